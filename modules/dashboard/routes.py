@@ -1,19 +1,14 @@
 import logging
-import json
-from pathlib import Path
 from fastapi import APIRouter, Depends, HTTPException
 from src.core.data.repository import EmailRepository
 from src.core.factory import get_email_repository
 from src.core.auth import get_current_active_user
+from src.core.performance_monitor import get_operation_averages
 from .models import ConsolidatedDashboardStats, WeeklyGrowth
-from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Use absolute path for performance log file
-LOG_FILE = Path(__file__).resolve().parent.parent.parent / "performance_metrics_log.jsonl"
-
 @router.get("/stats", response_model=ConsolidatedDashboardStats)
 async def get_dashboard_stats(
     repository: EmailRepository = Depends(get_email_repository),
@@ -54,28 +49,8 @@ async def get_dashboard_stats(
                 percentage=weekly_growth_data.get('percentage', 0.0)
             )
 
-        # Performance metrics (keep existing logic for now)
-        performance_metrics = defaultdict(lambda: {'total_duration': 0, 'count': 0})
-        try:
-            with open(LOG_FILE, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        log_entry = json.loads(line)
-                        op = log_entry.get("operation")
-                        duration = log_entry.get("duration_seconds")
-                        if op and duration is not None:
-                            performance_metrics[op]['total_duration'] += duration
-                            performance_metrics[op]['count'] += 1
-                    except json.JSONDecodeError:
-                        continue
-        except FileNotFoundError:
-            logger.warning(f"Performance log file not found: {LOG_FILE}")
-
-        avg_performance_metrics = {
-            op: data['total_duration'] / data['count']
-            for op, data in performance_metrics.items()
-            if data['count'] > 0  # Avoid division by zero
-        }
+        # Rolling average durations, kept current as operations are timed
+        avg_performance_metrics = get_operation_averages()
 
         return ConsolidatedDashboardStats(
             total_emails=total_emails,
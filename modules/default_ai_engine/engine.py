@@ -1,11 +1,12 @@
 import logging
-from typing import Any, Dict, List, Optional
+import os
+from typing import Any, Dict, List, Optional, Tuple
 
 # Core framework components
-from src.core.ai_engine import AIAnalysisResult, BaseAIEngine
+from src.core.ai_engine import ANALYSIS_FAILED_FLAG, AIAnalysisResult, BaseAIEngine
 
 # Module-specific components
-from backend.python_nlp.nlp_engine import NLPEngine
+from backend.python_nlp.nlp_engine import WARM_UP_ON_STARTUP, NLPEngine
 
 logger = logging.getLogger(__name__)
 
@@ -18,12 +19,16 @@ class DefaultAIEngine(BaseAIEngine):
     def __init__(self):
         self.nlp_engine = NLPEngine()
         self.category_lookup_map: Dict[str, Dict[str, Any]] = {}
+        # Model versions, with the loaded models they were read for
+        self._model_versions: Optional[Tuple[Tuple[str, ...], Dict[str, str]]] = None
 
     def initialize(self):
-        """Initializes the NLP engine and pre-compiles patterns."""
+        """Initializes the NLP engine and starts loading its models in the background."""
         try:
             self.nlp_engine.initialize_patterns()
-            self.health_check()
+            # Loading models here would delay startup; requests wait only for the models they use
+            if WARM_UP_ON_STARTUP:
+                self.nlp_engine.warm_up(background=True)
             logger.info("Default AI Engine initialized successfully.")
         except Exception as e:
             logger.error(f"Default AI Engine initialization failed: {e}", exc_info=True)
@@ -60,12 +65,41 @@ class DefaultAIEngine(BaseAIEngine):
         except Exception as e:
             logger.error(f"An error occurred during AI analysis: {e}", exc_info=True)
             return AIAnalysisResult(
-                {"reasoning": f"AI analysis error: {e}", "risk_flags": ["ai_analysis_failed"]}
+                {"reasoning": f"AI analysis error: {e}", "risk_flags": [ANALYSIS_FAILED_FLAG]}
             )
 
+    def get_model_versions(self) -> Dict[str, str]:
+        """
+        Identifies each NLP model by the latest modification time of its files.
+
+        The model directories are scanned again only when a model is loaded or
+        retrained, not on every analysis.
+        """
+        loaded = tuple(self.nlp_engine.loaded_models)
+        if self._model_versions is None or self._model_versions[0] != loaded:
+            self._model_versions = (loaded, self._scan_model_versions())
+        return dict(self._model_versions[1])
+
+    def invalidate_model_versions(self) -> None:
+        """Makes the next get_model_versions rescan the model files."""
+        self._model_versions = None
+
+    def _scan_model_versions(self) -> Dict[str, str]:
+        versions = {}
+        for head in ("sentiment", "topic", "intent", "urgency"):
+            path = getattr(self.nlp_engine, f"{head}_model_path", None)
+            if not path or not os.path.isdir(path):
+                continue
+            with os.scandir(path) as entries:
+                mtimes = [entry.stat().st_mtime for entry in entries if entry.is_file()]
+            versions[head] = str(max(mtimes, default=0.0))
+        return versions
+
     def health_check(self) -> Dict[str, Any]:
         """Performs a health check on the underlying NLP engine."""
-        return self.nlp_engine.analyze_email("health check", "health check")
+        health = self.nlp_engine.analyze_email("health check", "health check")
+        health["analysis_cache"] = self.get_analysis_cache_stats()
+        return health
 
     def cleanup(self):
         """Cleans up resources used by the NLP engine."""
@@ -97,6 +131,7 @@ class DefaultAIEngine(BaseAIEngine):
                 model_path = os.path.join(self.nlp_engine.model_dir, f"{model_type}_model.pkl")
                 joblib.dump(pipeline, model_path)
                 logger.info(f"{model_type.capitalize()} model saved to {model_path}")
+            self.invalidate_model_versions()
 
             logger.info("AI model training completed successfully.")
         except Exception as e:
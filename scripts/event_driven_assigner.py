@@ -9,7 +9,7 @@ import time
 from pathlib import Path
 from typing import List, Dict, Optional, Callable
 from datetime import datetime
-from task_queue import TaskRouter, Agent, Task, TaskQueue, Priority, TaskStatus
+from task_queue import TaskRouter, Agent, Task, TaskQueue, Priority
 from load_balancer import LoadBalancer
 
 
@@ -126,16 +126,21 @@ class EventDrivenTaskAssigner:
     def _assign_next_task_to_agent(self, agent: Agent):
         """Assign the next suitable task to an agent."""
         # Find the next suitable task for the agent
-        task = self.load_balancer.find_best_agent_for_task(agent)  # This needs to be public
-        if task:
-            self.load_balancer.assign_task_to_agent(task, agent)
+        if not agent.has_capacity():
+            return
+        for queue in self.router.queues.values():
+            task = queue.get_next_task(agent)
+            if task:
+                self.load_balancer.assign_task_to_agent(task, agent)
+                return
 
     def _reassign_failed_task(self, task: Task):
         """Reassign a failed task."""
-        # Reset task status
-        task.status = TaskStatus.PENDING
-        task.assigned_agent = None
-        task.assigned_at = None
+        # Reset task status and return it to its queue's ready tasks
+        queue = self.router.find_queue_for_task(task)
+        if queue is None:
+            return
+        queue.requeue_task(task)
 
         # Try to assign to a different agent
         best_agent = self.load_balancer.find_best_agent_for_task(task)
@@ -7,113 +7,320 @@ Efficient sync system that only transfers changed content between worktrees.
 import os
 import hashlib
 import json
+import mmap
+import struct
+import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Set
 from datetime import datetime
 from filecmp import dircmp
 import shutil
 
+from git_utils import GitHelper
+
+DEFAULT_EXTENSIONS = {'.md', '.txt', '.py', '.json', '.yml', '.yaml', '.xml', '.html', '.css', '.js'}
+
+HASH_INDEX_FILE = ".sync_index"
+# Bookkeeping files written next to the synced content; never synced themselves
+SYNC_METADATA_FILES = {HASH_INDEX_FILE, HASH_INDEX_FILE + ".tmp", ".sync_cache.json", ".sync_log.json"}
+
+# Index file layout: header (magic, entry count), then per entry
+# (size, mtime_ns, inode, SHA-1 digest, path length) followed by the UTF-8 path
+_INDEX_MAGIC = b"SYNCIDX1"
+_INDEX_HEADER = struct.Struct("<8sI")
+_INDEX_RECORD = struct.Struct("<QqQ20sH")
+
+READ_BUFFER_SIZE = 1024 * 1024
+# Files modified this close to a scan may change again without a visible
+# mtime change, so their hashes are not kept in the index
+RACY_WINDOW_NS = 2_000_000_000
+
+# (size, mtime_ns, inode, hash)
+IndexEntry = Tuple[int, int, int, str]
+
 
 class FileHash:
-    def __init__(self, path: str, hash_value: str, mtime: float):
+    def __init__(self, path: str, hash_value: str, mtime: float, size: Optional[int] = None):
         self.path = path
         self.hash = hash_value
         self.mtime = mtime
-        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size is None:
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.size = size
+
+
+class HashIndex:
+    """
+    On-disk index of file hashes keyed by path and validated by stat data.
+
+    A file whose size, mtime_ns and inode match its entry keeps its hash
+    without being read. The index is read through mmap in a single pass and
+    rewritten atomically by save(), once per scan.
+    """
+
+    def __init__(self, index_file: Path):
+        self.index_file = index_file
+        self.entries: Dict[str, IndexEntry] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def load(self):
+        """Load the index file, discarding it if it is missing or malformed."""
+        try:
+            with open(self.index_file, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    magic, count = _INDEX_HEADER.unpack_from(data, 0)
+                    if magic != _INDEX_MAGIC:
+                        raise ValueError("unknown index format")
+                    entries = {}
+                    offset = _INDEX_HEADER.size
+                    for _ in range(count):
+                        size, mtime_ns, inode, digest, path_len = _INDEX_RECORD.unpack_from(data, offset)
+                        offset += _INDEX_RECORD.size
+                        path = data[offset:offset + path_len].decode('utf-8', 'surrogateescape')
+                        offset += path_len
+                        entries[path] = (size, mtime_ns, inode, digest.hex())
+            self.entries = entries
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error loading hash index: {e}")
+
+    def save(self):
+        """Write the index if it changed since it was loaded or last saved."""
+        if not self.dirty:
+            return
+        tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        try:
+            with self._lock:
+                entries = list(self.entries.items())
+                self.dirty = False
+            with open(tmp_file, 'wb') as f:
+                f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, len(entries)))
+                for path, (size, mtime_ns, inode, hash_value) in entries:
+                    encoded = path.encode('utf-8', 'surrogateescape')
+                    f.write(_INDEX_RECORD.pack(size, mtime_ns, inode, bytes.fromhex(hash_value), len(encoded)))
+                    f.write(encoded)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            self.dirty = True
+            print(f"Error saving hash index: {e}")
+
+    def lookup(self, key: str, stat: os.stat_result) -> Optional[str]:
+        """Return the indexed hash of a file if its stat data is unchanged."""
+        entry = self.entries.get(key)
+        if entry is not None and entry[:3] == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return entry[3]
+        return None
+
+    def store(self, key: str, stat: os.stat_result, hash_value: str, now_ns: int):
+        """Record the hash of a file, unless it was modified too recently to trust its mtime."""
+        with self._lock:
+            if stat.st_mtime_ns >= now_ns - RACY_WINDOW_NS:
+                if self.entries.pop(key, None) is not None:
+                    self.dirty = True
+                return
+            entry = (stat.st_size, stat.st_mtime_ns, stat.st_ino, hash_value)
+            if self.entries.get(key) != entry:
+                self.entries[key] = entry
+                self.dirty = True
+
+    def prune(self, prefix: str, seen: Set[str]):
+        """Drop the entries under prefix ("" for the base directory) that were not seen."""
+        with self._lock:
+            stale = [
+                key for key in self.entries
+                if key not in seen and (key.startswith(prefix) if prefix else not key.startswith("../"))
+            ]
+            for key in stale:
+                del self.entries[key]
+            if stale:
+                self.dirty = True
+
+
+def git_blob_hashes(directory: Path) -> Dict[str, str]:
+    """
+    Get the git blob hashes of the tracked files under directory.
+
+    Only files whose worktree copy git considers unchanged from the index are
+    returned, keyed by path relative to directory. Returns an empty dict if
+    directory is not in a SHA-1 git worktree.
+    """
+    git = GitHelper(cwd=directory)
+    try:
+        object_format = git.run(["rev-parse", "--show-object-format"], check=False)
+        if object_format.returncode != 0 or object_format.stdout.strip() != "sha1":
+            return {}
+        listing = git.run(["ls-files", "-s", "-v", "-z"], check=False, text=False)
+        modified = git.run(["diff-files", "--name-only", "--relative", "-z"], check=False, text=False)
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    if listing.returncode != 0 or modified.returncode != 0:
+        return {}
+
+    modified_paths = {os.fsdecode(path) for path in modified.stdout.split(b"\0") if path}
+    blobs = {}
+    for record in listing.stdout.split(b"\0"):
+        if not record:
+            continue
+        info, _, path = record.partition(b"\t")
+        fields = info.split()
+        # Tag H: tracked without assume-unchanged or skip-worktree; stage 0: not conflicted
+        if len(fields) != 4 or fields[0] != b"H" or fields[3] != b"0":
+            continue
+        if fields[1] not in (b"100644", b"100755"):
+            continue
+        relative_path = os.fsdecode(path)
+        if relative_path not in modified_paths:
+            blobs[relative_path] = fields[2].decode('ascii')
+    return blobs
 
 
 class ChangeDetector:
-    def __init__(self, base_dir: Path):
+    """
+    Detects changed files between directory trees by content hash.
+
+    Hashes are git blob ids, so the hashes git already recorded for unchanged
+    tracked files can be used without reading them. Other files are looked up
+    in the hash index by stat data and only hashed (in parallel) on a miss.
+    """
+
+    def __init__(self, base_dir: Path, max_workers: Optional[int] = None, use_git: bool = True):
         self.base_dir = base_dir
-        self.hash_cache_file = base_dir / ".sync_cache.json"
-        self.hash_cache: Dict[str, FileHash] = {}
+        self.hash_cache_file = base_dir / HASH_INDEX_FILE
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.use_git = use_git
+        self.index = HashIndex(self.hash_cache_file)
+        self.hashed_files = 0
+        self.git_hashed_files = 0
         self.load_hash_cache()
 
+    @property
+    def hash_cache(self) -> Dict[str, IndexEntry]:
+        return self.index.entries
+
     def load_hash_cache(self):
         """Load hash cache from file."""
-        if self.hash_cache_file.exists():
-            try:
-                with open(self.hash_cache_file, 'r') as f:
-                    data = json.load(f)
-                    for path, item in data.items():
-                        self.hash_cache[path] = FileHash(
-                            path, item['hash'], item['mtime']
-                        )
-            except Exception as e:
-                print(f"Error loading hash cache: {e}")
+        self.index.load()
 
     def save_hash_cache(self):
         """Save hash cache to file."""
-        try:
-            data = {}
-            for path, file_hash in self.hash_cache.items():
-                data[path] = {
-                    'hash': file_hash.hash,
-                    'mtime': file_hash.mtime
-                }
-            with open(self.hash_cache_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving hash cache: {e}")
+        self.index.save()
 
     def calculate_file_hash(self, file_path: Path) -> str:
-        """Calculate SHA256 hash of a file."""
-        hash_sha256 = hashlib.sha256()
+        """Calculate the git blob hash (SHA-1) of a file."""
         with open(file_path, "rb") as f:
-            # Read file in chunks to handle large files efficiently
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+            size = os.fstat(f.fileno()).st_size
+            hash_sha1 = hashlib.sha1(b"blob %d\0" % size)
+            # Large reads let hashlib release the GIL for most of the work
+            for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
+                hash_sha1.update(chunk)
+        return hash_sha1.hexdigest()
 
-    def get_file_hash(self, file_path: Path) -> FileHash:
-        """Get file hash, calculating if not in cache."""
-        relative_path = str(file_path.relative_to(self.base_dir))
-        mtime = file_path.stat().st_mtime
-
-        # Check if file is in cache and hasn't changed
-        if relative_path in self.hash_cache:
-            cached = self.hash_cache[relative_path]
-            if cached.mtime == mtime:
-                return cached
-
-        # Calculate new hash
-        hash_value = self.calculate_file_hash(file_path)
-        file_hash = FileHash(str(file_path), hash_value, mtime)
-        self.hash_cache[relative_path] = file_hash
-        self.save_hash_cache()
-        return file_hash
+    def _index_key(self, file_path: Path) -> str:
+        return Path(os.path.relpath(file_path, self.base_dir)).as_posix()
 
-    def scan_directory(self, directory: Path, extensions: Set[str] = None) -> Dict[str, FileHash]:
-        """Scan directory and calculate hashes for all files."""
-        if extensions is None:
-            extensions = {'.md', '.txt', '.py', '.json', '.yml', '.yaml', '.xml', '.html', '.css', '.js'}
+    def get_file_hash(self, file_path: Path) -> FileHash:
+        """Get file hash, calculating if not in cache. Call save_hash_cache() to persist it."""
+        stat = file_path.stat()
+        key = self._index_key(file_path)
+        hash_value = self.index.lookup(key, stat)
+        if hash_value is None:
+            hash_value = self.calculate_file_hash(file_path)
+            self.hashed_files += 1
+            self.index.store(key, stat, hash_value, time.time_ns())
+        return FileHash(str(file_path), hash_value, stat.st_mtime, stat.st_size)
+
+    def _hash_or_none(self, file_path: Path) -> Optional[str]:
+        try:
+            return self.calculate_file_hash(file_path)
+        except OSError:
+            # Skip files that can't be read
+            return None
 
+    def _scan(self, directory: Path, extensions: Set[str]) -> Dict[str, FileHash]:
+        scan_start_ns = time.time_ns()
         file_hashes = {}
+        seen = set()
+        misses: List[Tuple[str, str, Path, os.stat_result]] = []
 
         for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if d != ".git"]
             for file in files:
+                if file in SYNC_METADATA_FILES:
+                    continue
                 if extensions and Path(file).suffix.lower() not in extensions:
                     continue
 
                 file_path = Path(root) / file
                 try:
-                    relative_path = str(file_path.relative_to(self.base_dir))
-                    file_hashes[relative_path] = self.get_file_hash(file_path)
-                except Exception:
-                    # Skip files that can't be read
+                    stat = file_path.stat()
+                except OSError:
+                    continue
+                relative_path = file_path.relative_to(directory).as_posix()
+                key = self._index_key(file_path)
+                seen.add(key)
+                hash_value = self.index.lookup(key, stat)
+                if hash_value is None:
+                    misses.append((relative_path, key, file_path, stat))
+                else:
+                    file_hashes[relative_path] = FileHash(str(file_path), hash_value, stat.st_mtime, stat.st_size)
+
+        if misses:
+            blobs = git_blob_hashes(directory) if self.use_git else {}
+            to_hash = []
+            for miss in misses:
+                blob = blobs.get(miss[0])
+                if blob is None:
+                    to_hash.append(miss)
                     continue
+                relative_path, key, file_path, stat = miss
+                self.git_hashed_files += 1
+                self.index.store(key, stat, blob, scan_start_ns)
+                file_hashes[relative_path] = FileHash(str(file_path), blob, stat.st_mtime, stat.st_size)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                hashes = executor.map(self._hash_or_none, [miss[2] for miss in to_hash])
+                for (relative_path, key, file_path, stat), hash_value in zip(to_hash, hashes):
+                    if hash_value is None:
+                        continue
+                    self.hashed_files += 1
+                    self.index.store(key, stat, hash_value, scan_start_ns)
+                    file_hashes[relative_path] = FileHash(str(file_path), hash_value, stat.st_mtime, stat.st_size)
+
+        prefix = self._index_key(directory)
+        self.index.prune("" if prefix == "." else prefix + "/", seen)
+        return file_hashes
 
+    def scan_directory(self, directory: Path, extensions: Set[str] = None) -> Dict[str, FileHash]:
+        """Scan directory and get hashes for all files, keyed by path relative to directory."""
+        if extensions is None:
+            extensions = DEFAULT_EXTENSIONS
+
+        file_hashes = self._scan(Path(directory), extensions)
+        self.save_hash_cache()
         return file_hashes
 
     def detect_changes(self, source_dir: Path, target_dir: Path,
                       extensions: Set[str] = None) -> Dict[str, List[str]]:
         """Detect changes between source and target directories."""
         if extensions is None:
-            extensions = {'.md', '.txt', '.py', '.json', '.yml', '.yaml', '.xml', '.html', '.css', '.js'}
+            extensions = DEFAULT_EXTENSIONS
 
-        source_hashes = self.scan_directory(source_dir, extensions)
-        target_hashes = self.scan_directory(target_dir, extensions)
+        # Scan both trees concurrently; the index is saved once for both
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            source_scan = executor.submit(self._scan, Path(source_dir), extensions)
+            target_hashes = self._scan(Path(target_dir), extensions)
+            source_hashes = source_scan.result()
+        self.save_hash_cache()
 
         added = []
         modified = []
@@ -137,6 +344,19 @@ class ChangeDetector:
             'deleted': deleted
         }
 
+    def record_copy(self, source_file: Path, target_file: Path):
+        """Index a copied file under the hash of its source, so the next scan need not read it."""
+        entry = self.index.entries.get(self._index_key(source_file))
+        if entry is None:
+            return
+        try:
+            stat = target_file.stat()
+        except OSError:
+            return
+        # copy2 keeps the mtime, so a source changed since its scan does not match
+        if (stat.st_size, stat.st_mtime_ns) == entry[:2]:
+            self.index.store(self._index_key(target_file), stat, entry[3], time.time_ns())
+
     def get_changed_files(self, source_dir: Path, target_dir: Path,
                          extensions: Set[str] = None) -> List[str]:
         """Get list of all changed files between directories."""
@@ -150,6 +370,7 @@ class ChangeDetector:
 
         source_hash = self.get_file_hash(source_file)
         target_hash = self.get_file_hash(target_file)
+        self.save_hash_cache()
 
         return source_hash.hash != target_hash.hash
 
@@ -183,7 +404,7 @@ class IncrementalSync:
     def sync_changes(self, extensions: Set[str] = None) -> Dict[str, int]:
         """Sync only changed files from source to target."""
         if extensions is None:
-            extensions = {'.md', '.txt', '.py', '.json', '.yml', '.yaml', '.xml', '.html', '.css', '.js'}
+            extensions = DEFAULT_EXTENSIONS
 
         start_time = time.time()
 
@@ -203,6 +424,7 @@ class IncrementalSync:
 
             # Copy file
             shutil.copy2(source_path, target_path)
+            self.change_detector.record_copy(source_path, target_path)
             synced_files += 1
 
         # Remove deleted files from target
@@ -210,6 +432,7 @@ class IncrementalSync:
             target_path = self.target_dir / relative_path
             if target_path.exists():
                 target_path.unlink()
+        self.change_detector.save_hash_cache()
 
         # Log sync operation
         sync_entry = {
@@ -255,7 +478,7 @@ class IncrementalSync:
     def preview_sync(self, extensions: Set[str] = None) -> Dict[str, List[str]]:
         """Preview what would be synced without actually syncing."""
         if extensions is None:
-            extensions = {'.md', '.txt', '.py', '.json', '.yml', '.yaml', '.xml', '.html', '.css', '.js'}
+            extensions = DEFAULT_EXTENSIONS
 
         return self.change_detector.detect_changes(self.source_dir, self.target_dir, extensions)
 
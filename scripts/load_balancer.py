@@ -4,12 +4,13 @@ Load Balancer for Documentation Tasks
 Implements automatic task distribution based on agent capabilities and performance history.
 """
 
+import heapq
 import json
 import time
 from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-from task_queue import TaskRouter, Agent, Task, TaskQueue, Priority, TaskStatus
+from task_queue import TaskRouter, Agent, Task, TaskQueue, Priority
 
 
 class LoadBalancer:
@@ -17,11 +18,14 @@ class LoadBalancer:
         self.router = router
         self.performance_history = {}
         self.agent_registry = {}
+        # agent name -> efficiency, recomputed when its performance history changes
+        self._efficiency_cache: Dict[str, float] = {}
 
     def register_agent(self, agent: Agent):
         """Register an agent with the load balancer."""
         self.agent_registry[agent.name] = agent
         self.performance_history[agent.name] = []
+        self._efficiency_cache.pop(agent.name, None)
 
     def update_agent_performance(self, agent_name: str, task_completion_time: int, success: bool = True):
         """Update performance history for an agent."""
@@ -35,8 +39,16 @@ class LoadBalancer:
             # Keep only last 100 entries
             if len(self.performance_history[agent_name]) > 100:
                 self.performance_history[agent_name] = self.performance_history[agent_name][-100:]
+            self._efficiency_cache.pop(agent_name, None)
 
     def get_agent_efficiency(self, agent_name: str) -> float:
+        """Get agent efficiency based on performance history."""
+        efficiency = self._efficiency_cache.get(agent_name)
+        if efficiency is None:
+            efficiency = self._efficiency_cache[agent_name] = self._calculate_agent_efficiency(agent_name)
+        return efficiency
+
+    def _calculate_agent_efficiency(self, agent_name: str) -> float:
         """Calculate agent efficiency based on performance history."""
         if agent_name not in self.performance_history:
             return 1.0  # Default efficiency
@@ -63,31 +75,31 @@ class LoadBalancer:
         return efficiency
 
     def balance_load(self):
-        """Distribute tasks evenly across available agents."""
-        # Get all pending tasks
-        pending_tasks = []
-        for queue in self.router.queues.values():
-            pending_tasks.extend([t for t in queue.tasks if t.status == TaskStatus.PENDING])
-
-        if not pending_tasks:
-            return
+        """Distribute ready tasks across available agents, highest priority first."""
+        free_slots = sum(
+            agent.max_concurrent_tasks - agent.current_load
+            for agent in self.router.agents if agent.has_capacity()
+        )
 
-        # Sort tasks by priority
-        pending_tasks.sort(key=lambda t: t.priority.value)
+        # Tasks with open dependencies are not in the ready heaps
+        ready_tasks = heapq.merge(*(queue.iter_ready_tasks() for queue in self.router.queues.values()))
 
         # Distribute tasks based on agent efficiency and capacity
-        for task in pending_tasks:
-            best_agent = self._find_best_agent_for_task(task)
+        for _, _, task in ready_tasks:
+            if free_slots <= 0:
+                break
+            best_agent = self.find_best_agent_for_task(task)
             if best_agent:
-                self._assign_task_to_agent(task, best_agent)
+                self.assign_task_to_agent(task, best_agent)
+                free_slots -= 1
 
     def find_best_agent_for_task(self, task: Task) -> Optional[Agent]:
         """Find the best agent for a specific task."""
         suitable_agents = []
 
         # Find agents that can handle this task type
-        for agent in self.router.agents:
-            if agent.can_handle_task(task) and agent.has_capacity():
+        for agent in self.router.get_candidate_agents(task):
+            if agent.has_capacity():
                 suitable_agents.append(agent)
 
         if not suitable_agents:
@@ -102,18 +114,15 @@ class LoadBalancer:
             score = (efficiency * 0.7) + (load_factor * 0.3)
             ranked_agents.append((agent, score))
 
-        # Sort by score (highest first)
-        ranked_agents.sort(key=lambda x: x[1], reverse=True)
-        return ranked_agents[0][0] if ranked_agents else None
+        # Highest score first; ties keep the order agents were added in
+        return max(ranked_agents, key=lambda x: x[1])[0]
 
     def assign_task_to_agent(self, task: Task, agent: Agent):
         """Assign a task to an agent through the router."""
-        # Find the queue that contains this task
-        for queue in self.router.queues.values():
-            if task in queue.tasks:
-                queue.mark_task_assigned(task, agent.name)
-                agent.assign_task(task)
-                break
+        queue = self.router.find_queue_for_task(task)
+        if queue is not None:
+            queue.mark_task_assigned(task, agent.name)
+            agent.assign_task(task)
 
     def get_load_balancing_stats(self) -> Dict:
         """Get load balancing statistics."""
@@ -8,12 +8,29 @@ import os
 import re
 import time
 import json
+import hashlib
+import heapq
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 
+from validation_cache import ValidationResultCacheManager
+
+LINK_PATTERN = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+PLACEHOLDER_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'\{\{.*?\}\}',  # {{placeholder}}
+        r'\[.*?\]\(.*?\)',  # [text](url) - but not markdown links
+        r'TODO:', r'FIXME:', r'XXX:'
+    )
+]
+
+READ_BUFFER_SIZE = 1024 * 1024
+# Added to each file's size when balancing chunks, for per-file overhead
+CHUNK_FILE_OVERHEAD = 4096
+
 
 class ValidationType(Enum):
     SYNTAX = "syntax"
@@ -52,6 +69,23 @@ class ValidationTask:
     duration: float = 0.0
 
 
+@dataclass
+class FileValidationResult:
+    file_path: str
+    errors: Dict[str, List[ValidationError]]  # validation type -> errors
+    durations: Dict[str, float] = field(default_factory=dict)  # validation type -> seconds
+    size: int = 0
+    content_hash: str = ""
+    cached: bool = False
+
+
+def _read_text(file_path: Path, content: Optional[str]) -> str:
+    if content is not None:
+        return content
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
 class ValidationWorker:
     def __init__(self, worker_id: str):
         self.worker_id = worker_id
@@ -59,12 +93,11 @@ class ValidationWorker:
         self.tasks_processed = 0
         self.errors_found = 0
 
-    def validate_syntax(self, file_path: Path) -> List[ValidationError]:
+    def validate_syntax(self, file_path: Path, content: Optional[str] = None) -> List[ValidationError]:
         """Validate syntax of a file."""
         errors = []
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = _read_text(file_path, content)
 
             # Check for basic syntax issues
             lines = content.split('\n')
@@ -108,16 +141,14 @@ class ValidationWorker:
 
         return errors
 
-    def validate_links(self, file_path: Path) -> List[ValidationError]:
+    def validate_links(self, file_path: Path, content: Optional[str] = None) -> List[ValidationError]:
         """Validate links in a file."""
         errors = []
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = _read_text(file_path, content)
 
             # Find markdown links
-            link_pattern = r'\[([^\]]+)\]\(([^)]+)\)'
-            links = re.findall(link_pattern, content)
+            links = LINK_PATTERN.findall(content)
 
             for text, url in links:
                 # Check for broken URLs (simplified check)
@@ -158,12 +189,11 @@ class ValidationWorker:
 
         return errors
 
-    def validate_content(self, file_path: Path) -> List[ValidationError]:
+    def validate_content(self, file_path: Path, content: Optional[str] = None) -> List[ValidationError]:
         """Validate content quality."""
         errors = []
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = _read_text(file_path, content)
 
             # Check for content issues
             if len(content.strip()) == 0:
@@ -187,14 +217,8 @@ class ValidationWorker:
                 ))
 
             # Check for placeholder text
-            placeholder_patterns = [
-                r'\{\{.*?\}\}',  # {{placeholder}}
-                r'\[.*?\]\(.*?\)',  # [text](url) - but not markdown links
-                r'TODO:', r'FIXME:', r'XXX:'
-            ]
-
-            for pattern in placeholder_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
+            for pattern in PLACEHOLDER_PATTERNS:
+                matches = pattern.findall(content)
                 for match in matches:
                     errors.append(ValidationError(
                         file_path=str(file_path),
@@ -215,6 +239,23 @@ class ValidationWorker:
 
         return errors
 
+    def validate(self, validation_type: ValidationType, file_path: Path,
+                 content: Optional[str] = None) -> List[ValidationError]:
+        """Run one type of validation on a file."""
+        if validation_type == ValidationType.SYNTAX:
+            return self.validate_syntax(file_path, content)
+        elif validation_type == ValidationType.LINKS:
+            return self.validate_links(file_path, content)
+        elif validation_type == ValidationType.CONTENT:
+            return self.validate_content(file_path, content)
+        elif validation_type == ValidationType.STRUCTURE:
+            # Structure validation would check document organization
+            return []
+        elif validation_type == ValidationType.COMPLETENESS:
+            # Completeness validation would check for required sections
+            return []
+        return []
+
     def run_validation_task(self, task: ValidationTask) -> ValidationTask:
         """Run a validation task."""
         self.is_active = True
@@ -224,22 +265,7 @@ class ValidationWorker:
             all_errors = []
 
             for file_path in task.files:
-                file_errors = []
-
-                if task.validation_type == ValidationType.SYNTAX:
-                    file_errors = self.validate_syntax(Path(file_path))
-                elif task.validation_type == ValidationType.LINKS:
-                    file_errors = self.validate_links(Path(file_path))
-                elif task.validation_type == ValidationType.CONTENT:
-                    file_errors = self.validate_content(Path(file_path))
-                elif task.validation_type == ValidationType.STRUCTURE:
-                    # Structure validation would check document organization
-                    file_errors = []
-                elif task.validation_type == ValidationType.COMPLETENESS:
-                    # Completeness validation would check for required sections
-                    file_errors = []
-
-                all_errors.extend(file_errors)
+                all_errors.extend(self.validate(task.validation_type, Path(file_path)))
 
             task.errors = all_errors
             task.result = ValidationResult.FAIL if all_errors else ValidationResult.PASS
@@ -264,9 +290,247 @@ class ValidationWorker:
         return task
 
 
+def validate_files(items: List[Tuple[str, Tuple[str, ...]]]) -> List[FileValidationResult]:
+    """
+    Validate a chunk of files. Runs in the engine's worker processes.
+
+    Each item is a file path and the validation type values to run on it.
+    Every file is read once and shared by its validations.
+    """
+    worker = ValidationWorker(f"pool-{os.getpid()}")
+    results = []
+    for file_path, type_values in items:
+        path = Path(file_path)
+        content = None
+        content_hash = ""
+        size = 0
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            size = len(data)
+            content = data.decode('utf-8')
+            content_hash = hashlib.sha256(data).hexdigest()
+        except (OSError, UnicodeDecodeError):
+            # The validators report the read error themselves
+            pass
+
+        result = FileValidationResult(file_path=file_path, errors={}, size=size, content_hash=content_hash)
+        for type_value in type_values:
+            start_time = time.perf_counter()
+            result.errors[type_value] = worker.validate(ValidationType(type_value), path, content)
+            result.durations[type_value] = time.perf_counter() - start_time
+        results.append(result)
+    return results
+
+
+def _content_hash(file_path: str) -> Tuple[str, int]:
+    """Hash a file as ValidationResultCacheManager does. Returns ("", 0) if unreadable."""
+    hash_sha256 = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
+                hash_sha256.update(chunk)
+    except OSError:
+        return "", 0
+    return hash_sha256.hexdigest(), size
+
+
+def _link_targets_hash(file_path: str, content_hash: str) -> str:
+    """
+    Fold the state of a file's relative link targets into its content hash.
+
+    A LINKS result depends on other files existing, so it is cached under
+    this key: deleting, creating or touching a link target invalidates it.
+    """
+    hash_sha256 = hashlib.sha256(content_hash.encode())
+    try:
+        content = _read_text(Path(file_path), None)
+    except (OSError, UnicodeDecodeError):
+        return content_hash
+    for _, url in LINK_PATTERN.findall(content):
+        if url.startswith('http') or url.startswith('#'):
+            continue
+        try:
+            mtime = (Path(file_path).parent / url).stat().st_mtime_ns
+        except (OSError, ValueError):
+            mtime = -1
+        hash_sha256.update(f"\0{url}\0{mtime}".encode())
+    return hash_sha256.hexdigest()
+
+
+class ValidationEngine:
+    """
+    Validates files across a process pool, skipping unchanged files.
+
+    Files whose content hash matches a cached result for every requested
+    validation are answered from the ValidationResultCacheManager. The rest
+    are sharded into chunks of similar total size and validated in worker
+    processes, so the regex-heavy validators are not serialized by the GIL.
+    Results are yielded as chunks complete.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 cache_manager: Optional[ValidationResultCacheManager] = None,
+                 chunks_per_worker: int = 4, use_cache: bool = True):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_manager = cache_manager or (ValidationResultCacheManager() if use_cache else None)
+        self.chunks_per_worker = chunks_per_worker
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # file -> content hash plus link target state, the cache key of LINKS results
+        self._link_hashes: Dict[str, str] = {}
+        # validation type -> {'files', 'bytes', 'seconds'}
+        self.throughput: Dict[str, Dict[str, float]] = {}
+
+    def shard(self, sized_items: List[Tuple[int, str, Tuple[str, ...]]]) -> List[List[Tuple[str, Tuple[str, ...]]]]:
+        """Split (size, file, types) items into chunks of similar total size, largest first."""
+        chunk_count = min(len(sized_items), self.max_workers * self.chunks_per_worker)
+        if chunk_count == 0:
+            return []
+        chunks: List[List[Tuple[str, Tuple[str, ...]]]] = [[] for _ in range(chunk_count)]
+        loads = [(0, index) for index in range(chunk_count)]
+        # Longest-processing-time-first: each file goes to the lightest chunk
+        for size, file_path, type_values in sorted(sized_items, key=lambda item: item[0], reverse=True):
+            load, index = heapq.heappop(loads)
+            chunks[index].append((file_path, type_values))
+            heapq.heappush(loads, (load + (size + CHUNK_FILE_OVERHEAD) * len(type_values), index))
+        return [chunks[index] for _, index in sorted(loads, reverse=True) if chunks[index]]
+
+    def _cache_key(self, type_value: str, file_path: str, content_hash: str) -> str:
+        if type_value == ValidationType.LINKS.value:
+            return self._link_hashes.get(file_path, content_hash)
+        return content_hash
+
+    def _cached_result(self, file_path: str, type_values: Tuple[str, ...],
+                       content_hash: str, size: int) -> Optional[FileValidationResult]:
+        errors = {}
+        for type_value in type_values:
+            entry = self.cache_manager.get_result(
+                type_value, Path(file_path),
+                content_hash=self._cache_key(type_value, file_path, content_hash)
+            )
+            if entry is None:
+                return None
+            errors[type_value] = [ValidationError(**error) for error in entry.metadata.get('errors', [])]
+        return FileValidationResult(file_path=file_path, errors=errors, size=size,
+                                    content_hash=content_hash, cached=True)
+
+    def _record(self, result: FileValidationResult):
+        for type_value, duration in result.durations.items():
+            stats = self.throughput.setdefault(type_value, {'files': 0, 'bytes': 0, 'seconds': 0.0})
+            stats['files'] += 1
+            stats['bytes'] += result.size
+            stats['seconds'] += duration
+
+        if self.cache_manager is None or not result.content_hash:
+            return
+        for type_value, errors in result.errors.items():
+            if any(error.error_type == "file_read_error" for error in errors):
+                continue
+            self.cache_manager.set_result(
+                type_value, Path(result.file_path),
+                ValidationResult.FAIL.value if errors else ValidationResult.PASS.value,
+                errors=[error.message for error in errors],
+                duration=result.durations.get(type_value, 0.0),
+                metadata={'errors': [asdict(error) for error in errors]},
+                content_hash=self._cache_key(type_value, result.file_path, result.content_hash),
+                save=False
+            )
+
+    def iter_validate_plan(self, plan: Dict[str, Sequence[ValidationType]],
+                           force: bool = False) -> Iterator[FileValidationResult]:
+        """
+        Validate each file of plan with its validation types, yielding results as they complete.
+
+        Cached results come first. The cache is saved once, after the last result.
+        """
+        items = [
+            (file_path, tuple(dict.fromkeys(vt.value for vt in types)))
+            for file_path, types in plan.items() if types
+        ]
+        with ThreadPoolExecutor(max_workers=min(32, self.max_workers + 4)) as hash_pool:
+            hashes = list(hash_pool.map(_content_hash, [file_path for file_path, _ in items]))
+            linked = [
+                (file_path, content_hash)
+                for (file_path, type_values), (content_hash, _) in zip(items, hashes)
+                if content_hash and ValidationType.LINKS.value in type_values
+            ]
+            self._link_hashes = dict(zip(
+                [file_path for file_path, _ in linked],
+                hash_pool.map(lambda item: _link_targets_hash(*item), linked)
+            ))
+
+        pending = []
+        for (file_path, type_values), (content_hash, size) in zip(items, hashes):
+            cached = None
+            if self.cache_manager is not None and content_hash and not force:
+                cached = self._cached_result(file_path, type_values, content_hash, size)
+            if cached is not None:
+                self.cache_hits += 1
+                yield cached
+            else:
+                self.cache_misses += 1
+                pending.append((size, file_path, type_values))
+
+        try:
+            chunks = self.shard(pending)
+            if self.max_workers <= 1 or len(chunks) <= 1:
+                for chunk in chunks:
+                    for result in validate_files(chunk):
+                        self._record(result)
+                        yield result
+                return
+
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(validate_files, chunk) for chunk in chunks]
+                try:
+                    for future in as_completed(futures):
+                        for result in future.result():
+                            self._record(result)
+                            yield result
+                finally:
+                    for future in futures:
+                        future.cancel()
+        finally:
+            if self.cache_manager is not None and pending:
+                self.cache_manager.save_cache()
+
+    def iter_validate(self, files: Iterable[str], validation_types: Sequence[ValidationType],
+                      force: bool = False) -> Iterator[FileValidationResult]:
+        """Run the same validation types on every file, yielding results as they complete."""
+        return self.iter_validate_plan({str(file_path): validation_types for file_path in files}, force)
+
+    def get_throughput(self) -> Dict[str, Dict[str, float]]:
+        """Get per-validator throughput of the files validated so far (cache hits excluded)."""
+        return {
+            type_value: {
+                'files': stats['files'],
+                'bytes': stats['bytes'],
+                'seconds': stats['seconds'],
+                'files_per_second': stats['files'] / stats['seconds'] if stats['seconds'] > 0 else 0.0,
+                'mb_per_second': stats['bytes'] / 1_000_000 / stats['seconds'] if stats['seconds'] > 0 else 0.0
+            }
+            for type_value, stats in self.throughput.items()
+        }
+
+    def get_statistics(self) -> Dict:
+        """Get cache and throughput statistics."""
+        total = self.cache_hits + self.cache_misses
+        return {
+            'max_workers': self.max_workers,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'hit_rate_percent': (self.cache_hits / total * 100) if total > 0 else 0,
+            'throughput': self.get_throughput()
+        }
+
+
 class ParallelValidationManager:
-    def __init__(self, max_workers: int = 4):
-        self.max_workers = max_workers
+    def __init__(self, max_workers: Optional[int] = None,
+                 cache_manager: Optional[ValidationResultCacheManager] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.engine = ValidationEngine(max_workers=self.max_workers, cache_manager=cache_manager)
         self.workers: Dict[str, ValidationWorker] = {}
         self.validation_history: List[ValidationTask] = []
         self.validation_log_file = Path("validation_log.json")
@@ -377,47 +641,63 @@ class ParallelValidationManager:
         return result
 
     def run_parallel_validation(self, tasks: List[ValidationTask]) -> Dict[str, ValidationTask]:
-        """Run multiple validation tasks in parallel."""
+        """
+        Run multiple validation tasks in parallel.
+
+        The files of all tasks are validated together by the process-pool
+        engine, so each file is read once and unchanged files are served from
+        the validation cache.
+        """
         if not self.workers:
             return {}
 
-        results = {}
+        plan: Dict[str, List[ValidationType]] = {}
+        for task in tasks:
+            for file_path in task.files:
+                types = plan.setdefault(str(file_path), [])
+                if task.validation_type not in types:
+                    types.append(task.validation_type)
 
-        # Use ThreadPoolExecutor for parallel validation
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all validation tasks
-            future_to_task = {
-                executor.submit(self.run_validation_task, task): task
-                for task in tasks
-            }
+        try:
+            file_results = {result.file_path: result for result in self.engine.iter_validate_plan(plan)}
+        except Exception as e:
+            results = {}
+            for task in tasks:
+                task.completed_at = time.time()
+                task.result = ValidationResult.FAIL
+                task.errors = [ValidationError(
+                    file_path="system",
+                    line_number=None,
+                    error_type="execution_error",
+                    message=f"Task execution failed: {str(e)}",
+                    severity="error"
+                )]
+                task.duration = task.completed_at - task.created_at
+                results[task.task_id] = task
+            return results
 
-            # Collect results as they complete
-            for future in as_completed(future_to_task):
-                task = future_to_task[future]
-                try:
-                    result = future.result()
-                    results[task.task_id] = result
-                except Exception as e:
-                    # Create failed task result
-                    failed_task = ValidationTask(
-                        task_id=task.task_id,
-                        validation_type=task.validation_type,
-                        files=task.files,
-                        worker_id=task.worker_id,
-                        created_at=task.created_at,
-                        completed_at=time.time(),
-                        result=ValidationResult.FAIL,
-                        errors=[ValidationError(
-                            file_path="system",
-                            line_number=None,
-                            error_type="execution_error",
-                            message=f"Task execution failed: {str(e)}",
-                            severity="error"
-                        )],
-                        duration=time.time() - task.created_at
-                    )
-                    results[task.task_id] = failed_task
+        available_workers = list(self.workers)
+        results = {}
+        for task in tasks:
+            if task.worker_id not in self.workers:
+                task.worker_id = available_workers[0]
+            type_value = task.validation_type.value
+            task.errors = []
+            task.duration = 0.0
+            for file_path in task.files:
+                file_result = file_results[str(file_path)]
+                task.errors.extend(file_result.errors.get(type_value, []))
+                task.duration += file_result.durations.get(type_value, 0.0)
+            task.result = ValidationResult.FAIL if task.errors else ValidationResult.PASS
+            task.completed_at = time.time()
+
+            worker = self.workers[task.worker_id]
+            worker.tasks_processed += 1
+            worker.errors_found += len(task.errors)
+            self.validation_history.append(task)
+            results[task.task_id] = task
 
+        self.save_validation_log()
         return results
 
     def get_worker_status(self, worker_id: str) -> Optional[Dict]:
@@ -465,7 +745,8 @@ class ParallelValidationManager:
             'pass_rate': (passed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
             'total_errors': total_errors,
             'error_types': error_types,
-            'worker_statuses': self.get_all_workers_status()
+            'worker_statuses': self.get_all_workers_status(),
+            'engine': self.engine.get_statistics()
         }
 
 
@@ -475,14 +756,14 @@ def main():
     print("=" * 35)
 
     # Create validation manager
-    manager = ParallelValidationManager(max_workers=4)
+    manager = ParallelValidationManager()
 
     # Add some workers
     manager.add_worker("validator1")
     manager.add_worker("validator2")
     manager.add_worker("validator3")
 
-    print("Parallel validation manager initialized with 3 workers")
+    print(f"Parallel validation manager initialized with 3 workers over {manager.max_workers} processes")
     print("System ready to run multiple validation processes simultaneously")
 
     # Example of what the workflow would look like:
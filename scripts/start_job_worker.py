@@ -1,30 +1,29 @@
 #!/usr/bin/env python3
 """
-RQ Job Worker for Dashboard Background Tasks
+Job Worker for Dashboard Background Tasks
 
-This script starts RQ workers to process background jobs for dashboard calculations.
+This script starts worker processes for the SQLite-backed job queue to process
+background jobs for dashboard calculations, reindexing and filter backfills.
 Run this script to enable background processing of heavy dashboard operations.
 """
 
 import sys
 import os
 
-# Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# Add the repository root to path; job functions are imported as src.core.*
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.job_queue import main as job_queue_main
 
-from rq import Worker, Queue, Connection
-from redis import Redis
 
 def main():
-    """Start RQ worker for dashboard jobs"""
-    redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+    """Start job workers for dashboard jobs"""
+    workers = os.getenv('JOB_QUEUE_WORKERS', '2')
+    print(f"Starting {workers} job workers for dashboard jobs...")
+    print(f"Job database: {os.getenv('JOB_QUEUE_DB_PATH', os.path.join('data', 'jobs.db'))}")
+    print("Press Ctrl+C to stop")
+    return job_queue_main(['worker', '--processes', workers] + sys.argv[1:])
 
-    with Connection(Redis.from_url(redis_url)):
-        worker = Worker(['dashboard_jobs'], name='dashboard-worker')
-        print("Starting RQ worker for dashboard jobs...")
-        print(f"Redis URL: {redis_url}")
-        print("Press Ctrl+C to stop")
-        worker.work()
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
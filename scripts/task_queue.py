@@ -4,10 +4,12 @@ Task Queue System with Smart Routing
 Implements independent task queues with smart routing based on agent capabilities.
 """
 
+import heapq
+import itertools
 import json
 import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from enum import Enum
 from dataclasses import dataclass, asdict
 from datetime import datetime
@@ -93,44 +95,125 @@ class Agent:
         return self.current_load / self.max_concurrent_tasks
 
 
+# Orders tasks of equal priority by when they were queued, across all queues
+_queue_sequence = itertools.count()
+
+# (priority value, queue sequence, task)
+ReadyEntry = Tuple[int, int, Task]
+
+
+class TaskList:
+    """Insertion-ordered collection of tasks with O(1) membership and removal. Task IDs are unique."""
+
+    def __init__(self):
+        self._tasks: Dict[str, Task] = {}
+
+    def append(self, task: Task):
+        self._tasks[task.id] = task
+
+    def remove(self, task: Task):
+        if self._tasks.get(task.id) is not task:
+            raise ValueError(f"Task {task.id} is not in the list")
+        del self._tasks[task.id]
+
+    def get(self, task_id: str) -> Optional[Task]:
+        return self._tasks.get(task_id)
+
+    def __contains__(self, task) -> bool:
+        return isinstance(task, Task) and self._tasks.get(task.id) is task
+
+    def __iter__(self) -> Iterator[Task]:
+        return iter(list(self._tasks.values()))
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
 class TaskQueue:
+    """
+    Queue of tasks scheduled by priority and dependencies.
+
+    Tasks whose dependencies are all completed wait in a heap per task type,
+    keyed by priority and then queue order. Tasks with open dependencies are
+    counted in a dependency graph instead, and move to their heap when the
+    last dependency completes, so no lookup scans the queue.
+
+    Heap entries of tasks that stopped being pending (e.g. assigned) are
+    dropped lazily; a task set back to pending must be passed to requeue_task.
+    """
+
     def __init__(self, name: str):
         self.name = name
-        self.tasks: List[Task] = []
+        self.tasks = TaskList()
         self.completed_tasks: List[Task] = []
+        self._completed_ids: Set[str] = set()
+        self._ready: Dict[str, List[ReadyEntry]] = {}
+        self._in_ready: Set[str] = set()
+        # task ID -> number of dependencies not yet completed
+        self._open_dependencies: Dict[str, int] = {}
+        # dependency ID -> IDs of the tasks waiting for it
+        self._dependents: Dict[str, List[str]] = {}
 
     def add_task(self, task: Task):
         """Add a task to the queue."""
         self.tasks.append(task)
+        open_dependencies = 0
+        for dep_id in set(task.dependencies):
+            if dep_id not in self._completed_ids:
+                self._dependents.setdefault(dep_id, []).append(task.id)
+                open_dependencies += 1
+        if open_dependencies:
+            self._open_dependencies[task.id] = open_dependencies
+        else:
+            self._push_ready(task)
+
+    def _push_ready(self, task: Task):
+        if task.id in self._in_ready:
+            return
+        heapq.heappush(self._ready.setdefault(task.type, []),
+                       (task.priority.value, next(_queue_sequence), task))
+        self._in_ready.add(task.id)
+
+    def _peek_ready(self, task_type: str) -> Optional[ReadyEntry]:
+        """Return the first pending entry of a type's heap, dropping stale entries."""
+        heap = self._ready.get(task_type)
+        while heap:
+            entry = heap[0]
+            task = entry[2]
+            if task.status == TaskStatus.PENDING and task in self.tasks:
+                return entry
+            heapq.heappop(heap)
+            self._in_ready.discard(task.id)
+        return None
 
     def get_next_task(self, agent: Agent) -> Optional[Task]:
         """Get the next suitable task for an agent."""
-        # Sort tasks by priority and dependencies
-        sorted_tasks = sorted(self.tasks, key=lambda t: (
-            t.priority.value,
-            len([d for d in t.dependencies if not self._is_dependency_completed(d)])
-        ))
-
-        for task in sorted_tasks:
-            if (task.status == TaskStatus.PENDING and
-                agent.can_handle_task(task) and
-                self._are_dependencies_met(task)):
-                return task
-        return None
+        if "general" in agent.capabilities:
+            task_types = list(self._ready)
+        else:
+            task_types = agent.capabilities
+
+        best = None
+        for task_type in task_types:
+            entry = self._peek_ready(task_type)
+            if entry is not None and (best is None or entry < best):
+                best = entry
+        return best[2] if best is not None else None
+
+    def iter_ready_tasks(self) -> Iterator[ReadyEntry]:
+        """Yield the entries of pending tasks with all dependencies met, in scheduling order."""
+        entries = sorted(itertools.chain.from_iterable(self._ready.values()))
+        for entry in entries:
+            if entry[2].status == TaskStatus.PENDING and entry[2] in self.tasks:
+                yield entry
 
     def _is_dependency_completed(self, task_id: str) -> bool:
         """Check if a dependency task is completed."""
-        for task in self.completed_tasks:
-            if task.id == task_id:
-                return True
-        return False
+        return task_id in self._completed_ids
 
     def _are_dependencies_met(self, task: Task) -> bool:
         """Check if all dependencies for a task are met."""
-        for dep_id in task.dependencies:
-            if not self._is_dependency_completed(dep_id):
-                return False
-        return True
+        return task.id not in self._open_dependencies
 
     def mark_task_assigned(self, task: Task, agent_name: str):
         """Mark a task as assigned to an agent."""
@@ -138,18 +221,41 @@ class TaskQueue:
         task.assigned_agent = agent_name
         task.assigned_at = datetime.now().isoformat()
 
+    def requeue_task(self, task: Task):
+        """Return an assigned or failed task to the pending tasks."""
+        task.status = TaskStatus.PENDING
+        task.assigned_agent = None
+        task.assigned_at = None
+        if task in self.tasks and self._are_dependencies_met(task):
+            self._push_ready(task)
+
     def mark_task_completed(self, task: Task):
         """Mark a task as completed."""
         task.status = TaskStatus.COMPLETED
         task.completed_at = datetime.now().isoformat()
         self.tasks.remove(task)
         self.completed_tasks.append(task)
+        self._completed_ids.add(task.id)
+
+        # Release the tasks for which this was the last open dependency
+        for dependent_id in self._dependents.pop(task.id, ()):
+            remaining = self._open_dependencies.get(dependent_id, 0) - 1
+            if remaining > 0:
+                self._open_dependencies[dependent_id] = remaining
+                continue
+            self._open_dependencies.pop(dependent_id, None)
+            dependent = self.tasks.get(dependent_id)
+            if dependent is not None and dependent.status == TaskStatus.PENDING:
+                self._push_ready(dependent)
 
 
 class TaskRouter:
     def __init__(self):
         self.queues: Dict[str, TaskQueue] = {}
         self.agents: List[Agent] = []
+        # capability -> agents having it; "general" agents can handle any task
+        self.agent_pools: Dict[str, List[Agent]] = {}
+        self._agent_order: Dict[int, int] = {}
 
     def add_queue(self, queue: TaskQueue):
         """Add a task queue."""
@@ -157,7 +263,28 @@ class TaskRouter:
 
     def add_agent(self, agent: Agent):
         """Add an agent."""
+        self._agent_order[id(agent)] = len(self.agents)
         self.agents.append(agent)
+        for capability in set(agent.capabilities):
+            self.agent_pools.setdefault(capability, []).append(agent)
+
+    def get_candidate_agents(self, task: Task) -> List[Agent]:
+        """Get the agents able to handle a task, from the capability pools, in the order they were added."""
+        candidates = list(self.agent_pools.get(task.type, ()))
+        if task.type != "general":
+            candidates.extend(
+                agent for agent in self.agent_pools.get("general", ())
+                if task.type not in agent.capabilities
+            )
+            candidates.sort(key=lambda agent: self._agent_order[id(agent)])
+        return candidates
+
+    def find_queue_for_task(self, task: Task) -> Optional[TaskQueue]:
+        """Find the queue that contains a task."""
+        for queue in self.queues.values():
+            if task in queue.tasks:
+                return queue
+        return None
 
     def route_task(self, task: Task) -> bool:
         """Route a task to the appropriate queue."""
@@ -196,12 +323,10 @@ class TaskRouter:
 
     def _assign_task_to_agent(self, task: Task, agent: Agent):
         """Assign a task to an agent."""
-        # Find the queue that contains this task
-        for queue in self.queues.values():
-            if task in queue.tasks:
-                queue.mark_task_assigned(task, agent.name)
-                agent.assign_task(task)
-                break
+        queue = self.find_queue_for_task(task)
+        if queue is not None:
+            queue.mark_task_assigned(task, agent.name)
+            agent.assign_task(task)
 
     def get_queue_stats(self) -> Dict:
         """Get statistics for all queues."""
@@ -7,6 +7,8 @@ import sys
 import os
 import tempfile
 import shutil
+import subprocess
+import time
 from pathlib import Path
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 
@@ -71,5 +73,53 @@ def test_incremental_sync():
 
         print("Incremental sync test completed successfully!")
 
+def test_hash_index_and_git_hashes_avoid_rehashing():
+    """Unchanged files are recognised by stat data or git's index instead of being reread."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = Path(temp_dir) / "source"
+        target_dir = Path(temp_dir) / "target"
+        source_dir.mkdir()
+        for i in range(20):
+            (source_dir / f"doc{i}.md").write_text(f"# Document {i}\n")
+        # Files modified within the racy window are not indexed
+        old = time.time() - 60
+        for path in source_dir.iterdir():
+            os.utime(path, (old, old))
+
+        sync = IncrementalSync(source_dir, target_dir)
+        detector = sync.change_detector
+        detector.use_git = False
+        assert sync.sync_changes()['added'] == 20
+        assert detector.hashed_files == 20
+
+        # Copies are indexed under their source hash, so a second sync only stats
+        detector = ChangeDetector(source_dir, use_git=False)
+        assert len(detector.hash_cache) == 40
+        changes = detector.detect_changes(source_dir, target_dir)
+        assert changes == {'added': [], 'modified': [], 'deleted': []}
+        assert detector.hashed_files == 0
+
+        (source_dir / "doc3.md").write_text("# Changed\n")
+        assert detector.detect_changes(source_dir, target_dir)['modified'] == ['doc3.md']
+        assert detector.hashed_files == 1
+        assert detector.calculate_file_hash(source_dir / "doc3.md") == subprocess.run(
+            ["git", "hash-object", str(source_dir / "doc3.md")],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+        # In a git worktree, blob hashes of unchanged tracked files are reused
+        repo_dir = Path(temp_dir) / "repo"
+        shutil.copytree(source_dir, repo_dir)
+        subprocess.run(["git", "init", "-q"], cwd=repo_dir, check=True)
+        subprocess.run(["git", "add", "."], cwd=repo_dir, check=True)
+        (repo_dir / "doc5.md").write_text("# Edited after staging\n")
+        detector = ChangeDetector(repo_dir)
+        hashes = detector.scan_directory(repo_dir)
+        assert (detector.git_hashed_files, detector.hashed_files) == (19, 1)
+        assert hashes['doc3.md'].hash == detector.calculate_file_hash(repo_dir / "doc3.md")
+        assert hashes['doc5.md'].hash == detector.calculate_file_hash(repo_dir / "doc5.md")
+
+
 if __name__ == "__main__":
-    test_incremental_sync()
\ No newline at end of file
+    test_incremental_sync()
+    test_hash_index_and_git_hashes_avoid_rehashing()
\ No newline at end of file
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the process-pool validation engine
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from parallel_validator import ParallelValidationManager, ValidationEngine, ValidationType
+from validation_cache import ValidationResultCacheManager
+
+
+def test_parallel_validation_uses_process_pool_and_cache():
+    """Tasks are validated across processes, then answered from the cache."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        files = []
+        for i in range(12):
+            doc = temp_path / f"doc{i}.md"
+            doc.write_text(f"# Guide {i}\n\n" + "Plenty of words in this document body. " * (i + 1))
+            files.append(str(doc))
+        broken = temp_path / "broken.md"
+        broken.write_text("# Broken (\n\nSee [the missing page](missing.md) for more words here today.\n")
+        files.append(str(broken))
+
+        cache_manager = ValidationResultCacheManager(cache_file=temp_path / ".validation_cache.json")
+        manager = ParallelValidationManager(max_workers=2, cache_manager=cache_manager)
+        manager.validation_log_file = temp_path / "validation_log.json"
+        manager.add_worker("validator1")
+
+        def make_tasks():
+            return [
+                manager.create_validation_task(ValidationType.SYNTAX, files, "validator1"),
+                manager.create_validation_task(ValidationType.LINKS, files, "validator1"),
+            ]
+
+        syntax, links = manager.run_parallel_validation(make_tasks()).values()
+        assert [e.error_type for e in syntax.errors] == ["unbalanced_parentheses"]
+        assert [e.error_type for e in links.errors] == ["broken_link"]
+        assert manager.engine.cache_misses == 13
+        throughput = manager.engine.get_throughput()
+        assert throughput["syntax"]["files"] == 13
+        assert throughput["links"]["files"] == 13
+
+        # Unchanged files are served from the cache with the same errors
+        syntax, links = manager.run_parallel_validation(make_tasks()).values()
+        assert manager.engine.cache_hits == 13
+        assert syntax.errors[0].line_number == 1
+        assert links.errors[0].message == "Broken link to file: missing.md"
+
+        # A LINKS result depends on the link target, not just the file's content
+        (temp_path / "missing.md").write_text("# Found\n")
+        engine = ValidationEngine(max_workers=2, cache_manager=cache_manager)
+        results = list(engine.iter_validate(files, [ValidationType.SYNTAX, ValidationType.LINKS]))
+        assert (engine.cache_hits, engine.cache_misses) == (12, 1)
+        assert not [r for r in results if r.errors["links"]]
+
+        broken.write_text("# Fixed\n\nEnough words in this document to pass the content checks.\n")
+        engine = ValidationEngine(max_workers=2, cache_manager=cache_manager)
+        results = list(engine.iter_validate(files, [ValidationType.SYNTAX]))
+        assert (engine.cache_hits, engine.cache_misses) == (12, 1)
+        assert not [r for r in results if r.errors["syntax"]]
+
+
+def test_shards_are_balanced_by_size():
+    engine = ValidationEngine(max_workers=2, chunks_per_worker=1, use_cache=False)
+    sizes = [900, 500, 400, 300, 200, 100]
+    chunks = engine.shard([(size * 1_000_000, f"f{size}", ("syntax",)) for size in sizes])
+    totals = sorted(sum(int(name[1:]) for name, _ in chunk) for chunk in chunks)
+    assert totals == [1200, 1200]
+
+
+if __name__ == "__main__":
+    test_parallel_validation_uses_process_pool_and_cache()
+    test_shards_are_balanced_by_size()
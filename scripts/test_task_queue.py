@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the indexed task scheduler and load balancer
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from task_queue import TaskRouter, Agent, Task, TaskQueue, Priority, TaskStatus
+from load_balancer import LoadBalancer
+
+
+def _task(task_id, task_type="api", priority=Priority.NORMAL, dependencies=None):
+    return Task(task_id, task_id, "", task_type, 10, priority, dependencies=dependencies)
+
+
+def test_dependencies_release_tasks_in_priority_order():
+    queue = TaskQueue("api_docs")
+    agent = Agent("writer", ["api"], 10)
+    queue.add_task(_task("a", priority=Priority.LOW))
+    queue.add_task(_task("b", priority=Priority.CRITICAL, dependencies=["a", "c"]))
+    queue.add_task(_task("c"))
+    queue.add_task(_task("d", task_type="guide", priority=Priority.CRITICAL))
+
+    # d is a guide task, b waits for a and c
+    assert queue.get_next_task(agent).id == "c"
+    assert queue.get_next_task(Agent("any", ["general"])).id == "d"
+
+    queue.mark_task_assigned(queue.tasks.get("c"), "writer")
+    queue.mark_task_completed(queue.tasks.get("c"))
+    assert queue.get_next_task(agent).id == "a"
+    queue.mark_task_completed(queue.tasks.get("a"))
+    assert queue.get_next_task(agent).id == "b"
+
+    b = queue.tasks.get("b")
+    queue.mark_task_assigned(b, "writer")
+    assert queue.get_next_task(agent) is None
+    queue.requeue_task(b)
+    assert queue.get_next_task(agent) is b
+
+
+def test_load_balancer_routes_with_capability_pools():
+    router = TaskRouter()
+    for name in ("api_docs", "user_guides", "general"):
+        router.add_queue(TaskQueue(name))
+    api = Agent("api-writer", ["api"], 2)
+    generalist = Agent("generalist", ["general"], 1)
+    guide = Agent("guide-writer", ["guide"], 1)
+    balancer = LoadBalancer(router)
+    for agent in (api, generalist, guide):
+        router.add_agent(agent)
+        balancer.register_agent(agent)
+
+    for i in range(3):
+        router.route_task(_task(f"api{i}"))
+    router.route_task(_task("guide0", task_type="guide", priority=Priority.HIGH))
+    router.route_task(_task("blocked", task_type="guide", dependencies=["guide0"]))
+    balancer.update_agent_performance("generalist", 5, success=False)
+
+    assert router.get_candidate_agents(_task("x")) == [api, generalist]
+    balancer.balance_load()
+    assigned = {
+        task.id: task.assigned_agent
+        for queue in router.queues.values() for task in queue.tasks
+        if task.status == TaskStatus.ASSIGNED
+    }
+    assert assigned == {
+        "guide0": "guide-writer", "api0": "api-writer", "api1": "api-writer", "api2": "generalist"
+    }
+    assert balancer.get_agent_efficiency("generalist") < balancer.get_agent_efficiency("api-writer")
+
+
+def test_routing_only_touches_the_heads_of_the_ready_heaps():
+    router = TaskRouter()
+    queue = TaskQueue("api_docs")
+    router.add_queue(queue)
+    priorities = list(Priority)
+    for i in range(10_000):
+        dependencies = [f"t{i - 1}"] if i % 10 == 0 and i else None
+        queue.add_task(_task(f"t{i}", priority=priorities[i % 4], dependencies=dependencies))
+    balancer = LoadBalancer(router)
+    for i in range(50):
+        agent = Agent(f"agent{i}", ["api" if i % 2 else "guide"], 1_000_000)
+        router.add_agent(agent)
+        balancer.register_agent(agent)
+
+    ready = len(queue._ready["api"])
+    expected = [
+        task.id for task in queue.tasks
+        if task.priority == Priority.CRITICAL and not task.dependencies
+    ][:1000]
+    picked = []
+    for _ in range(1000):
+        task = queue.get_next_task(router.agents[1])
+        balancer.assign_task_to_agent(task, balancer.find_best_agent_for_task(task))
+        picked.append(task.id)
+
+    # Tasks come out by priority then insertion order, and each pick only
+    # drops the stale head of the heap instead of rescanning the queue
+    assert picked == expected
+    assert len(queue._ready["api"]) == ready - 999
+    assert queue._open_dependencies.keys() == {f"t{i}" for i in range(10, 10_000, 10)}
+
+
+if __name__ == "__main__":
+    test_dependencies_release_tasks_in_priority_order()
+    test_load_balancer_routes_with_capability_pools()
+    test_routing_only_touches_the_heads_of_the_ready_heaps()
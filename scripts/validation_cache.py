@@ -114,14 +114,15 @@ class ValidationResultCacheManager:
         if old_entries:
             self.save_cache()
 
-    def get_result(self, validator_type: str, file_path: Path) -> Optional[ValidationResultCache]:
-        """Get cached validation result."""
+    def get_result(self, validator_type: str, file_path: Path,
+                   content_hash: Optional[str] = None) -> Optional[ValidationResultCache]:
+        """Get cached validation result. Pass content_hash if the file was already hashed."""
         cache_key = self._generate_cache_key(validator_type, str(file_path))
         cache_entry = self.cache.get(cache_key)
 
         if cache_entry:
             # Check if content has changed
-            current_hash = self._calculate_content_hash(file_path)
+            current_hash = content_hash if content_hash is not None else self._calculate_content_hash(file_path)
             if cache_entry.content_hash == current_hash and self._is_cache_age_valid(cache_entry.timestamp):
                 return cache_entry
 
@@ -129,14 +130,21 @@ class ValidationResultCacheManager:
 
     def set_result(self, validator_type: str, file_path: Path, result: str,
                    errors: List[str] = None, duration: float = 0.0,
-                   metadata: Dict = None) -> bool:
-        """Set validation result in cache."""
+                   metadata: Dict = None, content_hash: Optional[str] = None,
+                   save: bool = True) -> bool:
+        """
+        Set validation result in cache.
+
+        Pass content_hash if the validated content was already hashed, and
+        save=False to batch several results into one save_cache() call.
+        """
         if errors is None:
             errors = []
         if metadata is None:
             metadata = {}
 
-        content_hash = self._calculate_content_hash(file_path)
+        if content_hash is None:
+            content_hash = self._calculate_content_hash(file_path)
         if not content_hash:
             return False
 
@@ -154,7 +162,8 @@ class ValidationResultCacheManager:
         )
 
         self.cache[cache_key] = cache_entry
-        self.save_cache()
+        if save:
+            self.save_cache()
         return True
 
     def invalidate_result(self, validator_type: str, file_path: str) -> bool:
@@ -5,6 +5,8 @@ This module defines the API routes for the dashboard endpoints,
 including statistics and metrics for the Email Intelligence platform.
 """
 
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, Any
 
@@ -48,10 +50,11 @@ async def get_dashboard_stats(
         # Get weekly growth - for now keep synchronous, but prepare for background jobs
         weekly_growth = await email_service.get_weekly_growth()
 
-        # Trigger background job for growth calculation (non-blocking)
+        # Trigger background job for growth calculation (non-blocking); it reads
+        # the last saved snapshot, so the request never waits on a save
         from src.core.job_queue import get_job_queue
         job_queue = get_job_queue()
-        growth_job_id = job_queue.enqueue_weekly_growth_calculation(email_service)
+        growth_job_id = await asyncio.to_thread(job_queue.enqueue_weekly_growth_calculation, email_service)
 
         stats = DashboardStats(
             total_emails=total_emails,
@@ -98,7 +101,7 @@ def get_job_status(job_id: str, current_user: str = Depends(get_current_active_u
 
 
 @router.post("/jobs/weekly-growth")
-def trigger_weekly_growth_calculation(
+async def trigger_weekly_growth_calculation(
     email_service: EmailService = Depends(get_email_service),
     current_user: str = Depends(get_current_active_user)
 ):
@@ -109,7 +112,7 @@ def trigger_weekly_growth_calculation(
         from src.core.job_queue import get_job_queue
 
         job_queue = get_job_queue()
-        job_id = job_queue.enqueue_weekly_growth_calculation(email_service)
+        job_id = await asyncio.to_thread(job_queue.enqueue_weekly_growth_calculation, email_service)
 
         return {
             "success": True,
@@ -16,6 +16,8 @@ from functools import partial
 from pathlib import Path
 from typing import Any, Dict, List, Literal, Optional
 
+from src.core.dashboard_aggregates import EmailAggregates
+
 from .constants import DEFAULT_CATEGORY_COLOR
 from .performance_monitor import log_performance
 
@@ -96,6 +98,13 @@ class DatabaseManager:
         self.categories_by_id: Dict[int, Dict[str, Any]] = {}
         self.categories_by_name: Dict[str, Dict[str, Any]] = {}
         self.category_counts: Dict[int, int] = {}
+        self.dashboard_aggregates = EmailAggregates(
+            time_field=FIELD_CREATED_AT,
+            fallback_field=FIELD_TIME,
+            id_field=FIELD_ID,
+            category_field=FIELD_CATEGORY_ID,
+            unread_field=FIELD_IS_UNREAD,
+        )
 
         # State
         self._dirty_data: set[str] = set()
@@ -143,6 +152,7 @@ class DatabaseManager:
         }
         self.categories_by_id = {cat[FIELD_ID]: cat for cat in self.categories_data}
         self.categories_by_name = {cat[FIELD_NAME].lower(): cat for cat in self.categories_data}
+        self.dashboard_aggregates.rebuild(self.emails_data)
         self.category_counts = {cat_id: 0 for cat_id in self.categories_by_id}
         for email in self.emails_data:
             cat_id = email.get(FIELD_CATEGORY_ID)
@@ -306,6 +316,7 @@ class DatabaseManager:
 
         self.emails_data.append(light_email_record)
         self.emails_by_id[new_id] = light_email_record
+        self.dashboard_aggregates.add(light_email_record)
         if message_id:
             self.emails_by_message_id[message_id] = light_email_record
         await self._save_data(DATA_TYPE_EMAILS)
@@ -508,6 +519,7 @@ class DatabaseManager:
                 logger.error(f"Error updating heavy content for email {email_id}: {e}")
 
             self.emails_by_id[email_id] = email_to_update
+            self.dashboard_aggregates.add(email_to_update)
             if email_to_update.get(FIELD_MESSAGE_ID):
                 self.emails_by_message_id[email_to_update[FIELD_MESSAGE_ID]] = email_to_update
             idx = next(
@@ -645,6 +657,7 @@ class DatabaseManager:
                 logger.error(f"Error updating heavy content for email {email_id}: {e}")
 
             self.emails_by_id[email_id] = email_to_update
+            self.dashboard_aggregates.add(email_to_update)
             if email_to_update.get(FIELD_MESSAGE_ID):
                 self.emails_by_message_id[email_to_update[FIELD_MESSAGE_ID]] = email_to_update
             idx = next(
@@ -670,7 +683,7 @@ class DatabaseManager:
     async def get_auto_labeled_count(self) -> int:
         """Get the count of emails that have been auto-labeled."""
         await self._ensure_initialized()
-        return sum(1 for email in self.emails_data if email.get(FIELD_CATEGORY_ID))
+        return self.dashboard_aggregates.auto_labeled
 
     async def get_categories_count(self) -> int:
         """Get the total number of categories."""
@@ -678,14 +691,9 @@ class DatabaseManager:
         return len(self.categories_data)
 
     async def get_weekly_growth(self) -> Dict[str, Any]:
-        """Get the weekly growth statistics."""
+        """Get the emails added in the last 7 days and the change from the 7 days before."""
         await self._ensure_initialized()
-        # For now, return a simplified calculation
-        # In a real implementation, this would calculate growth over the past week
-        total_count = len(self.emails_data)
-        # Return a placeholder percentage that would need to be calculated properly
-        # based on actual week-over-week data
-        return {"emails": total_count, "percentage": 0.0}
+        return self.dashboard_aggregates.weekly_growth()
 
 
 # Module-level variable to store the database manager instance
@@ -0,0 +1,179 @@
+"""
+Batched CPU inference for several text-classification heads.
+
+The NLP engine runs one Hugging Face classification pipeline per analysis head
+(sentiment, topic, intent, urgency). For bulk jobs this module:
+
+- tokenizes each text once per group of heads sharing an equivalent tokenizer,
+- sorts texts by token length and pads each batch only to its longest member,
+- runs every model of the group on the same encoded batches,
+- returns one prediction per text, in input order.
+
+Heads that are not standard pipelines (no ``tokenizer``/``model``), or any
+head when torch is unavailable, are run by calling the pipeline on a list of
+texts with its own ``batch_size`` support.
+"""
+
+import hashlib
+import inspect
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import torch
+
+    HAS_TORCH = True
+except ImportError:
+    torch = None
+    HAS_TORCH = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 32
+# Upper bound on sequence length regardless of what the tokenizer reports
+MAX_SEQUENCE_LENGTH = 512
+
+Prediction = Optional[Dict[str, Any]]
+
+
+def tokenizer_fingerprint(tokenizer: Any) -> Tuple[str, str, int, str]:
+    """
+    Identifies tokenizers that produce identical encodings.
+
+    Fine-tuned heads usually share their base model's vocabulary even though
+    they are stored under different paths, so the vocabulary itself is hashed.
+    """
+    cached = getattr(tokenizer, "_batch_inference_fingerprint", None)
+    if cached is not None:
+        return cached
+    vocab = sorted(tokenizer.get_vocab().items())
+    digest = hashlib.sha256(repr(vocab).encode("utf-8")).hexdigest()
+    fingerprint = (
+        type(tokenizer).__name__,
+        digest,
+        int(min(getattr(tokenizer, "model_max_length", MAX_SEQUENCE_LENGTH), MAX_SEQUENCE_LENGTH)),
+        getattr(tokenizer, "padding_side", "right"),
+    )
+    try:
+        tokenizer._batch_inference_fingerprint = fingerprint
+    except AttributeError:
+        pass
+    return fingerprint
+
+
+@contextmanager
+def _torch_threads(num_threads: Optional[int]) -> Iterator[None]:
+    if not num_threads:
+        yield
+        return
+    previous = torch.get_num_threads()
+    torch.set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+
+def _supports_encoded_inference(analyzer: Any) -> bool:
+    return HAS_TORCH and hasattr(analyzer, "tokenizer") and hasattr(analyzer, "model")
+
+
+def _run_pipeline_batched(analyzer: Any, texts: Sequence[str], batch_size: int) -> List[Prediction]:
+    outputs = analyzer(list(texts), batch_size=batch_size, truncation=True)
+    predictions: List[Prediction] = []
+    for output in outputs:
+        # Some pipelines wrap each prediction in a single-element list
+        if isinstance(output, list):
+            output = output[0] if output else None
+        predictions.append(output)
+    return predictions
+
+
+def _run_encoded_group(
+    analyzers: Dict[str, Any], texts: Sequence[str], batch_size: int
+) -> Dict[str, List[Prediction]]:
+    """Tokenizes texts once and runs every model of a tokenizer group on the batches."""
+    tokenizer = next(iter(analyzers.values())).tokenizer
+    max_length = tokenizer_fingerprint(tokenizer)[2]
+    encoded = tokenizer(list(texts), truncation=True, max_length=max_length)
+    features = [
+        {key: encoded[key][i] for key in encoded.keys()} for i in range(len(texts))
+    ]
+    # Length-sorted batches keep padding to a minimum
+    order = sorted(range(len(texts)), key=lambda i: len(features[i]["input_ids"]))
+
+    results: Dict[str, List[Prediction]] = {name: [None] * len(texts) for name in analyzers}
+    accepted = {
+        name: set(inspect.signature(analyzer.model.forward).parameters)
+        for name, analyzer in analyzers.items()
+    }
+    for start in range(0, len(order), batch_size):
+        indices = order[start : start + batch_size]
+        batch = tokenizer.pad([features[i] for i in indices], return_tensors="pt")
+        for name, analyzer in analyzers.items():
+            model = analyzer.model
+            inputs = {key: value for key, value in batch.items() if key in accepted[name]}
+            with torch.inference_mode():
+                logits = model(**inputs).logits
+            scores, label_ids = torch.softmax(logits, dim=-1).max(dim=-1)
+            id2label = model.config.id2label
+            for position, i in enumerate(indices):
+                label_id = int(label_ids[position])
+                results[name][i] = {
+                    "label": id2label.get(label_id, str(label_id)),
+                    "score": float(scores[position]),
+                }
+    return results
+
+
+def run_classification_heads(
+    analyzers: Dict[str, Any],
+    texts: Sequence[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    num_threads: Optional[int] = None,
+) -> Dict[str, List[Prediction]]:
+    """
+    Runs several classification heads over the same texts in batches.
+
+    Args:
+        analyzers: Head name to Hugging Face pipeline. None entries are skipped.
+        texts: The texts to classify.
+        batch_size: Texts per forward pass.
+        num_threads: Torch intra-op threads to use; None keeps the current setting.
+
+    Returns:
+        Head name to a list of ``{"label", "score"}`` predictions aligned with
+        texts. A head that fails yields None for every text.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be greater than zero")
+    results: Dict[str, List[Prediction]] = {}
+    if not texts:
+        return {name: [] for name in analyzers if analyzers[name] is not None}
+
+    groups: Dict[Tuple, Dict[str, Any]] = {}
+    for name, analyzer in analyzers.items():
+        if analyzer is None:
+            continue
+        if _supports_encoded_inference(analyzer):
+            try:
+                groups.setdefault(tokenizer_fingerprint(analyzer.tokenizer), {})[name] = analyzer
+                continue
+            except Exception as e:
+                logger.warning(f"Could not fingerprint tokenizer of '{name}' head: {e}")
+        try:
+            results[name] = _run_pipeline_batched(analyzer, texts, batch_size)
+        except Exception as e:
+            logger.error(f"Batched inference failed for '{name}' head: {e}")
+            results[name] = [None] * len(texts)
+
+    if groups:
+        with _torch_threads(num_threads):
+            for group in groups.values():
+                try:
+                    results.update(_run_encoded_group(group, texts, batch_size))
+                except Exception as e:
+                    logger.error(f"Batched inference failed for heads {sorted(group)}: {e}")
+                    results.update({name: [None] * len(texts) for name in group})
+    return results
@@ -8,17 +8,19 @@ efficient, even when dealing with large volumes of emails.
 """
 
 import asyncio
+import base64
 import dataclasses
 import hashlib
 import json
 import logging
 import os
 import sqlite3
+import threading
 import time
 from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from dotenv import load_dotenv
 from google.auth.transport.requests import Request
@@ -29,6 +31,8 @@ from googleapiclient.errors import HttpError
 
 from src.core.security import PathValidator
 
+from .gmail_sync_pipeline import GmailApiClient, GmailSyncPipeline
+
 load_dotenv()
 
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
@@ -41,6 +45,28 @@ TOKEN_JSON_PATH = os.getenv("GMAIL_TOKEN_PATH", "jsons/token.json")
 CREDENTIALS_PATH = "jsons/credentials.json"
 GMAIL_CREDENTIALS_ENV_VAR = "GMAIL_CREDENTIALS_JSON"
 
+# Canned emails served when no Gmail service is configured
+SIMULATED_EMAIL_TEMPLATES = [
+    {
+        "subject": "Project Update",
+        "sender": "pm@company.com",
+        "content": "Update on Q4 planning...",
+        "labels": ["WORK"],
+    },
+    {
+        "subject": "Invoice #12345",
+        "sender": "billing@vendor.com",
+        "content": "Your invoice is due.",
+        "labels": ["FINANCE"],
+    },
+    {
+        "subject": "Weekend Plans",
+        "sender": "sarah@gmail.com",
+        "content": "Barbecue this weekend?",
+        "labels": ["PERSONAL"],
+    },
+]
+
 
 @dataclasses.dataclass
 class RateLimitConfig:
@@ -53,6 +79,8 @@ class RateLimitConfig:
         queries_per_second: A practical limit to avoid request bursts.
         messages_per_request: The maximum number of messages per list request.
         max_concurrent_requests: The maximum number of concurrent API calls.
+        batch_size: The number of messages fetched per HTTP batch request.
+        pipeline_queue_size: The capacity of each queue in the sync pipeline.
         initial_backoff: The initial backoff duration in seconds for retries.
         max_backoff: The maximum backoff duration in seconds.
         backoff_multiplier: The multiplier for exponential backoff.
@@ -63,6 +91,8 @@ class RateLimitConfig:
     queries_per_second: int = 5
     messages_per_request: int = 100
     max_concurrent_requests: int = 10
+    batch_size: int = 50
+    pipeline_queue_size: int = 8
     initial_backoff: float = 1.0
     max_backoff: float = 60.0
     backoff_multiplier: float = 2.0
@@ -104,16 +134,20 @@ class RateLimiter:
         self.last_update = time.time()
         self.request_times: deque[float] = deque()
 
-    async def acquire(self) -> None:
+    async def acquire(self, tokens: int = 1) -> None:
         """
-        Acquires permission to make an API request, blocking if necessary.
+        Acquires permission to make API requests, blocking if necessary.
+
+        Args:
+            tokens: The number of API calls to account for; an HTTP batch
+                request costs one per inner call.
         """
         current_time = time.time()
 
         while self.request_times and current_time - self.request_times[0] > 100:
             self.request_times.popleft()
 
-        if len(self.request_times) >= self.config.queries_per_100_seconds:
+        if self.request_times and len(self.request_times) + tokens > self.config.queries_per_100_seconds:
             sleep_time = 100 - (current_time - self.request_times[0])
             if sleep_time > 0:
                 await asyncio.sleep(sleep_time)
@@ -125,14 +159,14 @@ class RateLimiter:
         )
         self.last_update = current_time
 
-        if self.tokens < 1:
-            sleep_time = (1 - self.tokens) / self.config.queries_per_second
+        if self.tokens < tokens:
+            sleep_time = (tokens - self.tokens) / self.config.queries_per_second
             await asyncio.sleep(sleep_time)
             self.tokens = 0
         else:
-            self.tokens -= 1
+            self.tokens -= tokens
 
-        self.request_times.append(current_time)
+        self.request_times.extend([current_time] * tokens)
 
 
 class EmailCache:
@@ -140,20 +174,33 @@ class EmailCache:
     Provides a SQLite-based cache for email metadata and content.
 
     This helps to reduce redundant API calls by storing previously fetched
-    email data and synchronization states.
+    email data and synchronization states. The database runs in WAL mode, and
+    the bulk APIs read or write a whole batch in one statement or transaction.
     """
 
+    # Stay below SQLite's limit on bound parameters per statement
+    MAX_IDS_PER_QUERY = 500
+
     def __init__(self, cache_path: str = str(DEFAULT_CACHE_PATH)):
         """Initializes the EmailCache."""
         # Secure path validation
         self.cache_path = str(
-            PathValidator.validate_database_path(cache_path, Path(cache_path).parent)
+            PathValidator.validate_and_resolve_db_path(cache_path, Path(cache_path).parent)
         )
         self.conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        # The connection is shared across threads; serialize access to it
+        self._lock = threading.Lock()
+        self.rows_written = 0
+        self.rows_skipped = 0
         self._init_cache()
 
     def _init_cache(self):
         """Initializes the cache database tables if they don't exist."""
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only syncs at checkpoints and remains crash-safe
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-16000")
         self.conn.execute(
             """
             CREATE TABLE IF NOT EXISTS emails (
@@ -173,51 +220,104 @@ class EmailCache:
         )
         self.conn.commit()
 
+    @staticmethod
+    def _row_to_email(row: tuple) -> Dict[str, Any]:
+        return {
+            "message_id": row[0],
+            "thread_id": row[1],
+            "subject": row[2],
+            "sender": row[3],
+            "sender_email": row[4],
+            "content": row[5],
+            "labels": json.loads(row[6]) if row[6] else [],
+            "timestamp": row[7],
+            "retrieved_at": row[8],
+            "content_hash": row[9],
+        }
+
+    def _select_in(self, columns: str, message_ids: List[str]) -> List[tuple]:
+        rows: List[tuple] = []
+        for start in range(0, len(message_ids), self.MAX_IDS_PER_QUERY):
+            chunk = message_ids[start : start + self.MAX_IDS_PER_QUERY]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(
+                self.conn.execute(
+                    f"SELECT {columns} FROM emails WHERE message_id IN ({placeholders})", chunk
+                ).fetchall()
+            )
+        return rows
+
     def get_cached_email(self, message_id: str) -> Optional[Dict[str, Any]]:
         """Retrieves a cached email by its message ID."""
-        cursor = self.conn.execute("SELECT * FROM emails WHERE message_id = ?", (message_id,))
-        row = cursor.fetchone()
-        if row:
-            return {
-                "message_id": row[0],
-                "thread_id": row[1],
-                "subject": row[2],
-                "sender": row[3],
-                "sender_email": row[4],
-                "content": row[5],
-                "labels": json.loads(row[6]) if row[6] else [],
-                "timestamp": row[7],
-                "retrieved_at": row[8],
-                "content_hash": row[9],
-            }
-        return None
+        return self.get_cached_emails([message_id]).get(message_id)
+
+    def get_cached_emails(self, message_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Retrieves the cached emails among message_ids, keyed by message ID."""
+        if not message_ids:
+            return {}
+        with self._lock:
+            rows = self._select_in("*", list(dict.fromkeys(message_ids)))
+        return {row[0]: self._row_to_email(row) for row in rows}
 
     def cache_email(self, email_data: Dict[str, Any]) -> None:
         """Caches a single email's data."""
-        content_hash = hashlib.sha256(email_data.get("content", "").encode()).hexdigest()
-        self.conn.execute(
-            "INSERT OR REPLACE INTO emails VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                email_data["message_id"],
-                email_data.get("thread_id", ""),
-                email_data.get("subject", ""),
-                email_data.get("sender", ""),
-                email_data.get("sender_email", ""),
-                email_data.get("content", ""),
-                json.dumps(email_data.get("labels", [])),
-                email_data.get("timestamp", ""),
-                datetime.now().isoformat(),
-                content_hash,
-            ),
-        )
-        self.conn.commit()
+        self.cache_emails([email_data])
+
+    def cache_emails(self, emails: List[Dict[str, Any]]) -> int:
+        """
+        Caches a batch of emails in a single transaction.
+
+        Rows whose content hash and labels match what is already cached are
+        not rewritten. Returns the number of rows written.
+        """
+        rows = {}
+        for email_data in emails:
+            labels = json.dumps(email_data.get("labels", []))
+            content_hash = hashlib.sha256(email_data.get("content", "").encode()).hexdigest()
+            rows[email_data["message_id"]] = (email_data, labels, content_hash)
+        if not rows:
+            return 0
+
+        retrieved_at = datetime.now().isoformat()
+        with self._lock:
+            existing = {
+                message_id: (labels, content_hash)
+                for message_id, labels, content_hash in self._select_in(
+                    "message_id, labels, content_hash", list(rows)
+                )
+            }
+            changed = [
+                (
+                    message_id,
+                    email_data.get("thread_id", ""),
+                    email_data.get("subject", ""),
+                    email_data.get("sender", ""),
+                    email_data.get("sender_email", ""),
+                    email_data.get("content", ""),
+                    labels,
+                    email_data.get("timestamp", ""),
+                    retrieved_at,
+                    content_hash,
+                )
+                for message_id, (email_data, labels, content_hash) in rows.items()
+                if existing.get(message_id) != (labels, content_hash)
+            ]
+            if changed:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO emails VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        changed,
+                    )
+            self.rows_written += len(changed)
+            self.rows_skipped += len(rows) - len(changed)
+        return len(changed)
 
     def get_sync_state(self, query_filter: str) -> Optional[Dict[str, Any]]:
         """Retrieves the synchronization state for a given query filter."""
-        cursor = self.conn.execute(
-            "SELECT * FROM sync_metadata WHERE query_filter = ?", (query_filter,)
-        )
-        row = cursor.fetchone()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM sync_metadata WHERE query_filter = ?", (query_filter,)
+            ).fetchone()
         if row:
             return {
                 "sync_id": row[0],
@@ -231,18 +331,18 @@ class EmailCache:
 
     def update_sync_state(self, sync_data: Dict[str, Any]) -> None:
         """Updates the synchronization state in the cache."""
-        self.conn.execute(
-            "INSERT OR REPLACE INTO sync_metadata VALUES (?, ?, ?, ?, ?, ?)",
-            (
-                sync_data["sync_id"],
-                sync_data["query_filter"],
-                sync_data["last_sync"],
-                sync_data["total_messages"],
-                sync_data["processed_messages"],
-                sync_data.get("next_page_token", ""),
-            ),
-        )
-        self.conn.commit()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_metadata VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    sync_data["sync_id"],
+                    sync_data["query_filter"],
+                    sync_data["last_sync"],
+                    sync_data["total_messages"],
+                    sync_data["processed_messages"],
+                    sync_data.get("next_page_token", ""),
+                ),
+            )
 
 
 class GmailDataCollector:
@@ -254,14 +354,27 @@ class GmailDataCollector:
     efficient and reliable data collection.
     """
 
-    def __init__(self, config: Optional[RateLimitConfig] = None):
-        """Initializes the GmailDataCollector."""
+    def __init__(
+        self,
+        config: Optional[RateLimitConfig] = None,
+        gmail_service=None,
+        cache: Optional[EmailCache] = None,
+    ):
+        """
+        Initializes the GmailDataCollector.
+
+        A pre-built Gmail service may be passed in, in which case stored
+        credentials and the OAuth flow are skipped.
+        """
         self.config = config or RateLimitConfig()
         self.rate_limiter = RateLimiter(self.config)
-        self.cache = EmailCache()
+        self.cache = cache or EmailCache()
         self.logger = logging.getLogger(__name__)
-        self.gmail_service = None
-        self._load_credentials()
+        self.gmail_service = gmail_service
+        self.last_sync_metrics: Dict[str, Any] = {}
+        self._client: Optional[GmailApiClient] = None
+        if not self.gmail_service:
+            self._load_credentials()
         if not self.gmail_service:
             self._authenticate()
 
@@ -333,14 +446,22 @@ class GmailDataCollector:
         query_filter: str = "",
         max_emails: Optional[int] = None,
         since_date: Optional[datetime] = None,
+        analyze: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        write: Optional[Callable[[Any], Awaitable[Any]]] = None,
     ) -> EmailBatch:
         """
         Collects emails incrementally, using caching and rate limiting.
 
+        Listing, batched fetching, parsing and the optional analyze and write
+        stages run concurrently in a GmailSyncPipeline. The sync state is
+        checkpointed after each page has fully left the pipeline.
+
         Args:
             query_filter: The Gmail search query to filter emails.
             max_emails: The maximum number of emails to collect.
             since_date: The date from which to start collecting emails.
+            analyze: Optional async callable applied to each parsed email.
+            write: Optional async callable applied to each analyzed email.
 
         Returns:
             An EmailBatch object containing the collected emails.
@@ -357,40 +478,31 @@ class GmailDataCollector:
         if since_date:
             query_filter = f"{query_filter} after:{since_date.strftime('%Y/%m/%d')}".strip()
 
-        collected_messages: List[Dict[str, Any]] = []
-        page_token = sync_state.get("next_page_token")
+        def _checkpoint(page: int, next_page_token: Optional[str], count: int) -> None:
+            sync_state.update(
+                {
+                    "processed_messages": sync_state["processed_messages"] + count,
+                    "next_page_token": next_page_token,
+                    "last_sync": datetime.now().isoformat(),
+                }
+            )
+            self.cache.update_sync_state(sync_state)
+            self.logger.info(f"Collected {sync_state['processed_messages']} emails so far...")
+
+        pipeline = self.build_sync_pipeline(analyze=analyze, write=write)
         try:
-            while len(collected_messages) < (max_emails or float("inf")):
-                await self.rate_limiter.acquire()
-                message_list = await self._get_message_list(
-                    query_filter,
-                    page_token,
-                    min(
-                        self.config.messages_per_request,
-                        (max_emails or 100) - len(collected_messages),
-                    ),
-                )
-                if not message_list.get("messages"):
-                    break
-                batch_messages = await self._process_message_batch(message_list["messages"])
-                collected_messages.extend(batch_messages)
-                sync_state.update(
-                    {
-                        "processed_messages": sync_state["processed_messages"]
-                        + len(batch_messages),
-                        "next_page_token": message_list.get("nextPageToken"),
-                        "last_sync": datetime.now().isoformat(),
-                    }
-                )
-                self.cache.update_sync_state(sync_state)
-                if not message_list.get("nextPageToken"):
-                    break
-                page_token = message_list["nextPageToken"]
-                self.logger.info(f"Collected {len(collected_messages)} emails so far...")
+            collected_messages = await pipeline.run(
+                query_filter,
+                max_emails=max_emails,
+                page_token=sync_state.get("next_page_token"),
+                on_page_complete=_checkpoint,
+            )
         except Exception as e:
             self.logger.error(f"Error collecting emails: {e}")
             self.cache.update_sync_state(sync_state)
             raise
+        finally:
+            self.last_sync_metrics = pipeline.get_metrics()
         return EmailBatch(
             messages=collected_messages,
             batch_id=sync_id,
@@ -399,18 +511,51 @@ class GmailDataCollector:
             total_count=len(collected_messages),
         )
 
+    def build_sync_pipeline(
+        self,
+        analyze: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        write: Optional[Callable[[Any], Awaitable[Any]]] = None,
+    ) -> GmailSyncPipeline:
+        """Creates a sync pipeline that fetches through this collector and its cache."""
+        return GmailSyncPipeline(
+            client=self,
+            parse=self._parse_message_payload,
+            lookup=self.cache.get_cached_emails,
+            store=self.cache.cache_emails,
+            analyze=analyze,
+            write=write,
+            page_size=self.config.messages_per_request,
+            batch_size=self.config.batch_size,
+            queue_size=self.config.pipeline_queue_size,
+            fetch_concurrency=self.config.max_concurrent_requests,
+        )
+
+    def _api_client(self) -> GmailApiClient:
+        """Returns the API client, kept across calls so its request counters accumulate."""
+        if self._client is None or self._client.service is not self.gmail_service:
+            self._client = GmailApiClient(self.gmail_service, rate_limiter=self.rate_limiter)
+        return self._client
+
+    async def list_page(
+        self, query: str, page_token: Optional[str] = None, max_results: int = 100
+    ) -> Dict[str, Any]:
+        """Retrieves one page of message IDs."""
+        return await self._get_message_list(query, page_token, max_results)
+
+    async def get_messages(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """Retrieves raw Gmail messages with a single HTTP batch request."""
+        if self.gmail_service:
+            return await self._api_client().get_messages(message_ids)
+        self.logger.warning("Gmail service not available, using simulated messages.")
+        return [self._simulate_gmail_message(message_id) for message_id in message_ids]
+
     async def _get_message_list(
         self, query: str, page_token: Optional[str] = None, max_results: int = 100
     ) -> Dict[str, Any]:
         """Retrieves a list of message IDs from the Gmail API."""
         if self.gmail_service:
             try:
-                return (
-                    self.gmail_service.users()
-                    .messages()
-                    .list(userId="me", q=query, pageToken=page_token, maxResults=max_results)
-                    .execute()
-                )
+                return await self._api_client().list_page(query, page_token, max_results)
             except HttpError as error:
                 self.logger.error(f"An API error occurred: {error}")
                 return {"messages": [], "resultSizeEstimate": 0}
@@ -434,27 +579,6 @@ class GmailDataCollector:
             response["nextPageToken"] = f"token_{base_time}_next"
         return response
 
-    async def _process_message_batch(
-        self, message_ids: List[Dict[str, str]]
-    ) -> List[Dict[str, Any]]:
-        """Processes a batch of message IDs to retrieve their full content."""
-        semaphore = asyncio.Semaphore(self.config.max_concurrent_requests)
-        tasks = [
-            self._get_message_with_semaphore(semaphore, msg_info["id"]) for msg_info in message_ids
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        return [
-            res for res in results if res and not isinstance(res, Exception)
-        ]  # type: ignore [misc]
-
-    async def _get_message_with_semaphore(
-        self, semaphore: asyncio.Semaphore, message_id: str
-    ) -> Optional[Dict[str, Any]]:
-        """Retrieves message content under the control of a semaphore."""
-        async with semaphore:
-            await self.rate_limiter.acquire()
-            return await self._get_message_content(message_id)
-
     async def _get_message_content(self, message_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieves the full content of a message, using a cache to avoid
@@ -467,12 +591,12 @@ class GmailDataCollector:
         if self.gmail_service:
             try:
                 self.logger.debug(f"Fetching message {message_id} from Gmail API.")
-                message = (
+                request = (
                     self.gmail_service.users()
                     .messages()
                     .get(userId="me", id=message_id, format="full")
-                    .execute()
                 )
+                message = await asyncio.to_thread(request.execute)
                 if email_data := self._parse_message_payload(message):
                     self.cache.cache_email(email_data)
                     return email_data
@@ -491,13 +615,9 @@ class GmailDataCollector:
             if "parts" in message["payload"]:
                 for part in message["payload"]["parts"]:
                     if part["mimeType"] == "text/plain" and "data" in part["body"]:
-                        import base64
-
                         content = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
                         break
             elif "body" in message["payload"] and "data" in message["payload"]["body"]:
-                import base64
-
                 content = base64.urlsafe_b64decode(message["payload"]["body"]["data"]).decode(
                     "utf-8"
                 )
@@ -526,27 +646,7 @@ class GmailDataCollector:
 
     async def _simulate_email_content(self, message_id: str) -> Dict[str, Any]:
         """Simulates email content for development and testing."""
-        templates = [
-            {
-                "subject": "Project Update",
-                "sender": "pm@company.com",
-                "content": "Update on Q4 planning...",
-                "labels": ["WORK"],
-            },
-            {
-                "subject": "Invoice #12345",
-                "sender": "billing@vendor.com",
-                "content": "Your invoice is due.",
-                "labels": ["FINANCE"],
-            },
-            {
-                "subject": "Weekend Plans",
-                "sender": "sarah@gmail.com",
-                "content": "Barbecue this weekend?",
-                "labels": ["PERSONAL"],
-            },
-        ]
-        template = templates[hash(message_id) % len(templates)]
+        template = SIMULATED_EMAIL_TEMPLATES[hash(message_id) % len(SIMULATED_EMAIL_TEMPLATES)]
         return {
             "message_id": message_id,
             "thread_id": f"thread_{message_id.split('_')[1]}",
@@ -558,6 +658,23 @@ class GmailDataCollector:
             "timestamp": datetime.now().isoformat(),
         }
 
+    def _simulate_gmail_message(self, message_id: str) -> Dict[str, Any]:
+        """Simulates a raw Gmail API message for development and testing."""
+        template = SIMULATED_EMAIL_TEMPLATES[hash(message_id) % len(SIMULATED_EMAIL_TEMPLATES)]
+        return {
+            "id": message_id,
+            "threadId": f"thread_{message_id.split('_')[1]}",
+            "labelIds": template["labels"],
+            "internalDate": str(int(time.time() * 1000)),
+            "payload": {
+                "headers": [
+                    {"name": "Subject", "value": template["subject"]},
+                    {"name": "From", "value": template["sender"]},
+                ],
+                "body": {"data": base64.urlsafe_b64encode(template["content"].encode()).decode()},
+            },
+        }
+
     def get_collection_strategies(self) -> Dict[str, Dict[str, Any]]:
         """Defines a set of named strategies for collecting emails."""
         return {
@@ -12,7 +12,7 @@ import logging
 import os
 import sys
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
 
 # To avoid circular imports with type hints
 if TYPE_CHECKING:
@@ -122,7 +122,8 @@ class GmailAIService:
         Performs a comprehensive sync of Gmail emails.
 
         This method fetches emails, extracts metadata, performs AI analysis,
-        and prepares the data for database insertion.
+        and writes the results through the database manager when one is
+        configured. All of these stages run concurrently.
 
         Args:
             query_filter: The Gmail query to filter which emails to sync.
@@ -137,12 +138,17 @@ class GmailAIService:
             f"Starting Gmail sync with filter: {query_filter}, max_emails: {max_emails}"
         )
         try:
-            email_batch = await self._fetch_emails_from_gmail(query_filter, max_emails)
+            # Fetching, analysis and database writes overlap in the collector's
+            # sync pipeline instead of running one after another.
+            email_batch = await self._fetch_emails_from_gmail(
+                query_filter,
+                max_emails,
+                analyze=lambda gmail_msg: self._process_email(gmail_msg, include_ai_analysis),
+                write=self._write_email if self.db_manager else None,
+            )
             if not email_batch:
                 return {"success": False, "error": "Failed to fetch emails.", "processed_count": 0}
-            processed_db_emails = await self._process_and_analyze_batch(
-                email_batch, include_ai_analysis
-            )
+            processed_db_emails = email_batch.messages
             self.stats["total_processed"] += len(processed_db_emails)
             self.stats["last_sync"] = datetime.now().isoformat()
             return {
@@ -150,47 +156,54 @@ class GmailAIService:
                 "processed_count": len(processed_db_emails),
                 "emails": processed_db_emails,
                 "statistics": self.stats.copy(),
+                "pipeline_metrics": self.collector.last_sync_metrics,
             }
         except Exception as e:
             self.logger.error(f"Gmail sync failed: {e}", exc_info=True)
             return {"success": False, "error": str(e), "processed_count": 0}
 
     async def _fetch_emails_from_gmail(
-        self, query_filter: str, max_emails: int
+        self,
+        query_filter: str,
+        max_emails: int,
+        analyze: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        write: Optional[Callable[[Any], Awaitable[Any]]] = None,
     ) -> Optional[EmailBatch]:
         """Fetches a batch of emails from Gmail using the data collector."""
         try:
             return await self.collector.collect_emails_incremental(
-                query_filter=query_filter, max_emails=max_emails
+                query_filter=query_filter, max_emails=max_emails, analyze=analyze, write=write
             )
         except Exception as e:
             self.logger.error(f"Failed to fetch email batch: {e}", exc_info=True)
             return None
 
-    async def _process_and_analyze_batch(
-        self, email_batch: EmailBatch, include_ai_analysis: bool
-    ) -> List[Dict[str, Any]]:
-        """Processes a batch of emails, including metadata extraction and AI analysis."""
-        processed_emails = []
-        for gmail_msg in email_batch.messages:
-            try:
-                gmail_metadata = self.metadata_extractor.extract_complete_metadata(gmail_msg)
-                email_data = {
-                    "subject": gmail_metadata.subject,
-                    "content": gmail_metadata.body_plain or gmail_metadata.snippet,
-                }
-                ai_analysis_result = (
-                    await self._perform_ai_analysis(email_data) if include_ai_analysis else None
-                )
-                db_email = self._convert_to_db_format(gmail_metadata, ai_analysis_result)
-                processed_emails.append(db_email)
-                self.stats["successful_extractions"] += 1
-            except Exception as e:
-                self.logger.error(
-                    f"Failed to process email {gmail_msg.get('id', 'unknown')}: {e}", exc_info=True
-                )
-                self.stats["failed_extractions"] += 1
-        return processed_emails
+    async def _process_email(
+        self, gmail_msg: Dict[str, Any], include_ai_analysis: bool
+    ) -> Optional[Dict[str, Any]]:
+        """Extracts metadata from one email and analyzes it. Returns None on failure."""
+        try:
+            gmail_metadata = self.metadata_extractor.extract_complete_metadata(gmail_msg)
+            email_data = {
+                "subject": gmail_metadata.subject,
+                "content": gmail_metadata.body_plain or gmail_metadata.snippet,
+            }
+            ai_analysis_result = (
+                await self._perform_ai_analysis(email_data) if include_ai_analysis else None
+            )
+            db_email = self._convert_to_db_format(gmail_metadata, ai_analysis_result)
+            self.stats["successful_extractions"] += 1
+            return db_email
+        except Exception as e:
+            self.logger.error(
+                f"Failed to process email {gmail_msg.get('id', 'unknown')}: {e}", exc_info=True
+            )
+            self.stats["failed_extractions"] += 1
+            return None
+
+    async def _write_email(self, db_email: Dict[str, Any]) -> None:
+        """Persists one processed email through the database manager."""
+        await self.db_manager.create_email(db_email)
 
     async def _perform_ai_analysis(self, email_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Performs AI analysis on a single email."""
@@ -0,0 +1,485 @@
+"""
+Staged producer/consumer pipeline for Gmail synchronization.
+
+A sync is split into stages joined by bounded asyncio queues so that listing
+pages, fetching message batches, parsing, AI analysis and writing all overlap:
+
+    list -> fetch -> parse -> analyze -> write
+
+- ``list`` pages through ``messages.list`` and splits each page into chunks.
+- ``fetch`` retrieves a chunk of messages with one HTTP batch request.
+- ``parse`` decodes raw payloads in a worker thread, off the event loop, and
+  hands the freshly parsed emails to the optional ``store`` there too.
+- ``analyze`` and ``write`` are optional async callables run by their own workers.
+
+Bounded queues provide back-pressure: a slow stage stalls the stages upstream
+of it instead of letting fetched messages pile up in memory. Blocking calls
+(googleapiclient ``execute()``, the cache ``lookup`` and ``store``) always run
+in a worker thread.
+"""
+
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Gmail rejects HTTP batch requests with more than 100 inner calls
+GMAIL_BATCH_LIMIT = 100
+
+STAGE_LIST = "list"
+STAGE_FETCH = "fetch"
+STAGE_PARSE = "parse"
+STAGE_ANALYZE = "analyze"
+STAGE_WRITE = "write"
+
+
+class GmailApiClient:
+    """
+    Thin async wrapper over a googleapiclient Gmail service.
+
+    Every ``execute()`` runs in a worker thread, and ``get_messages`` fetches
+    many messages with a single HTTP batch request.
+
+    Args:
+        service: A Gmail v1 service object, or any object with the same shape.
+        rate_limiter: Optional object with an async ``acquire(tokens)``, awaited
+            before each HTTP round trip with the number of API calls it makes.
+        user_id: The Gmail user to act on.
+        message_format: The ``format`` passed to ``messages.get``.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        rate_limiter: Any = None,
+        user_id: str = "me",
+        message_format: str = "full",
+    ):
+        self.service = service
+        self.rate_limiter = rate_limiter
+        self.user_id = user_id
+        self.message_format = message_format
+        self.requests = 0
+        self.batch_requests = 0
+        self.failed_messages = 0
+
+    async def _execute(self, request: Any, calls: int = 1) -> Any:
+        if self.rate_limiter is not None:
+            # Gmail charges quota per inner call, not per HTTP batch
+            await self.rate_limiter.acquire(calls)
+        self.requests += 1
+        return await asyncio.to_thread(request.execute)
+
+    async def list_page(
+        self, query: str, page_token: Optional[str] = None, max_results: int = 100
+    ) -> Dict[str, Any]:
+        """Retrieves one page of message IDs."""
+        request = (
+            self.service.users()
+            .messages()
+            .list(userId=self.user_id, q=query, pageToken=page_token, maxResults=max_results)
+        )
+        return await self._execute(request)
+
+    async def get_messages(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Retrieves full messages, in the order requested.
+
+        Messages whose individual request failed are logged and left out.
+        """
+        if len(message_ids) > GMAIL_BATCH_LIMIT:
+            raise ValueError(f"At most {GMAIL_BATCH_LIMIT} messages can be fetched per batch")
+        messages_api = self.service.users().messages()
+        responses: Dict[str, Dict[str, Any]] = {}
+        failures: Dict[str, Exception] = {}
+
+        def _on_response(request_id: str, response: Dict[str, Any], exception: Exception):
+            if exception is not None:
+                failures[request_id] = exception
+            else:
+                responses[request_id] = response
+
+        batch = self.service.new_batch_http_request(callback=_on_response)
+        for message_id in message_ids:
+            batch.add(
+                messages_api.get(userId=self.user_id, id=message_id, format=self.message_format),
+                request_id=message_id,
+            )
+        await self._execute(batch, calls=len(message_ids))
+        self.batch_requests += 1
+
+        for message_id, error in failures.items():
+            logger.warning(f"Failed to fetch message {message_id} in batch: {error}")
+        self.failed_messages += len(failures)
+        return [responses[message_id] for message_id in message_ids if message_id in responses]
+
+
+@dataclasses.dataclass
+class StageMetrics:
+    """
+    Throughput and queue statistics for one pipeline stage.
+
+    Attributes:
+        name: The stage name.
+        workers: The number of concurrent workers running the stage.
+        items_in: Items taken from the stage's input queue.
+        items_out: Items passed on to the next stage.
+        errors: Items dropped because the stage raised.
+        busy_seconds: Total time workers spent handling items.
+        queue_depth: Depth of the input queue at the last sample.
+        max_queue_depth: Largest input queue depth seen.
+    """
+
+    name: str
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+
+    def sample_queue(self, depth: int) -> None:
+        self.queue_depth = depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        data = dataclasses.asdict(self)
+        data["throughput_per_second"] = self.items_out / elapsed if elapsed > 0 else 0.0
+        # Average number of workers busy over the run
+        data["utilization"] = (
+            self.busy_seconds / (elapsed * self.workers) if elapsed > 0 and self.workers else 0.0
+        )
+        return data
+
+
+@dataclasses.dataclass
+class _Chunk:
+    page: int
+    seq: int
+    message_ids: List[str]
+
+    @property
+    def size(self) -> int:
+        return len(self.message_ids)
+
+
+@dataclasses.dataclass
+class _Item:
+    page: int
+    seq: int
+    message_id: str
+    payload: Any
+    parsed: bool = False
+    size: int = 1
+
+
+@dataclasses.dataclass
+class _Batch:
+    page: int
+    items: List[_Item]
+
+    @property
+    def size(self) -> int:
+        return len(self.items)
+
+
+_END = object()
+
+
+class GmailSyncPipeline:
+    """
+    Runs one Gmail sync through the staged pipeline.
+
+    Args:
+        client: Object with async ``list_page(query, page_token, max_results)``
+            and ``get_messages(message_ids)``, such as ``GmailApiClient``.
+        parse: Converts a raw Gmail message to an email dict, or returns None
+            to drop it. Runs in a worker thread.
+        lookup: Optional bulk cache lookup mapping a list of message IDs to
+            the already parsed emails it holds; hits skip fetching and parsing.
+            Runs in a worker thread.
+        store: Optional callable run with the freshly parsed emails of each
+            batch, e.g. to cache them in one transaction. Runs in a worker thread.
+        analyze: Optional async callable applied to each parsed email.
+            Returning None drops the email.
+        write: Optional async callable applied to each analyzed email. Its
+            return value replaces the email in the results unless it is None.
+        page_size: Messages requested per ``messages.list`` call.
+        batch_size: Messages fetched per HTTP batch request.
+        queue_size: Capacity of each inter-stage queue.
+        fetch_concurrency: Batch requests in flight at once.
+        analysis_concurrency: Emails analyzed at once.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        parse: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+        lookup: Optional[Callable[[List[str]], Dict[str, Dict[str, Any]]]] = None,
+        store: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+        analyze: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        write: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        page_size: int = 100,
+        batch_size: int = 50,
+        queue_size: int = 8,
+        fetch_concurrency: int = 2,
+        analysis_concurrency: int = 4,
+    ):
+        if not 0 < batch_size <= GMAIL_BATCH_LIMIT:
+            raise ValueError(f"batch_size must be between 1 and {GMAIL_BATCH_LIMIT}")
+        self.client = client
+        self.parse = parse
+        self.lookup = lookup
+        self.store = store
+        self.analyze = analyze
+        self.write = write
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.fetch_concurrency = fetch_concurrency
+        self.analysis_concurrency = analysis_concurrency
+
+        self.metrics: Dict[str, StageMetrics] = {}
+        self.elapsed = 0.0
+        self._reset(None)
+
+    def _reset(self, on_page_complete: Optional[Callable[[int, Optional[str], int], None]]) -> None:
+        """Clears the results and page accounting of the previous run."""
+        self._results: List[_Item] = []
+        self._page_tokens: Dict[int, Optional[str]] = {}
+        self._page_expected: Dict[int, int] = {}
+        self._page_done: Dict[int, int] = {}
+        self._next_page_to_report = 0
+        self._on_page_complete = on_page_complete
+
+    # --- Page accounting ---
+
+    def _finish(self, page: int, count: int) -> None:
+        """Records that messages left the pipeline, reporting completed pages in order."""
+        self._page_done[page] = self._page_done.get(page, 0) + count
+        while (
+            self._next_page_to_report in self._page_expected
+            and self._page_done.get(self._next_page_to_report, 0)
+            >= self._page_expected[self._next_page_to_report]
+        ):
+            page = self._next_page_to_report
+            if self._on_page_complete is not None:
+                self._on_page_complete(page, self._page_tokens[page], self._page_expected[page])
+            self._next_page_to_report += 1
+
+    # --- Stage handlers ---
+
+    async def _list_stage(
+        self, query: str, max_emails: Optional[int], page_token: Optional[str], out_q: asyncio.Queue
+    ) -> None:
+        stage = self.metrics[STAGE_LIST]
+        page = 0
+        seq = 0
+        remaining = max_emails
+        try:
+            while remaining is None or remaining > 0:
+                max_results = self.page_size if remaining is None else min(self.page_size, remaining)
+                start = time.perf_counter()
+                response = await self.client.list_page(query, page_token, max_results)
+                stage.busy_seconds += time.perf_counter() - start
+                stage.items_in += 1
+
+                message_ids = [m["id"] for m in response.get("messages") or []]
+                if remaining is not None:
+                    message_ids = message_ids[:remaining]
+                    remaining -= len(message_ids)
+                if not message_ids:
+                    break
+                page_token = response.get("nextPageToken")
+                self._page_tokens[page] = page_token
+                self._page_expected[page] = len(message_ids)
+
+                for offset in range(0, len(message_ids), self.batch_size):
+                    chunk = _Chunk(page, seq + offset, message_ids[offset : offset + self.batch_size])
+                    stage.items_out += 1
+                    await out_q.put(chunk)
+                seq += len(message_ids)
+                page += 1
+                if not page_token:
+                    break
+        finally:
+            for _ in range(self.fetch_concurrency):
+                await out_q.put(_END)
+
+    async def _fetch(self, chunk: _Chunk) -> List[_Batch]:
+        items: List[_Item] = []
+        to_fetch: Dict[str, int] = {}
+        cache_hits = (
+            await asyncio.to_thread(self.lookup, chunk.message_ids)
+            if self.lookup is not None
+            else {}
+        )
+        for offset, message_id in enumerate(chunk.message_ids):
+            cached = cache_hits.get(message_id)
+            if cached is not None:
+                items.append(_Item(chunk.page, chunk.seq + offset, message_id, cached, parsed=True))
+            else:
+                to_fetch[message_id] = chunk.seq + offset
+
+        if to_fetch:
+            fetched = await self.client.get_messages(list(to_fetch))
+            for raw in fetched:
+                message_id = raw.get("id")
+                if message_id in to_fetch:
+                    items.append(_Item(chunk.page, to_fetch.pop(message_id), message_id, raw))
+            # Messages the batch failed to return leave the pipeline here
+            if to_fetch:
+                self._finish(chunk.page, len(to_fetch))
+        return [_Batch(chunk.page, items)] if items else []
+
+    async def _parse(self, batch: _Batch) -> List[_Item]:
+        raw_items = [item for item in batch.items if not item.parsed]
+        parsed = await asyncio.to_thread(self._parse_and_store, [item.payload for item in raw_items])
+        for item, email_data in zip(raw_items, parsed):
+            item.payload = email_data
+            item.parsed = True
+
+        items = []
+        for item in batch.items:
+            if item.payload is None:
+                self._finish(item.page, item.size)
+            else:
+                items.append(item)
+        return items
+
+    def _parse_and_store(self, payloads: List[Any]) -> List[Optional[Dict[str, Any]]]:
+        parsed = [self.parse(payload) for payload in payloads]
+        if self.store is not None:
+            fresh = [email_data for email_data in parsed if email_data is not None]
+            if fresh:
+                self.store(fresh)
+        return parsed
+
+    async def _analyze(self, item: _Item) -> List[_Item]:
+        analyzed = await self.analyze(item.payload)
+        if analyzed is None:
+            self._finish(item.page, item.size)
+            return []
+        item.payload = analyzed
+        return [item]
+
+    async def _write(self, item: _Item) -> List[_Item]:
+        written = await self.write(item.payload)
+        if written is not None:
+            item.payload = written
+        return [item]
+
+    async def _run_stage(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[List[_Item]]],
+        in_q: asyncio.Queue,
+        out_q: Optional[asyncio.Queue],
+        next_workers: int,
+    ) -> None:
+        stage = self.metrics[name]
+
+        async def worker() -> None:
+            while True:
+                item = await in_q.get()
+                if item is _END:
+                    return
+                stage.sample_queue(in_q.qsize())
+                stage.items_in += 1
+                start = time.perf_counter()
+                try:
+                    outputs = await handler(item)
+                except Exception as e:
+                    logger.error(
+                        f"Gmail sync stage '{name}' dropped {item.size} message(s) "
+                        f"from page {item.page}: {e}"
+                    )
+                    stage.errors += 1
+                    self._finish(item.page, item.size)
+                    outputs = []
+                stage.busy_seconds += time.perf_counter() - start
+                for output in outputs:
+                    stage.items_out += 1
+                    if out_q is None:
+                        self._results.append(output)
+                        self._finish(output.page, output.size)
+                    else:
+                        await out_q.put(output)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(stage.workers)))
+        finally:
+            if out_q is not None:
+                for _ in range(next_workers):
+                    await out_q.put(_END)
+
+    # --- Public interface ---
+
+    async def run(
+        self,
+        query: str,
+        max_emails: Optional[int] = None,
+        page_token: Optional[str] = None,
+        on_page_complete: Optional[Callable[[int, Optional[str], int], None]] = None,
+    ) -> List[Any]:
+        """
+        Syncs the messages matching a Gmail query.
+
+        Args:
+            query: The Gmail search query.
+            max_emails: Stop after listing this many messages.
+            page_token: Resume listing from this page token.
+            on_page_complete: Called as ``(page_index, next_page_token, count)``
+                once every message of a page has left the pipeline, in page
+                order, so callers can checkpoint the token safely.
+
+        Returns:
+            The emails produced by the last stage, in listing order.
+        """
+        self._reset(on_page_complete)
+        stages = [(STAGE_FETCH, self._fetch, self.fetch_concurrency), (STAGE_PARSE, self._parse, 1)]
+        if self.analyze is not None:
+            stages.append((STAGE_ANALYZE, self._analyze, self.analysis_concurrency))
+        if self.write is not None:
+            stages.append((STAGE_WRITE, self._write, 1))
+
+        self.metrics = {STAGE_LIST: StageMetrics(STAGE_LIST, 1)}
+        for name, _, workers in stages:
+            self.metrics[name] = StageMetrics(name, workers)
+
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in stages]
+        tasks = [
+            asyncio.create_task(self._list_stage(query, max_emails, page_token, queues[0]))
+        ]
+        for index, (name, handler, _) in enumerate(stages):
+            out_q = queues[index + 1] if index + 1 < len(stages) else None
+            next_workers = stages[index + 1][2] if index + 1 < len(stages) else 0
+            tasks.append(
+                asyncio.create_task(self._run_stage(name, handler, queues[index], out_q, next_workers))
+            )
+
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+        self._results.sort(key=lambda item: item.seq)
+        return [item.payload for item in self._results]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Returns per-stage throughput and queue-depth metrics of the last run."""
+        return {
+            "elapsed_seconds": self.elapsed,
+            "messages": len(self._results),
+            "stages": {name: stage.to_dict(self.elapsed) for name, stage in self.metrics.items()},
+        }
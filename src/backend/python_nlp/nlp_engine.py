@@ -8,20 +8,23 @@ and validation for analyzing email content.
 
 
 import argparse
+import importlib.util
 import json
 import logging
 import os
 import re
 import sys
+import threading
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 from backend.python_nlp.text_utils import clean_text
 from core.security import verify_model_safety
 
 from .analysis_components.importance_model import ImportanceModel
+from .batch_inference import DEFAULT_BATCH_SIZE, run_classification_heads
+from .warm_engine import request_analysis, serve
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s"
@@ -32,15 +35,12 @@ logger = logging.getLogger(__name__)
 try:
     import nltk
     from textblob import TextBlob
-    from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
     HAS_NLTK = True
     HAS_SKLEARN_AND_JOBLIB = True
-    HAS_TRANSFORMERS = True
 except ImportError:
     HAS_NLTK = False
     HAS_SKLEARN_AND_JOBLIB = False
-    HAS_TRANSFORMERS = False
     print(
         "Warning: NLTK, scikit-learn, joblib or transformers not available. "
         "Model loading and/or advanced NLP features will be disabled.",
@@ -58,6 +58,38 @@ def clean_text(text: str) -> str:
     return text.lower().strip()
 
 
+# Importing transformers takes seconds, so it is deferred until a model is loaded
+HAS_TRANSFORMERS = importlib.util.find_spec("transformers") is not None
+
+# Pipeline task of each model head
+MODEL_TASKS = {
+    "sentiment": "sentiment-analysis",
+    "topic": "text-classification",
+    "intent": "text-classification",
+    "urgency": "text-classification",
+}
+
+# Set to 0/false to skip loading models in the background on startup
+WARM_UP_ON_STARTUP = os.getenv("NLP_WARM_UP_ON_STARTUP", "true").lower() not in ("0", "false", "no")
+
+
+def pipeline(task: str, model: str):
+    """Builds a transformers pipeline, importing transformers on first use."""
+    from transformers import pipeline as transformers_pipeline
+
+    return transformers_pipeline(task, model=model)
+
+
+def _lazy_analyzer(head: str) -> property:
+    def get_analyzer(self):
+        return self._get_analyzer(head)
+
+    def set_analyzer(self, analyzer):
+        self._analyzers[head] = analyzer
+
+    return property(get_analyzer, set_analyzer, doc=f"The {head} pipeline, loaded on first use.")
+
+
 # Define paths for pre-trained models
 # MODEL_DIR = os.getenv("NLP_MODEL_DIR", os.path.dirname(__file__)) # Moved to __init__
 # SENTIMENT_MODEL_PATH = os.path.join(MODEL_DIR, "sentiment_model.pkl")
@@ -74,6 +106,9 @@ class NLPEngine:
     view of an email's content, including its sentiment, topic, intent, and
     urgency. It handles model loading, text preprocessing, and result aggregation.
 
+    Models are loaded on first use; call ``warm_up`` to load them ahead of
+    the first request.
+
     Attributes:
         sentiment_analyzer: Component for sentiment analysis.
         topic_analyzer: Component for topic analysis.
@@ -81,6 +116,11 @@ class NLPEngine:
         urgency_analyzer: Component for urgency analysis.
     """
 
+    sentiment_analyzer = _lazy_analyzer("sentiment")
+    topic_analyzer = _lazy_analyzer("topic")
+    intent_analyzer = _lazy_analyzer("intent")
+    urgency_analyzer = _lazy_analyzer("urgency")
+
     CATEGORY_PATTERNS = {
         "Work & Business": [
             r"\b(meeting|conference|project|deadline|client|presentation|report|proposal|budget|team|"
@@ -121,7 +161,7 @@ class NLPEngine:
     }
 
     def __init__(self):
-        """Initializes the NLP engine and loads all necessary models and resources."""
+        """Initializes the NLP engine. Models and stop words are loaded on first use."""
         model_dir = os.getenv(
             "NLP_MODEL_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "models")
         )
@@ -130,26 +170,101 @@ class NLPEngine:
         self.intent_model_path = os.path.join(model_dir, "intent")
         self.urgency_model_path = os.path.join(model_dir, "urgency")
         self.compiled_patterns = {}
+        self.importance_model = ImportanceModel()
 
-        # Initialize stop words if NLTK is available
-        if HAS_NLTK:
-            try:
-                import nltk
+        self._analyzers: Dict[str, Any] = {}
+        self._model_locks = {head: threading.Lock() for head in MODEL_TASKS}
+        self._stop_words: Optional[set] = None
+        self._stop_words_lock = threading.Lock()
+        self._warm_up_thread: Optional[threading.Thread] = None
 
+    def _get_analyzer(self, head: str) -> Any:
+        """Returns the pipeline of a model head, loading it on first use."""
+        try:
+            return self._analyzers[head]
+        except KeyError:
+            pass
+        with self._model_locks[head]:
+            if head not in self._analyzers:
+                self._analyzers[head] = self._load_pipeline(head)
+        return self._analyzers[head]
+
+    def _load_pipeline(self, head: str) -> Optional[Any]:
+        """Builds the pipeline of a model head. Returns None if it cannot be loaded."""
+        model_path = getattr(self, f"{head}_model_path")
+        logger.info(f"Loading {head} model from {model_path}...")
+        start = time.perf_counter()
+        try:
+            analyzer = pipeline(MODEL_TASKS[head], model=model_path)
+        except Exception as e:
+            logger.error(f"Error loading {head} model from {model_path}: {e}")
+            return None
+        logger.info(f"Loaded {head} model in {time.perf_counter() - start:.2f}s")
+        return analyzer
+
+    @property
+    def stop_words(self) -> set:
+        """English stop words, loaded (and downloaded if missing) on first use."""
+        if self._stop_words is None:
+            with self._stop_words_lock:
+                if self._stop_words is None:
+                    self._stop_words = self._load_stop_words()
+        return self._stop_words
+
+    @stop_words.setter
+    def stop_words(self, stop_words: set) -> None:
+        self._stop_words = stop_words
+
+    @staticmethod
+    def _load_stop_words() -> set:
+        if not HAS_NLTK:
+            return set()
+        try:
+            try:
                 nltk.data.find("corpora/stopwords")
             except LookupError:
                 logger.info("NLTK 'stopwords' resource not found. Downloading...")
                 nltk.download("stopwords", quiet=True)
-            self.stop_words = set(nltk.corpus.stopwords.words("english"))
-        else:
-            self.stop_words = set()
+            return set(nltk.corpus.stopwords.words("english"))
+        except Exception as e:
+            # Offline or blocked: the empty set is cached, so this is not retried per request
+            logger.warning(f"NLTK stop words unavailable, continuing without them: {e}")
+            return set()
 
-        logger.info("Attempting to load NLP models...")
-        self.sentiment_analyzer = pipeline("sentiment-analysis", model=self.sentiment_model_path)
-        self.topic_analyzer = pipeline("text-classification", model=self.topic_model_path)
-        self.intent_analyzer = pipeline("text-classification", model=self.intent_model_path)
-        self.urgency_analyzer = pipeline("text-classification", model=self.urgency_model_path)
-        self.importance_model = ImportanceModel()
+    @property
+    def loaded_models(self) -> List[str]:
+        """Model heads whose pipelines have been loaded successfully."""
+        return [head for head in MODEL_TASKS if self._analyzers.get(head) is not None]
+
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Loads every model and the stop words ahead of the first request.
+
+        Requests arriving during a background warm-up wait only for the
+        models they use.
+
+        Args:
+            background: Load in a daemon thread and return it instead of blocking.
+        """
+        if not background:
+            self._warm_up()
+            return None
+        if self._warm_up_thread is None or not self._warm_up_thread.is_alive():
+            self._warm_up_thread = threading.Thread(
+                target=self._warm_up, name="nlp-warm-up", daemon=True
+            )
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def _warm_up(self) -> None:
+        start = time.perf_counter()
+        for head in MODEL_TASKS:
+            self._get_analyzer(head)
+        stop_word_count = len(self.stop_words)
+        logger.info(
+            f"NLP engine warm-up finished in {time.perf_counter() - start:.2f}s "
+            f"({len(self.loaded_models)}/{len(MODEL_TASKS)} models, {stop_word_count} stop words)"
+        )
 
     def initialize_patterns(self):
         """Pre-compiles regex patterns for categorization."""
@@ -199,6 +314,21 @@ class NLPEngine:
         """
         return clean_text(text)
 
+    @staticmethod
+    def _format_model_prediction(head: str, prediction: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts a classification pipeline prediction into an analysis result."""
+        result = {
+            head: prediction["label"],
+            "confidence": prediction["score"],
+            "method_used": f"model_{head}",
+        }
+        if head == "sentiment":
+            result["polarity"] = (
+                prediction["score"] if prediction["label"] == "POSITIVE" else -prediction["score"]
+            )
+            result["subjectivity"] = 0.5
+        return result
+
     def _analyze_sentiment_model(self, text: str) -> Optional[Dict[str, Any]]:
         """
         Analyze sentiment using the loaded Hugging Face model.
@@ -208,18 +338,7 @@ class NLPEngine:
 
         try:
             results = self.sentiment_analyzer(text)
-            prediction = results[0]
-            return {
-                "sentiment": prediction["label"],
-                "polarity": (
-                    prediction["score"]
-                    if prediction["label"] == "POSITIVE"
-                    else -prediction["score"]
-                ),
-                "subjectivity": 0.5,
-                "confidence": prediction["score"],
-                "method_used": "model_sentiment",
-            }
+            return self._format_model_prediction("sentiment", results[0])
         except Exception as e:
             logger.error(f"Error using sentiment model: {e}. Trying fallback.")
             return None
@@ -331,12 +450,7 @@ class NLPEngine:
 
         try:
             results = self.topic_analyzer(text)
-            prediction = results[0]
-            return {
-                "topic": prediction["label"],
-                "confidence": prediction["score"],
-                "method_used": "model_topic",
-            }
+            return self._format_model_prediction("topic", results[0])
         except Exception as e:
             logger.error(f"Error using topic model: {e}. Trying fallback.")
             return None
@@ -462,12 +576,7 @@ class NLPEngine:
 
         try:
             results = self.intent_analyzer(text)
-            prediction = results[0]
-            return {
-                "intent": prediction["label"],
-                "confidence": prediction["score"],
-                "method_used": "model_intent",
-            }
+            return self._format_model_prediction("intent", results[0])
         except Exception as e:
             logger.error(f"Error using intent model: {e}. Trying fallback.")
             return None
@@ -530,12 +639,7 @@ class NLPEngine:
 
         try:
             results = self.urgency_analyzer(text)
-            prediction = results[0]
-            return {
-                "urgency": prediction["label"],
-                "confidence": prediction["score"],
-                "method_used": "model_urgency",
-            }
+            return self._format_model_prediction("urgency", results[0])
         except Exception as e:
             logger.error(f"Error using urgency model: {e}. Trying fallback.")
             return None
@@ -988,48 +1092,130 @@ class NLPEngine:
                 )
                 results[name] = result
 
-            # This method is regex-based, no model to load for it currently per its implementation
-            logger.info("Detecting risk factors...")
-            risk_analysis_flags = self._detect_risk_factors(cleaned_text)
-            logger.info(f"Risk factor detection completed. Flags: {risk_analysis_flags}")
-
-            # Extract keywords and entities
-            logger.info("Extracting keywords...")
-            keywords = self._extract_keywords(cleaned_text)  # Uses TextBlob if available
-            logger.info(f"Keyword extraction completed. Keywords: {keywords}")
-
-            logger.info("Categorizing content...")
-            categories = self._categorize_content(cleaned_text)  # Regex-based
-            logger.info(f"Content categorization completed. Categories: {categories}")
-
-            logger.info("Analyzing action items...")
-            action_items = self._analyze_action_items(
-                full_text
-            )  # Use full_text for action items for broader context before cleaning for other models
-            logger.info(
-                f"Action item analysis completed. Found {len(action_items)} potential actions."
-            )
-
-            logger.info("Building final analysis response...")
-            response = self._build_final_analysis_response(
-                results["sentiment"],
-                results["topic"],
-                results["intent"],
-                results["urgency"],
-                results["importance"],
-                categories,
-                keywords,
-                risk_analysis_flags,
-                action_items,
-            )
-            logger.info("Final analysis response built successfully.")
-            return response
+            return self._complete_analysis(full_text, cleaned_text, results)
 
         except Exception as e:
             error_msg = f"NLP analysis failed: {str(e)}"
             logger.exception("Exception in analyze_email:")  # Log full traceback
             return self._get_fallback_analysis(error_msg)
 
+    def analyze_emails(
+        self,
+        emails: Sequence[Union[Dict[str, Any], Tuple[str, str]]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        num_threads: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyzes many emails, running the model heads in batches.
+
+        Each text is tokenized once per group of heads sharing a tokenizer and
+        batches are padded only to their longest member. Heads without a model
+        result fall back per email, as in analyze_email.
+
+        Args:
+            emails: Dicts with "subject" and "content" keys, or (subject, content) pairs.
+            batch_size: Texts per forward pass.
+            num_threads: Torch intra-op threads for CPU inference.
+
+        Returns:
+            One analysis per email, in input order.
+        """
+        pairs = [
+            (email.get("subject", ""), email.get("content", ""))
+            if isinstance(email, dict)
+            else (email[0], email[1])
+            for email in emails
+        ]
+        if not HAS_NLTK and not HAS_SKLEARN_AND_JOBLIB:
+            logger.warning(
+                "NLTK and scikit-learn/joblib are unavailable. Using simple fallback analysis."
+            )
+            return [self._get_simple_fallback_analysis(subject, content) for subject, content in pairs]
+
+        full_texts = [f"{subject} {content}" for subject, content in pairs]
+        cleaned_texts = [self._preprocess_text(text) for text in full_texts]
+        predictions = run_classification_heads(
+            {
+                "sentiment": self.sentiment_analyzer,
+                "topic": self.topic_analyzer,
+                "intent": self.intent_analyzer,
+                "urgency": self.urgency_analyzer,
+            },
+            cleaned_texts,
+            batch_size=batch_size,
+            num_threads=num_threads,
+        )
+        fallbacks = {
+            "sentiment": lambda text: self._analyze_sentiment_textblob(text)
+            or self._analyze_sentiment_keyword(text),
+            "topic": self._analyze_topic_keyword,
+            "intent": self._analyze_intent_regex,
+            "urgency": self._analyze_urgency_regex,
+        }
+
+        analyses = []
+        for index, (full_text, cleaned_text) in enumerate(zip(full_texts, cleaned_texts)):
+            try:
+                results = {}
+                for head, fallback in fallbacks.items():
+                    head_predictions = predictions.get(head)
+                    prediction = head_predictions[index] if head_predictions else None
+                    results[head] = (
+                        self._format_model_prediction(head, prediction)
+                        if prediction is not None
+                        else fallback(cleaned_text)
+                    )
+                results["importance"] = self._analyze_importance(cleaned_text)
+                analyses.append(self._complete_analysis(full_text, cleaned_text, results))
+            except Exception as e:
+                logger.exception(f"Exception analyzing email {index} of batch:")
+                analyses.append(self._get_fallback_analysis(f"NLP analysis failed: {str(e)}"))
+        return analyses
+
+    def _complete_analysis(
+        self, full_text: str, cleaned_text: str, results: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Runs the rule-based analyses and builds the final response from the
+        per-head results (sentiment, topic, intent, urgency, importance).
+        """
+        # This method is regex-based, no model to load for it currently per its implementation
+        logger.info("Detecting risk factors...")
+        risk_analysis_flags = self._detect_risk_factors(cleaned_text)
+        logger.info(f"Risk factor detection completed. Flags: {risk_analysis_flags}")
+
+        # Extract keywords and entities
+        logger.info("Extracting keywords...")
+        keywords = self._extract_keywords(cleaned_text)  # Uses TextBlob if available
+        logger.info(f"Keyword extraction completed. Keywords: {keywords}")
+
+        logger.info("Categorizing content...")
+        categories = self._categorize_content(cleaned_text)  # Regex-based
+        logger.info(f"Content categorization completed. Categories: {categories}")
+
+        logger.info("Analyzing action items...")
+        action_items = self._analyze_action_items(
+            full_text
+        )  # Use full_text for action items for broader context before cleaning for other models
+        logger.info(
+            f"Action item analysis completed. Found {len(action_items)} potential actions."
+        )
+
+        logger.info("Building final analysis response...")
+        response = self._build_final_analysis_response(
+            results["sentiment"],
+            results["topic"],
+            results["intent"],
+            results["urgency"],
+            results["importance"],
+            categories,
+            keywords,
+            risk_analysis_flags,
+            action_items,
+        )
+        logger.info("Final analysis response built successfully.")
+        return response
+
     def _build_final_analysis_response(
         self,
         sentiment_analysis,
@@ -1130,6 +1316,16 @@ def main():
     parser.add_argument("--subject", type=str, default="", help="Subject of the email.")
     parser.add_argument("--content", type=str, default="", help="Content of the email.")
     parser.add_argument("--health-check", action="store_true", help="Perform a health check.")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the shared warm engine process used by CLI analyses.",
+    )
+    parser.add_argument(
+        "--no-warm-server",
+        action="store_true",
+        help="Analyze in this process instead of the shared warm engine process.",
+    )
     parser.add_argument(
         "--output-format",
         type=str,
@@ -1139,14 +1335,22 @@ def main():
     )
 
     args = parser.parse_args()
+    # Cheap: models are only loaded when an analysis runs in this process
     engine = NLPEngine()
 
+    if args.serve:
+        engine.initialize_patterns()
+        serve(engine)
+        sys.exit(0)
+
     if args.health_check:
         _perform_health_check(engine, args.output_format)
         sys.exit(0)
 
     if args.analyze_email:
-        _perform_email_analysis_cli(engine, args.subject, args.content, args.output_format)
+        _perform_email_analysis_cli(
+            engine, args.subject, args.content, args.output_format, _use_warm_server(args)
+        )
         sys.exit(0)
 
     # Backward compatibility / Default behavior
@@ -1212,12 +1416,35 @@ def _perform_health_check(engine: NLPEngine, output_format: str):
         print(json.dumps(health_status, indent=2))
 
 
-def _perform_email_analysis_cli(engine: NLPEngine, subject: str, content: str, output_format: str):
+def _use_warm_server(args: argparse.Namespace) -> bool:
+    """Whether CLI analyses go through the shared warm engine process."""
+    enabled = os.getenv("NLP_WARM_SERVER", "true").lower() not in ("0", "false", "no")
+    return enabled and not args.no_warm_server
+
+
+def _warm_server_command() -> List[str]:
+    """Command line that starts the warm engine process the way this CLI was run."""
+    if __spec__ is not None and __spec__.name:
+        return [sys.executable, "-m", __spec__.name, "--serve"]
+    return [sys.executable, os.path.abspath(__file__), "--serve"]
+
+
+def _perform_email_analysis_cli(
+    engine: NLPEngine,
+    subject: str,
+    content: str,
+    output_format: str,
+    use_warm_server: bool = False,
+):
     """Performs email analysis based on CLI arguments and prints the result."""
     if not subject and not content:
         # If called with --analyze-email but no subject/content, could be an error or expect empty analysis
         logger.warning("Analysis requested with empty subject and content.")
-    result = engine.analyze_email(subject, content)
+    result = None
+    if use_warm_server:
+        result = request_analysis(subject, content, server_command=_warm_server_command())
+    if result is None:
+        result = engine.analyze_email(subject, content)
     if output_format == "json":
         print(json.dumps(result))  # Compact JSON for machine readability
     else:
@@ -1238,6 +1465,8 @@ def _handle_backward_compatible_cli_invocation(
         "--subject",
         "--content",
         "--output-format",
+        "--serve",
+        "--no-warm-server",
     ]
     if any(flag in argv for flag in known_flags):
         return False
@@ -1261,7 +1490,9 @@ def _handle_backward_compatible_cli_invocation(
 
         logger.info("Processing with backward compatibility mode (positional arguments).")
         # Use the already defined _perform_email_analysis_cli for consistency in output
-        _perform_email_analysis_cli(engine, subject_old, content_old, args.output_format)
+        _perform_email_analysis_cli(
+            engine, subject_old, content_old, args.output_format, _use_warm_server(args)
+        )
         return True
     return False
 
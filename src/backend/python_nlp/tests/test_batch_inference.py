@@ -0,0 +1,104 @@
+import pytest
+
+from src.backend.python_nlp.batch_inference import run_classification_heads
+
+
+class _FakePipeline:
+    """Callable stand-in for a text-classification pipeline without tokenizer/model."""
+
+    def __init__(self, label_fn, fail=False):
+        self.label_fn = label_fn
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, texts, batch_size=1, truncation=False):
+        if self.fail:
+            raise RuntimeError("model crashed")
+        self.calls.append((len(texts), batch_size))
+        return [[{"label": self.label_fn(text), "score": 0.9}] for text in texts]
+
+
+def test_heads_return_predictions_in_input_order():
+    texts = ["urgent request", "weekly newsletter", "urgent invoice"]
+    urgency = _FakePipeline(lambda t: "high" if "urgent" in t else "low")
+    topic = _FakePipeline(lambda t: t.split()[1])
+
+    results = run_classification_heads(
+        {"urgency": urgency, "topic": topic, "intent": None}, texts, batch_size=2
+    )
+
+    assert [p["label"] for p in results["urgency"]] == ["high", "low", "high"]
+    assert [p["label"] for p in results["topic"]] == ["request", "newsletter", "invoice"]
+    assert "intent" not in results
+    assert urgency.calls == [(3, 2)]
+
+
+def test_failing_head_yields_none_without_affecting_others():
+    results = run_classification_heads(
+        {"ok": _FakePipeline(lambda t: "x"), "broken": _FakePipeline(None, fail=True)},
+        ["a", "b"],
+    )
+    assert results["broken"] == [None, None]
+    assert [p["label"] for p in results["ok"]] == ["x", "x"]
+
+    with pytest.raises(ValueError):
+        run_classification_heads({}, ["a"], batch_size=0)
+
+
+def test_heads_sharing_a_vocabulary_tokenize_once():
+    torch = pytest.importorskip("torch")
+
+    class Tokenizer:
+        model_max_length = 16
+        padding_side = "right"
+
+        def __init__(self):
+            self.calls = 0
+
+        def get_vocab(self):
+            return {"[PAD]": 0, "a": 1, "b": 2}
+
+        def __call__(self, texts, truncation=True, max_length=None):
+            self.calls += 1
+            ids = [[1 if w == "a" else 2 for w in t.split()][:max_length] for t in texts]
+            return {"input_ids": ids, "attention_mask": [[1] * len(i) for i in ids]}
+
+        def pad(self, features, return_tensors="pt"):
+            width = max(len(f["input_ids"]) for f in features)
+            return {
+                key: torch.tensor([f[key] + [0] * (width - len(f[key])) for f in features])
+                for key in ("input_ids", "attention_mask")
+            }
+
+    class Model(torch.nn.Module):
+        def __init__(self, label_for_a):
+            super().__init__()
+            self.config = type("Config", (), {"id2label": {0: "mostly_a", 1: "mostly_b"}})()
+            self.sign = 1.0 if label_for_a == "mostly_a" else -1.0
+
+        def forward(self, input_ids, attention_mask=None):
+            a_count = ((input_ids == 1) * attention_mask).sum(dim=-1).float()
+            b_count = ((input_ids == 2) * attention_mask).sum(dim=-1).float()
+            logits = torch.stack([a_count - b_count, b_count - a_count], dim=-1) * self.sign
+            return type("Output", (), {"logits": logits})()
+
+    class Pipeline:
+        def __init__(self, tokenizer, model):
+            self.tokenizer = tokenizer
+            self.model = model
+
+    tokenizer_one, tokenizer_two = Tokenizer(), Tokenizer()
+    texts = ["a a b", "b", "a b b b b", "a"]
+    results = run_classification_heads(
+        {
+            "first": Pipeline(tokenizer_one, Model("mostly_a")),
+            "second": Pipeline(tokenizer_two, Model("mostly_b")),
+        },
+        texts,
+        batch_size=3,
+        num_threads=1,
+    )
+
+    assert tokenizer_one.calls + tokenizer_two.calls == 1
+    assert [p["label"] for p in results["first"]] == ["mostly_a", "mostly_b", "mostly_b", "mostly_a"]
+    assert [p["label"] for p in results["second"]] == ["mostly_b", "mostly_a", "mostly_a", "mostly_b"]
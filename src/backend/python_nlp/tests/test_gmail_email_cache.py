@@ -0,0 +1,38 @@
+from src.backend.python_nlp.gmail_integration import EmailCache
+
+
+def _email(message_id, content="body", labels=("INBOX",)):
+    return {
+        "message_id": message_id,
+        "subject": f"Subject {message_id}",
+        "content": content,
+        "labels": list(labels),
+    }
+
+
+def test_bulk_cache_round_trip_uses_wal(tmp_path):
+    cache = EmailCache(str(tmp_path / "cache.db"))
+    assert cache.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    assert cache.cache_emails([_email(f"m{i}") for i in range(1200)]) == 1200
+    found = cache.get_cached_emails(["m0", "m1199", "missing", "m0"])
+
+    assert set(found) == {"m0", "m1199"}
+    assert found["m1199"]["subject"] == "Subject m1199"
+    assert found["m0"]["labels"] == ["INBOX"]
+    assert cache.get_cached_email("m5")["content"] == "body"
+
+
+def test_unchanged_rows_are_not_rewritten(tmp_path):
+    cache = EmailCache(str(tmp_path / "cache.db"))
+    cache.cache_emails([_email("a"), _email("b")])
+
+    written = cache.cache_emails(
+        [_email("a"), _email("b", content="edited"), _email("c", labels=("INBOX", "UNREAD"))]
+    )
+    assert written == 2
+    assert cache.rows_skipped == 1
+
+    assert cache.cache_emails([_email("c")]) == 1
+    assert cache.get_cached_email("c")["labels"] == ["INBOX"]
+    assert cache.get_cached_email("b")["content"] == "edited"
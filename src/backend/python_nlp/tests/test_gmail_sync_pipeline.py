@@ -0,0 +1,203 @@
+import asyncio
+import base64
+
+import pytest
+
+from src.backend.python_nlp.gmail_sync_pipeline import (
+    STAGE_ANALYZE,
+    STAGE_FETCH,
+    GmailApiClient,
+    GmailSyncPipeline,
+)
+
+
+class _FakeRequest:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batches.append(len(self.requests))
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except KeyError as e:
+                self.callback(request_id, None, e)
+
+
+class _FakeGmailService:
+    """In-memory stand-in for the googleapiclient Gmail v1 service."""
+
+    def __init__(self, message_count, page_size=10, missing=()):
+        self.ids = [f"m{i:03d}" for i in range(message_count)]
+        self.page_size = page_size
+        self.missing = set(missing)
+        self.batches = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, q, pageToken=None, maxResults=100):
+        def run():
+            start = int(pageToken or 0)
+            end = min(start + min(maxResults, self.page_size), len(self.ids))
+            response = {"messages": [{"id": i} for i in self.ids[start:end]]}
+            if end < len(self.ids):
+                response["nextPageToken"] = str(end)
+            return response
+
+        return _FakeRequest(run)
+
+    def get(self, userId, id, format):
+        def run():
+            if id in self.missing:
+                raise KeyError(id)
+            body = base64.urlsafe_b64encode(f"body of {id}".encode()).decode()
+            return {"id": id, "payload": {"body": {"data": body}}}
+
+        return _FakeRequest(run)
+
+    def new_batch_http_request(self, callback):
+        return _FakeBatch(self, callback)
+
+
+def _parse(raw):
+    return {
+        "message_id": raw["id"],
+        "content": base64.urlsafe_b64decode(raw["payload"]["body"]["data"]).decode(),
+    }
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_fetches_and_keeps_listing_order():
+    service = _FakeGmailService(45, page_size=20, missing={"m007"})
+    written = []
+    in_flight = 0
+    peak_in_flight = 0
+
+    async def analyze(email):
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        # Later messages finish first, so results arrive out of order
+        await asyncio.sleep(0.001 * (50 - int(email["message_id"][1:])) / 10)
+        in_flight -= 1
+        return {**email, "analyzed": True}
+
+    async def write(email):
+        written.append(email["message_id"])
+
+    checkpoints = []
+    pipeline = GmailSyncPipeline(
+        GmailApiClient(service),
+        parse=_parse,
+        analyze=analyze,
+        write=write,
+        batch_size=8,
+        queue_size=2,
+        analysis_concurrency=4,
+    )
+    results = await pipeline.run(
+        "in:inbox",
+        on_page_complete=lambda page, token, count: checkpoints.append((page, token, count)),
+    )
+
+    expected_ids = [i for i in service.ids if i != "m007"]
+    assert [email["message_id"] for email in results] == expected_ids
+    assert all(email["analyzed"] for email in results)
+    assert sorted(written) == expected_ids
+    assert results[0]["content"] == "body of m000"
+
+    # Pages of 20 split into batches of at most 8 messages
+    assert service.batches == [8, 8, 4, 8, 8, 4, 5]
+    assert checkpoints == [(0, "20", 20), (1, "40", 20), (2, None, 5)]
+    assert peak_in_flight > 1
+
+    metrics = pipeline.get_metrics()
+    assert metrics["messages"] == 44
+    assert metrics["stages"][STAGE_FETCH]["items_in"] == 7
+    assert metrics["stages"][STAGE_ANALYZE]["items_out"] == 44
+    assert metrics["stages"][STAGE_ANALYZE]["max_queue_depth"] <= 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_uses_cache_and_respects_max_emails():
+    service = _FakeGmailService(30)
+    cache = {"m001": {"message_id": "m001", "content": "cached"}}
+    stored = []
+
+    pipeline = GmailSyncPipeline(
+        GmailApiClient(service),
+        parse=_parse,
+        lookup=lambda ids: {i: cache[i] for i in ids if i in cache},
+        store=lambda emails: stored.append([email["message_id"] for email in emails]),
+        batch_size=50,
+    )
+    results = await pipeline.run("", max_emails=15)
+
+    assert [email["message_id"] for email in results] == service.ids[:15]
+    assert results[1]["content"] == "cached"
+    # Freshly parsed emails are stored once per batch; cache hits are not rewritten
+    assert [len(batch) for batch in stored] == [9, 5]
+    assert "m001" not in stored[0]
+    assert service.batches == [9, 5]
+
+    # A second run starts from clean results and page accounting
+    checkpoints = []
+    results = await pipeline.run(
+        "", max_emails=5, on_page_complete=lambda *args: checkpoints.append(args)
+    )
+    assert [email["message_id"] for email in results] == service.ids[:5]
+    assert checkpoints == [(0, "5", 5)]
+
+
+@pytest.mark.asyncio
+async def test_stage_errors_drop_items_without_stalling():
+    service = _FakeGmailService(12, page_size=4)
+
+    async def analyze(email):
+        if email["message_id"] == "m005":
+            raise RuntimeError("model failure")
+        return email
+
+    checkpoints = []
+    pipeline = GmailSyncPipeline(GmailApiClient(service), parse=_parse, analyze=analyze)
+    results = await pipeline.run("", on_page_complete=lambda *args: checkpoints.append(args))
+
+    assert len(results) == 11
+    assert [page for page, _, _ in checkpoints] == [0, 1, 2]
+    assert pipeline.get_metrics()["stages"][STAGE_ANALYZE]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_is_charged_one_token_per_message():
+    service = _FakeGmailService(25, page_size=20)
+    acquired = []
+
+    class _RecordingLimiter:
+        async def acquire(self, tokens=1):
+            acquired.append(tokens)
+
+    client = GmailApiClient(service, rate_limiter=_RecordingLimiter())
+    pipeline = GmailSyncPipeline(client, parse=_parse, batch_size=8)
+    results = await pipeline.run("")
+
+    assert len(results) == 25
+    # Two list pages cost one call each; every fetched message costs one more
+    assert sorted(acquired) == sorted([1, 1] + service.batches)
+    assert sum(acquired) == 2 + 25
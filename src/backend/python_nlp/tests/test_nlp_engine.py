@@ -304,3 +304,82 @@ def test_analyze_urgency_fallback_path():
         mock_model.assert_called_once_with("some text")
         mock_fallback.assert_called_once_with("some text")
         assert result["urgency"] == "fallback_urgency"
+
+
+def test_analyze_emails_batches_model_heads():
+    """Test analyze_emails runs each head once over the batch and keeps input order."""
+    calls = []
+
+    def fake_pipeline(task, model):
+        head = model.rstrip("/").split("/")[-1]
+
+        def run(texts, batch_size=1, truncation=False):
+            calls.append((head, len(texts), batch_size))
+            if head == "intent":
+                raise RuntimeError("intent model unavailable")
+            return [{"label": f"{head}:{'urgent' in text}", "score": 0.8} for text in texts]
+
+        return run
+
+    with (
+        patch("backend.python_nlp.nlp_engine.pipeline", side_effect=fake_pipeline),
+        patch("backend.python_nlp.nlp_engine.NLPEngine._extract_keywords", return_value=[]),
+    ):
+        engine = NLPEngine()
+        results = engine.analyze_emails(
+            [{"subject": "Urgent", "content": "reply now"}, ("Hello", "weekly news")],
+            batch_size=16,
+        )
+
+    assert [r["urgency"] for r in results] == ["urgency:True", "urgency:False"]
+    assert [r["topic"] for r in results] == ["topic:True", "topic:False"]
+    # The failing head falls back to regex matching for every email
+    assert results[0]["details"]["intent_analysis"]["method_used"] == "fallback_regex_intent"
+    assert sorted(calls) == [(head, 2, 16) for head in ("intent", "sentiment", "topic", "urgency")]
+
+
+def test_models_load_lazily_and_once():
+    """Test that models are loaded on first use, once, and that warm_up loads the rest."""
+    loaded = []
+
+    def fake_pipeline(task, model):
+        head = model.rstrip("/").split("/")[-1]
+        loaded.append(head)
+        if head == "intent":
+            raise OSError("model files missing")
+        return MagicMock(name=head)
+
+    with (
+        patch("backend.python_nlp.nlp_engine.pipeline", side_effect=fake_pipeline),
+        patch.object(NLPEngine, "_load_stop_words", return_value={"the"}) as load_stop_words,
+    ):
+        engine = NLPEngine()
+        assert loaded == []
+
+        assert engine.topic_analyzer is engine.topic_analyzer
+        assert loaded == ["topic"]
+
+        engine.warm_up(background=False)
+        assert sorted(loaded) == ["intent", "sentiment", "topic", "urgency"]
+        # A model that fails to load is unavailable, not retried on every call
+        assert engine.intent_analyzer is None
+        assert engine.loaded_models == ["sentiment", "topic", "urgency"]
+        assert engine.stop_words == {"the"}
+        load_stop_words.assert_called_once()
+
+
+def test_failed_stop_word_download_is_cached():
+    """Test that an offline stopwords download degrades to no stop words, attempted once."""
+    fake_nltk = MagicMock()
+    fake_nltk.data.find.side_effect = LookupError("stopwords")
+    fake_nltk.download.side_effect = OSError("network unreachable")
+
+    with (
+        patch("backend.python_nlp.nlp_engine.HAS_NLTK", True),
+        patch("backend.python_nlp.nlp_engine.nltk", fake_nltk, create=True),
+    ):
+        engine = NLPEngine()
+        assert engine.stop_words == set()
+        assert engine.stop_words == set()
+
+    fake_nltk.download.assert_called_once()
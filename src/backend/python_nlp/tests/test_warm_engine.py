@@ -0,0 +1,91 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from src.backend.python_nlp import warm_engine
+
+pytestmark = pytest.mark.skipif(
+    not warm_engine.WARM_SERVER_SUPPORTED, reason="requires Unix domain sockets"
+)
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.warmed_up = False
+        self.analyzed = []
+
+    @property
+    def loaded_models(self):
+        return ["sentiment"] if self.warmed_up else []
+
+    def warm_up(self, background=True):
+        self.warmed_up = True
+
+    def analyze_email(self, subject, content):
+        self.analyzed.append(subject)
+        if subject == "boom":
+            raise RuntimeError("model failure")
+        return {"topic": subject.lower(), "content_length": len(content)}
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_requests_are_served_by_warm_engine_until_idle(tmp_path):
+    address = str(tmp_path / "nlp.sock")
+    engine = _FakeEngine()
+    server = threading.Thread(
+        target=warm_engine.serve, args=(engine, address, 0.5), daemon=True
+    )
+    server.start()
+    _wait_for(lambda: os.path.exists(f"{address}.key"))
+
+    assert warm_engine.request_analysis("Invoice", "due", address=address) == {
+        "topic": "invoice",
+        "content_length": 3,
+    }
+    assert warm_engine.request_analysis("Hello", "x", address=address)["topic"] == "hello"
+    assert engine.warmed_up
+    assert engine.analyzed == ["Invoice", "Hello"]
+    # Engine errors are reported to the client, which falls back to local analysis
+    assert warm_engine.request_analysis("boom", "", address=address) is None
+    assert oct(os.stat(f"{address}.key").st_mode & 0o777) == "0o600"
+
+    server.join(timeout=5)
+    assert not server.is_alive()
+    assert not os.path.exists(address)
+    assert warm_engine.request_analysis("Invoice", "due", address=address) is None
+
+
+def test_stalled_clients_and_second_servers_do_not_block(tmp_path):
+    address = str(tmp_path / "nlp.sock")
+    engine = _FakeEngine()
+    server = threading.Thread(
+        target=warm_engine.serve, args=(engine, address, 1.0), daemon=True
+    )
+    server.start()
+    _wait_for(lambda: os.path.exists(f"{address}.key"))
+
+    # Another starter finds the lock taken and leaves the running server alone
+    started = time.monotonic()
+    warm_engine.serve(_FakeEngine(), address, 60)
+    assert time.monotonic() - started < 1.0
+
+    # A client that connects but never authenticates only ties up its own thread
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(address)
+    try:
+        assert warm_engine.request_analysis("Invoice", "due", address=address)["topic"] == "invoice"
+    finally:
+        stalled.close()
+
+    server.join(timeout=5)
+    assert not server.is_alive()
+    assert engine.analyzed == ["Invoice"]
@@ -0,0 +1,280 @@
+"""
+Shared warm NLP engine process for command-line invocations.
+
+Every ``nlp_engine.py --analyze-email`` run would otherwise load all models
+again. The first invocation starts a background server holding a warmed-up
+engine; later invocations send their email over a local Unix socket and
+receive the analysis. The server exits after a period without requests.
+
+The socket and its authentication key file are created readable by the
+current user only. A lock file next to the socket is held for the server's
+lifetime, so of several invocations starting a server at once only one
+binds the socket; the others find it running.
+"""
+
+import logging
+import os
+import secrets
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import (
+    AuthenticationError,
+    Client,
+    Connection,
+    Listener,
+    answer_challenge,
+    deliver_challenge,
+)
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+
+    FCNTL_AVAILABLE = True
+except ImportError:
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+WARM_SERVER_SUPPORTED = hasattr(socket, "AF_UNIX") and FCNTL_AVAILABLE
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+DEFAULT_STARTUP_TIMEOUT = 60.0
+# Seconds an authenticated client has to send its request
+REQUEST_TIMEOUT = 30.0
+_POLL_INTERVAL = 0.1
+
+
+def default_address() -> str:
+    """Returns the socket path from NLP_WARM_SERVER_ADDRESS or a per-user default."""
+    address = os.getenv("NLP_WARM_SERVER_ADDRESS")
+    if address:
+        return address
+    user = os.getuid() if hasattr(os, "getuid") else os.getenv("USERNAME", "user")
+    return os.path.join(tempfile.gettempdir(), f"emailintelligence-nlp-{user}.sock")
+
+
+def _key_path(address: str) -> str:
+    return f"{address}.key"
+
+
+def _lock_path(address: str) -> str:
+    return f"{address}.lock"
+
+
+def _acquire_server_lock(address: str) -> Optional[int]:
+    """
+    Takes the lock that entitles a process to serve address.
+
+    Returns the locked descriptor, which must stay open while serving, or
+    None if another server holds the lock. The lock file itself is never
+    removed, so every process locks the same file.
+    """
+    previous_umask = os.umask(0o077)
+    try:
+        fd = os.open(_lock_path(address), os.O_RDWR | os.O_CREAT, 0o600)
+    finally:
+        os.umask(previous_umask)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _remove_files(address: str) -> None:
+    for path in (address, _key_path(address)):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _handle(engine: Any, message: Dict[str, Any]) -> Dict[str, Any]:
+    op = message.get("op")
+    if op == "ping":
+        return {"ok": True, "loaded_models": list(engine.loaded_models)}
+    if op == "analyze":
+        result = engine.analyze_email(message.get("subject", ""), message.get("content", ""))
+        return {"ok": True, "result": result}
+    return {"ok": False, "error": f"Unknown operation: {op}"}
+
+
+def serve(
+    engine: Any,
+    address: Optional[str] = None,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+) -> None:
+    """
+    Serves analysis requests for engine until idle_timeout seconds pass without one.
+
+    The engine is warmed up in the background, so the server accepts
+    connections immediately; early requests wait for the models they need.
+    Each connection is served in its own thread, so a client that stalls
+    during the handshake or never sends its request cannot block others.
+    """
+    if not WARM_SERVER_SUPPORTED:
+        raise RuntimeError("The warm NLP server requires Unix domain sockets and fcntl")
+    address = address or default_address()
+    lock_fd = _acquire_server_lock(address)
+    if lock_fd is None:
+        logger.info(f"A warm NLP server is already running or starting at {address}")
+        return
+    try:
+        _serve_locked(engine, address, idle_timeout)
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(lock_fd)
+
+
+def _serve_locked(engine: Any, address: str, idle_timeout: float) -> None:
+    """Runs the server once this process holds the lock for address."""
+    # Any socket left behind belongs to a server that exited without cleaning up
+    _remove_files(address)
+    authkey = secrets.token_bytes(32)
+    previous_umask = os.umask(0o077)
+    try:
+        # Clients are authenticated in their connection's thread, not in accept()
+        listener = Listener(address, family="AF_UNIX")
+        with open(_key_path(address), "w", encoding="utf-8") as key_file:
+            key_file.write(authkey.hex())
+    finally:
+        os.umask(previous_umask)
+
+    engine.warm_up(background=True)
+    last_request = time.monotonic()
+    closed = threading.Event()
+
+    def serve_connection(conn: Connection) -> None:
+        nonlocal last_request
+        with conn:
+            try:
+                deliver_challenge(conn, authkey)
+                answer_challenge(conn, authkey)
+                if not conn.poll(REQUEST_TIMEOUT):
+                    logger.warning("Warm NLP server client sent no request; closing connection")
+                    return
+                message = conn.recv()
+                last_request = time.monotonic()
+                try:
+                    reply = _handle(engine, message)
+                except Exception as e:
+                    logger.error(f"Warm NLP server request failed: {e}")
+                    reply = {"ok": False, "error": str(e)}
+                conn.send(reply)
+            except AuthenticationError as e:
+                logger.warning(f"Rejected warm NLP server connection: {e}")
+            except (OSError, EOFError) as e:
+                logger.warning(f"Warm NLP server connection dropped: {e}")
+        last_request = time.monotonic()
+
+    def accept_loop() -> None:
+        while not closed.is_set():
+            try:
+                conn = listener.accept()
+            except OSError as e:
+                if not closed.is_set():
+                    logger.warning(f"Warm NLP server could not accept a connection: {e}")
+                continue
+            threading.Thread(
+                target=serve_connection, args=(conn,), name="nlp-warm-request", daemon=True
+            ).start()
+
+    if threading.current_thread() is threading.main_thread():
+        # Run the cleanup below when the process is terminated
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    logger.info(f"Warm NLP server listening at {address}")
+    threading.Thread(target=accept_loop, name="nlp-warm-server", daemon=True).start()
+    try:
+        while time.monotonic() - last_request < idle_timeout:
+            time.sleep(min(1.0, idle_timeout))
+        logger.info("Warm NLP server idle, shutting down")
+    finally:
+        closed.set()
+        listener.close()
+        _remove_files(address)
+
+
+def _request(message: Dict[str, Any], address: str) -> Optional[Dict[str, Any]]:
+    """Sends one message to the server. Returns None if no server answers."""
+    try:
+        with open(_key_path(address), "r", encoding="utf-8") as key_file:
+            authkey = bytes.fromhex(key_file.read().strip())
+        with Client(address, family="AF_UNIX", authkey=authkey) as conn:
+            conn.send(message)
+            return conn.recv()
+    except (OSError, EOFError, ValueError, AuthenticationError):
+        return None
+
+
+def start_server(
+    command: List[str],
+    address: Optional[str] = None,
+    startup_timeout: float = DEFAULT_STARTUP_TIMEOUT,
+) -> bool:
+    """
+    Starts a detached server process and waits until it answers.
+
+    Args:
+        command: Command line that runs ``serve`` for this address.
+        address: Socket path; defaults to ``default_address()``.
+        startup_timeout: Seconds to wait for the server to accept connections.
+    """
+    address = address or default_address()
+    logger.info(f"Starting warm NLP server: {' '.join(command)}")
+    subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        env={**os.environ, "NLP_WARM_SERVER_ADDRESS": address},
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if _request({"op": "ping"}, address) is not None:
+            return True
+        time.sleep(_POLL_INTERVAL)
+    logger.warning(f"Warm NLP server did not start within {startup_timeout:.0f}s")
+    return False
+
+
+def request_analysis(
+    subject: str,
+    content: str,
+    address: Optional[str] = None,
+    server_command: Optional[List[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Analyzes an email in the warm server process.
+
+    Args:
+        subject: The subject of the email.
+        content: The body of the email.
+        address: Socket path; defaults to ``default_address()``.
+        server_command: Command used to start a server if none is running.
+            None only uses an already running server.
+
+    Returns:
+        The analysis, or None if no server could be reached.
+    """
+    if not WARM_SERVER_SUPPORTED:
+        return None
+    address = address or default_address()
+    message = {"op": "analyze", "subject": subject, "content": content}
+    reply = _request(message, address)
+    if reply is None and server_command and start_server(server_command, address):
+        reply = _request(message, address)
+    if reply is None:
+        return None
+    if not reply.get("ok"):
+        logger.warning(f"Warm NLP server could not analyze email: {reply.get('error')}")
+        return None
+    return reply["result"]
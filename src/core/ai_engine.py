@@ -1,10 +1,23 @@
+import functools
 import logging
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
+from .analysis_cache import (
+    AnalysisCache,
+    bypass_analysis_cache,
+    get_analysis_cache,
+    is_analysis_cache_bypassed,
+)
 from .dynamic_model_manager import DynamicModelManager
+from .model_registry import ModelRegistry
 
 logger = logging.getLogger(__name__)
 
+# Risk flag marking a fallback result produced after an analysis error
+ANALYSIS_FAILED_FLAG = "ai_analysis_failed"
+# Fallback results are never cached; "analysis_failed" is set by the NLPEngine
+_UNCACHEABLE_RISK_FLAGS = frozenset({ANALYSIS_FAILED_FLAG, "analysis_failed"})
+
 
 class AIAnalysisResult:
     """
@@ -31,6 +44,35 @@ class AIAnalysisResult:
         return self.__dict__
 
 
+def _with_analysis_cache(analyze_email):
+    """Wraps an engine's analyze_email with a lookup in its analysis cache."""
+
+    @functools.wraps(analyze_email)
+    async def cached_analyze_email(
+        self, subject: str, content: str, categories: Optional[List[Dict[str, Any]]] = None
+    ) -> AIAnalysisResult:
+        cache = self.get_analysis_cache()
+        if cache is None or is_analysis_cache_bypassed():
+            return await analyze_email(self, subject, content, categories)
+
+        key = cache.make_key(
+            type(self).__name__, subject, content, self.get_model_versions(), categories
+        )
+        cached = await cache.get_async(key)
+        if cached is not None:
+            return AIAnalysisResult(cached)
+
+        # Nested analyze_email calls (e.g. via super()) must not cache twice
+        with bypass_analysis_cache():
+            result = await analyze_email(self, subject, content, categories)
+        if not _UNCACHEABLE_RISK_FLAGS.intersection(result.risk_flags):
+            await cache.put_async(key, result.to_dict())
+        return result
+
+    cached_analyze_email._analysis_cached = True
+    return cached_analyze_email
+
+
 class BaseAIEngine(ABC):
     """
     Abstract base class for all AI engines in the platform.
@@ -38,8 +80,45 @@ class BaseAIEngine(ABC):
     This class defines the standard interface that all AI engine modules must
     implement. This ensures that different models and backends can be plugged
     into the application seamlessly.
+
+    Every implementation's ``analyze_email`` is served through the shared
+    analysis cache: identical text analyzed with the same model versions
+    returns the stored result. Implementations report their model versions
+    through ``get_model_versions`` so that results are invalidated when a
+    model changes.
     """
 
+    # None uses the shared cache; set use_analysis_cache to False to opt out
+    analysis_cache: Optional[AnalysisCache] = None
+    use_analysis_cache: bool = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        analyze_email = cls.__dict__.get("analyze_email")
+        if analyze_email is not None and not getattr(analyze_email, "_analysis_cached", False):
+            cls.analyze_email = _with_analysis_cache(analyze_email)
+
+    def get_analysis_cache(self) -> Optional[AnalysisCache]:
+        """Returns the analysis cache used by this engine, or None if disabled."""
+        if not self.use_analysis_cache:
+            return None
+        return self.analysis_cache or get_analysis_cache()
+
+    def get_model_versions(self) -> Dict[str, str]:
+        """
+        Returns the versions of the models behind this engine's analyses.
+
+        Cached results are only reused while these versions are unchanged.
+        """
+        return {}
+
+    def get_analysis_cache_stats(self) -> Dict[str, Any]:
+        """Returns hit rates of the analysis cache for health checks."""
+        cache = self.get_analysis_cache()
+        if cache is None:
+            return {"status": "disabled"}
+        return {"status": "healthy", **cache.get_stats()}
+
     @abstractmethod
     def initialize(self):
         """
@@ -109,6 +188,13 @@ class ModernAIEngine(BaseAIEngine):
         self._model_manager = model_manager
         logger.info("ModernAIEngine initialized with DynamicModelManager")
 
+    def get_model_versions(self) -> Dict[str, str]:
+        """Returns the versions of all models known to the model registry."""
+        registry = getattr(self._model_manager, "registry", None)
+        if isinstance(registry, ModelRegistry):
+            return registry.get_model_versions()
+        return {}
+
     async def initialize(self):
         """Initialize the AI engine with required resources."""
         if self._initialized:
@@ -162,10 +248,13 @@ class ModernAIEngine(BaseAIEngine):
             }
             health_status["issues"].append("Model manager not available")
 
+        health_status["components"]["analysis_cache"] = self.get_analysis_cache_stats()
+
         # Check if basic analysis works
         try:
-            # Quick test with simple text
-            await self.analyze_email("test", "test content")
+            # Quick test with simple text; a cached result would not exercise the models
+            with bypass_analysis_cache():
+                await self.analyze_email("test", "test content")
             health_status["components"]["analysis_engine"] = {
                 "status": "healthy",
                 "test_result": "passed",
@@ -238,6 +327,7 @@ class ModernAIEngine(BaseAIEngine):
                     "urgency": "low",
                     "confidence": 0.0,
                     "reasoning": f"Analysis failed: {str(e)}",
+                    "risk_flags": [ANALYSIS_FAILED_FLAG],
                 }
             )
 
@@ -0,0 +1,360 @@
+"""
+Content-addressed cache for AI email analysis results.
+
+Newsletters, notifications and re-analysis after a tag update repeatedly send
+identical text through the AI engines. Results are cached under a key made of:
+
+- the engine name,
+- a SHA-256 digest of the normalized subject, content and category list,
+- a digest of the model versions the engine reports (usually taken from the
+  ``ModelRegistry``).
+
+An entry written under other model versions is treated as stale and dropped on
+lookup, so retraining or swapping a model invalidates its results without an
+explicit flush. Lookups go through an LRU in-memory tier first and an SQLite
+tier second; disk hits are promoted into memory. Async callers use
+``get_async``/``put_async``, which run the SQLite tier in a worker thread.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .sized_cache import EVICTION_LRU, SizeAwareCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.getenv("DATA_DIR", "data"), "analysis_cache.db")
+DEFAULT_MEMORY_ENTRIES = 4096
+DEFAULT_MEMORY_BYTES = 16 * 1024 * 1024
+DEFAULT_DISK_ENTRIES = 200_000
+# The disk tier is trimmed to max_disk_entries after this many writes
+_PRUNE_INTERVAL = 1000
+
+_bypass_cache: ContextVar[bool] = ContextVar("analysis_cache_bypass", default=False)
+
+
+def normalize_analysis_text(text: str) -> str:
+    """Normalizes text so that formatting-only differences share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def _digest(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+@contextmanager
+def bypass_analysis_cache() -> Iterator[None]:
+    """Runs the enclosed analyses without reading or writing the cache."""
+    token = _bypass_cache.set(True)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
+
+
+def is_analysis_cache_bypassed() -> bool:
+    return _bypass_cache.get()
+
+
+@dataclass(frozen=True)
+class AnalysisCacheKey:
+    """Identifies one analysis: what was analyzed, and by which models."""
+
+    engine: str
+    text_digest: str
+    model_digest: str
+
+    @property
+    def entry_id(self) -> str:
+        return f"{self.engine}:{self.text_digest}"
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of analysis result dictionaries.
+
+    Results are deep-copied on the way in and out, so callers may mutate
+    what they get. The memory tier and the disk tier have separate locks,
+    so memory hits never wait for SQLite.
+
+    Args:
+        db_path: SQLite file for the disk tier. None keeps only the memory tier.
+        max_memory_entries: Entry bound of the LRU memory tier.
+        max_memory_bytes: Byte bound of the LRU memory tier.
+        max_disk_entries: Rows kept on disk; the oldest are pruned beyond this.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = DEFAULT_DB_PATH,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        max_disk_entries: int = DEFAULT_DISK_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._memory = SizeAwareCache(
+            max_bytes=max_memory_bytes, max_entries=max_memory_entries, policy=EVICTION_LRU
+        )
+        # Guards the memory tier and the counters
+        self._lock = threading.Lock()
+        # Guards the SQLite connection
+        self._disk_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_failed = False
+        self._writes_since_prune = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    @property
+    def has_disk_tier(self) -> bool:
+        return self.db_path is not None and not self._disk_failed
+
+    def make_key(
+        self,
+        engine: str,
+        subject: str,
+        content: str,
+        model_versions: Optional[Mapping[str, Any]] = None,
+        categories: Optional[List[Dict[str, Any]]] = None,
+    ) -> AnalysisCacheKey:
+        """Builds the cache key for one analysis request."""
+        category_part = ""
+        if categories:
+            category_part = json.dumps(
+                sorted((str(c.get("id")), str(c.get("name"))) for c in categories)
+            )
+        text_digest = _digest(
+            normalize_analysis_text(subject), normalize_analysis_text(content), category_part
+        )
+        versions = json.dumps(
+            sorted((str(name), str(version)) for name, version in (model_versions or {}).items())
+        )
+        return AnalysisCacheKey(engine, text_digest, _digest(versions))
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None or not self.has_disk_tier:
+            return self._conn
+        try:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    entry_id TEXT PRIMARY KEY,
+                    model_digest TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_cache_created ON analysis_cache(created_at)"
+            )
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Analysis cache disk tier unavailable at {self.db_path}: {e}")
+            self._disk_failed = True
+            return None
+        self._conn = conn
+        return conn
+
+    def get(self, key: AnalysisCacheKey) -> Optional[Dict[str, Any]]:
+        """Returns a copy of the cached result for key, or None."""
+        cached, stale = self._get_from_memory(key)
+        if cached is not None:
+            return cached
+        result, stale_on_disk = self._get_from_disk(key)
+        return self._record_lookup(key, result, stale or stale_on_disk)
+
+    async def get_async(self, key: AnalysisCacheKey) -> Optional[Dict[str, Any]]:
+        """Like get, with the disk tier read in a worker thread."""
+        cached, stale = self._get_from_memory(key)
+        if cached is not None:
+            return cached
+        result, stale_on_disk = None, False
+        if self.has_disk_tier:
+            result, stale_on_disk = await asyncio.to_thread(self._get_from_disk, key)
+        return self._record_lookup(key, result, stale or stale_on_disk)
+
+    def _get_from_memory(self, key: AnalysisCacheKey) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Returns a copy of the current result in memory and whether a stale entry was dropped."""
+        with self._lock:
+            cached = self._memory.get(key.entry_id)
+            if cached is None:
+                return None, False
+            model_digest, result = cached
+            if model_digest == key.model_digest:
+                self.memory_hits += 1
+                return copy.deepcopy(result), False
+            self._memory.invalidate(key.entry_id)
+            return None, True
+
+    def _record_lookup(
+        self, key: AnalysisCacheKey, result: Optional[Dict[str, Any]], stale: bool
+    ) -> Optional[Dict[str, Any]]:
+        """Counts a lookup that missed memory and promotes a disk hit."""
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                if stale:
+                    self.invalidations += 1
+                return None
+            self.disk_hits += 1
+            self._memory.put(key.entry_id, (key.model_digest, result))
+        return copy.deepcopy(result)
+
+    def _get_from_disk(self, key: AnalysisCacheKey) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Returns the current result on disk and whether a stale row was dropped."""
+        with self._disk_lock:
+            conn = self._connect()
+            if conn is None:
+                return None, False
+            try:
+                row = conn.execute(
+                    "SELECT model_digest, result FROM analysis_cache WHERE entry_id = ?",
+                    (key.entry_id,),
+                ).fetchone()
+                if row is None:
+                    return None, False
+                if row[0] != key.model_digest:
+                    conn.execute("DELETE FROM analysis_cache WHERE entry_id = ?", (key.entry_id,))
+                    conn.commit()
+                    return None, True
+                return json.loads(row[1]), False
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Analysis cache read failed: {e}")
+                return None, False
+
+    def put(self, key: AnalysisCacheKey, result: Dict[str, Any]) -> None:
+        """Stores a result dictionary under key in both tiers."""
+        result = self._put_in_memory(key, result)
+        self._put_on_disk(key, result)
+
+    async def put_async(self, key: AnalysisCacheKey, result: Dict[str, Any]) -> None:
+        """Like put, with the disk tier written in a worker thread."""
+        result = self._put_in_memory(key, result)
+        if self.has_disk_tier:
+            await asyncio.to_thread(self._put_on_disk, key, result)
+
+    def _put_in_memory(self, key: AnalysisCacheKey, result: Dict[str, Any]) -> Dict[str, Any]:
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._memory.put(key.entry_id, (key.model_digest, result))
+            self.stores += 1
+        return result
+
+    def _put_on_disk(self, key: AnalysisCacheKey, result: Dict[str, Any]) -> None:
+        with self._disk_lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (entry_id, model_digest, result, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key.entry_id, key.model_digest, json.dumps(result, default=str), time.time()),
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= _PRUNE_INTERVAL:
+                    self._prune(conn)
+                conn.commit()
+            except (sqlite3.Error, TypeError) as e:
+                logger.warning(f"Analysis cache write failed: {e}")
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        self._writes_since_prune = 0
+        conn.execute(
+            """
+            DELETE FROM analysis_cache WHERE entry_id IN (
+                SELECT entry_id FROM analysis_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_disk_entries,),
+        )
+
+    def clear(self) -> None:
+        """Drops every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        with self._disk_lock:
+            conn = self._connect()
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM analysis_cache")
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Analysis cache clear failed: {e}")
+
+    def close(self) -> None:
+        with self._disk_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_hits": self.memory_hits,
+            "memory_hit_rate": self.memory_hits / lookups if lookups else 0.0,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory.resident_bytes,
+            "disk_tier": self.has_disk_tier,
+        }
+
+
+# Global instance management
+_shared_analysis_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """
+    Get the analysis cache shared by all AI engines.
+
+    The disk tier lives at ``ANALYSIS_CACHE_PATH`` (default
+    ``data/analysis_cache.db``); setting it to an empty string keeps the cache
+    in memory only.
+    """
+    global _shared_analysis_cache
+    if _shared_analysis_cache is None:
+        db_path = os.getenv("ANALYSIS_CACHE_PATH", DEFAULT_DB_PATH) or None
+        _shared_analysis_cache = AnalysisCache(db_path=db_path)
+    return _shared_analysis_cache
+
+
+def set_analysis_cache(cache: Optional[AnalysisCache]) -> None:
+    """Replace the shared analysis cache; None recreates it on next use."""
+    global _shared_analysis_cache
+    _shared_analysis_cache = cache
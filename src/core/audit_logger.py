@@ -6,19 +6,38 @@ with structured JSON output and configurable log levels.
 """
 
 import atexit
+import gzip
 import json
 import logging
+import os
+import shutil
 import threading
-import asyncio
+import time
+from collections import Counter
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from enum import Enum
 from pathlib import Path
-from queue import Queue
-from typing import Any, Dict, Optional
+from queue import Empty, Full, Queue
+from typing import Any, Dict, List, Optional, TextIO
+
+try:
+    import fcntl
+
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_ROTATE_INTERVAL = 24 * 60 * 60
+DEFAULT_BACKUP_COUNT = 30
+# Seconds between "audit queue full" warnings
+_DROP_WARNING_INTERVAL = 10.0
+# Queued by shutdown() to stop the writer thread after the events before it
+_STOP = object()
+
 
 class AuditEventType(Enum):
     """Types of audit events."""
@@ -94,30 +113,221 @@ class AuditEvent:
         return data
 
 
+class AuditSegmentWriter:
+    """
+    Append-only log file that stays open and rotates into compressed segments.
+
+    The active file is rotated when it would exceed max_bytes or when it has
+    been open for rotate_interval seconds. Rotated segments are renamed with a
+    UTC timestamp suffix and gzip-compressed in a background thread; only the
+    newest backup_count segments are kept.
+
+    Each file has one writer: the first process to open the path holds an
+    exclusive lock on it, and other processes (e.g. further uvicorn workers)
+    write to a per-PID file next to it (``audit.<pid>.jsonl``), which rotates
+    on its own. A rotation therefore never renames a file another process is
+    still appending to.
+
+    Not thread-safe: it is used only by the audit logger's writer thread.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        rotate_interval: Optional[float] = DEFAULT_ROTATE_INTERVAL,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        fsync: bool = False,
+    ):
+        self.path = Path(path)
+        # The file this process writes: path itself or its per-PID fallback
+        self.active_path = self.path
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.fsync = fsync
+        self.rotations = 0
+        self._file: Optional[TextIO] = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._compressions: List[threading.Thread] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _open(self) -> TextIO:
+        self._file = self._open_owned(self.path)
+        if self._file is None:
+            self.active_path = self.path.with_name(
+                f"{self.path.stem}.{os.getpid()}{self.path.suffix}"
+            )
+            self._file = open(self.active_path, "a", encoding="utf-8")
+        else:
+            self.active_path = self.path
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+        return self._file
+
+    @staticmethod
+    def _open_owned(path: Path) -> Optional[TextIO]:
+        """Opens path for appending if no other process writes it, holding a lock on it."""
+        f = open(path, "a", encoding="utf-8")
+        if not FCNTL_AVAILABLE:
+            return f
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # The owner may have rotated the file away between our open and lock
+            if os.stat(path).st_ino == os.fstat(f.fileno()).st_ino:
+                return f
+        except (BlockingIOError, FileNotFoundError):
+            pass
+        f.close()
+        return None
+
+    def write_batch(self, lines: List[str]) -> None:
+        """Appends lines with one write and one flush (group commit)."""
+        data = "".join(lines)
+        if self._file is None:
+            self._open()
+        if self._should_rotate(len(data.encode("utf-8"))):
+            self.rotate()
+            self._open()
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._size += len(data.encode("utf-8"))
+
+    def _should_rotate(self, incoming_bytes: int) -> bool:
+        if not self._size:
+            return False
+        if self.max_bytes and self._size + incoming_bytes > self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() - self._opened_at >= self.rotate_interval
+
+    def rotate(self) -> Optional[Path]:
+        """Closes the active file and compresses it into a timestamped segment."""
+        if self._file is None:
+            # Lock the file (or fall back to the per-PID one) before renaming it
+            self._open()
+        path = self.active_path
+        if not path.exists() or not path.stat().st_size:
+            self.close()
+            return None
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        segment = path.with_name(f"{path.name}.{stamp}")
+        suffix = 1
+        while segment.exists() or Path(f"{segment}.gz").exists():
+            segment = path.with_name(f"{path.name}.{stamp}-{suffix}")
+            suffix += 1
+        # Rename while still holding the lock, so no other process opens the old file meanwhile
+        os.replace(path, segment)
+        self.close()
+        self.rotations += 1
+
+        self._compressions = [t for t in self._compressions if t.is_alive()]
+        thread = threading.Thread(
+            target=self._compress, args=(segment, path), daemon=True, name="AuditLogCompressor"
+        )
+        thread.start()
+        self._compressions.append(thread)
+        return segment
+
+    def _compress(self, segment: Path, path: Path) -> None:
+        compressed = Path(f"{segment}.gz")
+        try:
+            with open(segment, "rb") as src, gzip.open(compressed, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            segment.unlink()
+        except OSError as e:
+            # Keep the uncompressed segment; it still counts towards backup_count
+            logger.error(f"Failed to compress audit segment {segment}: {e}")
+            try:
+                compressed.unlink()
+            except OSError:
+                pass
+        self._prune_segments(path)
+
+    def _prune_segments(self, path: Path) -> None:
+        """Keeps the newest backup_count segments of path, compressed or not."""
+        segments: Dict[str, List[Path]] = {}
+        for segment in path.parent.glob(f"{path.name}.*"):
+            stamp = segment.name[len(path.name) + 1:]
+            if stamp.endswith(".gz"):
+                stamp = stamp[:-3]
+            # Rotation stamps never contain dots; per-PID files of path do not match
+            if "." not in stamp:
+                segments.setdefault(stamp, []).append(segment)
+        stamps = sorted(segments)
+        for stamp in stamps[: max(0, len(stamps) - self.backup_count)]:
+            for old in segments[stamp]:
+                try:
+                    old.unlink()
+                except OSError as e:
+                    logger.warning(f"Failed to remove old audit segment {old}: {e}")
+
+    def wait_for_compression(self, timeout: Optional[float] = None) -> None:
+        for thread in self._compressions:
+            thread.join(timeout)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
 class AuditLogger:
     """
     Advanced audit logger with asynchronous processing and multiple output formats.
+
+    Events are queued and written by a background thread in group commits:
+    once an event arrives, the writer collects further events for at most
+    max_batch_latency seconds (or until max_batch_size) and writes the batch
+    with one write per output file. log_event never blocks, since it is
+    called from the event loop (e.g. by the security middleware): when the
+    queue is full the event is dropped and counted by severity in
+    get_metrics().
     """
 
     def __init__(
         self,
         log_file: str = "logs/audit.log",
         json_file: str = "logs/audit.jsonl",
-        max_queue_size: int = 1000,
-        flush_interval: int = 5,
+        max_queue_size: int = 10000,
+        max_batch_size: int = 500,
+        max_batch_latency: float = 0.05,
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        rotate_interval: Optional[float] = DEFAULT_ROTATE_INTERVAL,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        fsync: bool = False,
     ):
         self.log_file = Path(log_file)
         self.json_file = Path(json_file)
         self.max_queue_size = max_queue_size
-        self.flush_interval = flush_interval
-
-        # Create log directories
-        self.log_file.parent.mkdir(parents=True, exist_ok=True)
-        self.json_file.parent.mkdir(parents=True, exist_ok=True)
+        self.max_batch_size = max_batch_size
+        self.max_batch_latency = max_batch_latency
+
+        segment_options = {
+            "max_bytes": max_segment_bytes,
+            "rotate_interval": rotate_interval,
+            "backup_count": backup_count,
+            "fsync": fsync,
+        }
+        self._text_writer = AuditSegmentWriter(self.log_file, **segment_options)
+        self._json_writer = AuditSegmentWriter(self.json_file, **segment_options)
 
         # Event queue for async processing
-        self._event_queue: Queue[AuditEvent] = Queue(maxsize=max_queue_size)
+        self._event_queue: Queue = Queue(maxsize=max_queue_size)
         self._stop_event = threading.Event()
+        self._write_lock = threading.Lock()
+
+        # Backpressure and throughput metrics
+        self._metrics_lock = threading.Lock()
+        self._dropped: Counter = Counter()
+        self._max_queue_depth = 0
+        self._last_drop_warning = 0.0
+        self._written = 0
+        self._batches = 0
+        self._write_errors = 0
+        self._commit_seconds = 0.0
 
         # Start background processing thread
         self._processing_thread = threading.Thread(
@@ -131,13 +341,32 @@ class AuditLogger:
         logger.info("AuditLogger initialized")
 
     def log_event(self, event: AuditEvent):
-        """Log an audit event asynchronously."""
+        """Queue an audit event for the background writer."""
+        if self._stop_event.is_set():
+            self._record_drop(event)
+            return
         try:
             self._event_queue.put_nowait(event)
-        except asyncio.QueueFull:
-            # If queue is full, log immediately to prevent data loss
-            logger.warning(f"Audit queue full, logging synchronously: {event.event_id}")
-            self._write_event_immediate(event)
+        except Full:
+            self._record_drop(event)
+            return
+
+        depth = self._event_queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+
+    def _record_drop(self, event: AuditEvent) -> None:
+        now = time.monotonic()
+        with self._metrics_lock:
+            self._dropped[event.severity.value] += 1
+            warn = now - self._last_drop_warning >= _DROP_WARNING_INTERVAL
+            if warn:
+                self._last_drop_warning = now
+                dropped = sum(self._dropped.values())
+        if warn:
+            logger.warning(
+                f"Audit logger dropped {dropped} events so far (queue capacity {self.max_queue_size})"
+            )
 
     def log_security_event(
         self,
@@ -240,65 +469,122 @@ class AuditLogger:
         )
 
     def _process_events(self):
-        """Background thread to process audit events."""
-        while not self._stop_event.is_set():
-            events_to_process = []
-
-            # Collect events from queue
-            try:
-                while len(events_to_process) < 10:  # Process in batches
-                    event = self._event_queue.get(timeout=1.0)
-                    events_to_process.append(event)
+        """Background thread that group-commits queued events."""
+        stopping = False
+        while not stopping:
+            first = self._event_queue.get()
+            if first is _STOP:
+                self._event_queue.task_done()
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_batch_latency
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        event = self._event_queue.get(timeout=remaining)
+                    else:
+                        event = self._event_queue.get_nowait()
+                except Empty:
+                    break
+                if event is _STOP:
+                    stopping = True
                     self._event_queue.task_done()
-            except asyncio.TimeoutError:
-                pass  # No events available
-
-            # Write events
-            for event in events_to_process:
-                self._write_event_immediate(event)
-
-    def _write_event_immediate(self, event: AuditEvent):
-        """Write a single event immediately."""
-        try:
-            # Write to text log
-            log_line = (
-                f"[{event.timestamp}] {event.severity.value.upper()} "
-                f"{event.event_type.value} user={event.user_id or 'anonymous'} "
-                f"resource={event.resource or 'unknown'} action='{event.action}' "
-                f"result={event.result}"
-            )
+                    break
+                batch.append(event)
 
-            if event.details:
-                log_line += f" details={event.details}"
-
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write(log_line + "\n")
+            self._write_batch(batch)
+            for _ in batch:
+                self._event_queue.task_done()
 
-            # Write to JSON log
-            with open(self.json_file, "a", encoding="utf-8") as f:
-                json.dump(event.to_dict(), f, ensure_ascii=False)
-                f.write("\n")
+    @staticmethod
+    def _format_text_line(event: AuditEvent) -> str:
+        log_line = (
+            f"[{event.timestamp}] {event.severity.value.upper()} "
+            f"{event.event_type.value} user={event.user_id or 'anonymous'} "
+            f"resource={event.resource or 'unknown'} action='{event.action}' "
+            f"result={event.result}"
+        )
+        if event.details:
+            log_line += f" details={event.details}"
+        return log_line + "\n"
+
+    def _write_batch(self, events: List[AuditEvent]) -> None:
+        """Write a batch of events with one write per output file."""
+        start = time.perf_counter()
+        text_lines = []
+        json_lines = []
+        for event in events:
+            try:
+                json_lines.append(json.dumps(event.to_dict(), ensure_ascii=False, default=str) + "\n")
+                text_lines.append(self._format_text_line(event))
+            except Exception as e:
+                logger.error(f"Failed to serialize audit event {event.event_id}: {e}")
 
+        try:
+            with self._write_lock:
+                self._text_writer.write_batch(text_lines)
+                self._json_writer.write_batch(json_lines)
+            written = len(json_lines)
+            errors = len(events) - written
         except Exception as e:
-            logger.error(f"Failed to write audit event {event.event_id}: {e}")
+            logger.error(f"Failed to write {len(events)} audit events: {e}")
+            written = 0
+            errors = len(events)
+
+        with self._metrics_lock:
+            self._written += written
+            self._write_errors += errors
+            self._batches += 1
+            self._commit_seconds += time.perf_counter() - start
+
+    def rotate(self) -> None:
+        """Waits for queued events, then rotates both log files."""
+        self._event_queue.join()
+        with self._write_lock:
+            self._text_writer.rotate()
+            self._json_writer.rotate()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue, backpressure and write statistics."""
+        with self._metrics_lock:
+            return {
+                "queue_depth": self._event_queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "queue_capacity": self.max_queue_size,
+                "dropped": sum(self._dropped.values()),
+                "dropped_by_severity": dict(self._dropped),
+                "written": self._written,
+                "batches": self._batches,
+                "avg_batch_size": self._written / self._batches if self._batches else 0.0,
+                "avg_commit_ms": self._commit_seconds * 1000 / self._batches
+                if self._batches
+                else 0.0,
+                "write_errors": self._write_errors,
+                "rotations": self._text_writer.rotations + self._json_writer.rotations,
+            }
 
     def shutdown(self):
         """Shutdown the audit logger gracefully."""
         logger.info("Shutting down AuditLogger")
 
+        if self._stop_event.is_set():
+            return
         self._stop_event.set()
 
-        # Process remaining events
+        # The writer drains the events queued before the stop marker, then exits
         try:
-            while not self._event_queue.empty():
-                event = self._event_queue.get(timeout=1.0)
-                self._write_event_immediate(event)
-                self._event_queue.task_done()
-        except asyncio.TimeoutError:
+            self._event_queue.put(_STOP, timeout=5.0)
+            self._processing_thread.join(timeout=5.0)
+        except Full:
             pass
-
         if self._processing_thread.is_alive():
-            self._processing_thread.join(timeout=5.0)
+            logger.error("Audit writer did not drain its queue during shutdown")
+            return
+
+        self._text_writer.close()
+        self._json_writer.close()
 
 
 # Global audit logger instance
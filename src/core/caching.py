@@ -10,11 +10,12 @@ import json
 import logging
 import time
 from abc import ABC, abstractmethod
-from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any, Dict, List, Optional, Set
 
+from .sized_cache import EVICTION_LRU, SizeAwareCache, estimate_size
+
 try:
     import redis.asyncio as redis
 
@@ -25,6 +26,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Estimated bytes of a memory cache entry wrapper, excluding the cached value
+_ENTRY_OVERHEAD = estimate_size({"value": None, "expires_at": 0.0, "created_at": 0.0})
+
 
 class CacheBackend(Enum):
     """Supported cache backends"""
@@ -49,6 +53,8 @@ class CacheConfig:
     redis_url: Optional[str] = None
     redis_db: int = 0
     max_memory_items: int = 10000
+    max_memory_bytes: Optional[int] = 256 * 1024 * 1024  # None disables the byte budget
+    eviction_policy: str = EVICTION_LRU  # "lru", "slru" or "w-tinylfu"
     default_ttl: int = 3600  # 1 hour
     enable_monitoring: bool = True
 
@@ -62,6 +68,8 @@ class CacheStats:
     sets: int = 0
     deletes: int = 0
     evictions: int = 0
+    rejections: int = 0
+    resident_bytes: int = 0
 
     @property
     def hit_rate(self) -> float:
@@ -105,67 +113,69 @@ class CacheBackendInterface(ABC):
 
 
 class MemoryCacheBackend(CacheBackendInterface):
-    """In-memory cache backend using LRU strategy"""
+    """In-memory cache backend bounded by entry count and estimated bytes"""
 
     def __init__(self, config: CacheConfig):
         self.config = config
-        self._cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._cache = SizeAwareCache(
+            max_bytes=config.max_memory_bytes,
+            max_entries=config.max_memory_items,
+            policy=config.eviction_policy,
+            size_estimator=self._entry_size,
+            on_evict=self._on_evict,
+        )
         self._stats = CacheStats()
 
+    @staticmethod
+    def _entry_size(entry: Dict[str, Any]) -> int:
+        return estimate_size(entry["value"]) + _ENTRY_OVERHEAD
+
+    def _on_evict(self, key: str, entry: Dict[str, Any]) -> None:
+        self._stats.evictions += 1
+
     async def get(self, key: str) -> Optional[Any]:
         """Get value from memory cache"""
-        if key in self._cache:
-            # Move to end to mark as recently used
-            self._cache.move_to_end(key)
-            entry = self._cache[key]
-            # Check TTL
-            if entry.get("expires_at") and time.time() > entry["expires_at"]:
-                await self.delete(key)
-                self._stats.misses += 1
-                return None
-
-            self._stats.hits += 1
-            return entry["value"]
-        else:
+        entry = self._cache.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return None
+        # Check TTL
+        if entry.get("expires_at") and time.time() > entry["expires_at"]:
+            await self.delete(key)
             self._stats.misses += 1
             return None
 
+        self._stats.hits += 1
+        return entry["value"]
+
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set value in memory cache"""
+        """Set value in memory cache, evicting entries to stay within budget"""
         expires_at = time.time() + ttl if ttl else None
-
-        if key in self._cache:
-            # Move to end if it exists
-            self._cache.move_to_end(key)
-
-        self._cache[key] = {"value": value, "expires_at": expires_at, "created_at": time.time()}
-
-        # Enforce max items limit (LRU eviction)
-        while len(self._cache) > self.config.max_memory_items:
-            self._cache.popitem(last=False)  # Remove first item (LRU)
-            self._stats.evictions += 1
+        entry = {"value": value, "expires_at": expires_at, "created_at": time.time()}
 
         self._stats.sets += 1
+        if not self._cache.put(key, entry):
+            self._stats.rejections += 1
+            return False
         return True
 
     async def delete(self, key: str) -> bool:
         """Delete value from memory cache"""
-        if key in self._cache:
-            del self._cache[key]
+        if self._cache.invalidate(key):
             self._stats.deletes += 1
             return True
         return False
 
     async def exists(self, key: str) -> bool:
         """Check if key exists in memory cache"""
-        if key in self._cache:
-            # Check TTL without modifying access order
-            entry = self._cache[key]
-            if entry.get("expires_at") and time.time() > entry["expires_at"]:
-                await self.delete(key)
-                return False
-            return True
-        return False
+        # Check TTL without modifying access order
+        entry = self._cache.peek(key)
+        if entry is None:
+            return False
+        if entry.get("expires_at") and time.time() > entry["expires_at"]:
+            await self.delete(key)
+            return False
+        return True
 
     async def clear(self) -> bool:
         """Clear all memory cache entries"""
@@ -174,6 +184,7 @@ class MemoryCacheBackend(CacheBackendInterface):
 
     async def get_stats(self) -> CacheStats:
         """Get memory cache statistics"""
+        self._stats.resident_bytes = self._cache.resident_bytes
         return self._stats
 
 
@@ -0,0 +1,290 @@
+"""
+Materialized dashboard aggregates for the DatabaseManager.
+
+The dashboard used to count unread and auto-labeled emails by scanning every
+record and re-read the whole performance log on each request. Instead,
+``EmailAggregates`` keeps the totals, the per-category counts and daily and
+ISO-week ingestion counters up to date on the write path, so the dashboard
+reads them without touching the records. Week-over-week growth compares the
+last seven days of ingestion with the seven days before.
+
+Operation latencies are summarized separately by
+``metric_sink.RollingLatencySummary``. The DatabaseManager saves the summary
+at shutdown, with the position in the performance log it covers, and on
+startup adds only the timings logged after that position.
+
+Both can be repaired from the raw data with::
+
+    python -m src.core.dashboard_aggregates --data-dir data
+
+which recounts the emails and rebuilds the latency summary from the whole
+performance log. Run it while the application is stopped, as the application
+saves its own summary at shutdown.
+"""
+
+import argparse
+import heapq
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .data_export import DataPaths
+from .metric_sink import RollingLatencySummary
+from .storage_engine import STORAGE_ENGINE_JSON, create_storage_engine
+
+logger = logging.getLogger(__name__)
+
+GRANULARITY_DAY = "day"
+GRANULARITY_WEEK = "week"
+DEFAULT_METRICS_LOG = "performance_metrics_log.jsonl"
+LATENCY_SUMMARY_FILENAME = "latency_summary.json"
+
+# What one email adds to the aggregates: (category, unread, ingestion date)
+Contribution = Tuple[Hashable, bool, Optional[date]]
+
+
+def ingestion_date(value: Any) -> Optional[date]:
+    """Returns the UTC date of an ISO 8601, RFC 2822 or epoch timestamp, or None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value, timezone.utc).date()
+        except (OverflowError, OSError, ValueError):
+            return None
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.date()
+
+
+def _bump(counts: Dict[Any, int], key: Any, delta: int) -> None:
+    value = counts.get(key, 0) + delta
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+class EmailAggregates:
+    """
+    Counts over all emails, updated per write in O(1).
+
+    The contribution of each email is remembered by ID, so ``add`` also handles
+    updates (the previous contribution is subtracted first) and ``remove`` only
+    needs the ID.
+
+    Emails are bucketed by when they were ingested: ``time_field``, falling
+    back to ``fallback_field`` when it is missing or unparseable.
+    """
+
+    def __init__(
+        self,
+        time_field: str = "created_at",
+        fallback_field: str = "time",
+        id_field: str = "id",
+        category_field: str = "category_id",
+        unread_field: str = "is_unread",
+    ):
+        self.time_field = time_field
+        self.fallback_field = fallback_field
+        self.id_field = id_field
+        self.category_field = category_field
+        self.unread_field = unread_field
+        self.clear()
+
+    def clear(self) -> None:
+        self._contributions: Dict[Hashable, Contribution] = {}
+        self.unread = 0
+        self.auto_labeled = 0
+        self.category_counts: Dict[Hashable, int] = {}
+        self.daily: Dict[date, int] = {}
+        self.weekly: Dict[Tuple[int, int], int] = {}
+
+    @property
+    def total(self) -> int:
+        return len(self._contributions)
+
+    def _contribution(self, email: Dict[str, Any]) -> Contribution:
+        day = ingestion_date(email.get(self.time_field))
+        if day is None:
+            day = ingestion_date(email.get(self.fallback_field))
+        return email.get(self.category_field), bool(email.get(self.unread_field)), day
+
+    def _apply(self, contribution: Contribution, delta: int) -> None:
+        category, unread, day = contribution
+        if unread:
+            self.unread += delta
+        if category is not None:
+            self.auto_labeled += delta
+            _bump(self.category_counts, category, delta)
+        if day is not None:
+            _bump(self.daily, day, delta)
+            _bump(self.weekly, day.isocalendar()[:2], delta)
+
+    def add(self, email: Dict[str, Any]) -> None:
+        """Counts a new email, or recounts an email that was updated."""
+        email_id = email.get(self.id_field)
+        if email_id is None:
+            return
+        contribution = self._contribution(email)
+        previous = self._contributions.get(email_id)
+        if previous == contribution:
+            return
+        if previous is not None:
+            self._apply(previous, -1)
+        self._contributions[email_id] = contribution
+        self._apply(contribution, 1)
+
+    def remove(self, email_id: Hashable) -> bool:
+        """Uncounts a deleted email. Returns False if it was not counted."""
+        contribution = self._contributions.pop(email_id, None)
+        if contribution is None:
+            return False
+        self._apply(contribution, -1)
+        return True
+
+    def rebuild(self, emails: Iterable[Dict[str, Any]]) -> None:
+        """Recounts every email from scratch."""
+        self.clear()
+        for email in emails:
+            self.add(email)
+
+    def top_categories(self, limit: int = 10) -> List[Tuple[Hashable, int]]:
+        """Returns up to limit (category, count) pairs, largest count first."""
+        return heapq.nlargest(limit, self.category_counts.items(), key=lambda item: item[1])
+
+    def weekly_growth(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Emails ingested in the last 7 days and the change from the 7 days before, in percent."""
+        today = today or datetime.now(timezone.utc).date()
+        this_week = sum(self.daily.get(today - timedelta(days=i), 0) for i in range(7))
+        last_week = sum(self.daily.get(today - timedelta(days=i), 0) for i in range(7, 14))
+        percentage = (this_week - last_week) / last_week * 100.0 if last_week else 0.0
+        return {"emails": this_week, "percentage": round(percentage, 2)}
+
+    def ingestion_counts(
+        self, granularity: str = GRANULARITY_DAY, periods: int = 7, today: Optional[date] = None
+    ) -> List[Tuple[str, int]]:
+        """Returns (period, count) for the last periods days or ISO weeks, oldest first."""
+        today = today or datetime.now(timezone.utc).date()
+        if granularity == GRANULARITY_DAY:
+            days = [today - timedelta(days=i) for i in reversed(range(periods))]
+            return [(day.isoformat(), self.daily.get(day, 0)) for day in days]
+        if granularity == GRANULARITY_WEEK:
+            weeks = [
+                (today - timedelta(weeks=i)).isocalendar()[:2] for i in reversed(range(periods))
+            ]
+            return [
+                (f"{year}-W{week:02d}", self.weekly.get((year, week), 0)) for year, week in weeks
+            ]
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    def get_stats(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Get the aggregate counts."""
+        return {
+            "total_emails": self.total,
+            "unread_count": self.unread,
+            "auto_labeled": self.auto_labeled,
+            "category_counts": dict(self.category_counts),
+            "weekly_growth": self.weekly_growth(today),
+        }
+
+
+def load_latency_summary_file(path: str) -> Optional[Dict[str, Any]]:
+    """Returns a summary saved by save_latency_summary_file, or None if missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (IOError, ValueError) as e:
+        logger.warning(f"Discarding unreadable latency summary {path}: {e}")
+        return None
+
+
+def save_latency_summary_file(path: str, summary: Dict[str, Any]) -> None:
+    """Atomically writes a latency summary."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def rebuild_aggregates(
+    paths: DataPaths,
+    storage_engine: Any,
+    latency_summary_file: str,
+    metrics_log: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Recounts the email aggregates and rebuilds the saved latency summary.
+
+    The email aggregates are recounted from the persisted records, one at a
+    time; the DatabaseManager does the same at every startup, so they are only
+    reported. The latency summary is rebuilt from the whole metrics log.
+    """
+    aggregates = EmailAggregates()
+    for email in storage_engine.iter_records("emails", paths.emails_file):
+        aggregates.add(email)
+
+    result = aggregates.get_stats()
+    if metrics_log is not None:
+        summary = RollingLatencySummary()
+        log_position = os.path.getsize(metrics_log) if os.path.exists(metrics_log) else 0
+        result["timings_replayed"] = summary.replay_log(metrics_log, 0, log_position)
+        save_latency_summary_file(
+            latency_summary_file,
+            {"operations": summary.to_dict(), "log_position": log_position},
+        )
+        result["operations"] = summary.averages()
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point that repairs the dashboard aggregates of a data directory."""
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard aggregates from raw data")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "data"))
+    parser.add_argument(
+        "--storage-engine",
+        default=os.getenv("DATABASE_STORAGE_ENGINE", STORAGE_ENGINE_JSON),
+        help="Storage engine the data directory was written with",
+    )
+    parser.add_argument(
+        "--metrics-log",
+        default=DEFAULT_METRICS_LOG,
+        help="Performance log to rebuild the latency summary from",
+    )
+    parser.add_argument(
+        "--skip-latency", action="store_true", help="Leave the saved latency summary unchanged"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        result = rebuild_aggregates(
+            DataPaths.from_data_dir(args.data_dir),
+            create_storage_engine(args.storage_engine, args.data_dir),
+            os.path.join(args.data_dir, LATENCY_SUMMARY_FILENAME),
+            None if args.skip_latency else args.metrics_log,
+        )
+    except (IOError, ValueError) as e:
+        print(f"rebuild failed: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,740 @@
+"""
+SQLite-backed data source for the Email Intelligence Platform.
+
+Stores emails, categories and users in a single SQLite database running in WAL
+mode, with real indexes on message_id, category_id, is_unread and time. List
+endpoints support both offset pagination (for compatibility with the
+DatabaseManager API) and keyset pagination via opaque cursors, so a page costs
+an index range scan instead of a walk over the whole corpus.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..constants import DEFAULT_CATEGORY_COLOR
+from ..data_export import DataPaths, iter_stored_emails
+from ..database import (
+    FIELD_CATEGORY_COLOR,
+    FIELD_CATEGORY_ID,
+    FIELD_CATEGORY_NAME,
+    FIELD_COLOR,
+    FIELD_CONTENT,
+    FIELD_COUNT,
+    FIELD_CREATED_AT,
+    FIELD_ID,
+    FIELD_IS_UNREAD,
+    FIELD_MESSAGE_ID,
+    FIELD_NAME,
+    FIELD_SENDER,
+    FIELD_SENDER_EMAIL,
+    FIELD_SUBJECT,
+    FIELD_TIME,
+    FIELD_UPDATED_AT,
+    FIELD_ANALYSIS_METADATA,
+    HEAVY_EMAIL_FIELDS,
+    DatabaseConfig,
+)
+from ..enhanced_error_reporting import (
+    log_error,
+    ErrorSeverity,
+    ErrorCategory,
+    create_error_context
+)
+from ..storage_engine import create_storage_engine
+from .data_source import DataSource
+
+logger = logging.getLogger(__name__)
+
+SQLITE_DB_FILENAME = "emails.sqlite3"
+MIGRATION_MARKER_KEY = "json_migration_completed_at"
+MIGRATION_BATCH_SIZE = 500
+
+# Columns duplicated out of the JSON record so they can be indexed and filtered.
+_EMAIL_COLUMNS = (
+    FIELD_MESSAGE_ID,
+    FIELD_CATEGORY_ID,
+    FIELD_IS_UNREAD,
+    FIELD_TIME,
+    FIELD_SUBJECT,
+    FIELD_SENDER,
+    FIELD_SENDER_EMAIL,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    description TEXT,
+    color TEXT,
+    count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS emails (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT UNIQUE,
+    category_id INTEGER,
+    is_unread INTEGER,
+    time TEXT NOT NULL DEFAULT '',
+    subject TEXT,
+    sender TEXT,
+    sender_email TEXT,
+    record TEXT NOT NULL,
+    content TEXT,
+    search_text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_emails_time ON emails (time DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_emails_category_time ON emails (category_id, time DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_emails_unread_time ON emails (is_unread, time DESC, id DESC);
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def encode_cursor(sort_time: str, email_id: int) -> str:
+    """Encodes a keyset position as an opaque, URL-safe cursor."""
+    raw = json.dumps([sort_time, email_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decodes a cursor produced by encode_cursor."""
+    try:
+        sort_time, email_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(sort_time), int(email_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor}") from e
+
+
+def _sort_time(email: Dict[str, Any]) -> str:
+    """Mirrors DatabaseManager's sort key: time, falling back to created_at."""
+    value = email.get(FIELD_TIME, email.get(FIELD_CREATED_AT, ""))
+    return "" if value is None else str(value)
+
+
+def _search_text(light: Dict[str, Any], heavy: Dict[str, Any]) -> str:
+    """Casefolded subject, sender and body text, as matched by search."""
+    body = heavy.get(FIELD_CONTENT) or heavy.get("content_html")
+    parts = (light.get(FIELD_SUBJECT), light.get(FIELD_SENDER), light.get(FIELD_SENDER_EMAIL), body)
+    return "\n".join(str(part) for part in parts if part).casefold()
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SQLiteDataSource(DataSource):
+    """
+    DataSource implementation backed by SQLite in WAL mode.
+
+    All SQL runs on a single connection guarded by a lock and is offloaded
+    to a worker thread so the event loop never blocks on disk I/O.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._initialized = False
+
+    @classmethod
+    async def create(
+        cls, config: Optional[DatabaseConfig] = None, db_path: Optional[str] = None
+    ) -> "SQLiteDataSource":
+        """Creates, initializes and (once) migrates a data source for the given config."""
+        config = config or DatabaseConfig()
+        data_source = cls(db_path or os.path.join(config.data_dir, SQLITE_DB_FILENAME))
+        await data_source.initialize()
+        await data_source.migrate_from_json(config)
+        return data_source
+
+    # --- Connection management ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.executescript(_SCHEMA)
+        self._add_search_text(conn)
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def _add_search_text(conn: sqlite3.Connection) -> None:
+        """Adds and fills the search_text column in databases created before it existed."""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(emails)")}
+        if "search_text" in columns:
+            return
+        conn.execute("ALTER TABLE emails ADD COLUMN search_text TEXT")
+        last_id = None
+        while True:
+            rows = conn.execute(
+                "SELECT id, record, content FROM emails WHERE ? IS NULL OR id > ? ORDER BY id LIMIT ?",
+                (last_id, last_id, MIGRATION_BATCH_SIZE),
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany(
+                "UPDATE emails SET search_text = ? WHERE id = ?",
+                [
+                    (
+                        _search_text(json.loads(row["record"]), json.loads(row["content"]) if row["content"] else {}),
+                        row["id"],
+                    )
+                    for row in rows
+                ],
+            )
+            last_id = rows[-1]["id"]
+
+    async def initialize(self) -> None:
+        """Opens the connection and creates the schema if needed."""
+        if self._initialized:
+            return
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = await asyncio.to_thread(self._connect)
+        self._initialized = True
+
+    async def _run(self, func, *args):
+        """Runs func(conn, *args) in a worker thread under the connection lock."""
+        await self.initialize()
+
+        def call():
+            with self._lock:
+                try:
+                    return func(self._conn, *args)
+                except sqlite3.Error:
+                    self._conn.rollback()
+                    raise
+
+        try:
+            return await asyncio.to_thread(call)
+        except sqlite3.Error as e:
+            error_context = create_error_context(
+                component="SQLiteDataSource",
+                operation=getattr(func, "__name__", "query"),
+                additional_context={"db_path": self.db_path}
+            )
+            error_id = log_error(
+                e,
+                severity=ErrorSeverity.ERROR,
+                category=ErrorCategory.DATA,
+                context=error_context
+            )
+            logger.error(f"SQLite error: {e}. Error ID: {error_id}")
+            raise
+
+    async def shutdown(self) -> None:
+        """Checkpoints the WAL and closes the connection."""
+        if self._conn is None:
+            return
+
+        def close():
+            with self._lock:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.close()
+
+        await asyncio.to_thread(close)
+        self._conn = None
+        self._initialized = False
+
+    # --- Row mapping ---
+
+    @staticmethod
+    def _split_record(email: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        light = {k: v for k, v in email.items() if k not in HEAVY_EMAIL_FIELDS}
+        heavy = {k: email[k] for k in HEAVY_EMAIL_FIELDS if k in email}
+        for key in (FIELD_CATEGORY_NAME, FIELD_CATEGORY_COLOR):
+            light.pop(key, None)
+        return light, heavy
+
+    @staticmethod
+    def _row_to_email(row: sqlite3.Row, include_content: bool) -> Dict[str, Any]:
+        email = json.loads(row["record"])
+        email[FIELD_ID] = row["id"]
+        if include_content and row["content"]:
+            email.update(json.loads(row["content"]))
+        if row["category_name"] is not None:
+            email[FIELD_CATEGORY_NAME] = row["category_name"]
+            email[FIELD_CATEGORY_COLOR] = row["category_color"]
+        return email
+
+    @staticmethod
+    def _stored_values(light: Dict[str, Any], heavy: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Values of the record, content and search_text columns."""
+        return (
+            json.dumps(light),
+            json.dumps(heavy, ensure_ascii=False) if heavy else None,
+            _search_text(light, heavy),
+        )
+
+    @staticmethod
+    def _column_values(light: Dict[str, Any]) -> Tuple[Any, ...]:
+        is_unread = light.get(FIELD_IS_UNREAD)
+        return (
+            light.get(FIELD_MESSAGE_ID),
+            light.get(FIELD_CATEGORY_ID),
+            None if is_unread is None else int(bool(is_unread)),
+            _sort_time(light),
+            light.get(FIELD_SUBJECT),
+            light.get(FIELD_SENDER),
+            light.get(FIELD_SENDER_EMAIL),
+        )
+
+    _SELECT_EMAIL = (
+        "SELECT e.id, e.time, e.record, {content} AS content, "
+        "c.name AS category_name, c.color AS category_color "
+        "FROM emails e LEFT JOIN categories c ON c.id = e.category_id"
+    )
+
+    def _select(self, include_content: bool) -> str:
+        return self._SELECT_EMAIL.format(content="e.content" if include_content else "NULL")
+
+    @staticmethod
+    def _adjust_category_count(conn: sqlite3.Connection, category_id: Any, delta: int) -> None:
+        if category_id is not None:
+            conn.execute(
+                "UPDATE categories SET count = count + ? WHERE id = ?", (delta, category_id)
+            )
+
+    # --- Emails ---
+
+    def _insert_email(self, conn: sqlite3.Connection, email: Dict[str, Any]) -> int:
+        light, heavy = self._split_record(email)
+        columns = ["record", "content", "search_text", *_EMAIL_COLUMNS]
+        values = [*self._stored_values(light, heavy), *self._column_values(light)]
+        if light.get(FIELD_ID) is not None:
+            columns.insert(0, FIELD_ID)
+            values.insert(0, light[FIELD_ID])
+        cursor = conn.execute(
+            f"INSERT INTO emails ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            values,
+        )
+        email_id = cursor.lastrowid if light.get(FIELD_ID) is None else light[FIELD_ID]
+        self._adjust_category_count(conn, light.get(FIELD_CATEGORY_ID), 1)
+        return email_id
+
+    async def create_email(self, email_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Creates a new email, or updates the existing one with the same message ID."""
+        message_id = email_data.get(FIELD_MESSAGE_ID, email_data.get("messageId"))
+        if message_id and await self.get_email_by_message_id(message_id, include_content=False):
+            logger.warning(f"Email with messageId {message_id} already exists. Updating.")
+            return await self.update_email_by_message_id(message_id, email_data)
+
+        now = datetime.now(timezone.utc).isoformat()
+        analysis_metadata = email_data.get(
+            FIELD_ANALYSIS_METADATA, email_data.get("analysisMetadata", {})
+        )
+        if isinstance(analysis_metadata, str):
+            try:
+                analysis_metadata = json.loads(analysis_metadata)
+            except json.JSONDecodeError:
+                analysis_metadata = {}
+        record = email_data.copy()
+        record.pop(FIELD_ID, None)
+        record.update(
+            {
+                FIELD_MESSAGE_ID: message_id,
+                FIELD_CREATED_AT: now,
+                FIELD_UPDATED_AT: now,
+                FIELD_ANALYSIS_METADATA: analysis_metadata,
+            }
+        )
+
+        def insert(conn):
+            email_id = self._insert_email(conn, record)
+            conn.commit()
+            return email_id
+
+        email_id = await self._run(insert)
+        return await self.get_email_by_id(email_id)
+
+    async def get_email_by_id(
+        self, email_id: Any, include_content: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Fetches a single email by its internal ID."""
+        query = f"{self._select(include_content)} WHERE e.id = ?"
+        row = await self._run(lambda conn: conn.execute(query, (email_id,)).fetchone())
+        return self._row_to_email(row, include_content) if row else None
+
+    async def get_email_by_message_id(
+        self, message_id: str, include_content: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Fetches a single email by its message ID."""
+        if not message_id:
+            return None
+        query = f"{self._select(include_content)} WHERE e.message_id = ?"
+        row = await self._run(lambda conn: conn.execute(query, (message_id,)).fetchone())
+        return self._row_to_email(row, include_content) if row else None
+
+    @staticmethod
+    def _filters(
+        category_id: Optional[int], is_unread: Optional[bool]
+    ) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        if category_id is not None:
+            clauses.append("e.category_id = ?")
+            params.append(category_id)
+        if is_unread is not None:
+            clauses.append("e.is_unread = ?")
+            params.append(int(bool(is_unread)))
+        return clauses, params
+
+    async def get_emails(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        category_id: Optional[int] = None,
+        is_unread: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """Fetches emails newest first with offset pagination."""
+        clauses, params = self._filters(category_id, is_unread)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = (
+            f"{self._select(False)}{where} ORDER BY e.time DESC, e.id DESC LIMIT ? OFFSET ?"
+        )
+        rows = await self._run(
+            lambda conn: conn.execute(query, (*params, limit, offset)).fetchall()
+        )
+        return [self._row_to_email(row, False) for row in rows]
+
+    async def get_emails_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        category_id: Optional[int] = None,
+        is_unread: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        Fetches one page of emails newest first using keyset pagination.
+
+        Args:
+            limit: Maximum number of emails in the page.
+            cursor: The next_cursor returned with the previous page, or None.
+            category_id: Optional category ID to filter emails.
+            is_unread: Optional flag to filter unread emails.
+
+        Returns:
+            Dict with "emails" and "next_cursor" (None on the last page).
+        """
+        clauses, params = self._filters(category_id, is_unread)
+        if cursor:
+            sort_time, last_id = decode_cursor(cursor)
+            clauses.append("(e.time, e.id) < (?, ?)")
+            params.extend([sort_time, last_id])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"{self._select(False)}{where} ORDER BY e.time DESC, e.id DESC LIMIT ?"
+        rows = await self._run(lambda conn: conn.execute(query, (*params, limit + 1)).fetchall())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["time"], rows[-1]["id"])
+        return {
+            "emails": [self._row_to_email(row, False) for row in rows],
+            "next_cursor": next_cursor,
+        }
+
+    async def get_all_emails(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Retrieves all emails with pagination."""
+        return await self.get_emails(limit=limit, offset=offset)
+
+    async def get_emails_by_category(
+        self, category_id: int, limit: int = 50, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Retrieves emails by category."""
+        return await self.get_emails(limit=limit, offset=offset, category_id=category_id)
+
+    def _update_row(
+        self, conn: sqlite3.Connection, where: str, key: Any, update_data: Dict[str, Any]
+    ) -> Optional[int]:
+        row = conn.execute(
+            f"SELECT id, category_id, record, content FROM emails WHERE {where} = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        email = json.loads(row["record"])
+        if row["content"]:
+            email.update(json.loads(row["content"]))
+
+        changed = False
+        for field, value in update_data.items():
+            if field == FIELD_ID:
+                continue
+            if field not in email or email[field] != value:
+                email[field] = value
+                changed = True
+        if not changed:
+            return row["id"]
+
+        email[FIELD_UPDATED_AT] = datetime.now(timezone.utc).isoformat()
+        light, heavy = self._split_record(email)
+        conn.execute(
+            f"UPDATE emails SET record = ?, content = ?, search_text = ?, "
+            f"{', '.join(f'{c} = ?' for c in _EMAIL_COLUMNS)} WHERE id = ?",
+            (*self._stored_values(light, heavy), *self._column_values(light), row["id"]),
+        )
+        new_category_id = light.get(FIELD_CATEGORY_ID)
+        if new_category_id != row["category_id"]:
+            self._adjust_category_count(conn, row["category_id"], -1)
+            self._adjust_category_count(conn, new_category_id, 1)
+        conn.commit()
+        return row["id"]
+
+    async def update_email(self, email_id: Any, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Updates an email by its internal ID."""
+        updated_id = await self._run(self._update_row, "id", email_id, update_data)
+        if updated_id is None:
+            logger.warning(f"Email with {FIELD_ID} {email_id} not found for update.")
+            return {}
+        return await self.get_email_by_id(updated_id)
+
+    async def update_email_by_message_id(
+        self, message_id: str, update_data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Updates an email by its message ID."""
+        updated_id = await self._run(self._update_row, "message_id", message_id, update_data)
+        if updated_id is None:
+            logger.warning(f"Email with {FIELD_MESSAGE_ID} {message_id} not found for update.")
+            return None
+        return await self.get_email_by_id(updated_id)
+
+    async def delete_email(self, email_id: int) -> bool:
+        """Deletes an email by its internal ID."""
+
+        def delete(conn):
+            row = conn.execute(
+                "SELECT category_id FROM emails WHERE id = ?", (email_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM emails WHERE id = ?", (email_id,))
+            self._adjust_category_count(conn, row["category_id"], -1)
+            conn.commit()
+            return True
+
+        return await self._run(delete)
+
+    async def search_emails(self, query: str) -> List[Dict[str, Any]]:
+        """Searches for emails matching a query."""
+        return await self.search_emails_with_limit(query, limit=50)
+
+    async def search_emails_with_limit(
+        self, search_term: str, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Case-insensitive substring search over subject, sender and body text, newest first.
+
+        Matches the casefolded search_text column rather than the serialized
+        content, so JSON keys and escapes never match and non-ASCII text does.
+        """
+        if not search_term:
+            return await self.get_emails(limit=limit, offset=0)
+        pattern = f"%{_escape_like(search_term.casefold())}%"
+        query = (
+            f"{self._select(False)} WHERE e.search_text LIKE ? ESCAPE '\\' "
+            "ORDER BY e.time DESC, e.id DESC LIMIT ?"
+        )
+        rows = await self._run(lambda conn: conn.execute(query, (pattern, limit)).fetchall())
+        return [self._row_to_email(row, False) for row in rows]
+
+    async def add_tags(self, email_id: Any, tags: List[str]) -> bool:
+        """Adds tags to an email."""
+        email = await self.get_email_by_id(email_id, include_content=False)
+        if not email:
+            return False
+        new_tags = list(set(email.get("tags", []) + tags))
+        return bool(await self.update_email(email_id, {"tags": new_tags}))
+
+    async def remove_tags(self, email_id: Any, tags: List[str]) -> bool:
+        """Removes tags from an email."""
+        email = await self.get_email_by_id(email_id, include_content=False)
+        if not email:
+            return False
+        updated_tags = [tag for tag in email.get("tags", []) if tag not in tags]
+        return bool(await self.update_email(email_id, {"tags": updated_tags}))
+
+    # --- Categories ---
+
+    async def get_all_categories(self) -> List[Dict[str, Any]]:
+        """Fetches all categories with their email counts, ordered by name."""
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "SELECT id, name, description, color, count FROM categories ORDER BY name"
+            ).fetchall()
+        )
+        return [dict(row) for row in rows]
+
+    async def create_category(self, category_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Creates a new category, returning the existing one if the name is taken."""
+
+        def create(conn):
+            existing = conn.execute(
+                "SELECT id, name, description, color, count FROM categories WHERE name = ?",
+                (category_data.get(FIELD_NAME, ""),),
+            ).fetchone()
+            if existing:
+                logger.warning(
+                    f"Category with name '{category_data.get(FIELD_NAME)}' already exists. Returning existing."
+                )
+                return dict(existing)
+            cursor = conn.execute(
+                "INSERT INTO categories (name, description, color, count) VALUES (?, ?, ?, 0)",
+                (
+                    category_data[FIELD_NAME],
+                    category_data.get("description"),
+                    category_data.get(FIELD_COLOR, DEFAULT_CATEGORY_COLOR),
+                ),
+            )
+            conn.commit()
+            return {
+                FIELD_ID: cursor.lastrowid,
+                FIELD_NAME: category_data[FIELD_NAME],
+                "description": category_data.get("description"),
+                FIELD_COLOR: category_data.get(FIELD_COLOR, DEFAULT_CATEGORY_COLOR),
+                FIELD_COUNT: 0,
+            }
+
+        return await self._run(create)
+
+    # --- Dashboard ---
+
+    async def get_dashboard_aggregates(self) -> Dict[str, Any]:
+        """Retrieves aggregated dashboard statistics using indexed SQL aggregates."""
+        week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
+        two_weeks_ago = (datetime.now(timezone.utc) - timedelta(days=14)).isoformat()
+
+        def aggregate(conn):
+            total, unread, this_week, last_week = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(is_unread = 1), 0), "
+                "COALESCE(SUM(time >= ?), 0), COALESCE(SUM(time >= ? AND time < ?), 0) "
+                "FROM emails",
+                (week_ago, two_weeks_ago, week_ago),
+            ).fetchone()
+            auto_labeled = conn.execute(
+                "SELECT COUNT(*) FROM emails WHERE category_id IS NOT NULL"
+            ).fetchone()[0]
+            categories_count = conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0]
+            return total, unread, this_week, last_week, auto_labeled, categories_count
+
+        total, unread, this_week, last_week, auto_labeled, categories_count = await self._run(
+            aggregate
+        )
+        percentage = ((this_week - last_week) / last_week * 100.0) if last_week else 0.0
+        return {
+            "total_emails": total,
+            "auto_labeled": auto_labeled,
+            "categories_count": categories_count,
+            "unread_count": unread,
+            "weekly_growth": {"emails": this_week, "percentage": round(percentage, 2)},
+        }
+
+    async def get_category_breakdown(self, limit: int = 10) -> Dict[str, int]:
+        """Retrieves the top categories by email count."""
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "SELECT name, count FROM categories ORDER BY count DESC, name LIMIT ?", (limit,)
+            ).fetchall()
+        )
+        return {row["name"]: row["count"] for row in rows}
+
+    # --- Migration ---
+
+    def _batched(self, items: Iterable[Any]) -> Iterable[List[Any]]:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= MIGRATION_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _migrate_sync(self, conn: sqlite3.Connection, config: DatabaseConfig) -> Dict[str, int]:
+        if conn.execute("SELECT 1 FROM meta WHERE key = ?", (MIGRATION_MARKER_KEY,)).fetchone():
+            return {}
+
+        # Read through the storage engine so a WAL tail newer than the snapshot is included
+        engine = create_storage_engine(config.storage_engine, config.data_dir)
+        paths = DataPaths(
+            emails_file=config.emails_file,
+            categories_file=config.categories_file,
+            users_file=config.users_file,
+            email_content_dir=config.email_content_dir,
+        )
+        categories = list(engine.iter_records("categories", paths.categories_file))
+        users = list(engine.iter_records("users", paths.users_file))
+        emails = iter_stored_emails(paths, engine, include_content=True)
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO categories (id, name, description, color, count) "
+            "VALUES (?, ?, ?, ?, 0)",
+            [
+                (
+                    cat.get(FIELD_ID),
+                    cat.get(FIELD_NAME),
+                    cat.get("description"),
+                    cat.get(FIELD_COLOR, DEFAULT_CATEGORY_COLOR),
+                )
+                for cat in categories
+                if cat.get(FIELD_NAME)
+            ],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (id, record) VALUES (?, ?)",
+            [(user.get(FIELD_ID), json.dumps(user)) for user in users],
+        )
+
+        migrated = 0
+        for batch in self._batched(emails):
+            for email in batch:
+                if email.get(FIELD_ID) is None:
+                    continue
+                light, heavy = self._split_record(email)
+                conn.execute(
+                    f"INSERT OR IGNORE INTO emails (id, record, content, search_text, {', '.join(_EMAIL_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * (4 + len(_EMAIL_COLUMNS)))})",
+                    (light[FIELD_ID], *self._stored_values(light, heavy), *self._column_values(light)),
+                )
+                migrated += 1
+            conn.commit()
+
+        # Recompute category counts from the migrated emails rather than trusting the JSON.
+        conn.execute(
+            "UPDATE categories SET count = "
+            "(SELECT COUNT(*) FROM emails WHERE emails.category_id = categories.id)"
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (MIGRATION_MARKER_KEY, datetime.now(timezone.utc).isoformat()),
+        )
+        conn.commit()
+        return {"emails": migrated, "categories": len(categories), "users": len(users)}
+
+    async def migrate_from_json(self, config: DatabaseConfig) -> Dict[str, int]:
+        """
+        One-shot migration from the emails.json.gz + email_content/ layout.
+
+        The legacy files are left untouched. Subsequent calls are no-ops.
+
+        Returns:
+            Counts of migrated records per data type (empty if already migrated).
+        """
+        counts = await self._run(self._migrate_sync, config)
+        if counts:
+            logger.info(f"Migrated JSON data store into {self.db_path}: {counts}")
+        return counts
@@ -0,0 +1,543 @@
+"""
+Streaming NDJSON export and import of the email store.
+
+An export is one JSON object per line:
+
+- a header naming the format and version,
+- one line per category, user and email; email lines carry the light record
+  and the heavy fields of the email's content file,
+- an end line with the record counts, so a truncated file is detected.
+
+Records are streamed from the storage engine and content files one at a time,
+so memory use does not grow with the size of the store. The output can be
+gzip or zstd compressed (zstd needs the optional ``zstandard`` package).
+
+Both directions write a checkpoint every ``checkpoint_interval`` records. An
+interrupted run started again with ``resume=True`` truncates its output to
+the last checkpoint and continues from there, provided its source did not
+change in between (see ``StorageEngine.fingerprint``); otherwise it restarts. Compressed output is written as
+one compressed member (gzip) or frame (zstd) per checkpoint, which standard
+decompressors read as a single stream.
+
+An import replaces the data: it writes new snapshot files and content files
+next to the existing ones and swaps them in only after the whole input was
+read and verified.
+
+Command line usage::
+
+    python -m src.core.data_export export backup.ndjson.zst --data-dir data
+    python -m src.core.data_export import backup.ndjson.zst --data-dir data
+"""
+
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional
+
+from .storage_engine import STORAGE_ENGINE_JSON, StorageEngine, create_storage_engine
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = "emailintelligence-ndjson"
+EXPORT_VERSION = 1
+
+COMPRESSION_NONE = "none"
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+
+DEFAULT_CHECKPOINT_INTERVAL = 1000
+
+# Data types in export order, with the record type used on their lines
+SECTIONS = (("categories", "category"), ("users", "user"), ("emails", "email"))
+RECORD_TYPE_HEADER = "header"
+RECORD_TYPE_END = "end"
+
+CONTENT_FILE_SUFFIX = ".json.gz"
+IMPORT_SUFFIX = ".import"
+IMPORT_CHECKPOINT_FILE = ".ndjson-import.checkpoint.json"
+
+
+class DataPaths(NamedTuple):
+    """Locations of the files that make up an email store."""
+
+    emails_file: str
+    categories_file: str
+    users_file: str
+    email_content_dir: str
+
+    @classmethod
+    def from_data_dir(cls, data_dir: str) -> "DataPaths":
+        """Returns the default layout used by ``DatabaseConfig``."""
+        return cls(
+            emails_file=os.path.join(data_dir, "emails.json.gz"),
+            categories_file=os.path.join(data_dir, "categories.json.gz"),
+            users_file=os.path.join(data_dir, "users.json.gz"),
+            email_content_dir=os.path.join(data_dir, "email_content"),
+        )
+
+    def snapshot_file(self, data_type: str) -> str:
+        return getattr(self, f"{data_type}_file")
+
+
+def detect_compression(path: str, compression: Optional[str] = None) -> str:
+    """Returns the compression to use for path: explicit, or from its suffix."""
+    if compression is None:
+        if path.endswith(".gz"):
+            compression = COMPRESSION_GZIP
+        elif path.endswith((".zst", ".zstd")):
+            compression = COMPRESSION_ZSTD
+        else:
+            compression = COMPRESSION_NONE
+    if compression not in (COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_ZSTD):
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == COMPRESSION_ZSTD and not ZSTD_AVAILABLE:
+        raise ValueError("zstd compression requires the 'zstandard' package")
+    return compression
+
+
+class CheckpointedWriter:
+    """
+    Appends text to a possibly compressed file in resumable steps.
+
+    checkpoint() ends the current compressed member, makes the file durable
+    and returns its size. Reopening with that offset discards anything written
+    after the checkpoint and continues with a new member.
+    """
+
+    def __init__(self, path: str, compression: str, offset: Optional[int] = None):
+        self.path = path
+        self.compression = compression
+        if offset is None:
+            self._raw = open(path, "wb")
+        else:
+            self._raw = open(path, "r+b")
+            self._raw.truncate(offset)
+            self._raw.seek(offset)
+        self._stream: Optional[IO[bytes]] = None
+
+    def write(self, text: str) -> None:
+        if self._stream is None:
+            if self.compression == COMPRESSION_GZIP:
+                self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+            elif self.compression == COMPRESSION_ZSTD:
+                self._stream = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+            else:
+                self._stream = self._raw
+        self._stream.write(text.encode("utf-8"))
+
+    def _end_member(self) -> None:
+        if self._stream is not None and self._stream is not self._raw:
+            self._stream.close()
+        self._stream = None
+
+    def checkpoint(self) -> int:
+        self._end_member()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        return self._raw.tell()
+
+    def close(self) -> int:
+        offset = self.checkpoint()
+        self._raw.close()
+        return offset
+
+
+def open_text_reader(path: str, compression: Optional[str] = None) -> IO[str]:
+    """Opens a possibly compressed text file for reading."""
+    compression = detect_compression(path, compression)
+    if compression == COMPRESSION_GZIP:
+        return gzip.open(path, "rt", encoding="utf-8")
+    if compression == COMPRESSION_ZSTD:
+        raw = zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), read_across_frames=True, closefd=True
+        )
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _read_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (IOError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+
+def _write_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _content_path(content_dir: str, email_id: Any) -> str:
+    return os.path.join(content_dir, f"{email_id}{CONTENT_FILE_SUFFIX}")
+
+
+def _read_content(content_dir: str, email_id: Any) -> Optional[Dict[str, Any]]:
+    try:
+        with gzip.open(_content_path(content_dir, email_id), "rt", encoding="utf-8") as f:
+            content = json.load(f)
+    except FileNotFoundError:
+        return None
+    return content if isinstance(content, dict) else None
+
+
+def iter_stored_emails(
+    paths: DataPaths, storage_engine: StorageEngine, include_content: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """Streams the stored emails one at a time, optionally merged with their content files."""
+    for record in storage_engine.iter_records("emails", paths.emails_file):
+        if include_content:
+            content = _read_content(paths.email_content_dir, record.get("id"))
+            if content:
+                record = {**record, **content}
+        yield record
+
+
+def export_ndjson(
+    output_path: str,
+    paths: DataPaths,
+    storage_engine: StorageEngine,
+    compression: Optional[str] = None,
+    resume: bool = True,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+) -> Dict[str, Any]:
+    """
+    Streams the store at paths into an NDJSON file.
+
+    Args:
+        output_path: File to write; its suffix selects compression unless given.
+        paths: Snapshot files and content directory of the store.
+        storage_engine: Engine that persisted the snapshots (it may hold a log tail).
+        compression: "none", "gzip" or "zstd".
+        resume: Continue an interrupted export of the same file from its checkpoint.
+        checkpoint_interval: Records between checkpoints.
+
+    Returns:
+        Record counts per data type, plus "contents", "content_errors" and "resumed".
+    """
+    compression = detect_compression(output_path, compression)
+    checkpoint_path = f"{output_path}.checkpoint"
+    # Record positions are only meaningful while the snapshots stay the same
+    source = json.loads(json.dumps({
+        data_type: storage_engine.fingerprint(data_type, paths.snapshot_file(data_type))
+        for data_type, _ in SECTIONS
+    }))
+    state = _read_checkpoint(checkpoint_path) if resume else None
+    if state is not None and state.get("source") != source:
+        logger.info(f"The data changed since the interrupted export to {output_path}; restarting it.")
+        state = None
+    if (
+        state is None
+        or state.get("compression") != compression
+        or not os.path.exists(output_path)
+        or os.path.getsize(output_path) < state.get("offset", 0)
+    ):
+        state = None
+
+    counts = {data_type: 0 for data_type, _ in SECTIONS}
+    counts.update(contents=0, content_errors=0)
+    if state is None:
+        writer = CheckpointedWriter(output_path, compression)
+        writer.write(
+            _dumps(
+                {
+                    "type": RECORD_TYPE_HEADER,
+                    "format": EXPORT_FORMAT,
+                    "version": EXPORT_VERSION,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                }
+            )
+            + "\n"
+        )
+        section_index, position = 0, 0
+    else:
+        writer = CheckpointedWriter(output_path, compression, offset=state["offset"])
+        counts.update(state["counts"])
+        section_index, position = state["section"], state["position"]
+        logger.info(f"Resuming export to {output_path} at {SECTIONS[section_index][0]}[{position}]")
+
+    def save_checkpoint() -> None:
+        _write_checkpoint(
+            checkpoint_path,
+            {
+                "source": source,
+                "compression": compression,
+                "section": section_index,
+                "position": position,
+                "offset": writer.checkpoint(),
+                "counts": counts,
+            },
+        )
+
+    try:
+        while section_index < len(SECTIONS):
+            data_type, record_type = SECTIONS[section_index]
+            records = storage_engine.iter_records(data_type, paths.snapshot_file(data_type))
+            for index, record in enumerate(records):
+                if index < position:
+                    continue
+                line = {"type": record_type, "record": record}
+                if data_type == "emails":
+                    try:
+                        content = _read_content(paths.email_content_dir, record.get("id"))
+                    except (IOError, EOFError, ValueError) as e:
+                        logger.warning(f"Exporting email {record.get('id')} without content: {e}")
+                        counts["content_errors"] += 1
+                        content = None
+                    if content is not None:
+                        line["content"] = content
+                        counts["contents"] += 1
+                writer.write(_dumps(line) + "\n")
+                counts[data_type] += 1
+                position = index + 1
+                if position % checkpoint_interval == 0:
+                    save_checkpoint()
+            section_index, position = section_index + 1, 0
+            save_checkpoint()
+
+        end_counts = {data_type: counts[data_type] for data_type, _ in SECTIONS}
+        end_counts["contents"] = counts["contents"]
+        writer.write(_dumps({"type": RECORD_TYPE_END, "counts": end_counts}) + "\n")
+        writer.close()
+    except BaseException:
+        writer.close()
+        raise
+    _remove(checkpoint_path)
+    logger.info(f"Exported {end_counts} to {output_path}")
+    return {**counts, "resumed": state is not None}
+
+
+class _ArrayWriter:
+    """Writes a gzipped JSON array snapshot element by element."""
+
+    def __init__(self, path: str, count: int = 0, offset: Optional[int] = None):
+        self.writer = CheckpointedWriter(path, COMPRESSION_GZIP, offset)
+        self.count = count
+        if offset is None:
+            self.writer.write("[")
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self.writer.write(("," if self.count else "") + _dumps(record))
+        self.count += 1
+
+    def close(self) -> None:
+        self.writer.write("]")
+        self.writer.close()
+
+
+def _swap_in(paths: DataPaths) -> None:
+    """Replaces the store with the staged import. Safe to repeat after a crash."""
+    for data_type, _ in SECTIONS:
+        staged = paths.snapshot_file(data_type) + IMPORT_SUFFIX
+        if os.path.exists(staged):
+            os.replace(staged, paths.snapshot_file(data_type))
+    staged_dir = paths.email_content_dir + IMPORT_SUFFIX
+    if os.path.isdir(staged_dir):
+        old_dir = paths.email_content_dir + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(paths.email_content_dir):
+            os.rename(paths.email_content_dir, old_dir)
+        os.rename(staged_dir, paths.email_content_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _iter_lines(input_path: str) -> Iterator[Dict[str, Any]]:
+    with open_text_reader(input_path) as f:
+        # The line being read; a truncated gzip stream fails before the next one is returned
+        line_no = 1
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+                line_no += 1
+        except (json.JSONDecodeError, EOFError) as e:
+            raise ValueError(f"Invalid NDJSON at {input_path}:{line_no}: {e}") from e
+
+
+def import_ndjson(
+    input_path: str,
+    paths: DataPaths,
+    storage_engine: StorageEngine,
+    resume: bool = True,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+) -> Dict[str, Any]:
+    """
+    Replaces the store at paths with the contents of an NDJSON export.
+
+    Args:
+        input_path: Export to read; its suffix selects decompression.
+        paths: Snapshot files and content directory of the store.
+        storage_engine: Engine that owns the snapshots; its log is retired.
+        resume: Continue an interrupted import of the same file from its checkpoint.
+        checkpoint_interval: Records between checkpoints.
+
+    Returns:
+        Record counts per data type, plus "contents" and "resumed".
+
+    Raises:
+        ValueError: If the input is not a complete export.
+    """
+    data_dir = os.path.dirname(os.path.abspath(paths.emails_file))
+    checkpoint_path = os.path.join(data_dir, IMPORT_CHECKPOINT_FILE)
+    source = {"path": os.path.abspath(input_path), "size": os.path.getsize(input_path)}
+    state = _read_checkpoint(checkpoint_path) if resume else None
+    if state is not None and state.get("source") != source:
+        state = None
+
+    staged_dir = paths.email_content_dir + IMPORT_SUFFIX
+    if state is None:
+        shutil.rmtree(staged_dir, ignore_errors=True)
+        state = {"source": source, "phase": "copy", "lines": 0, "writers": {}}
+        resumed = False
+    else:
+        resumed = True
+        logger.info(f"Resuming import of {input_path} after line {state['lines']}")
+
+    counts = {data_type: 0 for data_type, _ in SECTIONS}
+    counts["contents"] = state.get("contents", 0)
+    if state["phase"] == "copy":
+        os.makedirs(staged_dir, exist_ok=True)
+        writers: Dict[str, _ArrayWriter] = {}
+        for data_type, _ in SECTIONS:
+            saved = state["writers"].get(data_type)
+            writers[data_type] = _ArrayWriter(
+                paths.snapshot_file(data_type) + IMPORT_SUFFIX,
+                count=saved["count"] if saved else 0,
+                offset=saved["offset"] if saved else None,
+            )
+        section_of = {record_type: data_type for data_type, record_type in SECTIONS}
+
+        def save_checkpoint(lines: int) -> None:
+            state["lines"] = lines
+            state["contents"] = counts["contents"]
+            state["writers"] = {
+                data_type: {"offset": writer.writer.checkpoint(), "count": writer.count}
+                for data_type, writer in writers.items()
+            }
+            _write_checkpoint(checkpoint_path, state)
+
+        end_counts = None
+        try:
+            for line_no, entry in enumerate(_iter_lines(input_path), 1):
+                entry_type = entry.get("type")
+                if line_no == 1:
+                    if entry_type != RECORD_TYPE_HEADER or entry.get("format") != EXPORT_FORMAT:
+                        raise ValueError(f"{input_path} is not an {EXPORT_FORMAT} export")
+                    if entry.get("version", 0) > EXPORT_VERSION:
+                        raise ValueError(f"Unsupported export version {entry.get('version')}")
+                if line_no <= state["lines"]:
+                    continue
+                if entry_type == RECORD_TYPE_END:
+                    end_counts = entry.get("counts", {})
+                    break
+                data_type = section_of.get(entry_type)
+                if data_type is None:
+                    if line_no > 1:
+                        logger.warning(f"Skipping unknown record type {entry_type!r}")
+                    continue
+                record = entry["record"]
+                writers[data_type].append(record)
+                if "content" in entry:
+                    with gzip.open(
+                        _content_path(staged_dir, record["id"]), "wt", encoding="utf-8"
+                    ) as f:
+                        f.write(_dumps(entry["content"]))
+                    counts["contents"] += 1
+                if line_no % checkpoint_interval == 0:
+                    save_checkpoint(line_no)
+        except BaseException:
+            for writer in writers.values():
+                writer.writer.close()
+            raise
+
+        for data_type, writer in writers.items():
+            writer.close()
+            counts[data_type] = writer.count
+        if end_counts is None:
+            raise ValueError(f"{input_path} is truncated: no end record")
+        expected = {key: end_counts.get(key) for key in counts}
+        if expected != counts:
+            raise ValueError(f"{input_path} is inconsistent: expected {expected}, read {counts}")
+        state.update(phase="swap", counts=counts)
+        _write_checkpoint(checkpoint_path, state)
+    else:
+        counts = state["counts"]
+
+    for data_type, _ in SECTIONS:
+        storage_engine.snapshot_replaced(data_type)
+    _swap_in(paths)
+    _remove(checkpoint_path)
+    logger.info(f"Imported {counts} from {input_path}")
+    return {**counts, "resumed": resumed}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point for exports and imports of a data directory."""
+    parser = argparse.ArgumentParser(description="Export or import the email store as NDJSON")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="NDJSON file (.gz or .zst for compression)")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "data"))
+    parser.add_argument(
+        "--storage-engine",
+        default=os.getenv("DATABASE_STORAGE_ENGINE", STORAGE_ENGINE_JSON),
+        help="Storage engine the data directory was written with",
+    )
+    parser.add_argument(
+        "--compression", choices=[COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_ZSTD]
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore checkpoints of an interrupted run"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    paths = DataPaths.from_data_dir(args.data_dir)
+    engine = create_storage_engine(args.storage_engine, args.data_dir)
+    try:
+        if args.action == "export":
+            result = export_ndjson(
+                args.path, paths, engine, compression=args.compression, resume=not args.restart
+            )
+        else:
+            result = import_ndjson(args.path, paths, engine, resume=not args.restart)
+    except (IOError, ValueError) as e:
+        print(f"{args.action} failed: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
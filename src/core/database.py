@@ -1,6 +1,7 @@
 """
 Database management for the Email Intelligence Platform.
 JSON file storage implementation with in-memory caching and indexing.
+Persistence is delegated to a pluggable storage engine (see storage_engine.py).
 """
 
 import asyncio
@@ -9,14 +10,15 @@ import itertools
 import json
 import logging
 import os
+from bisect import bisect_left
 from datetime import datetime, timezone
 from functools import partial
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional, Set
 
 # NOTE: These dependencies will be moved to the core framework as well.
 # For now, we are assuming they will be available in the new location.
-from .performance_monitor import log_performance
-from .enhanced_caching import EnhancedCachingManager
+from .performance_monitor import log_performance, restore_latency_summary, save_latency_summary
+from .enhanced_caching import DEFAULT_CONTENT_CACHE_BYTES, EnhancedCachingManager
 from .enhanced_error_reporting import (
     log_error,
     ErrorSeverity,
@@ -24,7 +26,24 @@ from .enhanced_error_reporting import (
     create_error_context
 )
 from .constants import DEFAULT_CATEGORY_COLOR
+from .dashboard_aggregates import (
+    LATENCY_SUMMARY_FILENAME,
+    EmailAggregates,
+    load_latency_summary_file,
+    save_latency_summary_file,
+)
+from .data_export import DataPaths, export_ndjson, import_ndjson
 from .security import validate_path_safety
+from .storage_engine import STORAGE_ENGINE_JSON, DataDirLock, create_storage_engine
+from .index_snapshot import (
+    directory_fingerprint,
+    is_snapshot_current,
+    load_index_snapshot,
+    save_index_snapshot,
+)
+from .search_index import PREFIX_WILDCARD, InvertedIndex, parse_query
+from .sized_cache import EVICTION_SLRU
+from .sorted_index import EmailOrderIndex
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +53,13 @@ EMAIL_CONTENT_DIR = os.path.join(DATA_DIR, "email_content")
 EMAILS_FILE = os.path.join(DATA_DIR, "emails.json.gz")
 CATEGORIES_FILE = os.path.join(DATA_DIR, "categories.json.gz")
 USERS_FILE = os.path.join(DATA_DIR, "users.json.gz")
+SEARCH_INDEX_FILENAME = "search_index.json.gz"
+INDEX_SNAPSHOT_FILENAME = "indexes.json.gz"
+
+# Query cache dependency tags
+QUERY_TAG_TERM = "term"
+QUERY_TAG_PREFIX = "prefix"
+QUERY_TAG_EMAIL = "email"
 
 
 # Data types
@@ -75,6 +101,9 @@ class DatabaseConfig:
         categories_file: Optional[str] = None,
         users_file: Optional[str] = None,
         email_content_dir: Optional[str] = None,
+        storage_engine: Optional[str] = None,
+        content_cache_max_bytes: Optional[int] = None,
+        content_cache_policy: Optional[str] = None,
     ):
         # Make data directory configurable via environment variable
         self.data_dir = data_dir or os.getenv("DATA_DIR", "data")
@@ -94,6 +123,19 @@ class DatabaseConfig:
             if not validate_path_safety(path_value, self.data_dir):
                 raise ValueError(f"Unsafe {path_attr} path: {path_value}")
 
+        # Storage engine: "json" (full rewrite) or "wal" (append-only log + snapshots)
+        self.storage_engine = storage_engine or os.getenv(
+            "DATABASE_STORAGE_ENGINE", STORAGE_ENGINE_JSON
+        )
+
+        # Byte budget and eviction policy ("lru", "slru" or "w-tinylfu") of the content cache
+        self.content_cache_max_bytes = content_cache_max_bytes or int(
+            os.getenv("CONTENT_CACHE_MAX_BYTES", DEFAULT_CONTENT_CACHE_BYTES)
+        )
+        self.content_cache_policy = content_cache_policy or os.getenv(
+            "CONTENT_CACHE_POLICY", EVICTION_SLRU
+        )
+
         # Ensure directories exist
         os.makedirs(self.email_content_dir, exist_ok=True)
 
@@ -129,6 +171,16 @@ class DatabaseManager(DataSource):
             self.users_file = USERS_FILE
             self.email_content_dir = EMAIL_CONTENT_DIR
 
+        # Persistence strategy for the in-memory record lists
+        storage_engine_name = (
+            getattr(config, "storage_engine", None)
+            if config is not None
+            else os.getenv("DATABASE_STORAGE_ENGINE", STORAGE_ENGINE_JSON)
+        )
+        self.storage_engine = create_storage_engine(storage_engine_name, self.data_dir)
+        # Held shared while the manager is open; see DataDirLock
+        self.data_dir_lock = DataDirLock(self.data_dir)
+
         # In-memory data stores
         self.emails_data: List[Dict[str, Any]] = []  # Stores light email records
         self.categories_data: List[Dict[str, Any]] = []
@@ -137,23 +189,56 @@ class DatabaseManager(DataSource):
         # In-memory indexes
         self.emails_by_id: Dict[int, Dict[str, Any]] = {}
         self.emails_by_message_id: Dict[str, Dict[str, Any]] = {}
-        self._search_index: Dict[int, str] = {}  # Cache for searchable text
         self.categories_by_id: Dict[int, Dict[str, Any]] = {}
         self.categories_by_name: Dict[str, Dict[str, Any]] = {}
         self.category_counts: Dict[int, int] = {}
 
+        # Full-text index over subject, sender and body, persisted alongside the data
+        self.search_index = InvertedIndex()
+        self.search_index_file = os.path.join(self.data_dir, SEARCH_INDEX_FILENAME)
+
         # Enhanced caching system
-        self.caching_manager = EnhancedCachingManager()
+        self.caching_manager = EnhancedCachingManager(
+            content_cache_max_bytes=getattr(
+                config, "content_cache_max_bytes", DEFAULT_CONTENT_CACHE_BYTES
+            ),
+            content_cache_policy=getattr(config, "content_cache_policy", EVICTION_SLRU),
+        )
 
-        # Internal Cache for sorted emails
-        self._sorted_emails_cache: Optional[List[Dict[str, Any]]] = None
+        # Ordered indexes (newest first) by time, category and unread state
+        self.email_order_index = EmailOrderIndex(
+            time_field=FIELD_TIME,
+            fallback_field=FIELD_CREATED_AT,
+            id_field=FIELD_ID,
+            category_field=FIELD_CATEGORY_ID,
+            unread_field=FIELD_IS_UNREAD,
+        )
+
+        # Dashboard counters, maintained on every write
+        self.dashboard_aggregates = EmailAggregates(
+            time_field=FIELD_CREATED_AT,
+            fallback_field=FIELD_TIME,
+            id_field=FIELD_ID,
+            category_field=FIELD_CATEGORY_ID,
+            unread_field=FIELD_IS_UNREAD,
+        )
 
         # Index of email IDs that have content files on disk
         self._content_available_index: set[int] = set()
 
+        # Indexes persisted at shutdown so startup can skip rebuilding them
+        self.index_snapshot_file = os.path.join(self.data_dir, INDEX_SNAPSHOT_FILENAME)
+        self._index_generation = 0
+        self._index_fingerprint: Optional[Dict[str, Any]] = None
+
+        # Rolling operation latencies shown on the dashboard, persisted across restarts
+        self.latency_summary_file = os.path.join(self.data_dir, LATENCY_SUMMARY_FILENAME)
+
         # State
         self._dirty_data: set[str] = set()
         self._initialized = False
+        # Set while an import replaces the files; saves would overwrite it with the old data
+        self._importing = False
 
         # Ensure directories exist
         os.makedirs(self.email_content_dir, exist_ok=True)
@@ -167,6 +252,34 @@ class DatabaseManager(DataSource):
         # compared to join() and guarantees type safety for non-string fields.
         return f"{email.get(FIELD_SUBJECT, '') or ''} {email.get(FIELD_SENDER, '') or ''} {email.get(FIELD_SENDER_EMAIL, '') or ''}".lower()
 
+    def _index_email_text(self, email: Dict[str, Any], content: Any = None) -> None:
+        """Adds or replaces an email in the full-text index."""
+        sender = f"{email.get(FIELD_SENDER, '') or ''} {email.get(FIELD_SENDER_EMAIL, '') or ''}"
+        body = content if isinstance(content, str) else None
+        self.search_index.add_document(email[FIELD_ID], email.get(FIELD_SUBJECT), sender, body)
+
+    def _invalidate_email_queries(self, email_id: int, previous_terms: Set[str]) -> None:
+        """
+        Invalidates only the cached queries a write to this email could change.
+
+        Searches are tagged with their terms and prefixes and with the emails they
+        returned, so the affected entries are those containing the email or
+        matching any term it had before or has after the write. Only the prefixes
+        cached searches actually use are checked against the terms.
+        """
+        terms = previous_terms | self.search_index.document_terms(email_id)
+        tags = {f"{QUERY_TAG_EMAIL}:{email_id}"}
+        tags.update(f"{QUERY_TAG_TERM}:{term}" for term in terms)
+        prefixes = self.caching_manager.get_query_tag_values(QUERY_TAG_PREFIX)
+        if prefixes and terms:
+            sorted_terms = sorted(terms)
+            for prefix in prefixes:
+                # The first term not sorting before the prefix is the only candidate
+                i = bisect_left(sorted_terms, prefix)
+                if i < len(sorted_terms) and sorted_terms[i].startswith(prefix):
+                    tags.add(f"{QUERY_TAG_PREFIX}:{prefix}")
+        self.caching_manager.invalidate_query_tags(tags)
+
     def _get_email_content_path(self, email_id: int) -> str:
         """Returns the path for an individual email's content file."""
         return os.path.join(self.email_content_dir, f"{email_id}.json.gz")
@@ -221,17 +334,25 @@ class DatabaseManager(DataSource):
     async def _ensure_initialized(self) -> None:
         """Ensure data is loaded and indexes are built."""
         if not self._initialized:
-            await self._load_data()
-            self._build_indexes()
+            if not self.data_dir_lock.held:
+                await asyncio.to_thread(self.data_dir_lock.acquire)
+            await self._startup()
             self._initialized = True
 
+    @log_performance(operation="database_startup")
+    async def _startup(self) -> None:
+        """Loads the data and its indexes, reusing the persisted indexes when current."""
+        await self._load_data()
+        if not await self._load_indexes():
+            self._build_indexes()
+        await self._load_search_index()
+        await self._load_latency_summary()
+
     # TODO(P1, 4h): Remove hidden side effects from initialization per functional_analysis_report.md
     # TODO(P2, 3h): Implement lazy loading strategy that is more predictable and testable
 
-    @log_performance(operation="build_indexes")
-    def _build_indexes(self) -> None:
-        """Builds or rebuilds all in-memory indexes from the loaded data."""
-        logger.info("Building in-memory indexes...")
+    def _build_record_maps(self) -> None:
+        """Builds the lookups that reference the loaded records (always done in memory)."""
         self.emails_by_id = {email[FIELD_ID]: email for email in self.emails_data}
         self.emails_by_message_id = {
             email[FIELD_MESSAGE_ID]: email
@@ -239,20 +360,12 @@ class DatabaseManager(DataSource):
             if FIELD_MESSAGE_ID in email
         }
 
-        # Build search index
-        self._search_index = {}
-        for email in self.emails_data:
-            eid = email.get(FIELD_ID)
-            if eid is not None:
-                self._search_index[eid] = self._get_searchable_text(email)
-
         self.categories_by_id = {cat[FIELD_ID]: cat for cat in self.categories_data}
         self.categories_by_name = {cat[FIELD_NAME].lower(): cat for cat in self.categories_data}
-        self.category_counts = {cat_id: 0 for cat_id in self.categories_by_id}
-        for email in self.emails_data:
-            cat_id = email.get(FIELD_CATEGORY_ID)
-            if cat_id in self.category_counts:
-                self.category_counts[cat_id] += 1
+        self.dashboard_aggregates.rebuild(self.emails_data)
+
+    def _apply_category_counts(self, counts: Dict[int, int]) -> None:
+        self.category_counts = counts
         for cat_id, count in self.category_counts.items():
             if (
                 cat_id in self.categories_by_id
@@ -261,6 +374,20 @@ class DatabaseManager(DataSource):
                 self.categories_by_id[cat_id][FIELD_COUNT] = count
                 self._dirty_data.add(DATA_TYPE_CATEGORIES)
 
+    @log_performance(operation="build_indexes")
+    def _build_indexes(self) -> None:
+        """Builds or rebuilds all in-memory indexes from the loaded data."""
+        logger.info("Building in-memory indexes...")
+        self._build_record_maps()
+        self.email_order_index.rebuild(self.emails_data)
+
+        category_counts = {cat_id: 0 for cat_id in self.categories_by_id}
+        for email in self.emails_data:
+            cat_id = email.get(FIELD_CATEGORY_ID)
+            if cat_id in category_counts:
+                category_counts[cat_id] += 1
+        self._apply_category_counts(category_counts)
+
         # Build content availability index
         # This allows us to skip os.path.exists checks during search
         self._content_available_index = set()
@@ -278,25 +405,151 @@ class DatabaseManager(DataSource):
 
         logger.info("In-memory indexes built successfully.")
 
+    def _current_index_fingerprint(self) -> Dict[str, Any]:
+        """Describes the persisted data the indexes are derived from."""
+        return {
+            DATA_TYPE_EMAILS: self.storage_engine.fingerprint(DATA_TYPE_EMAILS, self.emails_file),
+            DATA_TYPE_CATEGORIES: self.storage_engine.fingerprint(
+                DATA_TYPE_CATEGORIES, self.categories_file
+            ),
+            "email_content": directory_fingerprint(self.email_content_dir),
+        }
+
+    @log_performance(operation="load_indexes")
+    async def _load_indexes(self) -> bool:
+        """
+        Loads the indexes saved at the last shutdown.
+
+        Returns:
+            False if there is no snapshot or it does not match the loaded data,
+            in which case the indexes must be rebuilt.
+        """
+        snapshot = await asyncio.to_thread(load_index_snapshot, self.index_snapshot_file)
+        if snapshot is None:
+            return False
+        # Generations keep counting even when a stale snapshot is replaced
+        self._index_generation = snapshot.get("generation", 0)
+        fingerprint = await asyncio.to_thread(self._current_index_fingerprint)
+        if not is_snapshot_current(snapshot, fingerprint):
+            return False
+
+        self._build_record_maps()
+        try:
+            category_counts = {int(cat_id): count for cat_id, count in snapshot["category_counts"]}
+            content_ids = set(snapshot["content_ids"])
+            consistent = category_counts.keys() == self.categories_by_id.keys() and (
+                self.email_order_index.rebuild_from_order(self.emails_by_id, snapshot["order"])
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Discarding malformed index snapshot {self.index_snapshot_file}: {e}")
+            consistent = False
+        if not consistent:
+            logger.info("Index snapshot does not match the loaded data; rebuilding indexes.")
+            return False
+
+        self._apply_category_counts(category_counts)
+        self._content_available_index = content_ids
+        self._index_fingerprint = fingerprint
+        logger.info(f"Loaded in-memory indexes from snapshot generation {self._index_generation}.")
+        return True
+
+    async def _save_indexes(self) -> None:
+        """Persists the indexes if the data changed since they were loaded or saved."""
+        fingerprint = await asyncio.to_thread(self._current_index_fingerprint)
+        if fingerprint == self._index_fingerprint:
+            return
+        snapshot = {
+            "generation": self._index_generation + 1,
+            "fingerprint": fingerprint,
+            "order": self.email_order_index.ordered_ids(),
+            "category_counts": sorted(self.category_counts.items()),
+            "content_ids": sorted(self._content_available_index),
+        }
+        try:
+            await asyncio.to_thread(save_index_snapshot, self.index_snapshot_file, snapshot)
+        except (IOError, OSError, TypeError) as e:
+            logger.error(f"Error saving index snapshot to {self.index_snapshot_file}: {e}")
+            return
+        self._index_generation += 1
+        self._index_fingerprint = fingerprint
+
+    async def _load_latency_summary(self) -> None:
+        """Restores the saved latency summary and adds the timings logged after it."""
+        saved = await asyncio.to_thread(load_latency_summary_file, self.latency_summary_file)
+        await asyncio.to_thread(restore_latency_summary, saved)
+
+    async def _save_latency_summary(self) -> None:
+        try:
+            summary = await asyncio.to_thread(save_latency_summary)
+            await asyncio.to_thread(save_latency_summary_file, self.latency_summary_file, summary)
+        except (IOError, OSError) as e:
+            logger.error(f"Error saving latency summary to {self.latency_summary_file}: {e}")
+
+    @log_performance(operation="load_search_index")
+    async def _load_search_index(self) -> None:
+        """
+        Loads the persisted full-text index and reconciles it with the loaded emails.
+
+        The index is saved with the fingerprint of the data it was built from.
+        If the data changed after that save (e.g. the process crashed after
+        flushing data), the index may hold outdated terms and is rebuilt.
+        """
+        index = await asyncio.to_thread(InvertedIndex.load, self.search_index_file)
+        if index is not None:
+            fingerprint = await asyncio.to_thread(self._current_index_fingerprint)
+            # Round-trip through JSON so tuples and lists compare equal
+            if index.fingerprint == json.loads(json.dumps(fingerprint)):
+                self.search_index = index
+            else:
+                logger.info("Search index is older than the data; rebuilding it.")
+
+        for doc_id in self.search_index.doc_ids - self.emails_by_id.keys():
+            self.search_index.remove_document(doc_id)
+        await self._index_missing_emails()
+
+    async def _index_missing_emails(self) -> None:
+        """Adds the loaded emails that are not in the full-text index yet."""
+        missing = [e for eid, e in self.emails_by_id.items() if eid not in self.search_index]
+        if missing:
+            logger.info(f"Indexing {len(missing)} emails missing from the full-text index...")
+        for email in missing:
+            content = None
+            email_id = email[FIELD_ID]
+            if email_id in self._content_available_index:
+                try:
+                    heavy_data = await asyncio.to_thread(
+                        self._read_content_sync, self._get_email_content_path(email_id)
+                    )
+                    content = heavy_data.get(FIELD_CONTENT)
+                except (IOError, json.JSONDecodeError) as e:
+                    logger.warning(f"Could not index content for email {email_id}: {e}")
+            self._index_email_text(email, content)
+
+    async def _save_search_index(self) -> None:
+        """Persists the full-text index if it or the data it describes changed since it was loaded."""
+        fingerprint = json.loads(json.dumps(await asyncio.to_thread(self._current_index_fingerprint)))
+        if not self.search_index.dirty and self.search_index.fingerprint == fingerprint:
+            return
+        try:
+            await asyncio.to_thread(self.search_index.save, self.search_index_file, fingerprint)
+        except IOError as e:
+            logger.error(f"Error saving search index to {self.search_index_file}: {e}")
+
     @log_performance(operation="load_data")
     async def _load_data(self) -> None:
         """
         Loads data from JSON files into memory.
         If a data file does not exist, it creates an empty one.
         """
-        # Invalidate sorted cache on load
-        self._sorted_emails_cache = None
-
         for data_type, file_path, data_list_attr in [
             (DATA_TYPE_EMAILS, self.emails_file, "emails_data"),
             (DATA_TYPE_CATEGORIES, self.categories_file, "categories_data"),
             (DATA_TYPE_USERS, self.users_file, "users_data"),
         ]:
             try:
-                if os.path.exists(file_path):
-                    with gzip.open(file_path, "rt", encoding="utf-8") as f:
-                        data = await asyncio.to_thread(json.load, f)
-                        setattr(self, data_list_attr, data)
+                data = await self.storage_engine.load(data_type, file_path)
+                if data is not None:
+                    setattr(self, data_list_attr, data)
                     logger.info(f"Loaded {len(data)} items from compressed file: {file_path}")
                 else:
                     setattr(self, data_list_attr, [])
@@ -323,6 +576,8 @@ class DatabaseManager(DataSource):
     @log_performance(operation="save_data_to_file")
     async def _save_data_to_file(self, data_type: Literal["emails", "categories", "users"]) -> None:
         """Saves the specified in-memory data list to its JSON file."""
+        if self._importing:
+            return
         file_path, data_to_save = "", []
         if data_type == DATA_TYPE_EMAILS:
             file_path, data_to_save = self.emails_file, self.emails_data
@@ -330,6 +585,7 @@ class DatabaseManager(DataSource):
             for cat in self.categories_data:
                 if cat["id"] in self.category_counts:
                     cat["count"] = self.category_counts[cat["id"]]
+                self.storage_engine.record_put(DATA_TYPE_CATEGORIES, cat)
             file_path, data_to_save = self.categories_file, self.categories_data
         elif data_type == DATA_TYPE_USERS:
             file_path, data_to_save = self.users_file, self.users_data
@@ -349,9 +605,7 @@ class DatabaseManager(DataSource):
             return
 
         try:
-            with gzip.open(file_path, "wt", encoding="utf-8") as f:
-                dump_func = partial(json.dump, data_to_save, f, indent=4)
-                await asyncio.to_thread(dump_func)
+            await self.storage_engine.persist(data_type, file_path, data_to_save)
             logger.info(f"Persisted {len(data_to_save)} items to compressed file: {file_path}")
         except IOError as e:
             error_context = create_error_context(
@@ -369,22 +623,144 @@ class DatabaseManager(DataSource):
             logger.error(f"Error saving data to {file_path}: {e}. Error ID: {error_id}")
 
     async def _save_data(self, data_type: Literal["emails", "categories", "users"]) -> None:
-        """Marks data as dirty for write-behind saving."""
+        """
+        Commits the noted changes of a data type, or marks it dirty for write-behind saving.
+
+        Engines that log changes (the WAL engine) append them on every write,
+        grouping concurrent writes into one append; the JSON engine rewrites
+        the whole file, so it only does so at shutdown or export.
+        """
+        file_path, records = {
+            DATA_TYPE_EMAILS: (self.emails_file, self.emails_data),
+            DATA_TYPE_CATEGORIES: (self.categories_file, self.categories_data),
+            DATA_TYPE_USERS: (self.users_file, self.users_data),
+        }[data_type]
+        if self._importing:
+            # Held back until the import ends; discarded if it replaced the data
+            self._dirty_data.add(data_type)
+            return
+        try:
+            if await self.storage_engine.commit(data_type, file_path, records):
+                return
+        except (IOError, OSError) as e:
+            error_context = create_error_context(
+                component="DatabaseManager",
+                operation="_save_data",
+                additional_context={"data_type": data_type, "file_path": file_path}
+            )
+            error_id = log_error(
+                e,
+                severity=ErrorSeverity.ERROR,
+                category=ErrorCategory.DATA,
+                context=error_context,
+                details={"error_type": type(e).__name__},
+            )
+            logger.error(f"Error committing {data_type} changes: {e}. Error ID: {error_id}")
         self._dirty_data.add(data_type)
 
-    async def shutdown(self) -> None:
-        """Saves all dirty data to files before shutting down."""
-        logger.info("DatabaseManager shutting down. Saving dirty data...")
+    async def flush(self) -> None:
+        """
+        Writes the changes not on disk yet, so other processes (exports,
+        background jobs) read the current data.
+        """
         for data_type in list(self._dirty_data):
             await self._save_data_to_file(data_type)
         self._dirty_data.clear()
-        
+
+    async def rebuild_indexes(self) -> Dict[str, Any]:
+        """
+        Rebuilds all indexes and the full-text index from the loaded data and persists them.
+
+        Runs in the process that owns the data directory; the reindex job
+        uses it after taking the data directory lock exclusively.
+        """
+        await self._ensure_initialized()
+        self._build_indexes()
+        self.search_index = InvertedIndex()
+        await self._index_missing_emails()
+        await self.flush()
+        # Force a new snapshot generation even if the data did not change
+        self._index_fingerprint = None
+        await self._save_indexes()
+        await self._save_search_index()
+        return {
+            "emails": len(self.emails_data),
+            "indexed_documents": len(self.search_index),
+            "index_generation": self._index_generation,
+        }
+
+    async def shutdown(self) -> None:
+        """Saves all dirty data to files before shutting down."""
+        logger.info("DatabaseManager shutting down. Saving dirty data...")
+        await self.flush()
+        await self.storage_engine.close()
+        await self._save_search_index()
+        if self._initialized:
+            await self._save_indexes()
+            await self._save_latency_summary()
+        self.data_dir_lock.release()
+
         # Log cache statistics
         cache_stats = self.caching_manager.get_cache_statistics()
         logger.info(f"Cache statistics: {cache_stats}")
         
         logger.info("Shutdown complete.")
 
+    def _data_paths(self) -> DataPaths:
+        return DataPaths(
+            emails_file=self.emails_file,
+            categories_file=self.categories_file,
+            users_file=self.users_file,
+            email_content_dir=self.email_content_dir,
+        )
+
+    async def export_ndjson(
+        self, output_path: str, compression: Optional[str] = None, resume: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Streams all categories, users and emails (with content) to an NDJSON file.
+
+        Pending changes are saved first; records and content files are then read
+        from disk one at a time. See ``data_export.export_ndjson``.
+        """
+        await self._ensure_initialized()
+        await self.flush()
+        return await asyncio.to_thread(
+            export_ndjson,
+            output_path,
+            self._data_paths(),
+            self.storage_engine,
+            compression=compression,
+            resume=resume,
+        )
+
+    async def import_ndjson(self, input_path: str, resume: bool = True) -> Dict[str, Any]:
+        """
+        Replaces all data with the contents of an NDJSON export and reloads it.
+
+        See ``data_export.import_ndjson``.
+        """
+        self._importing = True
+        try:
+            # A compaction still running would overwrite the imported snapshot
+            await self.storage_engine.close()
+            stats = await asyncio.to_thread(
+                import_ndjson, input_path, self._data_paths(), self.storage_engine, resume=resume
+            )
+        finally:
+            self._importing = False
+        # Unsaved changes, caches and the full-text index describe the replaced data
+        for data_type in (DATA_TYPE_EMAILS, DATA_TYPE_CATEGORIES, DATA_TYPE_USERS):
+            self.storage_engine.discard_pending(data_type)
+        self._dirty_data.clear()
+        self.caching_manager.clear_all_caches()
+        self.search_index = InvertedIndex()
+        if os.path.exists(self.search_index_file):
+            await asyncio.to_thread(os.remove, self.search_index_file)
+        self._initialized = False
+        await self._ensure_initialized()
+        return stats
+
     def _generate_id(self, data_list: List[Dict[str, Any]]) -> int:
         """
         Generates a new unique integer ID for a record.
@@ -459,11 +835,11 @@ class DatabaseManager(DataSource):
         self.emails_data.append(email)
         self.emails_by_id[email_id] = email
 
-        # Update search index
-        self._search_index[email_id] = self._get_searchable_text(email)
-
         if message_id:
             self.emails_by_message_id[message_id] = email
+        self.email_order_index.add(email)
+        self.dashboard_aggregates.add(email)
+        self.storage_engine.record_put(DATA_TYPE_EMAILS, email)
 
     async def create_email(self, email_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Create a new email record, separating heavy and light content."""
@@ -484,6 +860,7 @@ class DatabaseManager(DataSource):
 
         light_email_record = full_email_record
         await self._add_email_to_indexes(light_email_record)
+        self._index_email_text(light_email_record, heavy_data.get(FIELD_CONTENT))
         await self._save_data(DATA_TYPE_EMAILS)
 
         category_id = light_email_record.get(FIELD_CATEGORY_ID)
@@ -494,9 +871,8 @@ class DatabaseManager(DataSource):
         if heavy_data:
             self.caching_manager.put_email_content(new_id, heavy_data)
 
-        # Invalidate sorted cache and query cache
-        self._sorted_emails_cache = None
-        self.caching_manager.clear_query_cache()
+        # Invalidate cached queries this email could appear in
+        self._invalidate_email_queries(new_id, set())
 
         return self._add_category_details(light_email_record)
 
@@ -564,6 +940,7 @@ class DatabaseManager(DataSource):
         self.categories_by_id[new_id] = category_record
         self.categories_by_name[category_name_lower] = category_record
         self.category_counts[new_id] = 0
+        self.storage_engine.record_put(DATA_TYPE_CATEGORIES, category_record)
         await self._save_data(DATA_TYPE_CATEGORIES)
         return category_record
 
@@ -604,28 +981,6 @@ class DatabaseManager(DataSource):
         result_emails = [self._add_category_details(email) for email in paginated_emails]
         return result_emails
 
-    def _get_sorted_emails(self) -> List[Dict[str, Any]]:
-        """Returns the full list of emails sorted by time, using cache if available."""
-        if self._sorted_emails_cache is not None:
-            return self._sorted_emails_cache
-
-        try:
-            sorted_emails = sorted(
-                self.emails_data,
-                key=lambda e: e.get(FIELD_TIME, e.get(FIELD_CREATED_AT, "")),
-                reverse=True,
-            )
-        except TypeError:
-            logger.warning(
-                f"Sorting emails by {FIELD_TIME} failed due to incomparable types. Using '{FIELD_CREATED_AT}'."
-            )
-            sorted_emails = sorted(
-                self.emails_data, key=lambda e: e.get(FIELD_CREATED_AT, ""), reverse=True
-            )
-
-        self._sorted_emails_cache = sorted_emails
-        return sorted_emails
-
     async def get_emails(
         self,
         limit: int = 50,
@@ -633,23 +988,14 @@ class DatabaseManager(DataSource):
         category_id: Optional[int] = None,
         is_unread: Optional[bool] = None,
     ) -> List[Dict[str, Any]]:
-        """Get emails with pagination and filtering. Optimized to use generator for memory efficiency."""
-        # Use cached sorted list to avoid sorting on every request
-        source_emails = self._get_sorted_emails()
-
-        # Use iterator to filter lazily
-        email_iter = iter(source_emails)
-
-        # Apply filters lazily (generator expressions)
-        if category_id is not None:
-            email_iter = (e for e in email_iter if e.get(FIELD_CATEGORY_ID) == category_id)
-
-        if is_unread is not None:
-            email_iter = (e for e in email_iter if e.get(FIELD_IS_UNREAD) == is_unread)
-
-        # Apply pagination using islice. We consume only what we need.
-        # islice(iter, start, stop). stop is offset + limit.
-        paginated_emails = list(itertools.islice(email_iter, offset, offset + limit))
+        """Get emails with pagination and filtering, read lazily from the ordered indexes."""
+        id_iter = self.email_order_index.iter_ids(
+            category_id=category_id, is_unread=is_unread, offset=offset
+        )
+        # Consume only the page we need.
+        paginated_emails = [
+            self.emails_by_id[email_id] for email_id in itertools.islice(id_iter, limit)
+        ]
 
         return [self._add_category_details(email) for email in paginated_emails]
 
@@ -674,12 +1020,14 @@ class DatabaseManager(DataSource):
 
         if changed_fields:
             email_to_update[FIELD_UPDATED_AT] = datetime.now(timezone.utc).isoformat()
+            email_id = email_to_update[FIELD_ID]
+            previous_terms = self.search_index.document_terms(email_id)
+            self._index_email_text(email_to_update, email_to_update.get(FIELD_CONTENT))
             heavy_data = {
                 field: email_to_update.pop(field)
                 for field in HEAVY_EMAIL_FIELDS
                 if field in email_to_update
             }
-            email_id = email_to_update[FIELD_ID]
             content_path = self._get_email_content_path(email_id)
             try:
                 with gzip.open(content_path, "wt", encoding="utf-8") as f:
@@ -690,12 +1038,14 @@ class DatabaseManager(DataSource):
 
             self.emails_by_id[email_id] = email_to_update
             self.emails_by_message_id[message_id] = email_to_update
-            self._search_index[email_id] = self._get_searchable_text(email_to_update)
             idx = next(
                 (i for i, e in enumerate(self.emails_data) if e.get(FIELD_ID) == email_id), -1
             )
             if idx != -1:
                 self.emails_data[idx] = email_to_update
+            self.email_order_index.add(email_to_update)
+            self.dashboard_aggregates.add(email_to_update)
+            self.storage_engine.record_put(DATA_TYPE_EMAILS, email_to_update)
             await self._save_data(DATA_TYPE_EMAILS)
 
             new_category_id = email_to_update.get(FIELD_CATEGORY_ID)
@@ -708,9 +1058,8 @@ class DatabaseManager(DataSource):
             # Invalidate cache for this email
             self.caching_manager.invalidate_email_record(email_id)
             
-            # Invalidate sorted cache and query cache
-            self._sorted_emails_cache = None
-            self.caching_manager.clear_query_cache()
+            # Invalidate cached queries affected by this email
+            self._invalidate_email_queries(email_id, previous_terms)
 
         return self._add_category_details(email_to_update)
 
@@ -750,12 +1099,48 @@ class DatabaseManager(DataSource):
         """Get emails by category"""
         return await self.get_emails(limit=limit, offset=offset, category_id=category_id)
 
+    async def get_dashboard_aggregates(self) -> Dict[str, Any]:
+        """Get the dashboard statistics from the counters maintained on write."""
+        await self._ensure_initialized()
+        aggregates = self.dashboard_aggregates
+        return {
+            "total_emails": aggregates.total,
+            "auto_labeled": aggregates.auto_labeled,
+            "categories_count": len(self.categories_data),
+            "unread_count": aggregates.unread,
+            "weekly_growth": aggregates.weekly_growth(),
+        }
+
+    async def get_category_breakdown(self, limit: int = 10) -> Dict[str, int]:
+        """Get the email count of the top categories by name, largest first."""
+        await self._ensure_initialized()
+        # Emails can reference deleted categories, so rank them all and skip unknown IDs
+        ranked = self.dashboard_aggregates.top_categories(
+            len(self.dashboard_aggregates.category_counts)
+        )
+        breakdown = {}
+        for category_id, count in ranked:
+            category = self.categories_by_id.get(category_id)
+            if category is not None:
+                breakdown[category[FIELD_NAME]] = count
+                if len(breakdown) == limit:
+                    break
+        return breakdown
+
     async def search_emails(self, query: str) -> List[Dict[str, Any]]:
         """Searches for emails matching a query."""
         return await self.search_emails_with_limit(query, limit=50)
 
     async def search_emails_with_limit(self, search_term: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Search emails with limit parameter. Searches subject/sender in-memory, and content on-disk."""
+        """
+        Search emails with limit parameter using the full-text index.
+
+        All query terms must match whole words of the subject, sender or body;
+        terms ending in '*' match as prefixes. Results are ranked by relevance,
+        newest first on ties. A query matching no words (e.g. a fragment such as
+        "voic") falls back to the former substring match over subject and
+        sender, newest first.
+        """
         if not search_term:
             return await self.get_emails(limit=limit, offset=0)
 
@@ -768,71 +1153,42 @@ class DatabaseManager(DataSource):
             return cached_result
 
         search_term_lower = search_term.lower()
-        filtered_emails = []
-
-        # Optimization: Iterate over sorted emails and stop once we reach the limit.
-        # This avoids scanning the entire dataset and checking disk content for older emails
-        # when we already have enough recent matches.
-        source_emails = self._get_sorted_emails()
-
         logger.info(
             f"Starting email search for term: '{search_term_lower}'"
         )
 
-        for email_light in source_emails:
-            if len(filtered_emails) >= limit:
-                break
-
-            email_id = email_light[FIELD_ID]
-
-            # Use search index if available for O(1) text access instead of repeated .lower()
-            if email_id in self._search_index:
-                found_in_light = search_term_lower in self._search_index[email_id]
-            else:
-                found_in_light = (
-                    search_term_lower in email_light.get(FIELD_SUBJECT, "").lower()
-                    or search_term_lower in email_light.get(FIELD_SENDER, "").lower()
-                    or search_term_lower in email_light.get(FIELD_SENDER_EMAIL, "").lower()
-                )
-
-            if found_in_light:
-                filtered_emails.append(email_light)
-                continue
-
-            # Check content cache first to avoid disk I/O
-            cached_content = self.caching_manager.get_email_content(email_id)
-            if cached_content:
-                content = cached_content.get(FIELD_CONTENT, "")
-                if isinstance(content, str) and search_term_lower in content.lower():
-                    filtered_emails.append(email_light)
+        results = []
+        tags = {
+            f"{QUERY_TAG_PREFIX if is_prefix else QUERY_TAG_TERM}:{term}"
+            for term, is_prefix in parse_query(search_term_lower)
+        }
+        for email_id, _score in self.search_index.search(search_term_lower):
+            email_light = self.emails_by_id.get(email_id)
+            if email_light is None:
                 continue
+            results.append(self._add_category_details(email_light))
+            tags.add(f"{QUERY_TAG_EMAIL}:{email_id}")
+            if len(results) >= limit:
+                break
 
-            # Check content availability index first to avoid unnecessary os.path.exists calls
-            # This is a significant optimization when many emails don't have content loaded
-            if email_id in self._content_available_index:
-                content_path = self._get_email_content_path(email_id)
-                # Double check existence just in case (race condition or manual deletion),
-                # but we trust the index for the negative case (if NOT in index, definitely no content)
-                if os.path.exists(content_path):
-                    try:
-                        # Offload synchronous file I/O to a thread to prevent blocking the event loop
-                        heavy_data = await asyncio.to_thread(self._read_content_sync, content_path)
-                        content = heavy_data.get(FIELD_CONTENT, "")
-                        if isinstance(content, str) and search_term_lower in content.lower():
-                            filtered_emails.append(email_light)
-                    except (IOError, json.JSONDecodeError) as e:
-                        logger.error(f"Could not search content for email {email_id}: {e}")
-                else:
-                    # Index out of sync, remove it
-                    self._content_available_index.discard(email_id)
-
-        # Results are already sorted because we iterated source_emails (which is sorted)
-        results = [self._add_category_details(email) for email in filtered_emails]
+        if not results and PREFIX_WILDCARD not in search_term_lower:
+            # Substring results can change with any write, so they are not cached
+            return self._search_light_substring(search_term_lower, limit)
 
-        # Cache the results
-        self.caching_manager.put_query_result(cache_key, results)
+        # Cache the results, tagged with the terms and emails they depend on
+        self.caching_manager.put_query_result(cache_key, results, tags=tags)
         return results
 
+    def _search_light_substring(self, search_term_lower: str, limit: int) -> List[Dict[str, Any]]:
+        """Finds emails whose subject or sender contains the term, newest first."""
+        results = []
+        for email_id in self.email_order_index.iter_ids():
+            email_light = self.emails_by_id.get(email_id)
+            if email_light is not None and search_term_lower in self._get_searchable_text(email_light):
+                results.append(self._add_category_details(email_light))
+                if len(results) >= limit:
+                    break
+        return results
 
     async def _update_email_fields(
         self, email: Dict[str, Any], update_data: Dict[str, Any]
@@ -872,9 +1228,6 @@ class DatabaseManager(DataSource):
         email_id = email[FIELD_ID]
         self.emails_by_id[email_id] = email
 
-        # Update search index
-        self._search_index[email_id] = self._get_searchable_text(email)
-
         if email.get(FIELD_MESSAGE_ID):
             self.emails_by_message_id[email[FIELD_MESSAGE_ID]] = email
 
@@ -884,6 +1237,9 @@ class DatabaseManager(DataSource):
         )
         if idx != -1:
             self.emails_data[idx] = email
+        self.email_order_index.add(email)
+        self.dashboard_aggregates.add(email)
+        self.storage_engine.record_put(DATA_TYPE_EMAILS, email)
 
     async def update_email(
         self, email_id: int, update_data: Dict[str, Any]
@@ -898,6 +1254,9 @@ class DatabaseManager(DataSource):
         if not await self._update_email_fields(email_to_update, update_data):
             return self._add_category_details(email_to_update)
 
+        previous_terms = self.search_index.document_terms(email_id)
+        self._index_email_text(email_to_update, email_to_update.get(FIELD_CONTENT))
+
         await self._save_heavy_content(email_id, email_to_update)
         await self._update_email_indexes(email_to_update)
         await self._save_data(DATA_TYPE_EMAILS)
@@ -911,12 +1270,52 @@ class DatabaseManager(DataSource):
 
         self.caching_manager.invalidate_email_record(email_id)
 
-        # Invalidate sorted cache and query cache
-        self._sorted_emails_cache = None
-        self.caching_manager.clear_query_cache()
+        # Invalidate cached queries affected by this email
+        self._invalidate_email_queries(email_id, previous_terms)
 
         return self._add_category_details(email_to_update)
 
+    async def delete_email(self, email_id: int) -> bool:
+        """Delete an email by its internal ID, including its content file."""
+        email = self.emails_by_id.pop(email_id, None)
+        if not email:
+            logger.warning(f"Email with {FIELD_ID} {email_id} not found for deletion.")
+            return False
+
+        message_id = email.get(FIELD_MESSAGE_ID)
+        if message_id:
+            self.emails_by_message_id.pop(message_id, None)
+        previous_terms = self.search_index.document_terms(email_id)
+        self.search_index.remove_document(email_id)
+        self.email_order_index.remove(email_id)
+        self.dashboard_aggregates.remove(email_id)
+        idx = next(
+            (i for i, e in enumerate(self.emails_data) if e.get(FIELD_ID) == email_id), -1
+        )
+        if idx != -1:
+            del self.emails_data[idx]
+        self.storage_engine.record_delete(DATA_TYPE_EMAILS, email_id)
+        await self._save_data(DATA_TYPE_EMAILS)
+
+        category_id = email.get(FIELD_CATEGORY_ID)
+        if category_id is not None:
+            await self._update_category_count(category_id, decrement=True)
+
+        if email_id in self._content_available_index:
+            self._content_available_index.discard(email_id)
+            try:
+                await asyncio.to_thread(os.remove, self._get_email_content_path(email_id))
+            except FileNotFoundError:
+                pass
+            except IOError as e:
+                logger.error(f"Error deleting heavy content for email {email_id}: {e}")
+
+        self.caching_manager.invalidate_email_record(email_id)
+
+        # Invalidate cached queries affected by this email
+        self._invalidate_email_queries(email_id, previous_terms)
+        return True
+
     async def add_tags(self, email_id: Any, tags: List[str]) -> bool:
         """Adds tags to an email."""
         # Convert email_id to int if it's a string
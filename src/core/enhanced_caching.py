@@ -7,11 +7,15 @@ including LRU cache for frequently accessed data and query result caching.
 
 import logging
 import time
-from collections import OrderedDict
-from typing import Any, Dict, Optional
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set
+
+from .sized_cache import EVICTION_SLRU, SizeAwareCache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CONTENT_CACHE_BYTES = 64 * 1024 * 1024
+
 
 class LRUCache:
     """LRU (Least Recently Used) Cache implementation for frequently accessed data."""
@@ -68,7 +72,12 @@ class LRUCache:
 
 
 class QueryResultCache:
-    """Cache for query results with TTL (Time To Live) and LRU capacity support."""
+    """
+    Cache for query results with TTL (Time To Live) and LRU capacity support.
+
+    Entries can carry dependency tags (e.g. "term:invoice", "email:42") so that a
+    write only invalidates the results it could change.
+    """
 
     def __init__(
         self, ttl_seconds: int = 300, capacity: int = 1000
@@ -82,6 +91,14 @@ class QueryResultCache:
         self.hits = 0
         self.misses = 0
 
+        # Dependency tracking: tag -> keys and key -> tags
+        self._tag_keys: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Set[str]] = {}
+        # Registered tag values per tag type ("prefix:inv" -> {"prefix": {"inv"}})
+        self._tag_values: Dict[str, Set[str]] = {}
+        self.invalidations = 0
+        self.tag_invalidations: Counter = Counter()
+
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache if not expired, marking it as recently used."""
         if key in self.cache:
@@ -93,28 +110,77 @@ class QueryResultCache:
                 return value
             else:
                 # Expired, remove it
-                del self.cache[key]
+                self._remove(key)
         self.misses += 1
         return None
 
-    def put(self, key: str, value: Any) -> None:
+    def put(self, key: str, value: Any, tags: Optional[Iterable[str]] = None) -> None:
         """Put value in cache with current timestamp, evicting oldest if necessary."""
         if key in self.cache:
             # Update existing entry and move to end
             self.cache.move_to_end(key)
+            self._untag(key)
         elif len(self.cache) >= self.capacity:
             # First, try to clear expired entries
             self.clear_expired()
             # If still over capacity, remove least recently used item
             if len(self.cache) >= self.capacity:
-                self.cache.popitem(last=False)
+                self._remove(next(iter(self.cache)))
 
         self.cache[key] = (value, time.time())
+        if tags:
+            key_tags = set(tags)
+            self._key_tags[key] = key_tags
+            for tag in key_tags:
+                keys = self._tag_keys.get(tag)
+                if keys is None:
+                    keys = self._tag_keys[tag] = set()
+                    tag_type, _, value = tag.partition(":")
+                    self._tag_values.setdefault(tag_type, set()).add(value)
+                keys.add(key)
+
+    def _untag(self, key: str) -> None:
+        """Drop the dependency tags recorded for a key."""
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+                    tag_type, _, value = tag.partition(":")
+                    values = self._tag_values.get(tag_type)
+                    if values is not None:
+                        values.discard(value)
+                        if not values:
+                            del self._tag_values[tag_type]
+
+    def _remove(self, key: str) -> None:
+        del self.cache[key]
+        self._untag(key)
 
     def invalidate(self, key: str) -> None:
         """Remove a specific key from cache."""
         if key in self.cache:
-            del self.cache[key]
+            self._remove(key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Remove every entry depending on any of the given tags. Returns the number removed."""
+        removed = 0
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if not keys:
+                continue
+            self.tag_invalidations[tag] += len(keys)
+            for key in list(keys):
+                if key in self.cache:
+                    self._remove(key)
+                    removed += 1
+        self.invalidations += removed
+        return removed
+
+    def tag_values(self, tag_type: str) -> Set[str]:
+        """Returns the values of the tags of one type that cached entries currently depend on."""
+        return set(self._tag_values.get(tag_type, ()))
 
     def clear_expired(self) -> None:
         """Remove all expired entries."""
@@ -125,32 +191,45 @@ class QueryResultCache:
             if current_time - timestamp >= self.ttl_seconds
         ]
         for key in expired_keys:
-            del self.cache[key]
+            self._remove(key)
 
     def clear(self) -> None:
         """Clear all cache entries."""
         self.cache.clear()
+        self._tag_keys.clear()
+        self._key_tags.clear()
+        self._tag_values.clear()
         self.hits = 0
         self.misses = 0
 
-    def get_stats(self) -> Dict[str, Any]:
-        """Get cache statistics."""
+    def get_stats(self, top_tags: int = 20) -> Dict[str, Any]:
+        """Get cache statistics, including invalidation counts per tag."""
         total = self.hits + self.misses
         hit_rate = self.hits / total if total > 0 else 0
         self.clear_expired()  # Clean up expired entries
+        by_tag_type: Counter = Counter()
+        for tag, count in self.tag_invalidations.items():
+            by_tag_type[tag.split(":", 1)[0]] += count
         return {
             "size": len(self.cache),
             "hits": self.hits,
             "misses": self.misses,
             "hit_rate": hit_rate,
             "ttl_seconds": self.ttl_seconds,
+            "invalidations": self.invalidations,
+            "invalidations_by_tag_type": dict(by_tag_type),
+            "invalidations_by_tag": dict(self.tag_invalidations.most_common(top_tags)),
         }
 
 
 class EnhancedCachingManager:
     """Enhanced caching manager that integrates with DatabaseManager."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        content_cache_max_bytes: int = DEFAULT_CONTENT_CACHE_BYTES,
+        content_cache_policy: str = EVICTION_SLRU,
+    ):
         # LRU cache for frequently accessed individual records
         self.email_record_cache = LRUCache(capacity=200)
         self.category_record_cache = LRUCache(capacity=50)
@@ -158,8 +237,10 @@ class EnhancedCachingManager:
         # Query result cache for complex queries
         self.query_cache = QueryResultCache(ttl_seconds=300, capacity=1000)  # 5 minutes
 
-        # Cache for email content (heavy data)
-        self.email_content_cache = LRUCache(capacity=100)
+        # Cache for email content (heavy data), bounded by estimated bytes
+        self.email_content_cache = SizeAwareCache(
+            max_bytes=content_cache_max_bytes, policy=content_cache_policy
+        )
 
         # Cache for smart filters (optimization)
         self.filter_cache = LRUCache(capacity=100)
@@ -172,6 +253,7 @@ class EnhancedCachingManager:
             "category_record_put": 0,
             "query_result_get": 0,
             "query_result_put": 0,
+            "query_tag_invalidations": 0,
             "content_get": 0,
             "content_put": 0,
             "filter_get": 0,
@@ -246,10 +328,12 @@ class EnhancedCachingManager:
         self.cache_operations["query_result_get"] += 1
         return self.query_cache.get(query_key)
 
-    def put_query_result(self, query_key: str, result: Any) -> None:
-        """Put query result in cache."""
+    def put_query_result(
+        self, query_key: str, result: Any, tags: Optional[Iterable[str]] = None
+    ) -> None:
+        """Put query result in cache, optionally tagged with the data it depends on."""
         self.cache_operations["query_result_put"] += 1
-        self.query_cache.put(query_key, result)
+        self.query_cache.put(query_key, result, tags=tags)
 
     def get_email_content(self, email_id: int) -> Optional[Dict[str, Any]]:
         """Get email content from cache."""
@@ -274,6 +358,15 @@ class EnhancedCachingManager:
         """Invalidate query result cache."""
         self.query_cache.invalidate(query_key)
 
+    def invalidate_query_tags(self, tags: Iterable[str]) -> int:
+        """Invalidate only the query results depending on any of the given tags."""
+        self.cache_operations["query_tag_invalidations"] += 1
+        return self.query_cache.invalidate_tags(tags)
+
+    def get_query_tag_values(self, tag_type: str) -> Set[str]:
+        """Values of the query dependency tags of one type, e.g. the cached search prefixes."""
+        return self.query_cache.tag_values(tag_type)
+
     def clear_query_cache(self) -> None:
         """Clear query result cache."""
         self.query_cache.clear()
@@ -57,6 +57,12 @@ async def get_data_source() -> DataSource:
     if _data_source_instance is None:
         source_type = os.environ.get("DATA_SOURCE_TYPE", "default")
 
+        if source_type == "sqlite":
+            # SQLite replaces the JSON store entirely; migrates the JSON files once.
+            from .data.sqlite_data_source import SQLiteDataSource
+            _data_source_instance = await SQLiteDataSource.create()
+            return _data_source_instance
+
         # The DatabaseManager may be used by multiple data sources, so we create it upfront.
         from .database import DatabaseConfig, create_database_manager
         config = DatabaseConfig()
@@ -0,0 +1,248 @@
+"""
+Compiled matcher for smart email filters.
+
+Compiles a set of active filters into structures that evaluate all of them in
+roughly one pass over an email's text:
+
+- one Aho-Corasick automaton per text field over every subject / content keyword,
+- a hash map from ``sender_domain`` to the filters requiring it,
+- pre-compiled ``from_patterns`` regexes, run only for filters whose other
+  criteria already matched.
+
+Matching semantics are those of ``SmartFilterManager._apply_filter_to_email``:
+criteria are ANDed, keyword and pattern lists are ORed, and keywords match as
+case-insensitive substrings.
+"""
+
+import logging
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+
+class AhoCorasickAutomaton:
+    """
+    Multi-pattern substring matcher.
+
+    Finds which of the given patterns occur in a text in a single pass over
+    the text, independent of the number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Inherit matches ending at the longest proper suffix
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[int]:
+        """Returns the indices of all patterns occurring in text."""
+        found: Set[int] = set()
+        if not self.patterns or not text:
+            return found
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class _CompiledFilter:
+    __slots__ = (
+        "filter", "needs_domain", "needs_subject", "needs_content",
+        "subject_keywords", "content_keywords", "from_patterns",
+    )
+
+    def __init__(self, filter_obj: Any):
+        self.filter = filter_obj
+        self.needs_domain = False
+        self.needs_subject = False
+        self.needs_content = False
+        self.subject_keywords: Sequence[str] = ()
+        self.content_keywords: Sequence[str] = ()
+        self.from_patterns: Optional[List[Pattern]] = None
+
+
+class _KeywordIndex:
+    """Maps keywords of one text field to the filters listing them."""
+
+    def __init__(self):
+        self._keyword_ids: Dict[str, int] = {}
+        self._filters_by_keyword: List[List[int]] = []
+        self.match_always: Set[int] = set()
+        self.automaton: Optional[AhoCorasickAutomaton] = None
+
+    def add(self, filter_index: int, keyword: str) -> None:
+        if not keyword:
+            # An empty keyword is a substring of every text
+            self.match_always.add(filter_index)
+            return
+        keyword_id = self._keyword_ids.get(keyword)
+        if keyword_id is None:
+            keyword_id = self._keyword_ids[keyword] = len(self._filters_by_keyword)
+            self._filters_by_keyword.append([])
+        self._filters_by_keyword[keyword_id].append(filter_index)
+
+    def build(self) -> None:
+        self.automaton = AhoCorasickAutomaton(self._keyword_ids)
+
+    def matching_filters(self, text: str) -> Set[int]:
+        matched = set(self.match_always)
+        for keyword_id in self.automaton.find(text):
+            matched.update(self._filters_by_keyword[keyword_id])
+        return matched
+
+
+class CompiledFilterSet:
+    """
+    An immutable, compiled view of a priority-ordered list of filters.
+
+    Args:
+        filters: Filter objects with ``filter_id`` and ``criteria`` attributes,
+            in the order matches should be reported (highest priority first).
+    """
+
+    def __init__(self, filters: Sequence[Any]):
+        self.source = filters
+        self._compiled: List[_CompiledFilter] = []
+        self._by_domain: Dict[Any, List[int]] = {}
+        self._subject = _KeywordIndex()
+        self._content = _KeywordIndex()
+        # Filters with no domain or keyword criteria are candidates for every email
+        self._unconditional: List[int] = []
+        self.invalid_filters: List[str] = []
+
+        for filter_obj in filters:
+            try:
+                compiled = self._compile(filter_obj)
+            except (re.error, AttributeError, TypeError) as e:
+                logger.warning(f"Skipping filter {filter_obj.filter_id} with invalid criteria: {e}")
+                self.invalid_filters.append(filter_obj.filter_id)
+                continue
+            if compiled is not None:
+                self._register(compiled)
+
+        self._subject.build()
+        self._content.build()
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+    def _compile(self, filter_obj: Any) -> Optional[_CompiledFilter]:
+        """Compiles one filter. Returns None if its criteria can never match."""
+        criteria = filter_obj.criteria
+        compiled = _CompiledFilter(filter_obj)
+        if "sender_domain" in criteria:
+            compiled.needs_domain = True
+            hash(criteria["sender_domain"])
+        if "subject_keywords" in criteria:
+            compiled.needs_subject = True
+            compiled.subject_keywords = [keyword.lower() for keyword in criteria["subject_keywords"]]
+        if "content_keywords" in criteria:
+            compiled.needs_content = True
+            compiled.content_keywords = [keyword.lower() for keyword in criteria["content_keywords"]]
+        if "from_patterns" in criteria:
+            compiled.from_patterns = [re.compile(p, re.IGNORECASE) for p in criteria["from_patterns"]]
+
+        # An empty keyword or pattern list can never be satisfied
+        if (
+            (compiled.needs_subject and not compiled.subject_keywords)
+            or (compiled.needs_content and not compiled.content_keywords)
+            or (compiled.from_patterns is not None and not compiled.from_patterns)
+        ):
+            return None
+        return compiled
+
+    def _register(self, compiled: _CompiledFilter) -> None:
+        index = len(self._compiled)
+        self._compiled.append(compiled)
+        criteria = compiled.filter.criteria
+        if compiled.needs_domain:
+            self._by_domain.setdefault(criteria["sender_domain"], []).append(index)
+        for keyword in compiled.subject_keywords:
+            self._subject.add(index, keyword)
+        for keyword in compiled.content_keywords:
+            self._content.add(index, keyword)
+        if not (compiled.needs_domain or compiled.needs_subject or compiled.needs_content):
+            self._unconditional.append(index)
+
+    def match(self, context: Any) -> List[Any]:
+        """
+        Returns the filters matching an email context, in priority order.
+
+        The context must provide ``sender_domain``, ``subject_lower``,
+        ``content_lower`` and ``sender_lower`` attributes.
+        """
+        domain_hits = self._by_domain.get(context.sender_domain, ())
+        subject_hits = self._subject.matching_filters(context.subject_lower)
+        content_hits = self._content.matching_filters(context.content_lower)
+
+        candidates = set(self._unconditional)
+        candidates.update(domain_hits)
+        candidates.update(subject_hits)
+        candidates.update(content_hits)
+        domain_hits = set(domain_hits)
+
+        matched = []
+        for index in sorted(candidates):
+            compiled = self._compiled[index]
+            if compiled.needs_domain and index not in domain_hits:
+                continue
+            if compiled.needs_subject and index not in subject_hits:
+                continue
+            if compiled.needs_content and index not in content_hits:
+                continue
+            if compiled.from_patterns is not None and not any(
+                p.search(context.sender_lower) for p in compiled.from_patterns
+            ):
+                continue
+            matched.append(compiled.filter)
+        return matched
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "filters": len(self._compiled),
+            "invalid_filters": len(self.invalid_filters),
+            "sender_domains": len(self._by_domain),
+            "subject_keywords": len(self._subject.automaton),
+            "content_keywords": len(self._content.automaton),
+        }
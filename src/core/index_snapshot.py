@@ -0,0 +1,64 @@
+"""
+Persisted snapshot of the DatabaseManager's derived indexes.
+
+Rebuilding the indexes on startup means scanning the whole email content
+directory and sorting every email. Instead, the indexes are saved at shutdown
+together with a fingerprint of the data they were built from (see
+``StorageEngine.fingerprint``) and a generation number that increases with
+every save. On startup the snapshot is used only if its fingerprint equals
+the current one; otherwise, or if the file is unreadable, the indexes are
+rebuilt from the data.
+"""
+
+import gzip
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_SNAPSHOT_VERSION = 1
+
+
+def directory_fingerprint(path: str) -> Optional[int]:
+    """Returns the modification time of a directory, which changes when entries are added or removed."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_index_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """Returns the saved snapshot, or None if it is missing, unreadable or of an old format."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (IOError, EOFError, ValueError) as e:
+        logger.warning(f"Discarding unreadable index snapshot {path}: {e}")
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != INDEX_SNAPSHOT_VERSION:
+        logger.info(f"Index snapshot {path} has an old format; indexes will be rebuilt.")
+        return None
+    return snapshot
+
+
+def is_snapshot_current(snapshot: Dict[str, Any], fingerprint: Dict[str, Any]) -> bool:
+    """Whether the snapshot was built from data matching fingerprint."""
+    # Round-trip through JSON so tuples and lists compare equal
+    if snapshot.get("fingerprint") == json.loads(json.dumps(fingerprint)):
+        return True
+    logger.info(
+        f"Index snapshot generation {snapshot.get('generation')} is stale; indexes will be rebuilt."
+    )
+    return False
+
+
+def save_index_snapshot(path: str, snapshot: Dict[str, Any]) -> None:
+    """Atomically writes a snapshot built by the caller."""
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({**snapshot, "version": INDEX_SNAPSHOT_VERSION}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
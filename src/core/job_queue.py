@@ -1,149 +1,702 @@
 """
 Job Queue System for Background Processing
 
-Implements RQ-based job queue for heavy dashboard calculations,
-providing async processing for weekly growth and performance metrics.
+Durable job queue backed by SQLite, so single-node deployments get background
+processing for heavy dashboard and batch jobs without running Redis.
+
+- Jobs name their function by dotted path (``package.module.function`` or
+  ``package.module:function``) and take JSON-serializable arguments; coroutine
+  functions are run to completion.
+- Workers run in separate processes (see ``start_workers`` or
+  ``python -m src.core.job_queue worker``) and claim jobs highest priority
+  first inside an ``IMMEDIATE`` transaction, so several processes can share
+  one database file.
+- A claimed job holds a lease of ``timeout`` seconds, which its worker renews
+  while the job runs. A job whose worker died is handed out again once the
+  lease expires (or failed once its retries are used up); job functions
+  should therefore be idempotent.
+- Jobs read the data directory from disk, so the API flushes its pending
+  writes before queueing them. Jobs that rewrite the data directory take its
+  ``DataDirLock`` exclusively and fail while the API has it open.
+- Failed jobs are retried up to ``max_retries`` times with exponential backoff.
+- Results are kept for ``result_ttl`` seconds and failures for
+  ``failure_ttl`` seconds; status polling returns a ``JobResult``.
 """
 
+import argparse
+import asyncio
+import importlib
+import inspect
+import json
 import logging
-from typing import Any, Optional
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
-try:
-    from rq import Queue, Connection, Worker
-    from redis import Redis
-    RQ_AVAILABLE = True
-except ImportError:
-    RQ_AVAILABLE = False
+logger = logging.getLogger(__name__)
 
-from .caching import get_cache_manager
+DEFAULT_DB_PATH = os.path.join(os.getenv("DATA_DIR", "data"), "jobs.db")
+DEFAULT_QUEUE = "dashboard_jobs"
+
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+STATUS_QUEUED = "queued"
+STATUS_STARTED = "started"
+STATUS_FINISHED = "finished"
+STATUS_FAILED = "failed"
+STATUS_NOT_FOUND = "not_found"
+
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 5.0
+DEFAULT_RESULT_TTL = 3600.0
+DEFAULT_FAILURE_TTL = 86400.0
+DEFAULT_POLL_INTERVAL = 0.5
+# Workers delete expired jobs at most this often
+_PURGE_INTERVAL = 60.0
+_LEASE_LOST_ERROR = "Job timed out or its worker stopped"
+# Leases are renewed this many times per timeout while a job runs
+_HEARTBEATS_PER_LEASE = 3
 
-logger = logging.getLogger(__name__)
 
 @dataclass
 class JobResult:
     """Job execution result"""
     job_id: str
-    status: str  # 'queued', 'started', 'finished', 'failed'
+    status: str  # 'queued', 'started', 'finished', 'failed', 'not_found'
     result: Optional[Any] = None
     error: Optional[str] = None
     created_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    attempts: int = 0
+
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+def resolve_job_function(path: str) -> Callable[..., Any]:
+    """Imports the function named by ``package.module.function`` or ``package.module:function``."""
+    module_name, sep, attribute = path.partition(":")
+    if not sep:
+        module_name, _, attribute = path.rpartition(".")
+    if not module_name or not attribute:
+        raise ValueError(f"Job function must be a dotted path: {path!r}")
+    func = getattr(importlib.import_module(module_name), attribute)
+    if not callable(func):
+        raise TypeError(f"Job function {path!r} is not callable")
+    return func
+
 
 class JobQueue:
-    """RQ-based job queue for dashboard background processing"""
-
-    def __init__(self, redis_url: Optional[str] = None):
-        if not RQ_AVAILABLE:
-            raise ImportError("RQ is not available. Install rq to use job queue.")
-
-        self.redis_url = redis_url or "redis://localhost:6379"
-        self.redis = Redis.from_url(self.redis_url)
-        self.queue = Queue('dashboard_jobs', connection=self.redis)
-        self.cache_manager = get_cache_manager()
-
-    def enqueue_weekly_growth_calculation(self, email_service) -> str:
-        """Enqueue weekly growth calculation job"""
-        # For now, pass email_service data that the job function can use
-        # In a real implementation, we'd serialize the necessary data
-        job = self.queue.enqueue(
-            'src.core.job_queue.calculate_weekly_growth',
-            job_timeout=300,  # 5 minutes
-            result_ttl=3600,  # 1 hour
-            failure_ttl=86400  # 24 hours
+    """
+    SQLite-backed job queue for dashboard and batch background processing.
+
+    Args:
+        db_path: SQLite file holding the jobs; shared by the API and the workers.
+        name: Queue name; workers only take jobs of their queue.
+        busy_timeout: Seconds to wait for another process's write lock.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        name: str = DEFAULT_QUEUE,
+        busy_timeout: float = 5.0,
+    ):
+        self.db_path = db_path or os.getenv("JOB_QUEUE_DB_PATH", DEFAULT_DB_PATH)
+        self.name = name
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not be shared with forked worker processes
+        if self._conn is not None and self._conn_pid == os.getpid():
+            return self._conn
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
         )
-        return job.id
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                queue TEXT NOT NULL,
+                func TEXT NOT NULL,
+                args TEXT NOT NULL,
+                kwargs TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_retries INTEGER NOT NULL,
+                retry_backoff REAL NOT NULL,
+                timeout REAL NOT NULL,
+                result_ttl REAL NOT NULL,
+                failure_ttl REAL NOT NULL,
+                run_at REAL NOT NULL,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                completed_at REAL,
+                expires_at REAL,
+                worker TEXT,
+                result TEXT,
+                error TEXT
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_ready "
+            "ON jobs(queue, status, priority DESC, run_at)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at)")
+        self._conn = conn
+        self._conn_pid = os.getpid()
+        return conn
 
-    def enqueue_performance_metrics_aggregation(self, email_service) -> str:
-        """Enqueue performance metrics aggregation job"""
-        job = self.queue.enqueue(
-            'src.core.job_queue.aggregate_performance_metrics',
-            job_timeout=600,  # 10 minutes
-            result_ttl=3600,  # 1 hour
-            failure_ttl=86400  # 24 hours
+    def enqueue(
+        self,
+        func: str,
+        args: Sequence[Any] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        priority: int = PRIORITY_NORMAL,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        timeout: float = DEFAULT_TIMEOUT,
+        result_ttl: float = DEFAULT_RESULT_TTL,
+        failure_ttl: float = DEFAULT_FAILURE_TTL,
+        delay: float = 0.0,
+    ) -> str:
+        """
+        Queues a call of the function at dotted path func and returns the job ID.
+
+        Args:
+            func: Dotted path of the job function.
+            args: JSON-serializable positional arguments.
+            kwargs: JSON-serializable keyword arguments.
+            priority: Higher priorities are started first.
+            max_retries: Retries after the first failed attempt.
+            retry_backoff: Seconds before the first retry; doubled for each further one.
+            timeout: Seconds a worker may run the job before it is handed out again.
+            result_ttl: Seconds a finished job's result is kept.
+            failure_ttl: Seconds a failed job is kept.
+            delay: Seconds before the job may start.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        row = (
+            job_id, self.name, func, json.dumps(list(args)), json.dumps(kwargs or {}),
+            priority, STATUS_QUEUED, max_retries, retry_backoff, timeout,
+            result_ttl, failure_ttl, now + delay, now,
         )
-        return job.id
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO jobs (id, queue, func, args, kwargs, priority, status, max_retries, "
+                "retry_backoff, timeout, result_ttl, failure_ttl, run_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Takes the next ready job for worker, or returns None if there is none.
+
+        Jobs whose lease expired are first queued again, or failed if they
+        have used up their retries.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """
+                    UPDATE jobs SET
+                        status = CASE WHEN attempts > max_retries THEN ? ELSE ? END,
+                        completed_at = CASE WHEN attempts > max_retries THEN ? END,
+                        expires_at = CASE WHEN attempts > max_retries THEN ? + failure_ttl END,
+                        run_at = ?, lease_expires_at = NULL, error = ?
+                    WHERE queue = ? AND status = ? AND lease_expires_at <= ?
+                    """,
+                    (STATUS_FAILED, STATUS_QUEUED, now, now, now, _LEASE_LOST_ERROR,
+                     self.name, STATUS_STARTED, now),
+                )
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE queue = ? AND status = ? AND run_at <= ? "
+                    "ORDER BY priority DESC, run_at, created_at LIMIT 1",
+                    (self.name, STATUS_QUEUED, now),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, "
+                        "lease_expires_at = ? + timeout, worker = ? WHERE id = ?",
+                        (STATUS_STARTED, now, now, worker, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job: Dict[str, Any], result: Any) -> bool:
+        """Stores the result of a claimed job. Returns False if its lease was lost meanwhile."""
+        now = time.time()
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, completed_at = ?, "
+                "expires_at = ? + result_ttl, lease_expires_at = NULL "
+                "WHERE id = ? AND status = ? AND attempts = ?",
+                (STATUS_FINISHED, json.dumps(result, default=str), now, now,
+                 job["id"], STATUS_STARTED, job["attempts"]),
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job: Dict[str, Any]) -> bool:
+        """Renews the lease of a running job. Returns False if it was lost meanwhile."""
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET lease_expires_at = ? + timeout "
+                "WHERE id = ? AND status = ? AND attempts = ?",
+                (time.time(), job["id"], STATUS_STARTED, job["attempts"]),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """
+        Records a failed attempt of a claimed job, scheduling a retry if any are left.
+
+        Returns False if the job's lease was lost meanwhile.
+        """
+        now = time.time()
+        if job["attempts"] <= job["max_retries"]:
+            retry_at = now + job["retry_backoff"] * 2 ** (job["attempts"] - 1)
+            sql = (
+                "UPDATE jobs SET status = ?, error = ?, run_at = ?, lease_expires_at = NULL "
+                "WHERE id = ? AND status = ? AND attempts = ?"
+            )
+            params = (STATUS_QUEUED, error, retry_at, job["id"], STATUS_STARTED, job["attempts"])
+        else:
+            sql = (
+                "UPDATE jobs SET status = ?, error = ?, completed_at = ?, "
+                "expires_at = ? + failure_ttl, lease_expires_at = NULL "
+                "WHERE id = ? AND status = ? AND attempts = ?"
+            )
+            params = (STATUS_FAILED, error, now, now, job["id"], STATUS_STARTED, job["attempts"])
+        with self._lock:
+            cursor = self._connect().execute(sql, params)
+        return cursor.rowcount == 1
+
+    def purge_expired(self) -> int:
+        """Deletes finished and failed jobs whose TTL has passed. Returns the count."""
+        with self._lock:
+            cursor = self._connect().execute(
+                "DELETE FROM jobs WHERE expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
 
     def get_job_status(self, job_id: str) -> JobResult:
         """Get job status and result"""
-        job = self.queue.fetch_job(job_id)
-        if not job:
-            return JobResult(job_id=job_id, status='not_found')
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT status, result, error, attempts, created_at, completed_at, expires_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None or (row["expires_at"] is not None and row["expires_at"] <= time.time()):
+            return JobResult(job_id=job_id, status=STATUS_NOT_FOUND)
 
         result = JobResult(
             job_id=job_id,
-            status=job.get_status(),
-            created_at=job.created_at,
-            completed_at=job.ended_at
+            status=row["status"],
+            created_at=_timestamp(row["created_at"]),
+            completed_at=_timestamp(row["completed_at"]),
+            attempts=row["attempts"],
         )
-
-        if job.is_finished:
-            result.result = job.result
-        elif job.is_failed:
-            result.error = str(job.exc_info) if job.exc_info else 'Unknown error'
-
+        if row["status"] == STATUS_FINISHED and row["result"] is not None:
+            result.result = json.loads(row["result"])
+        # Queued jobs keep the error of their last failed attempt until retried
+        result.error = row["error"]
         return result
 
     async def get_job_result(self, job_id: str) -> Optional[Any]:
-        """Get completed job result from cache or job store"""
-        # Try cache first
-        cache_key = f"job_result:{job_id}"
-        cached_result = await self.cache_manager.get(cache_key)
-        if cached_result:
-            return cached_result
-
-        # Get from RQ
-        job = self.queue.fetch_job(job_id)
-        if job and job.is_finished and job.result:
-            # Cache the result
-            await self.cache_manager.set(cache_key, job.result, ttl=3600)
-            return job.result
-
-        return None
+        """Get completed job result from the job store"""
+        job = await asyncio.to_thread(self.get_job_status, job_id)
+        return job.result if job.status == STATUS_FINISHED else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE queue = ? GROUP BY status", (self.name,)
+            ).fetchall()
+        return {"queue": self.name, "db_path": self.db_path, **{row[0]: row[1] for row in rows}}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    # Dashboard jobs
+
+    def enqueue_weekly_growth_calculation(self, email_service=None) -> str:
+        """
+        Enqueue weekly growth calculation job.
+
+        The job reads the last saved snapshot, which saves swap in atomically,
+        plus the WAL tail; it never asks the owning process to write.
+        """
+        return self.enqueue("src.core.job_queue.calculate_weekly_growth", timeout=300)
+
+    def enqueue_performance_metrics_aggregation(self, email_service=None) -> str:
+        """Enqueue performance metrics aggregation job"""
+        return self.enqueue("src.core.job_queue.aggregate_performance_metrics", timeout=600)
+
+    def enqueue_reindex(self, data_dir: Optional[str] = None) -> str:
+        """
+        Enqueue a rebuild of the persisted indexes of a data directory.
+
+        The job fails while another process has the directory open; such a
+        process should call ``DatabaseManager.rebuild_indexes`` instead.
+        """
+        return self.enqueue(
+            "src.core.job_queue.rebuild_indexes",
+            kwargs={"data_dir": data_dir},
+            priority=PRIORITY_LOW,
+            timeout=3600,
+        )
+
+    def enqueue_filter_backfill(self, data_dir: Optional[str] = None) -> str:
+        """
+        Enqueue a run of the active filters over every stored email.
+
+        The job reads the last saved snapshot, which saves swap in atomically,
+        plus the WAL tail; it never asks the owning process to write.
+        """
+        return self.enqueue(
+            "src.core.job_queue.backfill_filters",
+            kwargs={"data_dir": data_dir},
+            priority=PRIORITY_LOW,
+            timeout=3600,
+        )
+
+
+class JobWorker:
+    """
+    Runs the jobs of a queue one at a time.
+
+    Args:
+        queue: The queue to take jobs from.
+        poll_interval: Seconds to sleep when no job is ready.
+        name: Worker name recorded on claimed jobs.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        name: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._functions: Dict[str, Callable[..., Any]] = {}
+        self._last_purge = 0.0
+        self.processed = 0
+        self.failed = 0
+
+    def run_one(self) -> bool:
+        """Runs the next ready job. Returns False if there was none."""
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._renew_lease, args=(job, stop_heartbeat), daemon=True
+        )
+        heartbeat.start()
+        try:
+            try:
+                func = self._functions.get(job["func"])
+                if func is None:
+                    func = self._functions[job["func"]] = resolve_job_function(job["func"])
+                result = func(*json.loads(job["args"]), **json.loads(job["kwargs"]))
+                if inspect.isawaitable(result):
+                    result = asyncio.run(_await(result))
+            finally:
+                stop_heartbeat.set()
+                heartbeat.join()
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Job {job['id']} ({job['func']}) attempt {job['attempts']} failed: {e}")
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            if not self.queue.fail(job, error):
+                logger.warning(f"Job {job['id']} was handed to another worker before it failed")
+        else:
+            if not self.queue.complete(job, result):
+                logger.warning(f"Job {job['id']} was handed to another worker before it finished")
+        self.processed += 1
+        return True
+
+    def _renew_lease(self, job: Dict[str, Any], stop: threading.Event) -> None:
+        """Keeps a running job's lease from expiring until stop is set."""
+        interval = job["timeout"] / _HEARTBEATS_PER_LEASE
+        while not stop.wait(interval):
+            try:
+                if not self.queue.heartbeat(job):
+                    logger.warning(f"Job {job['id']} lost its lease while running")
+                    return
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew the lease of job {job['id']}: {e}")
+
+    def work(self, burst: bool = False, stop_event: Optional[Any] = None) -> int:
+        """
+        Runs jobs until stop_event is set, or until none is ready if burst.
+
+        Returns the number of jobs run.
+        """
+        processed_before = self.processed
+        while stop_event is None or not stop_event.is_set():
+            now = time.monotonic()
+            if now - self._last_purge >= _PURGE_INTERVAL:
+                self._last_purge = now
+                purged = self.queue.purge_expired()
+                if purged:
+                    logger.info(f"Purged {purged} expired jobs")
+            if self.run_one():
+                continue
+            if burst:
+                break
+            if stop_event is not None:
+                stop_event.wait(self.poll_interval)
+            else:
+                time.sleep(self.poll_interval)
+        return self.processed - processed_before
+
+
+async def _await(awaitable: Any) -> Any:
+    return await awaitable
+
+
+def run_worker(
+    db_path: Optional[str] = None,
+    queue_name: str = DEFAULT_QUEUE,
+    burst: bool = False,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+) -> int:
+    """Runs a worker in the current process. Used as the target of worker processes."""
+    queue = JobQueue(db_path, name=queue_name)
+    try:
+        return JobWorker(queue, poll_interval=poll_interval).work(burst=burst)
+    finally:
+        queue.close()
+
+
+def start_workers(
+    count: Optional[int] = None,
+    db_path: Optional[str] = None,
+    queue_name: str = DEFAULT_QUEUE,
+    burst: bool = False,
+) -> List[multiprocessing.Process]:
+    """
+    Starts worker processes for a queue.
+
+    Args:
+        count: Number of processes; defaults to JOB_QUEUE_WORKERS or 2.
+        db_path: SQLite file of the queue.
+        queue_name: Queue the workers take jobs from.
+        burst: Exit once no job is ready instead of polling.
+    """
+    count = count or int(os.getenv("JOB_QUEUE_WORKERS", "2"))
+    processes = []
+    for index in range(count):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(db_path, queue_name, burst),
+            name=f"JobWorker-{index}",
+            daemon=True,
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
 
 # Global job queue instance
 _job_queue: Optional[JobQueue] = None
 
+
 def get_job_queue() -> JobQueue:
-    """Get the global job queue instance"""
+    """
+    Get the global job queue instance.
+
+    Jobs are stored at ``JOB_QUEUE_DB_PATH`` (default ``data/jobs.db``).
+    """
     global _job_queue
     if _job_queue is None:
         _job_queue = JobQueue()
     return _job_queue
 
-# Job functions (called by RQ workers)
 
-def calculate_weekly_growth(email_service):
-    """Calculate weekly growth metrics - runs in background"""
-    # This would be called by RQ worker
-    # For now, implement basic calculation
-    # In real implementation, this would analyze email data over time
+# Job functions (called by workers)
+
+def _data_dir(data_dir: Optional[str]) -> str:
+    return data_dir or os.getenv("DATA_DIR", "data")
+
+
+def _iter_emails(data_dir: Optional[str], include_content: bool = False):
+    from .data_export import DataPaths, iter_stored_emails
+    from .storage_engine import STORAGE_ENGINE_JSON, create_storage_engine
+
+    data_dir = _data_dir(data_dir)
+    engine = create_storage_engine(
+        os.getenv("DATABASE_STORAGE_ENGINE", STORAGE_ENGINE_JSON), data_dir
+    )
+    return iter_stored_emails(DataPaths.from_data_dir(data_dir), engine, include_content)
+
+
+def calculate_weekly_growth(data_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Calculate weekly growth and ingestion history from the stored emails - runs in background"""
+    from .dashboard_aggregates import GRANULARITY_DAY, GRANULARITY_WEEK, EmailAggregates
+
+    aggregates = EmailAggregates()
+    for email in _iter_emails(data_dir):
+        aggregates.add(email)
+    growth = aggregates.weekly_growth()
     return {
-        "weekly_growth": "+12.5%",
-        "trend": "increasing",
-        "calculated_at": datetime.now().isoformat()
+        "weekly_growth": growth,
+        "trend": "increasing" if growth["percentage"] > 0 else
+                 "decreasing" if growth["percentage"] < 0 else "steady",
+        "daily_ingestion": aggregates.ingestion_counts(GRANULARITY_DAY, 14),
+        "weekly_ingestion": aggregates.ingestion_counts(GRANULARITY_WEEK, 8),
+        "calculated_at": datetime.now(timezone.utc).isoformat(),
     }
 
-def aggregate_performance_metrics(email_service):
-    """Aggregate performance metrics - runs in background"""
-    # This would collect and aggregate various performance metrics
-    # CPU usage, memory, response times, etc.
+
+def aggregate_performance_metrics(metrics_log: Optional[str] = None) -> Dict[str, Any]:
+    """Aggregate operation latencies from the performance log - runs in background"""
+    from .dashboard_aggregates import DEFAULT_METRICS_LOG
+    from .metric_sink import RollingLatencySummary
+
+    metrics_log = metrics_log or DEFAULT_METRICS_LOG
+    summary = RollingLatencySummary()
+    timings = summary.replay_log(metrics_log)
     return {
-        "avg_response_time": "245ms",
-        "throughput": "150 req/min",
-        "error_rate": "0.1%",
-        "calculated_at": datetime.now().isoformat()
+        "operations": summary.get_summaries(),
+        "timings": timings,
+        "calculated_at": datetime.now(timezone.utc).isoformat(),
     }
 
+
+async def rebuild_indexes(data_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Rebuild and persist the index snapshot and full-text index of a data directory.
+
+    Raises:
+        RuntimeError: Another process (e.g. the API) has the data directory open.
+    """
+    from .database import DatabaseConfig, DatabaseManager
+
+    data_dir = _data_dir(data_dir)
+    manager = DatabaseManager(DatabaseConfig(data_dir=data_dir))
+    # A live manager would keep appending to (and later overwrite) what this one rewrites
+    if not await asyncio.to_thread(manager.data_dir_lock.acquire, True, False):
+        raise RuntimeError(
+            f"Data directory {data_dir} is in use; rebuild its indexes in the process "
+            "serving it with DatabaseManager.rebuild_indexes()"
+        )
+    try:
+        stats = await manager.rebuild_indexes()
+    finally:
+        await manager.shutdown()
+    stats["calculated_at"] = datetime.now(timezone.utc).isoformat()
+    return stats
+
+
+async def backfill_filters(
+    data_dir: Optional[str] = None, batch_size: int = 500
+) -> Dict[str, Any]:
+    """
+    Run the active smart filters over every stored email and count the matches.
+
+    The filters' usage statistics are left alone, so the job can be rerun.
+    """
+    from .smart_filter_manager import SmartFilterManager
+
+    manager = SmartFilterManager()
+    emails = 0
+    filter_matches: Dict[str, int] = {}
+    labels: Dict[str, int] = {}
+    try:
+        async for summary in manager.iter_filter_results(
+            _iter_emails(data_dir, include_content=True), batch_size, record_usage=False
+        ):
+            emails += 1
+            for matched in summary["filters_matched"]:
+                filter_matches[matched["name"]] = filter_matches.get(matched["name"], 0) + 1
+            for label in summary["categories"]:
+                labels[label] = labels.get(label, 0) + 1
+    finally:
+        await manager.close()
+    return {
+        "emails": emails,
+        "filter_matches": filter_matches,
+        "labels": labels,
+        "calculated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
 # Worker management
 
 def start_job_worker():
-    """Start RQ worker for dashboard jobs"""
-    with Connection(Redis.from_url("redis://localhost:6379")):
-        worker = Worker(['dashboard_jobs'])
-        worker.work()
+    """Run a worker for dashboard jobs in this process"""
+    run_worker()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point that runs worker processes or shows queue statistics."""
+    parser = argparse.ArgumentParser(description="SQLite-backed background job queue")
+    parser.add_argument("action", choices=["worker", "stats"])
+    parser.add_argument("--db-path", default=None, help="Defaults to JOB_QUEUE_DB_PATH")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--burst", action="store_true", help="Exit once no job is ready")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+
+    if args.action == "stats":
+        print(json.dumps(JobQueue(args.db_path, name=args.queue).get_stats()))
+        return 0
+    processes = start_workers(args.processes, args.db_path, args.queue, burst=args.burst)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+    return 0
+
 
 if __name__ == "__main__":
-    # For testing
-    start_job_worker()
+    sys.exit(main())
@@ -0,0 +1,515 @@
+"""
+Buffered sink for operation timings recorded by ``log_performance``.
+
+Recording a timing appends one tuple to a bounded ring buffer
+(``collections.deque.append`` is atomic, so no lock is taken) and returns. A
+background writer drains the buffer every ``flush_interval`` seconds, or as
+soon as ``batch_size`` entries are pending, and:
+
+- records each duration in a per-operation HDR-style histogram, from which
+  p50/p95/p99 are read without keeping the raw samples,
+- appends the whole batch to the JSONL log with a single file write,
+- hands the batch to registered observers such as ``RollingLatencySummary``.
+
+When the writer falls behind, the oldest entries are overwritten and counted
+as dropped.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 65536
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_SUMMARY_BUCKET_SECONDS = 3600
+DEFAULT_SUMMARY_WINDOW_BUCKETS = 24
+
+# (operation, duration in seconds, wall-clock time or None)
+TimingEntry = Tuple[str, float, Optional[float]]
+
+
+class HdrHistogram:
+    """
+    Log-linear histogram of non-negative integer values.
+
+    Values below ``2 ** significant_bits`` are counted exactly; larger values
+    share buckets whose width keeps the relative error under
+    ``2 ** -(significant_bits - 1)``. Memory is a fixed list of counters.
+
+    Args:
+        significant_bits: Bits of precision kept per value (7 gives < 1.6% error).
+        max_value: Largest trackable value; larger values are clamped to it.
+    """
+
+    def __init__(self, significant_bits: int = 7, max_value: int = 2**40):
+        self._sub_bits = significant_bits
+        self._sub_count = 1 << significant_bits
+        self._half_count = self._sub_count >> 1
+        self.max_value = max_value
+        self._counts = [0] * (self._index(max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self._sub_bits
+        if shift <= 0:
+            return value
+        return shift * self._half_count + (value >> shift)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self._sub_count:
+            return index
+        shift = index // self._half_count - 1
+        sub = index % self._half_count + self._half_count
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value: float) -> None:
+        value = min(max(int(value), 0), self.max_value)
+        self._counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """Returns the value at or below which percentile percent of values fall."""
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(self.count * percentile / 100))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def reset(self) -> None:
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+
+class BufferedMetricSink:
+    """
+    Collects operation durations off the hot path.
+
+    Args:
+        log_file: JSONL file the writer appends to. None keeps metrics in memory only.
+        capacity: Entries the ring buffer holds before dropping the oldest.
+        batch_size: Pending entries that wake the writer before the interval ends.
+        flush_interval: Seconds between writer runs.
+        sample_rate: Fraction of calls to time (0.0-1.0).
+    """
+
+    def __init__(
+        self,
+        log_file: Optional[str] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        sample_rate: float = 1.0,
+    ):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0.0 and 1.0")
+        self.log_file = log_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+
+        self._buffer: deque = deque(maxlen=capacity)
+        self._sequence = itertools.count()
+        self._next_sequence = 0
+        self._histograms: Dict[str, HdrHistogram] = {}
+        self._encoded_operations: Dict[str, str] = {}
+        self._drain_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._observers: List[Callable[[List[TimingEntry]], None]] = []
+
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+
+    def should_sample(self) -> bool:
+        """Decides whether the next call is timed."""
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(self, operation: str, duration_seconds: float) -> None:
+        """Queues one timing. Safe to call from any thread or event loop."""
+        self._buffer.append((next(self._sequence), operation, duration_seconds, time.time()))
+        if self._writer is None:
+            self._start_writer()
+        elif len(self._buffer) >= self.batch_size and not self._wake.is_set():
+            self._wake.set()
+
+    def add_observer(self, observer: Callable[[List[TimingEntry]], None]) -> int:
+        """
+        Calls observer with every drained batch of timings from now on.
+
+        Returns the size of the log file at registration: timings written past
+        it are the ones the observer receives.
+        """
+        with self._drain_lock:
+            self._observers.append(observer)
+            return self._log_size()
+
+    def remove_observer(self, observer: Callable[[List[TimingEntry]], None]) -> None:
+        with self._drain_lock:
+            if observer in self._observers:
+                self._observers.remove(observer)
+
+    def checkpoint(self, capture: Callable[[], Any]) -> Tuple[Any, int]:
+        """
+        Flushes, then returns capture() together with the log file size.
+
+        Both are taken under the drain lock, so every timing in the log up to
+        that size has been seen by the observers and none after it has.
+        """
+        self.flush()
+        with self._drain_lock:
+            return capture(), self._log_size()
+
+    def _log_size(self) -> int:
+        if self.log_file is None:
+            return 0
+        try:
+            return os.path.getsize(self.log_file)
+        except OSError:
+            return 0
+
+    def _start_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(
+                target=self._run_writer, name="MetricSinkWriter", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.shutdown)
+
+    def _run_writer(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Failed to flush performance metrics: {e}")
+
+    def flush(self) -> int:
+        """Drains pending entries into the histograms and the log file. Returns the count."""
+        drained = 0
+        with self._drain_lock:
+            # Drain in bounded batches so a busy producer cannot starve the file write
+            while True:
+                entries: Optional[List[TimingEntry]] = [] if self._observers else None
+                batch = self._drain_batch(max(len(self._buffer), 1), entries)
+                if not batch:
+                    return drained
+                drained += len(batch)
+                if self.log_file is not None:
+                    with open(self.log_file, "a", encoding="utf-8") as f:
+                        f.write("".join(batch))
+                    self.written += len(batch)
+                    self.flushes += 1
+                for observer in self._observers:
+                    try:
+                        observer(entries)
+                    except Exception as e:
+                        logger.warning(f"Performance metric observer failed: {e}")
+
+    def _drain_batch(self, limit: int, entries: Optional[List[TimingEntry]] = None) -> List[str]:
+        lines: List[str] = []
+        for _ in range(limit):
+            try:
+                sequence, operation, duration, wall_time = self._buffer.popleft()
+            except IndexError:
+                break
+            if sequence >= self._next_sequence:
+                self.dropped += sequence - self._next_sequence
+                self._next_sequence = sequence + 1
+            else:
+                # Appended out of order by a concurrent caller, not dropped
+                self.dropped -= 1
+
+            histogram = self._histograms.get(operation)
+            if histogram is None:
+                histogram = self._histograms[operation] = HdrHistogram()
+                self._encoded_operations[operation] = json.dumps(operation)
+            histogram.record(duration * 1_000_000)
+            if entries is not None:
+                entries.append((operation, duration, wall_time))
+
+            timestamp = datetime.fromtimestamp(wall_time, timezone.utc).isoformat()
+            lines.append(
+                f'{{"timestamp": "{timestamp}", "operation": '
+                f'{self._encoded_operations[operation]}, "duration_seconds": {duration!r}}}\n'
+            )
+        return lines
+
+    def get_latency_stats(self, operation: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns count, mean and p50/p95/p99 latencies in milliseconds per operation.
+
+        Pending entries are drained first, so recent calls are included.
+        """
+        self.flush()
+        with self._drain_lock:
+            names = [operation] if operation is not None else list(self._histograms)
+            stats = {}
+            for name in names:
+                histogram = self._histograms.get(name)
+                if histogram is None or not histogram.count:
+                    continue
+                stats[name] = {
+                    "count": histogram.count,
+                    "mean_ms": histogram.total / histogram.count / 1000,
+                    "min_ms": histogram.min / 1000,
+                    "max_ms": histogram.max / 1000,
+                    "p50_ms": histogram.value_at_percentile(50) / 1000,
+                    "p95_ms": histogram.value_at_percentile(95) / 1000,
+                    "p99_ms": histogram.value_at_percentile(99) / 1000,
+                }
+            return stats
+
+    def reset_histograms(self) -> None:
+        with self._drain_lock:
+            self._histograms.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get sink statistics."""
+        return {
+            "pending": len(self._buffer),
+            "capacity": self._buffer.maxlen,
+            "dropped": self.dropped,
+            "written": self.written,
+            "flushes": self.flushes,
+            "sample_rate": self.sample_rate,
+            "operations": len(self._histograms),
+        }
+
+    def shutdown(self) -> None:
+        """Stops the writer after a final flush."""
+        self._stop.set()
+        self._wake.set()
+        if self._writer is not None and self._writer.is_alive():
+            self._writer.join(timeout=5.0)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Failed to flush performance metrics on shutdown: {e}")
+
+
+def iter_metric_log(
+    path: str, start: int = 0, end: Optional[int] = None
+) -> Iterator[TimingEntry]:
+    """Yields the timings logged between byte offsets start and end of a JSONL log."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(start)
+        position = start
+        for line in f:
+            position += len(line)
+            if end is not None and position > end:
+                break
+            try:
+                entry = json.loads(line)
+                operation = entry["operation"]
+                duration = float(entry["duration_seconds"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            wall_time = None
+            timestamp = entry.get("timestamp")
+            if isinstance(timestamp, str):
+                try:
+                    wall_time = datetime.fromisoformat(timestamp).timestamp()
+                except ValueError:
+                    pass
+            yield operation, duration, wall_time
+
+
+class RollingLatencySummary:
+    """
+    Per-operation latency totals plus a rolling window of recent timings.
+
+    Totals cover every timing seen. The window keeps a count and a sum per
+    ``bucket_seconds`` bucket for the last ``window_buckets`` buckets (24 hours
+    by default), so averages over recent calls need no raw samples and reading
+    them costs the same however many calls were made.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = DEFAULT_SUMMARY_BUCKET_SECONDS,
+        window_buckets: int = DEFAULT_SUMMARY_WINDOW_BUCKETS,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self._operations: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # Increases with every change, so callers can tell whether to persist
+        self.version = 0
+
+    def record_batch(self, entries: List[TimingEntry]) -> None:
+        """Adds a batch of timings; used as a ``BufferedMetricSink`` observer."""
+        with self._lock:
+            for operation, duration, wall_time in entries:
+                self._record(operation, duration, wall_time)
+            self.version += 1
+
+    def _summary(self, operation: str) -> Dict[str, Any]:
+        summary = self._operations.get(operation)
+        if summary is None:
+            summary = self._operations[operation] = {
+                "count": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "buckets": {},
+            }
+        return summary
+
+    def _record(self, operation: str, duration: float, wall_time: Optional[float]) -> None:
+        summary = self._summary(operation)
+        summary["count"] += 1
+        summary["total"] += duration
+        summary["max"] = max(summary["max"], duration)
+        if wall_time is None:
+            return
+        buckets = summary["buckets"]
+        bucket = int(wall_time // self.bucket_seconds)
+        counts = buckets.get(bucket)
+        if counts is None:
+            counts = buckets[bucket] = [0, 0.0]
+            oldest = bucket - self.window_buckets
+            for stale in [b for b in buckets if b <= oldest]:
+                del buckets[stale]
+        counts[0] += 1
+        counts[1] += duration
+
+    def get_summaries(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Returns all-time and recent (within the window) counts and means per operation."""
+        first_bucket = int((now or time.time()) // self.bucket_seconds) - self.window_buckets + 1
+        with self._lock:
+            summaries = {}
+            for operation, summary in self._operations.items():
+                recent = [c for b, c in summary["buckets"].items() if b >= first_bucket]
+                recent_count = sum(c[0] for c in recent)
+                recent_total = sum(c[1] for c in recent)
+                summaries[operation] = {
+                    "count": summary["count"],
+                    "mean_seconds": summary["total"] / summary["count"],
+                    "max_seconds": summary["max"],
+                    "recent_count": recent_count,
+                    "recent_mean_seconds": recent_total / recent_count if recent_count else None,
+                }
+            return summaries
+
+    def averages(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Mean duration per operation over the window, or over all time if idle in it."""
+        return {
+            operation: (
+                summary["recent_mean_seconds"]
+                if summary["recent_count"]
+                else summary["mean_seconds"]
+            )
+            for operation, summary in self.get_summaries(now).items()
+        }
+
+    def replay_log(self, path: str, start: int = 0, end: Optional[int] = None) -> int:
+        """Adds the timings logged between byte offsets start and end. Returns the count."""
+        replayed = 0
+        with self._lock:
+            for operation, duration, wall_time in iter_metric_log(path, start, end):
+                self._record(operation, duration, wall_time)
+                replayed += 1
+            self.version += 1
+        return replayed
+
+    def rebuild_from_log(self, path: str) -> int:
+        """Discards the summaries and recomputes them from a whole JSONL log."""
+        self.clear()
+        return self.replay_log(path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                operation: {**summary, "buckets": sorted(summary["buckets"].items())}
+                for operation, summary in self._operations.items()
+            }
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """
+        Adds summaries saved by ``to_dict`` to the current ones.
+
+        Raises KeyError, TypeError or ValueError, without changing anything, if
+        data is malformed.
+        """
+        parsed = [
+            (
+                str(operation),
+                int(saved["count"]),
+                float(saved["total"]),
+                float(saved["max"]),
+                [
+                    (int(bucket), int(count), float(total))
+                    for bucket, (count, total) in saved["buckets"]
+                ],
+            )
+            for operation, saved in data.items()
+        ]
+        with self._lock:
+            for operation, count, total, maximum, buckets in parsed:
+                summary = self._summary(operation)
+                summary["count"] += count
+                summary["total"] += total
+                summary["max"] = max(summary["max"], maximum)
+                for bucket, bucket_count, bucket_total in buckets:
+                    counts = summary["buckets"].setdefault(bucket, [0, 0.0])
+                    counts[0] += bucket_count
+                    counts[1] += bucket_total
+            self.version += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._operations.clear()
+            self.version += 1
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={os.getenv(name)!r}")
+        return default
+
+
+def create_metric_sink(log_file: Optional[str]) -> BufferedMetricSink:
+    """Creates a sink configured from PERFORMANCE_SAMPLE_RATE and PERFORMANCE_FLUSH_INTERVAL."""
+    return BufferedMetricSink(
+        log_file=log_file,
+        sample_rate=min(max(_env_float("PERFORMANCE_SAMPLE_RATE", 1.0), 0.0), 1.0),
+        flush_interval=_env_float("PERFORMANCE_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL),
+    )
@@ -12,6 +12,7 @@ from typing import Optional
 
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from starlette.routing import Match
 
 from .audit_logger import audit_logger
 from .performance_monitor import performance_monitor
@@ -55,7 +56,9 @@ class SecurityMiddleware:
         # Rate limiting check
         if self.enable_rate_limiting:
             allowed, headers = await api_rate_limiter.check_rate_limit(
-                request.url.path, client_ip  # Use IP as client key, could be enhanced with user_id
+                request.url.path,
+                client_ip,  # Use IP as client key, could be enhanced with user_id
+                route_template=self._get_route_template(scope),
             )
 
             if not allowed:
@@ -152,6 +155,18 @@ class SecurityMiddleware:
 
             raise
 
+    def _get_route_template(self, scope) -> Optional[str]:
+        """Find the path template of the route that will handle the request."""
+        route = scope.get("route")
+        if route is None:
+            # Routing happens after the middleware, so match against the app's routes
+            for candidate in getattr(scope.get("app"), "routes", ()):
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    route = candidate
+                    break
+        return getattr(route, "path_format", None) or getattr(route, "path", None)
+
     def _get_client_ip(self, request: Request) -> str:
         """Extract real client IP, considering proxies."""
         # Check X-Forwarded-For header
@@ -272,6 +272,20 @@ class ModelRegistry:
         # Try to load the model
         return await self.load_model(model_id)
 
+    def get_model_versions(self) -> Dict[str, str]:
+        """
+        Get the version of every registered model.
+
+        The expected hash is included when known, so replacing a model file
+        without bumping its version still counts as a new version.
+        """
+        return {
+            model_id: f"{metadata.version}:{metadata.expected_hash}"
+            if metadata.expected_hash
+            else metadata.version
+            for model_id, metadata in self._registry.items()
+        }
+
     async def list_models(self, include_loaded: bool = True) -> List[Dict[str, Any]]:
         """List all registered models with their status."""
         async with self._model_lock:
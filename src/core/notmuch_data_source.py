@@ -6,8 +6,10 @@ with AI analysis, smart filtering, and tagging functionality.
 """
 
 import asyncio
+import itertools
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from datetime import datetime
 import email
 
@@ -35,6 +37,144 @@ from .security import PathValidator
 
 logger = logging.getLogger(__name__)
 
+# Result orderings, mapped onto notmuch's native Query.SORT values
+SORT_NEWEST_FIRST = "newest_first"
+SORT_OLDEST_FIRST = "oldest_first"
+SORT_MESSAGE_ID = "message_id"
+SORT_UNSORTED = "unsorted"
+_NOTMUCH_SORT_NAMES = {
+    SORT_NEWEST_FIRST: "NEWEST_FIRST",
+    SORT_OLDEST_FIRST: "OLDEST_FIRST",
+    SORT_MESSAGE_ID: "MESSAGE_ID",
+    SORT_UNSORTED: "UNSORTED",
+}
+
+# Incremental tag-count refreshes between recounts of every tag
+TAG_COUNT_VERIFY_INTERVAL = 10
+# Beyond this many changed messages, recounting every tag beats visiting them
+TAG_COUNT_MAX_SCAN = 1000
+
+# Tags maintained by mail clients rather than by users
+SYSTEM_TAGS = frozenset(
+    {"inbox", "unread", "sent", "draft", "deleted", "spam", "flagged", "replied", "forwarded"}
+)
+
+
+def _database_revision(notmuch_db: Any) -> Tuple[int, Optional[str]]:
+    """Returns the committed (lastmod revision, database UUID) of a notmuch database."""
+    revision = notmuch_db.get_revision()
+    if isinstance(revision, tuple):
+        return int(revision[0]), revision[1]
+    return int(revision), None
+
+
+class _TagCountTable:
+    """
+    Per-tag message counts kept current from notmuch's lastmod revision.
+
+    Counts are notmuch's own per-tag counts, so building the table walks no
+    messages and nothing is remembered per message. When the revision moves,
+    only the messages modified since the last seen revision are visited and
+    the tags they now carry are recounted. Removed messages and the tags a
+    message lost are invisible to that query, so every tag is recounted when
+    the revision advanced further than the visited messages account for (a
+    removal), when more than ``max_scan`` messages changed, and otherwise
+    every ``verify_interval`` incremental refreshes.
+    """
+
+    def __init__(
+        self, verify_interval: int = TAG_COUNT_VERIFY_INTERVAL, max_scan: int = TAG_COUNT_MAX_SCAN
+    ):
+        self.counts: Dict[str, int] = {}
+        self.total_messages = 0
+        self.revision: Optional[int] = None
+        self.uuid: Optional[str] = None
+        self.full_rebuilds = 0
+        self.incremental_refreshes = 0
+        self.verify_interval = verify_interval
+        self.max_scan = max_scan
+        self._refreshes_since_rebuild = 0
+
+    @staticmethod
+    def _count(notmuch_db: Any, query_string: str) -> int:
+        return notmuch_db.create_query(query_string).count_messages()
+
+    def _recount(self, notmuch_db: Any, tags: Iterable[str]) -> None:
+        for tag in tags:
+            count = self._count(notmuch_db, _tag_query(tag))
+            if count:
+                self.counts[tag] = count
+            else:
+                self.counts.pop(tag, None)
+
+    def _changed_tags(self, notmuch_db: Any, query_string: str) -> Optional[Tuple[int, Set[str]]]:
+        """Returns how many messages match and the tags they carry, or None past max_scan."""
+        query = notmuch_db.create_query(query_string)
+        _set_query_sort(query, SORT_UNSORTED)
+        messages = 0
+        tags: Set[str] = set()
+        for message in query.search_messages():
+            messages += 1
+            if messages > self.max_scan:
+                return None
+            tags.update(message.get_tags())
+        return messages, tags
+
+    def _rebuild(self, notmuch_db: Any) -> None:
+        self.counts = {}
+        self._recount(notmuch_db, notmuch_db.get_all_tags())
+        self.total_messages = self._count(notmuch_db, "*")
+        self.full_rebuilds += 1
+        self._refreshes_since_rebuild = 0
+
+    def refresh(self, notmuch_db: Any) -> Dict[str, int]:
+        """Brings the counts up to the database's current revision and returns a copy."""
+        # Read the revision before scanning; changes made during the scan are
+        # picked up again by the next refresh, and recounting them is harmless.
+        revision, uuid = _database_revision(notmuch_db)
+        if self.revision is None or uuid != self.uuid:
+            self._rebuild(notmuch_db)
+        elif revision != self.revision:
+            self.incremental_refreshes += 1
+            self._refreshes_since_rebuild += 1
+            changed = self._changed_tags(notmuch_db, f"lastmod:{self.revision + 1}..{revision}")
+            if (
+                changed is None
+                or changed[0] < revision - self.revision
+                or self._refreshes_since_rebuild >= self.verify_interval
+            ):
+                self._rebuild(notmuch_db)
+            else:
+                self._recount(notmuch_db, changed[1])
+                self.total_messages = self._count(notmuch_db, "*")
+        self.revision, self.uuid = revision, uuid
+        return dict(self.counts)
+
+
+def _tag_query(tag: str) -> str:
+    """Returns a notmuch query matching one tag, quoted so any tag name is accepted."""
+    escaped = tag.replace('"', '""')
+    return f'tag:"{escaped}"'
+
+
+def _set_query_sort(query: Any, sort: str) -> None:
+    """Applies one of the SORT_* orderings to a notmuch query."""
+    if sort not in _NOTMUCH_SORT_NAMES:
+        raise ValueError(f"Unknown sort order: {sort}")
+    if notmuch is not None:
+        query.set_sort(getattr(notmuch.Query.SORT, _NOTMUCH_SORT_NAMES[sort]))
+
+
+def _message_summary(message: Any) -> Dict[str, Any]:
+    return {
+        "id": message.get_message_id(),
+        "message_id": message.get_message_id(),
+        "subject": message.get_header("subject"),
+        "sender": message.get_header("from"),
+        "date": message.get_date(),
+        "tags": list(message.get_tags()),
+    }
+
 
 class NotmuchDataSource(DataSource):
     """
@@ -74,6 +214,9 @@ class NotmuchDataSource(DataSource):
         self.ai_engine = None
         self.filter_manager = None
         self._initialized = False
+        self._tag_counts = _TagCountTable()
+        # notmuch calls run in worker threads, one at a time per database handle
+        self._notmuch_lock = threading.Lock()
         
         # Initialize Notmuch database if the notmuch module is available
         if NOTMUCH_AVAILABLE:
@@ -133,8 +276,35 @@ class NotmuchDataSource(DataSource):
         self._initialized = True
         logger.info("NotmuchDataSource initialized")
 
+    def _iter_page(
+        self, search_term: str, limit: int, offset: int = 0, sort: str = SORT_NEWEST_FIRST
+    ) -> Iterator[Any]:
+        """
+        Lazily yields one page of messages matching a notmuch query.
+
+        Ordering is done by notmuch itself, and iteration stops after the last
+        message of the page, so only offset + limit messages are ever loaded.
+        """
+        query = self.notmuch_db.create_query(search_term)
+        _set_query_sort(query, sort)
+        return itertools.islice(query.search_messages(), offset, offset + limit)
+
+    def _page_summaries(
+        self, search_term: str, limit: int, offset: int = 0, sort: str = SORT_NEWEST_FIRST
+    ) -> List[Dict[str, Any]]:
+        return [_message_summary(message) for message in self._iter_page(search_term, limit, offset, sort)]
+
+    async def _run_notmuch(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs blocking notmuch calls in a worker thread."""
+        def run():
+            with self._notmuch_lock:
+                return func(*args)
+        return await asyncio.to_thread(run)
+
     @log_performance(operation="search_emails")
-    async def search_emails(self, search_term: str, limit: int = 50) -> List[Dict[str, Any]]:
+    async def search_emails(
+        self, search_term: str, limit: int = 50, offset: int = 0, sort: str = SORT_NEWEST_FIRST
+    ) -> List[Dict[str, Any]]:
         """Searches emails using a notmuch query string."""
         await self._ensure_initialized()
         
@@ -142,22 +312,7 @@ class NotmuchDataSource(DataSource):
             return []
 
         try:
-            query = self.notmuch_db.create_query(search_term)
-            messages = query.search_messages()
-
-            results = []
-            for message in list(messages)[:limit]:
-                results.append(
-                    {
-                        "id": message.get_message_id(),
-                        "message_id": message.get_message_id(),
-                        "subject": message.get_header("subject"),
-                        "sender": message.get_header("from"),
-                        "date": message.get_date(),
-                        "tags": list(message.get_tags()),
-                    }
-                )
-            return results
+            return await self._run_notmuch(self._page_summaries, search_term, limit, offset, sort)
         except Exception as e:
             logger.error(f"Error searching emails in notmuch: {e}")
             return []
@@ -245,9 +400,10 @@ class NotmuchDataSource(DataSource):
         offset: int = 0,
         category_id: Optional[int] = None,
         is_unread: Optional[bool] = None,
+        sort: str = SORT_NEWEST_FIRST,
     ) -> List[Dict[str, Any]]:
         """
-        Retrieves emails. This is a basic implementation that maps parameters to a notmuch query.
+        Retrieves one page of emails, mapping the parameters to a notmuch query.
         """
         await self._ensure_initialized()
         
@@ -261,22 +417,7 @@ class NotmuchDataSource(DataSource):
             return []
 
         try:
-            query = self.notmuch_db.create_query(search_term)
-            messages = query.search_messages()
-
-            results = []
-            for message in list(messages)[offset : offset + limit]:
-                results.append(
-                    {
-                        "id": message.get_message_id(),
-                        "message_id": message.get_message_id(),
-                        "subject": message.get_header("subject"),
-                        "sender": message.get_header("from"),
-                        "date": message.get_date(),
-                        "tags": list(message.get_tags()),
-                    }
-                )
-            return results
+            return await self._run_notmuch(self._page_summaries, search_term, limit, offset, sort)
         except Exception as e:
             logger.error(f"Error getting emails from notmuch: {e}")
             return []
@@ -294,7 +435,7 @@ class NotmuchDataSource(DataSource):
             return []
         
         try:
-            tags = self.notmuch_db.get_all_tags()
+            tags = await self._run_notmuch(lambda: list(self.notmuch_db.get_all_tags()))
             return [{"name": tag, "id": tag} for tag in tags]
         except Exception as e:
             logger.error(f"Error retrieving notmuch tags: {e}")
@@ -453,6 +594,20 @@ class NotmuchDataSource(DataSource):
         # In a full implementation, this would actually delete the email
         return True
 
+    async def _refresh_tag_counts(self) -> Dict[str, int]:
+        """Returns per-tag message counts, refreshed from notmuch's lastmod revision."""
+        return await self._run_notmuch(self._tag_counts.refresh, self.notmuch_db)
+
+    def get_tag_count_stats(self) -> Dict[str, Any]:
+        """Returns the state of the cached tag-count table."""
+        return {
+            "revision": self._tag_counts.revision,
+            "tags": len(self._tag_counts.counts),
+            "messages": self._tag_counts.total_messages,
+            "full_rebuilds": self._tag_counts.full_rebuilds,
+            "incremental_refreshes": self._tag_counts.incremental_refreshes,
+        }
+
     @log_performance(operation="get_dashboard_aggregates")
     async def get_dashboard_aggregates(self) -> Dict[str, Any]:
         """Retrieves aggregated dashboard statistics for efficient server-side calculations."""
@@ -468,24 +623,13 @@ class NotmuchDataSource(DataSource):
             }
 
         try:
-            # Get total emails
-            query = self.notmuch_db.create_query("*")
-            total_emails = query.count_messages()
-
-            # Get unread count
-            unread_query = self.notmuch_db.create_query("tag:unread")
-            unread_count = unread_query.count_messages()
-
+            tag_counts = await self._refresh_tag_counts()
+            total_emails = self._tag_counts.total_messages
+            unread_count = tag_counts.get("unread", 0)
             # For auto_labeled, we'll use a placeholder tag like "auto-labeled"
-            auto_labeled_query = self.notmuch_db.create_query("tag:auto-labeled")
-            auto_labeled = auto_labeled_query.count_messages()
-
-            # For categories, we'll count distinct tags (excluding system tags)
-            all_tags = self.notmuch_db.get_all_tags()
-            # Filter out common system tags to get user-defined categories
-            system_tags = {"inbox", "unread", "sent", "draft", "deleted", "spam", "flagged", "replied", "forwarded"}
-            category_tags = [tag for tag in all_tags if tag.lower() not in system_tags]
-            categories_count = len(category_tags)
+            auto_labeled = tag_counts.get("auto-labeled", 0)
+            # Categories are the tags in use, excluding system tags
+            categories_count = sum(1 for tag in tag_counts if tag.lower() not in SYSTEM_TAGS)
 
             # Weekly growth - simplified calculation
             # In a production implementation, this would query for emails from the last week
@@ -516,8 +660,8 @@ class NotmuchDataSource(DataSource):
     async def get_category_breakdown(self, limit: int = 10) -> Dict[str, int]:
         """Retrieves category breakdown statistics with configurable limit.
         
-        In Notmuch, categories are mapped to tags. This implementation counts emails per tag
-        and excludes common system tags to focus on user-defined categories.
+        In Notmuch, categories are mapped to tags. Counts come from the cached tag-count
+        table, excluding common system tags to focus on user-defined categories.
         """
         await self._ensure_initialized()
         
@@ -525,22 +669,11 @@ class NotmuchDataSource(DataSource):
             return {}
 
         try:
-            # Get all tags and their counts
-            tag_counts = {}
-            
-            # Exclude common system tags
-            system_tags = {"inbox", "unread", "sent", "draft", "deleted", "spam", "flagged", "replied", "forwarded"}
-            
-            # Get all tags from the database
-            all_tags = list(self.notmuch_db.get_all_tags())
-            
-            # For each tag (that's not a system tag), count messages
-            for tag in all_tags:
-                if tag.lower() not in system_tags:
-                    query = self.notmuch_db.create_query(f"tag:{tag}")
-                    count = query.count_messages()
-                    if count > 0:  # Only include tags with emails
-                        tag_counts[tag] = count
+            tag_counts = {
+                tag: count
+                for tag, count in (await self._refresh_tag_counts()).items()
+                if tag.lower() not in SYSTEM_TAGS
+            }
             
             # Sort by count descending and apply limit
             sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
@@ -638,30 +771,15 @@ class NotmuchDataSource(DataSource):
                 logger.error(f"Could not retrieve email data for re-analysis {message_id}")
                 return
 
-            # Perform AI analysis
-            subject = email_data.get("subject", "")
-            content = email_data.get("body", "")
-            full_text = f"{subject} {content}"
-
-            analysis_results = {}
-
-            # Sentiment analysis
-            try:
-                if self.ai_engine:
-                    sentiment = self.ai_engine.analyze_sentiment(full_text)
-                    if sentiment:
-                        analysis_results["sentiment"] = sentiment
-            except Exception as e:
-                logger.warning(f"Sentiment analysis failed for email {message_id}: {e}")
-
-            # Topic classification
-            try:
-                if self.ai_engine:
-                    topics = self.ai_engine.classify_topic(full_text)
-                    if topics:
-                        analysis_results["topics"] = topics
-            except Exception as e:
-                logger.warning(f"Topic classification failed for email {message_id}: {e}")
+            # Tag updates do not change the text, so this is normally served
+            # from the shared analysis cache
+            if self.ai_engine:
+                try:
+                    await self.ai_engine.analyze_email(
+                        email_data.get("subject", ""), email_data.get("body", "")
+                    )
+                except Exception as e:
+                    logger.warning(f"AI analysis failed for email {message_id}: {e}")
 
             logger.info(f"Completed re-analysis for email {message_id}")
         except Exception as e:
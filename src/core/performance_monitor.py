@@ -22,10 +22,21 @@ from typing import Any, Callable, Dict, List, Optional
 
 import psutil
 
+from .metric_sink import RollingLatencySummary, create_metric_sink
+
 logger = logging.getLogger(__name__)
 
 LOG_FILE = "performance_metrics_log.jsonl"
 
+# Receives every timing recorded by the log_performance decorator
+metric_sink = create_metric_sink(LOG_FILE)
+
+# Rolling per-operation averages for the dashboard, kept current by the sink's writer.
+# Timings logged before this position are added by restore_latency_summary.
+latency_summary = RollingLatencySummary()
+_latency_log_start = metric_sink.add_observer(latency_summary.record_batch)
+_latency_restored = False
+
 
 @dataclass
 class PerformanceMetric:
@@ -68,13 +79,10 @@ class PerformanceMonitor:
             logger.warning(f"Failed to create performance log file: {e}")
 
     def log_performance(self, log_entry: Dict[str, Any]) -> None:
-        """Log a performance entry to the log file"""
-        try:
-            with self.lock:
-                with open(LOG_FILE, "a") as f:
-                    f.write(json.dumps(log_entry) + "\n")
-        except Exception as e:
-            logger.warning(f"Failed to log performance: {e}")
+        """Queue a performance entry for the buffered log writer"""
+        metric_sink.record(
+            log_entry.get("operation", "unknown_operation"), log_entry.get("duration_seconds", 0)
+        )
 
     def get_system_metrics(self) -> Dict[str, Any]:
         """Get current system metrics"""
@@ -131,26 +139,17 @@ def log_performance(operation_or_func=None, *, operation: str = ""):
 
 def _create_decorator(func, op_name):
     """Create the actual decorator for a function"""
+    # Timings go straight to the sink: one ring-buffer append per sampled call
+    sink = metric_sink
     if asyncio.iscoroutinefunction(func):
 
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
+            if not sink.should_sample():
+                return await func(*args, **kwargs)
             start_time = time.perf_counter()
             result = await func(*args, **kwargs)
-            end_time = time.perf_counter()
-            duration = end_time - start_time
-
-            log_entry = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "operation": op_name,
-                "duration_seconds": duration,
-            }
-
-            try:
-                performance_monitor.log_performance(log_entry)
-            except Exception as e:
-                logger.warning(f"Failed to log performance: {e}")
-
+            sink.record(op_name, time.perf_counter() - start_time)
             return result
 
         return async_wrapper
@@ -158,25 +157,60 @@ def _create_decorator(func, op_name):
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
+            if not sink.should_sample():
+                return func(*args, **kwargs)
             start_time = time.perf_counter()
             result = func(*args, **kwargs)
-            end_time = time.perf_counter()
-            duration = end_time - start_time
+            sink.record(op_name, time.perf_counter() - start_time)
+            return result
 
-            log_entry = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "operation": op_name,
-                "duration_seconds": duration,
-            }
+        return sync_wrapper
 
-            try:
-                performance_monitor.log_performance(log_entry)
-            except Exception as e:
-                logger.warning(f"Failed to log performance: {e}")
 
-            return result
+def get_operation_latencies(operation: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Get p50/p95/p99 latencies of operations timed with log_performance."""
+    return metric_sink.get_latency_stats(operation)
 
-        return sync_wrapper
+
+def get_operation_averages() -> Dict[str, float]:
+    """Get the rolling mean duration in seconds of operations timed with log_performance."""
+    return latency_summary.averages()
+
+
+def save_latency_summary() -> Dict[str, Any]:
+    """Returns the latency summary with the log position it covers, for persisting."""
+    summaries, log_position = metric_sink.checkpoint(latency_summary.to_dict)
+    return {"operations": summaries, "log_position": log_position}
+
+
+def restore_latency_summary(saved: Optional[Dict[str, Any]]) -> bool:
+    """
+    Adds a summary saved by save_latency_summary, then the timings logged after it.
+
+    Without a saved summary the whole log is replayed. Only the first call in
+    a process has an effect; it returns False otherwise.
+    """
+    global _latency_restored
+    if _latency_restored:
+        return False
+    _latency_restored = True
+    start = 0
+    if saved:
+        try:
+            log_position = int(saved["log_position"])
+            latency_summary.merge(saved["operations"])
+            start = log_position
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Discarding malformed latency summary: {e}")
+            start = 0
+    if metric_sink.log_file is not None:
+        if start > _latency_log_start:
+            # The log was truncated or replaced since the summary was saved
+            start = 0
+        replayed = latency_summary.replay_log(metric_sink.log_file, start, _latency_log_start)
+        if replayed:
+            logger.info(f"Added {replayed} logged timings to the latency summary")
+    return True
 
 
 import atexit
@@ -1,18 +1,43 @@
 """
 API Rate Limiting for Email Intelligence Platform
 
-Implements token bucket algorithm for API endpoint rate limiting with Redis backend support.
+Implements token bucket algorithm for API endpoint rate limiting.
+
+Bucket state lives in a ``BucketStore``. The default ``ShardedMemoryStore``
+spreads keys over independently locked shards, so concurrent requests only
+contend when their keys hash to the same shard. ``SQLiteBucketStore`` keeps the
+buckets in an SQLite file so that several worker processes (e.g. uvicorn
+``--workers``) enforce one budget; it is selected with ``RATE_LIMIT_DB_PATH``.
+Its transactions run in a thread so they never block the event loop.
 """
 
 import asyncio
 import logging
+import os
+import re
+import sqlite3
+import threading
 import time
+from abc import ABC, abstractmethod
 from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SHARDS = 64
+# Stale SQLite buckets are pruned after this many writes
+_PRUNE_INTERVAL = 1000
+# Seconds between "shared store unavailable" warnings
+_FALLBACK_WARNING_INTERVAL = 10.0
+# Path segments that identify a resource rather than a route
+_DYNAMIC_SEGMENT = re.compile(
+    r"^(\d+|[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}"
+    r"|[0-9a-fA-F]{16,})$"
+)
+# Candidates for random tokens (nanoid, base64url, cuid); see _is_dynamic_segment
+_TOKEN_SEGMENT = re.compile(r"^[A-Za-z0-9_-]{20,}$")
+
 
 @dataclass
 class RateLimitConfig:
@@ -22,6 +47,11 @@ class RateLimitConfig:
     burst_limit: int = 10
     window_seconds: int = 60
 
+    @property
+    def refill_rate(self) -> float:
+        """Tokens added per second."""
+        return self.requests_per_minute / self.window_seconds
+
 
 @dataclass
 class RateLimitState:
@@ -31,18 +61,229 @@ class RateLimitState:
     last_refill: float
 
 
+def _refill(tokens: float, last_refill: float, now: float, config: RateLimitConfig) -> float:
+    return min(config.burst_limit, tokens + max(0.0, now - last_refill) * config.refill_rate)
+
+
+class BucketStore(ABC):
+    """
+    Storage for token buckets. take() must be atomic per key.
+
+    Stores whose operations do I/O set ``blocking``; RateLimiter then calls
+    them from a worker thread instead of the event loop.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def take(self, key: str, config: RateLimitConfig, now: float) -> Tuple[bool, float]:
+        """Refills the bucket for key, takes one token if available.
+
+        Returns:
+            Tuple of (allowed, tokens left)
+        """
+
+    @abstractmethod
+    def peek(self, key: str, config: RateLimitConfig, now: float) -> float:
+        """Returns the tokens available for key without taking one."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes all buckets."""
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets: OrderedDict[str, RateLimitState] = OrderedDict()
+
+
+class ShardedMemoryStore(BucketStore):
+    """
+    In-process bucket store split into independently locked shards.
+
+    Each shard is an LRU bounded to max_keys / shards entries. The shard locks
+    are threading locks held only for the few arithmetic operations of one
+    update, never across an await.
+    """
+
+    def __init__(self, max_keys: int = 10000, shards: int = DEFAULT_SHARDS):
+        self._shards = [_Shard() for _ in range(shards)]
+        self._max_per_shard = max(1, max_keys // shards)
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def take(self, key: str, config: RateLimitConfig, now: float) -> Tuple[bool, float]:
+        shard = self._shard(key)
+        with shard.lock:
+            state = shard.buckets.get(key)
+            if state is None:
+                # Evict oldest entry if at capacity
+                if len(shard.buckets) >= self._max_per_shard:
+                    shard.buckets.popitem(last=False)
+                state = shard.buckets[key] = RateLimitState(
+                    tokens=config.burst_limit, last_refill=now
+                )
+            else:
+                # Move to end to mark as recently used
+                shard.buckets.move_to_end(key)
+
+            state.tokens = _refill(state.tokens, state.last_refill, now, config)
+            state.last_refill = now
+            allowed = state.tokens >= 1
+            if allowed:
+                state.tokens -= 1
+            return allowed, state.tokens
+
+    def peek(self, key: str, config: RateLimitConfig, now: float) -> float:
+        shard = self._shard(key)
+        with shard.lock:
+            state = shard.buckets.get(key)
+            if state is None:
+                return config.burst_limit
+            return _refill(state.tokens, state.last_refill, now, config)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
+
+    def __len__(self) -> int:
+        return sum(len(shard.buckets) for shard in self._shards)
+
+
+class SQLiteBucketStore(BucketStore):
+    """
+    Bucket store shared by every process that opens the same SQLite file.
+
+    Each take() is one short ``BEGIN IMMEDIATE`` transaction, which SQLite
+    serializes across processes. Placing the file on a tmpfs such as
+    ``/dev/shm`` keeps it in shared memory. Buckets idle long enough to be
+    full again are equivalent to missing ones and are pruned periodically.
+    If the database cannot be used, the limit is enforced per process by an
+    in-memory fallback store and the error logged.
+    """
+
+    blocking = True
+
+    def __init__(self, db_path: str, busy_timeout: float = 0.5):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._writes_since_prune = 0
+        self._max_idle = 0.0
+        self._fallback = ShardedMemoryStore()
+        self._last_fallback_warning = 0.0
+
+    def _warn_fallback(self, error: sqlite3.Error) -> None:
+        now = time.monotonic()
+        if now - self._last_fallback_warning >= _FALLBACK_WARNING_INTERVAL:
+            self._last_fallback_warning = now
+            logger.warning(f"Shared rate limit store unavailable, limiting per process: {error}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    last_refill REAL NOT NULL
+                )
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, config: RateLimitConfig, now: float) -> Tuple[bool, float]:
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, last_refill FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = config.burst_limit if row is None else _refill(row[0], row[1], now, config)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, last_refill) "
+                    "VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                self._max_idle = max(self._max_idle, config.burst_limit / config.refill_rate)
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= _PRUNE_INTERVAL:
+                    self._prune(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return allowed, tokens
+        except sqlite3.Error as e:
+            self._warn_fallback(e)
+            return self._fallback.take(key, config, now)
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        self._writes_since_prune = 0
+        conn.execute(
+            "DELETE FROM rate_limit_buckets WHERE last_refill < ?", (now - self._max_idle,)
+        )
+
+    def peek(self, key: str, config: RateLimitConfig, now: float) -> float:
+        try:
+            row = (
+                self._connect()
+                .execute("SELECT tokens, last_refill FROM rate_limit_buckets WHERE key = ?", (key,))
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            self._warn_fallback(e)
+            return self._fallback.peek(key, config, now)
+        if row is None:
+            return config.burst_limit
+        return _refill(row[0], row[1], now, config)
+
+    def clear(self) -> None:
+        self._fallback.clear()
+        self._connect().execute("DELETE FROM rate_limit_buckets")
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
 class RateLimiter:
     """
     Token bucket rate limiter for API endpoints.
 
-    Uses in-memory storage by default. Can be extended to use Redis for distributed rate limiting.
+    Uses a sharded in-memory store by default. Pass a shared store such as
+    ``SQLiteBucketStore`` to enforce the limit across processes; namespace
+    keeps the keys of different limiters apart in a shared store.
     """
 
-    def __init__(self, config: RateLimitConfig, max_clients: int = 10000):
+    def __init__(
+        self,
+        config: RateLimitConfig,
+        max_clients: int = 10000,
+        store: Optional[BucketStore] = None,
+        namespace: str = "",
+    ):
         self.config = config
-        self._limits: OrderedDict[str, RateLimitState] = OrderedDict()
-        self._lock = asyncio.Lock()
-        self._max_clients = max_clients
+        self._store = store or ShardedMemoryStore(max_keys=max_clients)
+        self._prefix = f"{namespace}|" if namespace else ""
 
     async def is_allowed(self, key: str) -> Tuple[bool, Dict[str, int]]:
         """
@@ -54,96 +295,133 @@ class RateLimiter:
         Returns:
             Tuple of (allowed: bool, headers: dict with rate limit info)
         """
-        async with self._lock:
-            now = time.time()
-            state = self._limits.get(key)
+        now = time.time()
+        if self._store.blocking:
+            allowed, tokens = await asyncio.to_thread(
+                self._store.take, self._prefix + key, self.config, now
+            )
+        else:
+            allowed, tokens = self._store.take(self._prefix + key, self.config, now)
 
-            if state is None:
-                # Evict oldest entry if at capacity
-                if len(self._limits) >= self._max_clients:
-                    self._limits.popitem(last=False)
-                # First request for this key
-                state = RateLimitState(tokens=self.config.burst_limit, last_refill=now)
-                self._limits[key] = state
-            else:
-                # Move to end to mark as recently used
-                self._limits.move_to_end(key)
+        # Calculate headers for response
+        headers = {
+            "X-RateLimit-Limit": self.config.requests_per_minute,
+            "X-RateLimit-Remaining": max(0, int(tokens)),
+            "X-RateLimit-Reset": int(now + self.config.window_seconds),
+        }
+        return allowed, headers
 
-            # Refill tokens based on time passed
-            time_passed = now - state.last_refill
-            refill_amount = time_passed * (
-                self.config.requests_per_minute / self.config.window_seconds
+    async def get_remaining_tokens(self, key: str) -> int:
+        """Get remaining tokens for a key."""
+        if self._store.blocking:
+            tokens = await asyncio.to_thread(
+                self._store.peek, self._prefix + key, self.config, time.time()
             )
-            state.tokens = min(self.config.burst_limit, state.tokens + refill_amount)
-            state.last_refill = now
+        else:
+            tokens = self._store.peek(self._prefix + key, self.config, time.time())
+        return max(0, int(tokens))
 
-            # Check if request is allowed
-            if state.tokens >= 1:
-                state.tokens -= 1
-                allowed = True
-            else:
-                allowed = False
-
-            # Calculate headers for response
-            headers = {
-                "X-RateLimit-Limit": self.config.requests_per_minute,
-                "X-RateLimit-Remaining": max(0, int(state.tokens)),
-                "X-RateLimit-Reset": int(now + self.config.window_seconds),
-            }
 
-            return allowed, headers
+def _is_dynamic_segment(segment: str) -> bool:
+    """
+    Whether a path segment looks like a resource ID rather than part of a route.
 
-    async def get_remaining_tokens(self, key: str) -> int:
-        """Get remaining tokens for a key."""
-        state = self._limits.get(key)
-        if state is None:
-            return self.config.burst_limit
+    Besides numbers, UUIDs and hex digests, long tokens count as IDs when
+    they contain a digit and either mix in upper case or have no separators,
+    so long static slugs such as ``performance-overview-v2-report`` stay.
+    """
+    if _DYNAMIC_SEGMENT.match(segment):
+        return True
+    if not _TOKEN_SEGMENT.match(segment) or not any(c.isdigit() for c in segment):
+        return False
+    return any(c.isupper() for c in segment) or not any(c in "-_" for c in segment)
 
-        # Calculate current tokens (refill if needed)
-        now = time.time()
-        time_passed = now - state.last_refill
-        refill_amount = time_passed * (self.config.requests_per_minute / self.config.window_seconds)
-        current_tokens = min(self.config.burst_limit, state.tokens + refill_amount)
 
-        return max(0, int(current_tokens))
+def normalize_endpoint(path: str) -> str:
+    """Replaces ID-like path segments with ``{id}``: ``/api/emails/42`` -> ``/api/emails/{id}``."""
+    return "/".join(
+        "{id}" if _is_dynamic_segment(segment) else segment for segment in path.split("/")
+    )
 
 
 class APIRateLimiter:
     """
     API-specific rate limiter with endpoint-based configurations.
+
+    Limiters are keyed by route template (``/api/emails/{email_id}``), not by
+    raw path, so every resource of a route shares one bucket per client. Paths
+    without a known template are normalized with ``normalize_endpoint``. An
+    endpoint uses the configuration of the longest configured prefix, or the
+    default one; once max_endpoints limiters exist, further endpoints share a
+    catch-all limiter.
     """
 
-    def __init__(self):
+    def __init__(self, store: Optional[BucketStore] = None, max_endpoints: int = 1000):
         self._limiters: Dict[str, RateLimiter] = {}
+        self._configs: Dict[str, RateLimitConfig] = {}
         self._default_config = RateLimitConfig()
+        self._store = store
+        self._max_endpoints = max_endpoints
+        self._lock = threading.Lock()
 
     def add_endpoint_limit(self, endpoint: str, config: RateLimitConfig):
-        """Add rate limiting for a specific endpoint."""
-        self._limiters[endpoint] = RateLimiter(config)
+        """Add rate limiting for an endpoint and the routes below it."""
+        endpoint = endpoint.rstrip("/") or "/"
+        self._configs[endpoint] = config
+        # Limiters created from an older configuration pick up the new one
+        self._limiters.clear()
+
+    def _config_for(self, endpoint: str) -> RateLimitConfig:
+        prefix = endpoint
+        while prefix:
+            config = self._configs.get(prefix)
+            if config is not None:
+                return config
+            prefix = prefix.rpartition("/")[0]
+        return self._configs.get("/", self._default_config)
 
     def get_limiter(self, endpoint: str) -> RateLimiter:
         """Get rate limiter for an endpoint, creating default if needed."""
-        if endpoint not in self._limiters:
-            self._limiters[endpoint] = RateLimiter(self._default_config)
-        return self._limiters[endpoint]
-
-    async def check_rate_limit(self, endpoint: str, client_key: str) -> Tuple[bool, Dict[str, int]]:
+        limiter = self._limiters.get(endpoint)
+        if limiter is not None:
+            return limiter
+        with self._lock:
+            if len(self._limiters) >= self._max_endpoints:
+                endpoint = "*"
+            limiter = self._limiters.get(endpoint)
+            if limiter is None:
+                limiter = self._limiters[endpoint] = self._new_limiter(endpoint)
+            return limiter
+
+    def _new_limiter(self, endpoint: str) -> RateLimiter:
+        return RateLimiter(self._config_for(endpoint), store=self._store, namespace=endpoint)
+
+    async def check_rate_limit(
+        self, endpoint: str, client_key: str, route_template: Optional[str] = None
+    ) -> Tuple[bool, Dict[str, int]]:
         """
         Check rate limit for an endpoint and client.
 
         Args:
             endpoint: API endpoint path
             client_key: Client identifier (user ID, IP, etc.)
+            route_template: Path template of the matched route, if known
 
         Returns:
             Tuple of (allowed: bool, rate_limit_headers: dict)
         """
-        limiter = self.get_limiter(endpoint)
+        limiter = self.get_limiter(route_template or normalize_endpoint(endpoint))
         return await limiter.is_allowed(client_key)
 
 
+def create_bucket_store() -> Optional[BucketStore]:
+    """Returns the shared store configured by RATE_LIMIT_DB_PATH, or None for in-memory limits."""
+    db_path = os.getenv("RATE_LIMIT_DB_PATH")
+    return SQLiteBucketStore(db_path) if db_path else None
+
+
 # Global API rate limiter instance
-api_rate_limiter = APIRateLimiter()
+api_rate_limiter = APIRateLimiter(store=create_bucket_store())
 
 # Pre-configure some common endpoints
 api_rate_limiter.add_endpoint_limit(
@@ -0,0 +1,270 @@
+"""
+Inverted full-text index for email search.
+
+Maintains tokenized postings (term -> document ID -> weighted term frequency)
+over an email's subject, sender and body. Documents are added, replaced and
+removed incrementally, queries are ranked with BM25, and terms ending in ``*``
+are expanded as prefixes over a sorted vocabulary. The index can be persisted
+to a gzipped JSON file so searches never need to open per-email content files.
+"""
+
+import gzip
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .sorted_index import SortedKeyList
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+# Term frequencies are weighted by the field a term came from.
+FIELD_WEIGHTS = {"subject": 3.0, "sender": 2.0, "body": 1.0}
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_QUERY_TOKEN_RE = re.compile(r"[^\W_]+\*?", re.UNICODE)
+PREFIX_WILDCARD = "*"
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Splits text into lowercase alphanumeric tokens."""
+    if not text or not isinstance(text, str):
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def parse_query(query: Optional[str]) -> List[Tuple[str, bool]]:
+    """Splits a query into (term, is_prefix) pairs; a trailing ``*`` marks a prefix."""
+    if not query or not isinstance(query, str):
+        return []
+    clauses = []
+    for raw in _QUERY_TOKEN_RE.findall(query.lower()):
+        if raw.endswith(PREFIX_WILDCARD):
+            clauses.append((raw[:-1], True))
+        else:
+            clauses.append((raw, False))
+    return clauses
+
+
+class InvertedIndex:
+    """
+    Incrementally maintained inverted index with BM25 ranking.
+
+    Args:
+        k1: BM25 term-frequency saturation parameter.
+        b: BM25 document-length normalization parameter.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        # Sorted terms for prefix expansion; chunked so adding a new term is not O(V)
+        self._vocabulary = SortedKeyList()
+        self.dirty = False
+        # Fingerprint of the data the index was last saved with, see save()
+        self.fingerprint: Optional[Any] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_terms
+
+    @property
+    def doc_ids(self) -> Set[int]:
+        return set(self._doc_terms)
+
+    def document_terms(self, doc_id: int) -> Set[str]:
+        """Returns the terms currently indexed for a document."""
+        return set(self._doc_terms.get(doc_id, ()))
+
+    # --- Maintenance ---
+
+    def add_document(
+        self,
+        doc_id: int,
+        subject: Optional[str] = None,
+        sender: Optional[str] = None,
+        body: Optional[str] = None,
+    ) -> None:
+        """Indexes a document, replacing any previous version with the same ID."""
+        weighted: Counter = Counter()
+        for field, text in (("subject", subject), ("sender", sender), ("body", body)):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                weighted[token] += weight
+        self._set_document(doc_id, dict(weighted))
+
+    def _set_document(self, doc_id: int, terms: Dict[str, float]) -> None:
+        if doc_id in self._doc_terms:
+            self.remove_document(doc_id)
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary.add(term)
+            postings[doc_id] = tf
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        self.dirty = True
+
+    def remove_document(self, doc_id: int) -> bool:
+        """Removes a document from the index. Returns False if it was not indexed."""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary.remove(term)
+        self._total_length -= self._doc_lengths.pop(doc_id, 0.0)
+        self.dirty = True
+        return True
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_lengths.clear()
+        self._vocabulary = SortedKeyList()
+        self._total_length = 0.0
+        self.dirty = True
+
+    # --- Querying ---
+
+    def expand_prefix(self, prefix: str, max_terms: Optional[int] = None) -> List[str]:
+        """Returns the vocabulary terms starting with prefix, at most max_terms if given."""
+        terms = []
+        for term in self._vocabulary.iter_from(prefix):
+            if not term.startswith(prefix) or len(terms) == max_terms:
+                break
+            terms.append(term)
+        return terms
+
+    def _idf(self, doc_freq: int) -> float:
+        n = len(self._doc_terms)
+        return math.log(1.0 + (n - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def _clause_scores(self, terms: Iterable[str]) -> Dict[int, float]:
+        """Scores documents matching any of the given terms (one query clause)."""
+        avg_length = self._total_length / len(self._doc_terms) if self._doc_terms else 0.0
+        scores: Dict[int, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(len(postings))
+            for doc_id, tf in postings.items():
+                norm = 1.0 - self.b
+                if avg_length:
+                    norm += self.b * self._doc_lengths[doc_id] / avg_length
+                score = idf * tf * (self.k1 + 1.0) / (tf + self.k1 * norm)
+                # A document matching several expansions of one prefix counts its best match.
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Runs a conjunctive query and returns (doc_id, score) pairs, best first.
+
+        Every query token must match. Tokens ending in ``*`` match any term
+        with that prefix.
+        """
+        clauses: List[List[str]] = [
+            self.expand_prefix(term) if is_prefix else [term]
+            for term, is_prefix in parse_query(query)
+        ]
+        if not clauses:
+            return []
+
+        # Evaluate the most selective clause first so intersections stay small.
+        clauses.sort(key=lambda c: sum(len(self._postings.get(t, ())) for t in c))
+        totals: Optional[Dict[int, float]] = None
+        for clause in clauses:
+            clause_scores = self._clause_scores(clause)
+            if totals is None:
+                totals = clause_scores
+            else:
+                totals = {
+                    doc_id: score + clause_scores[doc_id]
+                    for doc_id, score in totals.items()
+                    if doc_id in clause_scores
+                }
+            if not totals:
+                return []
+
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[:limit] if limit is not None else ranked
+
+    # --- Persistence ---
+
+    def save(self, path: str, fingerprint: Optional[Any] = None) -> None:
+        """
+        Writes the index atomically to a gzipped JSON file.
+
+        Args:
+            path: Destination file.
+            fingerprint: JSON-serializable description of the data the index was
+                built from, returned by load() so callers can detect a stale index.
+        """
+        payload = {
+            "version": INDEX_FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "docs": {str(doc_id): terms for doc_id, terms in self._doc_terms.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        self.dirty = False
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def load(cls, path: str, **kwargs: Any) -> Optional["InvertedIndex"]:
+        """Loads an index written by save(). Returns None if missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (IOError, ValueError) as e:
+            logger.warning(f"Discarding unreadable search index {path}: {e}")
+            return None
+        if payload.get("version") != INDEX_FORMAT_VERSION:
+            logger.info(f"Search index {path} has an old format; it will be rebuilt.")
+            return None
+
+        index = cls(**kwargs)
+        index.fingerprint = payload.get("fingerprint")
+        for doc_id, terms in payload.get("docs", {}).items():
+            doc_id = int(doc_id)
+            for term, tf in terms.items():
+                index._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(terms.values())
+            index._doc_terms[doc_id] = terms
+            index._doc_lengths[doc_id] = length
+            index._total_length += length
+        index._vocabulary = SortedKeyList.from_sorted(sorted(index._postings))
+        return index
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._doc_terms),
+            "terms": len(self._postings),
+            "postings": sum(len(p) for p in self._postings.values()),
+        }
@@ -0,0 +1,347 @@
+"""
+Byte-budgeted in-memory cache.
+
+Bounds a cache by the estimated memory of its entries rather than by entry
+count, so a few large HTML bodies and many short notes share one budget.
+Three policies are supported:
+
+- ``lru``: plain least-recently-used eviction.
+- ``slru``: segmented LRU. New entries land in a probation segment and are
+  promoted to a protected segment on their second access, so one-off scans
+  cannot flush the frequently used entries.
+- ``w-tinylfu``: a small LRU admission window in front of a segmented LRU main
+  space. Entries leaving the window only enter the main space if a frequency
+  sketch shows they are used more often than the entry they would displace.
+"""
+
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+EVICTION_LRU = "lru"
+EVICTION_SLRU = "slru"
+EVICTION_W_TINYLFU = "w-tinylfu"
+EVICTION_POLICIES = (EVICTION_LRU, EVICTION_SLRU, EVICTION_W_TINYLFU)
+
+_WINDOW = "window"
+_PROBATION = "probation"
+_PROTECTED = "protected"
+
+
+def estimate_size(value: Any, max_depth: int = 8) -> int:
+    """
+    Estimates the memory held by a value, including nested containers.
+
+    Shared objects are counted once; containers deeper than max_depth are
+    counted shallowly.
+    """
+    seen = set()
+    total = 0
+    stack = [(value, 0)]
+    while stack:
+        obj, depth = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if depth >= max_depth:
+            continue
+        if isinstance(obj, dict):
+            for key, item in obj.items():
+                stack.append((key, depth + 1))
+                stack.append((item, depth + 1))
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend((item, depth + 1) for item in obj)
+    return total
+
+
+class FrequencySketch:
+    """
+    Count-min sketch of recent access frequencies with periodic aging.
+
+    Counters saturate at max_count and are halved after every sample_size
+    increments, so the estimate follows the recent workload.
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4, max_count: int = 15):
+        # Round the width up to a power of two so rows can be indexed with a mask
+        self._mask = (1 << max(4, (width - 1).bit_length())) - 1
+        self._rows = [[0] * (self._mask + 1) for _ in range(depth)]
+        self.max_count = max_count
+        self.sample_size = 10 * (self._mask + 1)
+        self._additions = 0
+
+    def _slots(self, key: Hashable) -> Iterator[tuple]:
+        for seed, row in enumerate(self._rows):
+            yield row, hash((seed, key)) & self._mask
+
+    def increment(self, key: Hashable) -> None:
+        """Records one access to key."""
+        slots = list(self._slots(key))
+        current = min(row[idx] for row, idx in slots)
+        if current >= self.max_count:
+            return
+        # Conservative update: only raise the counters holding the minimum.
+        for row, idx in slots:
+            if row[idx] == current:
+                row[idx] = current + 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key: Hashable) -> int:
+        """Returns the estimated recent access count of key."""
+        return min(row[idx] for row, idx in self._slots(key))
+
+    def _age(self) -> None:
+        for row in self._rows:
+            for idx, count in enumerate(row):
+                if count:
+                    row[idx] = count >> 1
+        self._additions //= 2
+
+    def clear(self) -> None:
+        for row in self._rows:
+            row[:] = [0] * len(row)
+        self._additions = 0
+
+
+class _Entry:
+    __slots__ = ("value", "size", "segment")
+
+    def __init__(self, value: Any, size: int, segment: str):
+        self.value = value
+        self.size = size
+        self.segment = segment
+
+
+class SizeAwareCache:
+    """
+    Cache bounded by estimated bytes and, optionally, by entry count.
+
+    Args:
+        max_bytes: Total byte budget. None disables the byte bound.
+        max_entries: Optional entry-count bound, applied alongside max_bytes.
+        policy: One of "lru", "slru" or "w-tinylfu".
+        size_estimator: Returns the size in bytes of a value.
+        protected_ratio: Share of the main space reserved for protected entries.
+        window_ratio: Share of the budget used by the w-tinylfu admission window.
+        on_evict: Called with (key, value) when an entry is evicted to make room.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = 32 * 1024 * 1024,
+        max_entries: Optional[int] = None,
+        policy: str = EVICTION_LRU,
+        size_estimator: Callable[[Any], int] = estimate_size,
+        protected_ratio: float = 0.8,
+        window_ratio: float = 0.01,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes must be greater than zero")
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError("max_entries must be greater than zero")
+
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.policy = policy
+        self.size_estimator = size_estimator
+        self.on_evict = on_evict
+
+        budget = max_bytes if max_bytes is not None else sys.maxsize
+        self._window_budget = int(budget * window_ratio) if policy == EVICTION_W_TINYLFU else 0
+        self._main_budget = budget - self._window_budget
+        self._protected_budget = int(self._main_budget * protected_ratio)
+
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._segments: Dict[str, OrderedDict] = {
+            _WINDOW: OrderedDict(),
+            _PROBATION: OrderedDict(),
+            _PROTECTED: OrderedDict(),
+        }
+        self._segment_bytes = {_WINDOW: 0, _PROBATION: 0, _PROTECTED: 0}
+        self._sketch: Optional[FrequencySketch] = None
+        if policy == EVICTION_W_TINYLFU:
+            self._sketch = FrequencySketch(width=max_entries or 4096)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(self._segment_bytes.values())
+
+    # --- Segment bookkeeping ---
+
+    def _link(self, key: Hashable, entry: _Entry, segment: str) -> None:
+        entry.segment = segment
+        self._segments[segment][key] = None
+        self._segment_bytes[segment] += entry.size
+
+    def _unlink(self, key: Hashable, entry: _Entry) -> None:
+        del self._segments[entry.segment][key]
+        self._segment_bytes[entry.segment] -= entry.size
+
+    def _evict(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._unlink(key, entry)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, entry.value)
+
+    def _touch(self, key: Hashable, entry: _Entry) -> None:
+        if entry.segment != _PROBATION or self.policy == EVICTION_LRU:
+            self._segments[entry.segment].move_to_end(key)
+            return
+        # Second access: promote to the protected segment, demoting its
+        # least recently used entries back to probation if it is full.
+        self._unlink(key, entry)
+        self._link(key, entry, _PROTECTED)
+        protected = self._segments[_PROTECTED]
+        while self._segment_bytes[_PROTECTED] > self._protected_budget and len(protected) > 1:
+            demoted_key = next(iter(protected))
+            demoted = self._entries[demoted_key]
+            self._unlink(demoted_key, demoted)
+            self._link(demoted_key, demoted, _PROBATION)
+
+    def _main_victim(self, exclude: Hashable) -> Optional[Hashable]:
+        for segment in (_PROBATION, _PROTECTED):
+            for key in self._segments[segment]:
+                if key != exclude:
+                    return key
+        return None
+
+    def _over_budget(self) -> bool:
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.resident_bytes > self.max_bytes
+
+    def _admit_from_window(self) -> None:
+        """Moves window overflow into the main space, filtered by frequency."""
+        window = self._segments[_WINDOW]
+        while window and self._segment_bytes[_WINDOW] > self._window_budget:
+            candidate = next(iter(window))
+            candidate_entry = self._entries[candidate]
+            self._unlink(candidate, candidate_entry)
+            self._link(candidate, candidate_entry, _PROBATION)
+            while (
+                self._segment_bytes[_PROBATION] + self._segment_bytes[_PROTECTED]
+                > self._main_budget
+            ):
+                victim = self._main_victim(exclude=candidate)
+                if victim is None:
+                    break
+                if self._sketch.estimate(candidate) > self._sketch.estimate(victim):
+                    self._evict(victim)
+                else:
+                    self._evict(candidate)
+                    self.rejections += 1
+                    break
+
+    def _enforce_budget(self) -> None:
+        if self.policy == EVICTION_W_TINYLFU:
+            self._admit_from_window()
+        while self._entries and self._over_budget():
+            for segment in (_PROBATION, _PROTECTED, _WINDOW):
+                if self._segments[segment]:
+                    self._evict(next(iter(self._segments[segment])))
+                    break
+
+    # --- Public interface ---
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get value from cache, recording the access."""
+        if self._sketch is not None:
+            self._sketch.increment(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(key, entry)
+        return entry.value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Get value without affecting recency, frequency or statistics."""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        Put value in cache, evicting entries until it fits the budget.
+
+        Returns False if the value was not kept, either because it is larger
+        than the whole budget or because the admission policy rejected it.
+        """
+        size = self.size_estimator(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.invalidate(key)
+            self.rejections += 1
+            return False
+        if self._sketch is not None:
+            self._sketch.increment(key)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._segment_bytes[entry.segment] += size - entry.size
+            entry.value = value
+            entry.size = size
+            self._touch(key, entry)
+        else:
+            entry = _Entry(value, size, _WINDOW)
+            self._entries[key] = entry
+            self._link(key, entry, _WINDOW if self._sketch is not None else _PROBATION)
+
+        self._enforce_budget()
+        return key in self._entries
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove a specific key from cache."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._unlink(key, entry)
+        return True
+
+    def clear(self) -> None:
+        """Clear all cache entries and statistics."""
+        self._entries.clear()
+        for segment in self._segments.values():
+            segment.clear()
+        for segment in self._segment_bytes:
+            self._segment_bytes[segment] = 0
+        if self._sketch is not None:
+            self._sketch.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total > 0 else 0
+        return {
+            "capacity": self.max_entries,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": hit_rate,
+            "policy": self.policy,
+            "max_bytes": self.max_bytes,
+            "resident_bytes": self.resident_bytes,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+        }
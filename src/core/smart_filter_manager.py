@@ -6,19 +6,22 @@ performance monitoring, and integration with the advanced workflow engine.
 It follows the same patterns as other core modules in the src/core directory.
 """
 
+import asyncio
 import json
 import logging
 import os
 import re
 import sqlite3
+import time
 from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Union
 
 from .database import DATA_DIR
 from .performance_monitor import log_performance
 from .caching import get_cache_manager
+from .filter_matcher import CompiledFilterSet
 from .enhanced_error_reporting import (
     log_error,
     ErrorSeverity,
@@ -31,6 +34,9 @@ logger = logging.getLogger(__name__)
 # Define paths for data storage
 DEFAULT_DB_PATH = os.path.join(DATA_DIR, "smart_filters.db")
 
+# Number of emails filtered per batch by the batch/streaming API
+DEFAULT_FILTER_BATCH_SIZE = 500
+
 
 @dataclass
 class EmailFilter:
@@ -143,6 +149,23 @@ class SmartFilterManager:
         # Enhanced caching system
         self.caching_manager = get_cache_manager()
 
+        # Active filters compiled into a single matcher, rebuilt when they change.
+        # Every filter change bumps the version, which the matcher is keyed on.
+        self._compiled_filters: Optional[CompiledFilterSet] = None
+        self._compiled_version = -1
+        self._filters_version = 0
+
+        # Cumulative throughput of batch filter application
+        self.batch_metrics: Dict[str, Any] = {
+            "batches": 0,
+            "emails_processed": 0,
+            "filters_matched": 0,
+            "usage_transactions": 0,
+            "elapsed_seconds": 0.0,
+            "emails_per_second": 0.0,
+            "last_batch_emails_per_second": 0.0,
+        }
+
         # State
         self._dirty_data: set[str] = set()
         self._initialized = False
@@ -171,8 +194,6 @@ class SmartFilterManager:
             except sqlite3.OperationalError as e:
                 if "database is locked" in str(e) and attempt < retries - 1:
                     self.logger.warning(f"Database locked, retrying ({attempt + 1}/{retries}): {e}")
-                    import time
-
                     time.sleep(0.1 * (attempt + 1))  # Exponential backoff
                     continue
                 else:
@@ -219,8 +240,6 @@ class SmartFilterManager:
             except sqlite3.OperationalError as e:
                 if "database is locked" in str(e) and attempt < retries - 1:
                     self.logger.warning(f"Database locked, retrying ({attempt + 1}/{retries}): {e}")
-                    import time
-
                     time.sleep(0.1 * (attempt + 1))  # Exponential backoff
                     continue
                 else:
@@ -678,6 +697,33 @@ class SmartFilterManager:
         # Update cache
         cache_key = f"filter_{filter_obj.filter_id}"
         await self.caching_manager.set(cache_key, filter_obj)
+        await self._invalidate_active_filters()
+
+    async def _invalidate_active_filters(self) -> None:
+        """Drops the cached active filter list and its compiled matcher."""
+        self._filters_version += 1
+        await self.caching_manager.delete("active_filters_sorted")
+        self._compiled_filters = None
+
+    async def _get_compiled_filters(self) -> CompiledFilterSet:
+        """
+        Returns the matcher for the active filters, compiling it if they changed.
+
+        Adding, updating, (de)activating and deleting a filter all go through
+        _invalidate_active_filters, so an unchanged version means the compiled
+        matcher is current without loading or comparing the filters.
+        """
+        version = self._filters_version
+        if self._compiled_filters is not None and self._compiled_version == version:
+            return self._compiled_filters
+
+        compiled = CompiledFilterSet(await self.get_active_filters_sorted())
+        # A change made while the filters were loading leaves this matcher uncached
+        if version == self._filters_version:
+            self._compiled_filters = compiled
+            self._compiled_version = version
+        self.logger.debug(f"Compiled active filters: {compiled.get_stats()}")
+        return compiled
 
     @log_performance(operation="get_active_filters_sorted")
     async def get_active_filters_sorted(self) -> List[EmailFilter]:
@@ -717,25 +763,10 @@ class SmartFilterManager:
 
         return filters
 
-    @log_performance(operation="apply_filters_to_email")
-    async def apply_filters_to_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Applies all active filters to an email and returns a summary of actions.
-
-        Args:
-            email_data: A dictionary representing the email data.
-
-        Returns:
-            A dictionary summarizing the matched filters and actions taken.
-        """
-        await self._ensure_initialized()
-
-        summary = {"filters_matched": [], "actions_taken": [], "categories": []}
-
-        # Pre-calculate email properties once to avoid repeated processing in the loop
-        # This reduces complexity from O(N_filters * Length) to O(1 * Length + N_filters)
+    def _build_email_context(self, email_data: Dict[str, Any]) -> _EmailContext:
+        """Pre-calculates the normalized email fields the filters match against."""
         sender_email = email_data.get("sender_email", email_data.get("sender", ""))
-        email_context = _EmailContext(
+        return _EmailContext(
             email=email_data,
             sender_domain=self._extract_domain(sender_email),
             subject_lower=email_data.get("subject", "").lower(),
@@ -743,33 +774,31 @@ class SmartFilterManager:
             sender_lower=sender_email.lower()
         )
 
-        # Get active filters sorted by priority
-        active_filters = await self.get_active_filters_sorted()
-
-        matched_filters = []
-
-        for filter_obj in active_filters:
+    def _summarize_matches(
+        self, email_data: Dict[str, Any], matched_filters: List[EmailFilter]
+    ) -> Dict[str, Any]:
+        """Builds the summary of matched filters and the actions they trigger."""
+        summary = {"filters_matched": [], "actions_taken": [], "categories": []}
+        for filter_obj in matched_filters:
             try:
-                if await self._apply_filter_to_email(filter_obj, email_context):
-                    matched_filters.append(filter_obj)
-                    # Record that this filter matched
-                    summary["filters_matched"].append({
-                        "filter_id": filter_obj.filter_id,
-                        "name": filter_obj.name,
-                        "priority": filter_obj.priority
-                    })
-
-                    # Execute actions
-                    for action_key, action_value in filter_obj.actions.items():
-                        if action_key == "add_label":
-                            if isinstance(action_value, str):
-                                summary["categories"].append(action_value)
-                        elif action_key == "mark_important":
-                            if action_value:
-                                summary["actions_taken"].append("marked_important")
-                        elif action_key == "move_to_folder":
-                            if isinstance(action_value, str):
-                                summary["actions_taken"].append(f"moved_to_{action_value}")
+                # Record that this filter matched
+                summary["filters_matched"].append({
+                    "filter_id": filter_obj.filter_id,
+                    "name": filter_obj.name,
+                    "priority": filter_obj.priority
+                })
+
+                # Execute actions
+                for action_key, action_value in filter_obj.actions.items():
+                    if action_key == "add_label":
+                        if isinstance(action_value, str):
+                            summary["categories"].append(action_value)
+                    elif action_key == "mark_important":
+                        if action_value:
+                            summary["actions_taken"].append("marked_important")
+                    elif action_key == "move_to_folder":
+                        if isinstance(action_value, str):
+                            summary["actions_taken"].append(f"moved_to_{action_value}")
 
             except Exception as e:
                 error_context = create_error_context(
@@ -784,19 +813,169 @@ class SmartFilterManager:
                     context=error_context
                 )
                 self.logger.warning(f"Error applying filter {filter_obj.filter_id} to email {email_data.get('id')}: {e}. Error ID: {error_id}")
+        return summary
+
+    @log_performance(operation="apply_filters_to_email")
+    async def apply_filters_to_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Applies all active filters to an email and returns a summary of actions.
+
+        Args:
+            email_data: A dictionary representing the email data.
+
+        Returns:
+            A dictionary summarizing the matched filters and actions taken.
+        """
+        await self._ensure_initialized()
+
+        # Pre-calculate email properties once so every filter matches against the same context
+        email_context = self._build_email_context(email_data)
+
+        # Match the active filters, in priority order, in one pass
+        compiled = await self._get_compiled_filters()
+        matched_filters = compiled.match(email_context)
+        summary = self._summarize_matches(email_data, matched_filters)
 
         # Batch update usage statistics for all matched filters
         if matched_filters:
             await self._batch_update_filter_usage(matched_filters)
             # Update the sorted list cache to ensure consistency
             # This is safer than relying on in-place reference updates if caching strategy changes
-            await self.caching_manager.set("active_filters_sorted", active_filters)
+            await self.caching_manager.set("active_filters_sorted", compiled.source)
 
         # Update the last_used timestamp for the email
         email_data["last_filtered_at"] = datetime.now(timezone.utc).isoformat()
 
         return summary
 
+    async def iter_filter_results(
+        self,
+        emails: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        batch_size: int = DEFAULT_FILTER_BATCH_SIZE,
+        record_usage: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Applies the active filters to a stream of emails, yielding one summary per email.
+
+        Emails are processed in batches: the active filters are loaded and compiled
+        once per batch, and the usage statistics of every filter matched in a batch
+        are written in a single transaction when the batch completes.
+
+        Args:
+            emails: An iterable or async iterable of email dictionaries.
+            batch_size: The number of emails processed per batch.
+            record_usage: Whether matches count towards the filters' usage
+                statistics; reports over already-filtered emails pass False.
+
+        Yields:
+            The summary for each email, as returned by apply_filters_to_email,
+            with the email's "email_id" added.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be greater than zero")
+        await self._ensure_initialized()
+
+        batch: List[Dict[str, Any]] = []
+        if isinstance(emails, AsyncIterable):
+            async for email_data in emails:
+                batch.append(email_data)
+                if len(batch) >= batch_size:
+                    for summary in await self._apply_filters_to_batch(batch, record_usage):
+                        yield summary
+                    batch = []
+        else:
+            for email_data in emails:
+                batch.append(email_data)
+                if len(batch) >= batch_size:
+                    for summary in await self._apply_filters_to_batch(batch, record_usage):
+                        yield summary
+                    batch = []
+        if batch:
+            for summary in await self._apply_filters_to_batch(batch, record_usage):
+                yield summary
+
+    @log_performance(operation="apply_filters_to_emails")
+    async def apply_filters_to_emails(
+        self,
+        emails: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        batch_size: int = DEFAULT_FILTER_BATCH_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Applies the active filters to many emails, e.g. to re-filter a backlog.
+
+        Args:
+            emails: An iterable or async iterable of email dictionaries.
+            batch_size: The number of emails processed per batch.
+
+        Returns:
+            A dictionary with the per-email "summaries" and the throughput
+            "metrics" of this run.
+        """
+        batches_before = self.batch_metrics["batches"]
+        start_time = time.perf_counter()
+        summaries = [summary async for summary in self.iter_filter_results(emails, batch_size)]
+        elapsed = time.perf_counter() - start_time
+        matches = sum(len(summary["filters_matched"]) for summary in summaries)
+        return {
+            "summaries": summaries,
+            "metrics": {
+                "emails_processed": len(summaries),
+                "filters_matched": matches,
+                "batches": self.batch_metrics["batches"] - batches_before,
+                "elapsed_seconds": elapsed,
+                "emails_per_second": len(summaries) / elapsed if elapsed > 0 else 0.0,
+            },
+        }
+
+    async def _apply_filters_to_batch(
+        self, batch: List[Dict[str, Any]], record_usage: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Filters one batch of emails and records filter usage once for the whole batch."""
+        start_time = time.perf_counter()
+        compiled = await self._get_compiled_filters()
+
+        summaries = []
+        usage: Counter = Counter()
+        matched_by_id: Dict[str, EmailFilter] = {}
+        filtered_at = datetime.now(timezone.utc).isoformat()
+        for email_data in batch:
+            matched_filters = compiled.match(self._build_email_context(email_data))
+            summary = self._summarize_matches(email_data, matched_filters)
+            summary["email_id"] = email_data.get("id")
+            summaries.append(summary)
+            for filter_obj in matched_filters:
+                usage[filter_obj.filter_id] += 1
+                matched_by_id[filter_obj.filter_id] = filter_obj
+            email_data["last_filtered_at"] = filtered_at
+
+        if usage and record_usage:
+            await self._batch_update_filter_usage(
+                list(matched_by_id.values()), counts=usage
+            )
+            await self.caching_manager.set("active_filters_sorted", compiled.source)
+
+        elapsed = time.perf_counter() - start_time
+        metrics = self.batch_metrics
+        metrics["batches"] += 1
+        metrics["emails_processed"] += len(batch)
+        metrics["filters_matched"] += sum(usage.values())
+        metrics["usage_transactions"] += 1 if usage and record_usage else 0
+        metrics["elapsed_seconds"] += elapsed
+        metrics["emails_per_second"] = (
+            metrics["emails_processed"] / metrics["elapsed_seconds"]
+            if metrics["elapsed_seconds"] > 0
+            else 0.0
+        )
+        metrics["last_batch_emails_per_second"] = len(batch) / elapsed if elapsed > 0 else 0.0
+
+        # Let other tasks run between batches of a long backlog
+        await asyncio.sleep(0)
+        return summaries
+
+    def get_batch_metrics(self) -> Dict[str, Any]:
+        """Returns cumulative throughput metrics of batch filter application."""
+        return dict(self.batch_metrics)
+
     async def _update_filter_usage(self, filter_id: str):
         """Updates the usage statistics for a filter."""
         # Update usage count and last used time
@@ -816,13 +995,21 @@ class SmartFilterManager:
         # which is acceptable as they are not used for filter logic (priority/criteria).
         # await self.caching_manager.delete("active_filters_sorted")
 
-    async def _batch_update_filter_usage(self, filters: List[EmailFilter]):
+    async def _batch_update_filter_usage(
+        self, filters: List[EmailFilter], counts: Optional[Dict[str, int]] = None
+    ):
         """
         Updates usage statistics for multiple filters efficiently.
 
         This method updates the database and in-memory objects without
         invalidating the entire sorted list cache, significantly improving
         performance when multiple filters match an email.
+
+        Args:
+            filters: The filters that matched.
+            counts: Optional number of matches per filter ID, used to coalesce
+                the matches of a whole batch of emails into one update. Each
+                filter counts once if omitted.
         """
         if not filters:
             return
@@ -833,18 +1020,29 @@ class SmartFilterManager:
         # Prepare batch update parameters
         update_params = []
         for filter_obj in filters:
-            update_params.append((current_time_iso, filter_obj.filter_id))
+            count = counts.get(filter_obj.filter_id, 1) if counts else 1
+            if counts:
+                update_params.append((count, current_time_iso, filter_obj.filter_id))
+            else:
+                update_params.append((current_time_iso, filter_obj.filter_id))
 
             # Update object in memory (updates the reference in cache if it exists there)
-            filter_obj.usage_count += 1
+            filter_obj.usage_count += count
             filter_obj.last_used = current_time
 
         # Execute single batch update query
-        update_query = """
-            UPDATE email_filters
-            SET usage_count = usage_count + 1, last_used = ?
-            WHERE filter_id = ?
-        """
+        if counts:
+            update_query = """
+                UPDATE email_filters
+                SET usage_count = usage_count + ?, last_used = ?
+                WHERE filter_id = ?
+            """
+        else:
+            update_query = """
+                UPDATE email_filters
+                SET usage_count = usage_count + 1, last_used = ?
+                WHERE filter_id = ?
+            """
         self._db_executemany(update_query, update_params)
 
         # Invalidate single filter caches
@@ -915,7 +1113,7 @@ class SmartFilterManager:
 
         # Invalidate cache
         await self.caching_manager.delete(f"filter_{filter_id}")
-        await self.caching_manager.delete("active_filters_sorted")
+        await self._invalidate_active_filters()
 
         return True
 
@@ -929,7 +1127,7 @@ class SmartFilterManager:
 
         # Invalidate cache
         await self.caching_manager.delete(f"filter_{filter_id}")
-        await self.caching_manager.delete("active_filters_sorted")
+        await self._invalidate_active_filters()
 
         return True
 
@@ -947,7 +1145,7 @@ class SmartFilterManager:
 
         # Invalidate cache
         await self.caching_manager.delete(f"filter_{filter_id}")
-        await self.caching_manager.delete("active_filters_sorted")
+        await self._invalidate_active_filters()
 
         return True
 
@@ -0,0 +1,276 @@
+"""
+Ordered secondary indexes for the DatabaseManager.
+
+Keeps emails ordered newest first globally, per category and per unread state,
+so list endpoints can page without re-sorting the corpus after every write.
+The ordering matches the historical sort: by ``time`` (falling back to
+``created_at``) descending, with ties kept in insertion order.
+"""
+
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+SortKey = Tuple[str, int]
+
+
+class SortedKeyList:
+    """
+    A sorted list split into bounded chunks.
+
+    Each chunk is a plain sorted list and ``_maxes`` holds the last key of
+    every chunk, so insertion and removal bisect twice and shift at most one
+    chunk: O(log n + chunk_size) instead of O(n) for a single flat list.
+    """
+
+    def __init__(self, chunk_size: int = 512):
+        self.chunk_size = chunk_size
+        self._chunks: List[List[Any]] = []
+        self._maxes: List[Any] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __reversed__(self) -> Iterator[Any]:
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def add(self, key: Any) -> None:
+        """Inserts a key, keeping the list sorted."""
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._chunks[pos].append(key)
+            self._maxes[pos] = key
+        else:
+            insort(self._chunks[pos], key)
+        self._len += 1
+
+        chunk = self._chunks[pos]
+        if len(chunk) > 2 * self.chunk_size:
+            half = len(chunk) // 2
+            self._chunks[pos:pos + 1] = [chunk[:half], chunk[half:]]
+            self._maxes[pos:pos + 1] = [chunk[half - 1], chunk[-1]]
+
+    def remove(self, key: Any) -> bool:
+        """Removes one occurrence of key. Returns False if it is not present."""
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return False
+        chunk = self._chunks[pos]
+        idx = bisect_left(chunk, key)
+        if idx == len(chunk) or chunk[idx] != key:
+            return False
+        del chunk[idx]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[pos]
+            del self._maxes[pos]
+        else:
+            self._maxes[pos] = chunk[-1]
+        return True
+
+    def __contains__(self, key: Any) -> bool:
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return False
+        chunk = self._chunks[pos]
+        idx = bisect_left(chunk, key)
+        return idx < len(chunk) and chunk[idx] == key
+
+    def iter_from(self, key: Any) -> Iterator[Any]:
+        """Iterates in ascending order, starting at the first key not less than key."""
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return
+        chunk = self._chunks[pos]
+        yield from islice(chunk, bisect_left(chunk, key), None)
+        for chunk in islice(self._chunks, pos + 1, None):
+            yield from chunk
+
+    def iter_reversed_from(self, offset: int = 0) -> Iterator[Any]:
+        """Iterates from the largest key down, skipping the first offset keys by chunk."""
+        for chunk in reversed(self._chunks):
+            if offset >= len(chunk):
+                offset -= len(chunk)
+                continue
+            yield from reversed(chunk[: len(chunk) - offset])
+            offset = 0
+
+    @classmethod
+    def from_sorted(cls, keys: List[Any], chunk_size: int = 512) -> "SortedKeyList":
+        """Builds a list from keys that are already sorted."""
+        instance = cls(chunk_size=chunk_size)
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            instance._chunks.append(chunk)
+            instance._maxes.append(chunk[-1])
+        instance._len = len(keys)
+        return instance
+
+
+def email_sort_key(email: Dict[str, Any], time_field: str, fallback_field: str, id_field: str) -> SortKey:
+    """Builds the sort key for an email. Larger keys are newer."""
+    value = email.get(time_field, email.get(fallback_field, ""))
+    # Negated ID so that, iterating in reverse, equal timestamps keep insertion order.
+    return ("" if value is None else str(value), -email[id_field])
+
+
+class EmailOrderIndex:
+    """
+    Maintains newest-first orderings of email IDs by time, category and unread state.
+
+    Each write costs O(log n) per ordering it touches; reads iterate lazily, so
+    a page only visits the entries it returns plus the skipped offset.
+    """
+
+    def __init__(
+        self,
+        time_field: str = "time",
+        fallback_field: str = "created_at",
+        id_field: str = "id",
+        category_field: str = "category_id",
+        unread_field: str = "is_unread",
+    ):
+        self.time_field = time_field
+        self.fallback_field = fallback_field
+        self.id_field = id_field
+        self.category_field = category_field
+        self.unread_field = unread_field
+        self.clear()
+
+    def clear(self) -> None:
+        self._by_time = SortedKeyList()
+        self._by_category: Dict[Hashable, SortedKeyList] = {}
+        self._by_unread: Dict[bool, SortedKeyList] = {}
+        self._entries: Dict[int, Tuple[SortKey, Hashable, Optional[bool]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, email: Dict[str, Any]) -> SortKey:
+        return email_sort_key(email, self.time_field, self.fallback_field, self.id_field)
+
+    def _unread_key(self, email: Dict[str, Any]) -> Optional[bool]:
+        value = email.get(self.unread_field)
+        return None if value is None else bool(value)
+
+    def rebuild(self, emails: List[Dict[str, Any]]) -> None:
+        """Rebuilds every ordering from scratch in O(n log n)."""
+        keyed = sorted(
+            (self._key(e), e.get(self.category_field), self._unread_key(e), e[self.id_field])
+            for e in emails
+            if e.get(self.id_field) is not None
+        )
+        self._load_sorted(keyed)
+
+    def rebuild_from_order(
+        self, emails_by_id: Dict[int, Dict[str, Any]], ordered_ids: List[int]
+    ) -> bool:
+        """
+        Rebuilds every ordering in O(n) from IDs listed oldest first, as returned
+        by ordered_ids() before a restart.
+
+        Returns False, leaving the index unchanged, if ordered_ids does not list
+        every email of emails_by_id exactly once in sort order.
+        """
+        if len(ordered_ids) != len(emails_by_id):
+            return False
+        keyed = []
+        previous = None
+        for email_id in ordered_ids:
+            email = emails_by_id.get(email_id)
+            if email is None:
+                return False
+            key = self._key(email)
+            # Strictly increasing keys also rule out duplicate IDs
+            if previous is not None and key <= previous:
+                return False
+            previous = key
+            keyed.append((key, email.get(self.category_field), self._unread_key(email), email_id))
+        self._load_sorted(keyed)
+        return True
+
+    def ordered_ids(self) -> List[int]:
+        """Returns all email IDs, oldest first."""
+        return [-key[1] for key in self._by_time]
+
+    def _load_sorted(self, keyed: List[Tuple[SortKey, Hashable, Optional[bool], int]]) -> None:
+        self.clear()
+        by_category: Dict[Hashable, List[SortKey]] = {}
+        by_unread: Dict[bool, List[SortKey]] = {}
+        for key, category_id, unread, email_id in keyed:
+            self._entries[email_id] = (key, category_id, unread)
+            by_category.setdefault(category_id, []).append(key)
+            if unread is not None:
+                by_unread.setdefault(unread, []).append(key)
+        self._by_time = SortedKeyList.from_sorted([k for k, _, _, _ in keyed])
+        self._by_category = {c: SortedKeyList.from_sorted(keys) for c, keys in by_category.items()}
+        self._by_unread = {u: SortedKeyList.from_sorted(keys) for u, keys in by_unread.items()}
+
+    def add(self, email: Dict[str, Any]) -> None:
+        """Adds an email, or moves it if its ordering attributes changed."""
+        email_id = email[self.id_field]
+        entry = (self._key(email), email.get(self.category_field), self._unread_key(email))
+        existing = self._entries.get(email_id)
+        if existing == entry:
+            return
+        if existing is not None:
+            self.remove(email_id)
+
+        key, category_id, unread = entry
+        self._entries[email_id] = entry
+        self._by_time.add(key)
+        self._by_category.setdefault(category_id, SortedKeyList()).add(key)
+        if unread is not None:
+            self._by_unread.setdefault(unread, SortedKeyList()).add(key)
+
+    def remove(self, email_id: int) -> bool:
+        """Removes an email from every ordering."""
+        entry = self._entries.pop(email_id, None)
+        if entry is None:
+            return False
+        key, category_id, unread = entry
+        self._by_time.remove(key)
+        if category_id in self._by_category:
+            self._by_category[category_id].remove(key)
+        if unread is not None and unread in self._by_unread:
+            self._by_unread[unread].remove(key)
+        return True
+
+    def iter_ids(
+        self,
+        category_id: Optional[Hashable] = None,
+        is_unread: Optional[bool] = None,
+        offset: int = 0,
+    ) -> Iterator[int]:
+        """Yields email IDs newest first, optionally filtered, skipping offset matches."""
+        if category_id is not None and is_unread is not None:
+            # Walk the category ordering and check unread state per entry.
+            source = self._by_category.get(category_id)
+            if source is None:
+                return iter(())
+            ids = (-key[1] for key in reversed(source))
+            matching = (i for i in ids if self._entries[i][2] == is_unread)
+            return islice(matching, offset, None)
+
+        if category_id is not None:
+            source = self._by_category.get(category_id)
+        elif is_unread is not None:
+            source = self._by_unread.get(bool(is_unread))
+        else:
+            source = self._by_time
+        if source is None:
+            return iter(())
+        return (-key[1] for key in source.iter_reversed_from(offset))
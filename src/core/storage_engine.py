@@ -0,0 +1,627 @@
+"""
+Pluggable storage engines for the DatabaseManager.
+
+The default engine keeps the historical behaviour of rewriting a whole
+``*.json.gz`` file on every flush. The write-ahead log engine instead appends
+record-level changes to segmented log files and folds them into the same
+``*.json.gz`` snapshot in the background, so the cost of a flush scales with
+the change set rather than with the size of the corpus.
+"""
+
+import asyncio
+import gzip
+import io
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+STORAGE_ENGINE_JSON = "json"
+STORAGE_ENGINE_WAL = "wal"
+
+WAL_DIR_NAME = "wal"
+WAL_MANIFEST_FILE = "MANIFEST.json"
+WAL_SEGMENT_SUFFIX = ".log"
+
+WAL_OP_PUT = "put"
+WAL_OP_DELETE = "del"
+
+DATA_DIR_LOCK_FILE = ".lock"
+
+_READ_CHUNK_CHARS = 64 * 1024
+
+
+class StorageEngine(ABC):
+    """Abstract persistence strategy for the DatabaseManager's record lists."""
+
+    def __init__(self, key_field: str = "id"):
+        self.key_field = key_field
+
+    @abstractmethod
+    async def load(self, data_type: str, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Loads all records of a data type.
+
+        Returns:
+            The list of records, or None if nothing has been persisted yet.
+        """
+        pass
+
+    def record_put(self, data_type: str, record: Dict[str, Any]) -> None:
+        """Notes that a record was created or updated."""
+
+    def record_delete(self, data_type: str, record_id: Any) -> None:
+        """Notes that a record was deleted."""
+
+    async def commit(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Makes the changes noted since the last commit durable, if the engine can
+        do so without a full persist.
+
+        Returns:
+            False if the engine only persists whole snapshots, so the caller
+            must call persist() later.
+        """
+        return False
+
+    @abstractmethod
+    async def persist(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]]
+    ) -> None:
+        """Makes the current state of a data type durable."""
+        pass
+
+    def iter_records(self, data_type: str, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the persisted records of a data type one at a time.
+
+        Unlike load(), memory use does not grow with the number of records.
+        """
+        if os.path.exists(file_path):
+            with gzip.open(file_path, "rt", encoding="utf-8") as f:
+                yield from iter_json_array(f)
+
+    def snapshot_replaced(self, data_type: str) -> None:
+        """Notes that the snapshot file was rewritten outside the engine (e.g. by an import)."""
+
+    def discard_pending(self, data_type: str) -> None:
+        """Drops the changes noted since the last commit without making them durable."""
+
+    def fingerprint(self, data_type: str, file_path: str) -> List[Any]:
+        """
+        Returns a cheap description of the persisted state of a data type.
+
+        The fingerprint changes whenever the persisted records may have changed,
+        so state derived from them can be reused while it stays equal.
+        """
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return []
+        return [stat.st_size, stat.st_mtime_ns]
+
+    async def close(self) -> None:
+        """Waits for background work and releases resources."""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns engine statistics."""
+        return {"engine": self.__class__.__name__}
+
+
+def iter_json_array(f: IO[str], chunk_size: int = _READ_CHUNK_CHARS) -> Iterator[Any]:
+    """Incrementally decodes the elements of a top-level JSON array from a text stream."""
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer:
+        return
+    if buffer[0] != "[":
+        raise json.JSONDecodeError("Expected a JSON array", buffer, 0)
+    pos = 1
+    eof = False
+    expect_value = True
+    while True:
+        # Skip whitespace and separators
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            if buffer[pos] == ",":
+                expect_value = True
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise json.JSONDecodeError("Unterminated JSON array", buffer, pos)
+            buffer = f.read(chunk_size)
+            pos = 0
+            eof = not buffer
+            continue
+        if buffer[pos] == "]":
+            return
+        if not expect_value:
+            raise json.JSONDecodeError("Expected ',' or ']'", buffer, pos)
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            value, end = None, -1
+        # A value not followed by a delimiter (e.g. a number) may continue in the next chunk
+        if end < 0 or (not eof and (end == len(buffer) or buffer[end] not in " \t\r\n,]")):
+            if eof:
+                raise json.JSONDecodeError("Truncated JSON array element", buffer, pos)
+            more = f.read(chunk_size)
+            eof = not more
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+        yield value
+        pos = end
+        expect_value = False
+
+
+def _read_json_gz(file_path: str) -> Any:
+    with gzip.open(file_path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fsync_dir(path: str) -> None:
+    """Makes the creation, renaming or removal of entries in a directory durable."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on every platform (e.g. Windows)
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_json_gz_atomic(
+    file_path: str, data: Any, indent: Optional[int] = None, fsync: bool = False
+) -> None:
+    """
+    Writes gzipped JSON to a temporary file and atomically swaps it in.
+
+    With fsync, the file is made durable before the rename and the rename
+    is made durable before returning, so a crash leaves either the old or
+    the complete new file.
+    """
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz, io.TextIOWrapper(gz, encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, separators=None if indent else (",", ":"))
+        raw.flush()
+        if fsync:
+            os.fsync(raw.fileno())
+    os.replace(tmp_path, file_path)
+    if fsync:
+        _fsync_dir(os.path.dirname(os.path.abspath(file_path)))
+
+
+class JsonFileStorageEngine(StorageEngine):
+    """Rewrites the full gzipped JSON file on every persist (legacy behaviour)."""
+
+    async def load(self, data_type: str, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        if not os.path.exists(file_path):
+            return None
+        return await asyncio.to_thread(_read_json_gz, file_path)
+
+    async def persist(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]]
+    ) -> None:
+        # Written beside the file and swapped in, so a concurrent export or
+        # import never reads a half-written snapshot
+        await asyncio.to_thread(_write_json_gz_atomic, file_path, records, 4)
+
+
+class WriteAheadLogStorageEngine(StorageEngine):
+    """
+    Append-only storage engine with segmented write-ahead logs.
+
+    Each data type gets a directory ``<data_dir>/wal/<data_type>/`` holding
+    numbered segment files of JSON lines and a manifest naming the first
+    segment not yet folded into the snapshot. Startup loads the snapshot and
+    replays the tail. Replaying is idempotent, so a crash at any point during
+    compaction leaves a recoverable state.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        key_field: str = "id",
+        segment_max_bytes: int = 8 * 1024 * 1024,
+        compact_after_bytes: int = 32 * 1024 * 1024,
+        fsync: bool = True,
+    ):
+        super().__init__(key_field=key_field)
+        self.wal_dir = os.path.join(data_dir, WAL_DIR_NAME)
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_after_bytes = compact_after_bytes
+        self.fsync = fsync
+
+        # Serialized log lines not yet appended, per data type
+        self._pending: Dict[str, List[str]] = {}
+        self._active_segment: Dict[str, int] = {}
+        self._tail_bytes: Dict[str, int] = {}
+        self._compaction_tasks: Dict[str, asyncio.Task] = {}
+        self._append_locks: Dict[str, asyncio.Lock] = {}
+        self._compaction_locks: Dict[str, asyncio.Lock] = {}
+        self._stats = {
+            "appended_records": 0,
+            "appended_bytes": 0,
+            "flushes": 0,
+            "group_commits": 0,
+            "compactions": 0,
+            "full_snapshots": 0,
+            "replayed_records": 0,
+            "skipped_corrupt_records": 0,
+        }
+
+        os.makedirs(self.wal_dir, exist_ok=True)
+
+    # --- Layout helpers ---
+
+    def _type_dir(self, data_type: str) -> str:
+        path = os.path.join(self.wal_dir, data_type)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _segment_path(self, data_type: str, segment_no: int) -> str:
+        return os.path.join(self._type_dir(data_type), f"{segment_no:012d}{WAL_SEGMENT_SUFFIX}")
+
+    def _list_segments(self, data_type: str) -> List[int]:
+        segments = []
+        for filename in os.listdir(self._type_dir(data_type)):
+            if filename.endswith(WAL_SEGMENT_SUFFIX):
+                try:
+                    segments.append(int(filename[: -len(WAL_SEGMENT_SUFFIX)]))
+                except ValueError:
+                    pass
+        return sorted(segments)
+
+    def _read_manifest(self, data_type: str) -> int:
+        """Returns the first segment number not covered by the snapshot."""
+        manifest_path = os.path.join(self._type_dir(data_type), WAL_MANIFEST_FILE)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return int(json.load(f).get("first_segment", 0))
+        except FileNotFoundError:
+            return 0
+        except (IOError, ValueError, json.JSONDecodeError) as e:
+            # Replaying extra segments is harmless, so fall back to all of them.
+            logger.warning(f"Unreadable WAL manifest for {data_type}: {e}. Replaying all segments.")
+            return 0
+
+    def _write_manifest(self, data_type: str, first_segment: int) -> None:
+        manifest_path = os.path.join(self._type_dir(data_type), WAL_MANIFEST_FILE)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"first_segment": first_segment}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, manifest_path)
+        if self.fsync:
+            _fsync_dir(os.path.dirname(manifest_path))
+
+    # --- Loading ---
+
+    def _read_tail_sync(
+        self, data_type: str
+    ) -> Tuple[Dict[Any, Optional[Dict[str, Any]]], List[int], int, int]:
+        """
+        Reads the segments not yet folded into the snapshot.
+
+        Returns:
+            Tuple of (latest record per key, None for deleted keys; segment
+            numbers; tail size in bytes; number of entries read)
+        """
+        first_segment = self._read_manifest(data_type)
+        segments = [s for s in self._list_segments(data_type) if s >= first_segment]
+        changes: Dict[Any, Optional[Dict[str, Any]]] = {}
+        tail_bytes = 0
+        entries = 0
+        for segment_no in segments:
+            segment_path = self._segment_path(data_type, segment_no)
+            tail_bytes += os.path.getsize(segment_path)
+            with open(segment_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn write at the end of the last segment after a crash.
+                        self._stats["skipped_corrupt_records"] += 1
+                        logger.warning(f"Skipping corrupt WAL record in {segment_path}")
+                        continue
+                    if entry.get("op") == WAL_OP_PUT:
+                        changes[entry["key"]] = entry["record"]
+                    elif entry.get("op") == WAL_OP_DELETE:
+                        changes[entry["key"]] = None
+                    entries += 1
+        return changes, segments, tail_bytes, entries
+
+    def _replay_sync(self, data_type: str, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        snapshot_exists = os.path.exists(file_path)
+        changes, segments, tail_bytes, entries = self._read_tail_sync(data_type)
+        if not snapshot_exists and not segments:
+            return None
+
+        records: Dict[Any, Dict[str, Any]] = {}
+        if snapshot_exists:
+            for record in _read_json_gz(file_path):
+                records[record.get(self.key_field)] = record
+        for key, record in changes.items():
+            if record is None:
+                records.pop(key, None)
+            else:
+                records[key] = record
+        self._stats["replayed_records"] += entries
+
+        # Always append to a fresh segment after startup so a torn tail is never extended.
+        self._active_segment[data_type] = (
+            (segments[-1] + 1) if segments else self._read_manifest(data_type)
+        )
+        self._tail_bytes[data_type] = tail_bytes
+        return list(records.values())
+
+    def iter_records(self, data_type: str, file_path: str) -> Iterator[Dict[str, Any]]:
+        # Only the unfolded tail is held in memory; it is bounded by compact_after_bytes
+        changes = self._read_tail_sync(data_type)[0]
+        for record in super().iter_records(data_type, file_path):
+            key = record.get(self.key_field)
+            if key in changes:
+                record = changes.pop(key)
+                if record is None:
+                    continue
+            yield record
+        for record in changes.values():
+            if record is not None:
+                yield record
+
+    async def load(self, data_type: str, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self._replay_sync, data_type, file_path)
+
+    # --- Writing ---
+
+    def record_put(self, data_type: str, record: Dict[str, Any]) -> None:
+        # Serialize eagerly so later in-place mutations don't leak into this entry.
+        entry = {"op": WAL_OP_PUT, "key": record.get(self.key_field), "record": record}
+        self._pending.setdefault(data_type, []).append(json.dumps(entry, separators=(",", ":")))
+
+    def record_delete(self, data_type: str, record_id: Any) -> None:
+        entry = {"op": WAL_OP_DELETE, "key": record_id}
+        self._pending.setdefault(data_type, []).append(json.dumps(entry, separators=(",", ":")))
+
+    def _lock(self, locks: Dict[str, asyncio.Lock], data_type: str) -> asyncio.Lock:
+        lock = locks.get(data_type)
+        if lock is None:
+            lock = locks[data_type] = asyncio.Lock()
+        return lock
+
+    def _append_sync(self, data_type: str, payload: str) -> int:
+        segment_no = self._active_segment.setdefault(data_type, self._read_manifest(data_type))
+        segment_path = self._segment_path(data_type, segment_no)
+        data = payload.encode("utf-8")
+        new_segment = not os.path.exists(segment_path)
+        with open(segment_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            segment_size = f.tell()
+        if new_segment and self.fsync:
+            _fsync_dir(os.path.dirname(segment_path))
+        if segment_size >= self.segment_max_bytes:
+            self._active_segment[data_type] = segment_no + 1
+        return len(data)
+
+    async def _append_pending(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]]
+    ) -> None:
+        """Appends every pending entry of a data type in one write. Holds the append lock."""
+        async with self._lock(self._append_locks, data_type):
+            # Entries noted while an earlier append was in flight are written
+            # together here (group commit); later callers may find none left.
+            lines = self._pending.pop(data_type, [])
+            if not lines:
+                return
+            try:
+                written = await asyncio.to_thread(
+                    self._append_sync, data_type, "\n".join(lines) + "\n"
+                )
+            except (IOError, OSError):
+                # Keep the entries, ahead of any noted meanwhile, for the next attempt
+                self._pending[data_type] = lines + self._pending.get(data_type, [])
+                raise
+
+            self._tail_bytes[data_type] = self._tail_bytes.get(data_type, 0) + written
+            self._stats["appended_records"] += len(lines)
+            self._stats["appended_bytes"] += written
+            self._stats["flushes"] += 1
+
+        if self._tail_bytes[data_type] >= self.compact_after_bytes:
+            self._schedule_compaction(data_type, file_path, records)
+
+    async def commit(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]]
+    ) -> bool:
+        if not os.path.exists(file_path) and not self._list_segments(data_type):
+            # Nothing persisted yet: the first persist() writes a full snapshot
+            return False
+        self._stats["group_commits"] += 1
+        await self._append_pending(data_type, file_path, records)
+        return True
+
+    async def persist(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]]
+    ) -> None:
+        if not self._pending.get(data_type):
+            # The caller changed records without describing them (or the snapshot
+            # does not exist yet), so only a full snapshot is safe.
+            await self._compact(data_type, file_path, records)
+            self._stats["full_snapshots"] += 1
+            return
+        await self._append_pending(data_type, file_path, records)
+
+    def fingerprint(self, data_type: str, file_path: str) -> List[Any]:
+        first_segment = self._read_manifest(data_type)
+        segments = []
+        for segment_no in self._list_segments(data_type):
+            if segment_no >= first_segment:
+                stat = os.stat(self._segment_path(data_type, segment_no))
+                segments.append([segment_no, stat.st_size, stat.st_mtime_ns])
+        return super().fingerprint(data_type, file_path) + segments
+
+    def discard_pending(self, data_type: str) -> None:
+        self._pending.pop(data_type, None)
+
+    def snapshot_replaced(self, data_type: str) -> None:
+        # Every logged change predates the new snapshot, so retire all segments
+        self.discard_pending(data_type)
+        segments = self._list_segments(data_type)
+        first_segment = max(
+            segments[-1] + 1 if segments else 0,
+            self._active_segment.get(data_type, self._read_manifest(data_type)) + 1,
+        )
+        self._write_manifest(data_type, first_segment)
+        for segment_no in segments:
+            os.remove(self._segment_path(data_type, segment_no))
+        self._active_segment[data_type] = first_segment
+        self._tail_bytes[data_type] = 0
+
+    # --- Compaction ---
+
+    def _schedule_compaction(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]]
+    ) -> None:
+        task = self._compaction_tasks.get(data_type)
+        if task is not None and not task.done():
+            return
+        self._compaction_tasks[data_type] = asyncio.create_task(
+            self._compact(data_type, file_path, records)
+        )
+
+    def _snapshot_sync(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]], first_segment: int
+    ) -> None:
+        # The snapshot must be durable before the manifest stops covering the
+        # segments it replaces, and those may only be removed after that
+        _write_json_gz_atomic(file_path, records, fsync=self.fsync)
+        self._write_manifest(data_type, first_segment)
+        for segment_no in self._list_segments(data_type):
+            if segment_no < first_segment:
+                os.remove(self._segment_path(data_type, segment_no))
+
+    async def _compact(
+        self, data_type: str, file_path: str, records: List[Dict[str, Any]]
+    ) -> None:
+        """Folds all sealed segments into a new snapshot."""
+        # Inline snapshots (persist) and background compactions of a data type
+        # run one at a time, so neither retires segments the other still needs.
+        async with self._lock(self._compaction_locks, data_type):
+            # Appends in flight must land before the segment they write to is sealed
+            async with self._lock(self._append_locks, data_type):
+                # Seal the active segment; new appends go to the next one.
+                first_segment = (
+                    self._active_segment.get(data_type, self._read_manifest(data_type)) + 1
+                )
+                self._active_segment[data_type] = first_segment
+                tail_before = self._tail_bytes.get(data_type, 0)
+                # Shallow-copy records on the loop thread so the writer thread sees a stable list.
+                records_copy = [dict(record) for record in records]
+            try:
+                await asyncio.to_thread(
+                    self._snapshot_sync, data_type, file_path, records_copy, first_segment
+                )
+            except (IOError, OSError) as e:
+                logger.error(f"WAL compaction for {data_type} failed: {e}")
+                return
+        self._tail_bytes[data_type] = max(0, self._tail_bytes.get(data_type, 0) - tail_before)
+        self._stats["compactions"] += 1
+        logger.info(f"Compacted WAL for {data_type} into snapshot {file_path}")
+
+    async def close(self) -> None:
+        tasks = [t for t in self._compaction_tasks.values() if not t.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._compaction_tasks.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "engine": self.__class__.__name__,
+            "tail_bytes": dict(self._tail_bytes),
+            "active_segments": dict(self._active_segment),
+            **self._stats,
+        }
+
+
+class DataDirLock:
+    """
+    Advisory lock on a data directory, shared by the processes serving it.
+
+    Every DatabaseManager holds the lock shared while it is open. Maintenance
+    that rewrites the data or its indexes from another process (e.g. the
+    reindex job) takes it exclusively, so it cannot run underneath a live
+    manager. Without ``fcntl`` (Windows) the lock always succeeds.
+    """
+
+    def __init__(self, data_dir: str):
+        self.path = os.path.join(data_dir, DATA_DIR_LOCK_FILE)
+        self._fd: Optional[int] = None
+        self.exclusive = False
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, exclusive: bool = False, blocking: bool = True) -> bool:
+        """
+        Takes (or converts) the lock. Returns False if it is not available and
+        not blocking.
+        """
+        if not FCNTL_AVAILABLE:
+            self._fd, self.exclusive = -1, exclusive
+            return True
+        fd = self._fd
+        if fd is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(fd, flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if self._fd is None:
+                os.close(fd)
+            return False
+        self._fd, self.exclusive = fd, exclusive
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if FCNTL_AVAILABLE:
+            # Closing the descriptor releases the lock
+            os.close(self._fd)
+        self._fd, self.exclusive = None, False
+
+
+def create_storage_engine(name: Optional[str], data_dir: str) -> StorageEngine:
+    """Creates a storage engine by name ("json" or "wal")."""
+    name = (name or STORAGE_ENGINE_JSON).lower()
+    if name == STORAGE_ENGINE_WAL:
+        return WriteAheadLogStorageEngine(data_dir)
+    if name != STORAGE_ENGINE_JSON:
+        logger.warning(f"Unknown storage engine '{name}', falling back to '{STORAGE_ENGINE_JSON}'.")
+    return JsonFileStorageEngine()
@@ -1,14 +1,31 @@
 import asyncio
+import inspect
 import logging
+import os
 import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import networkx as nx
 import psutil  # For memory monitoring
 
 logger = logging.getLogger(__name__)
 
+# Where a node's operation runs during parallel execution
+EXECUTION_MODE_AUTO = "auto"  # "loop" for coroutine functions, "thread" otherwise
+EXECUTION_MODE_LOOP = "loop"  # On the event loop: async or non-blocking I/O-bound operations
+EXECUTION_MODE_THREAD = "thread"  # In a thread pool: blocking calls, GIL-releasing work
+EXECUTION_MODE_PROCESS = "process"  # In a process pool: pure-Python CPU-bound work
+EXECUTION_MODES = (
+    EXECUTION_MODE_AUTO,
+    EXECUTION_MODE_LOOP,
+    EXECUTION_MODE_THREAD,
+    EXECUTION_MODE_PROCESS,
+)
+
 
 class NodeExecutionStatus(Enum):
     """Status of node execution"""
@@ -38,7 +55,10 @@ class Node:
         outputs: List[str],
         failure_strategy: str = "stop",
         conditional_expression: Optional[str] = None,
+        execution_mode: str = EXECUTION_MODE_AUTO,
     ):
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
         self.node_id = node_id
         self.name = name
         self.operation = operation
@@ -46,8 +66,24 @@ class Node:
         self.outputs = outputs
         self.failure_strategy = failure_strategy  # "stop", "continue", or "retry"
         self.conditional_expression = conditional_expression  # Optional conditional for execution
+        self.execution_mode = execution_mode
         self.status = NodeExecutionStatus.PENDING
 
+    def resolve_execution_mode(self) -> str:
+        """Returns where the operation runs, resolving "auto" from the operation type."""
+        if self.execution_mode != EXECUTION_MODE_AUTO:
+            return self.execution_mode
+        if asyncio.iscoroutinefunction(self.operation):
+            return EXECUTION_MODE_LOOP
+        return EXECUTION_MODE_THREAD
+
+    def _map_outputs(self, result: Any) -> Dict[str, Any]:
+        # If the node produces multiple outputs, we expect the operation
+        # to return a tuple. Otherwise, a single value.
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: result}
+        return {name: value for name, value in zip(self.outputs, result)}
+
     def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Executes the node's operation using the provided context.
@@ -61,13 +97,44 @@ class Node:
             # Execute the operation
             result = self.operation(*args)
 
-            # If the node produces multiple outputs, we expect the operation
-            # to return a tuple. Otherwise, a single value.
-            if len(self.outputs) == 1:
-                node_result = {self.outputs[0]: result}
+            node_result = self._map_outputs(result)
+            self.status = NodeExecutionStatus.SUCCESS
+            return node_result
+
+        except Exception as e:
+            self.status = NodeExecutionStatus.FAILED
+            logger.error(f"Error executing node '{self.name}' ({self.node_id}): {e}", exc_info=True)
+            raise
+
+    async def execute_async(
+        self,
+        context: Dict[str, Any],
+        thread_pool: Optional[Executor] = None,
+        process_pool: Optional[Executor] = None,
+    ) -> Dict[str, Any]:
+        """
+        Executes the node's operation according to its execution mode.
+
+        "loop" operations run on the event loop (and are awaited if they return
+        an awaitable); "thread" and "process" operations are offloaded to the
+        given pools so that they overlap with other nodes.
+        """
+        self.status = NodeExecutionStatus.RUNNING
+
+        try:
+            args = [context[key] for key in self.inputs]
+            mode = self.resolve_execution_mode()
+
+            if mode == EXECUTION_MODE_LOOP:
+                result = self.operation(*args)
+                if inspect.isawaitable(result):
+                    result = await result
             else:
-                node_result = {name: value for name, value in zip(self.outputs, result)}
+                pool = process_pool if mode == EXECUTION_MODE_PROCESS else thread_pool
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(pool, partial(self.operation, *args))
 
+            node_result = self._map_outputs(result)
             self.status = NodeExecutionStatus.SUCCESS
             return node_result
 
@@ -187,6 +254,10 @@ class WorkflowRunner:
     - Memory optimization
     - Parallel execution
     - Monitoring and metrics
+
+    In parallel mode each node runs where its execution mode says: on the event
+    loop, in a thread pool or in a process pool. Pools are created per run unless
+    shared ones are passed in.
     """
 
     def __init__(
@@ -195,11 +266,18 @@ class WorkflowRunner:
         fail_on_error: bool = False,
         max_retries: int = 1,
         max_concurrent: int = 5,
+        thread_pool: Optional[Executor] = None,
+        process_pool: Optional[Executor] = None,
     ):
         self.workflow = workflow
         self.fail_on_error = fail_on_error
         self.max_retries = max_retries
         self.max_concurrent = max_concurrent  # Maximum number of nodes to execute in parallel
+        self.thread_pool = thread_pool
+        self.process_pool = process_pool
+        self._active_thread_pool: Optional[Executor] = None
+        self._active_process_pool: Optional[Executor] = None
+        self._node_intervals: List[Tuple[float, float]] = []
         self.execution_context = {}
         self.node_results = {}
         self.execution_stats = {
@@ -215,7 +293,9 @@ class WorkflowRunner:
             "retries_performed": 0,
             "node_execution_times": {},  # Track execution time per node
             "memory_usage_peak": 0,  # Track peak memory usage
-            "parallelism_utilization": 0,  # Track parallelism utilization
+            "parallelism_utilization": 0,  # Average busy share of the max_concurrent slots
+            "average_concurrency": 0,  # Node execution time divided by wall time
+            "peak_concurrency": 0,  # Most nodes observed running at once
         }
 
     def run(
@@ -401,109 +481,128 @@ class WorkflowRunner:
                         )
 
     async def _run_parallel(self, execution_order, cleanup_schedule):
-        """Execute workflow nodes in parallel where possible"""
-        import asyncio
+        """
+        Execute workflow nodes in parallel where possible.
 
-        # Create a queue of nodes that are ready to execute
-        ready_nodes = []
-        completed_nodes = set()
+        Nodes become ready when their in-degree (unfinished dependencies) drops
+        to zero, so each completion only touches that node's dependents.
+        """
         node_dependencies = self._calculate_node_dependencies()
+        dependents: Dict[str, List[str]] = {node_id: [] for node_id in node_dependencies}
+        for node_id, dependencies in node_dependencies.items():
+            for dependency in dependencies:
+                dependents[dependency].append(node_id)
+        in_degree = {node_id: len(deps) for node_id, deps in node_dependencies.items()}
+        # Consumers still to finish per node, to release results when memory optimized
+        pending_consumers = {node_id: len(nodes) for node_id, nodes in dependents.items()}
+
+        # Initially, all nodes without dependencies are ready (in topological order)
+        ready_nodes = deque(node_id for node_id in execution_order if in_degree[node_id] == 0)
+        running_tasks: Dict[asyncio.Task, str] = {}
+
+        owns_thread_pool = self.thread_pool is None
+        owns_process_pool = self.process_pool is None
+        self._active_thread_pool = self.thread_pool or ThreadPoolExecutor(
+            max_workers=self.max_concurrent, thread_name_prefix="workflow-node"
+        )
+        self._active_process_pool = self.process_pool
+        if self._active_process_pool is None and any(
+            node.resolve_execution_mode() == EXECUTION_MODE_PROCESS
+            for node in self.workflow.nodes.values()
+        ):
+            self._active_process_pool = ProcessPoolExecutor(
+                max_workers=min(self.max_concurrent, os.cpu_count() or 1)
+            )
 
-        # Initially, all nodes without dependencies are ready
-        for node_id in execution_order:
-            if not node_dependencies[node_id]:  # No dependencies
-                ready_nodes.append(node_id)
-
-        # Track running tasks
-        running_tasks = {}
-
-        # Process nodes
-        while ready_nodes or running_tasks:
-            # Start new tasks up to the concurrency limit
-            while ready_nodes and len(running_tasks) < self.max_concurrent:
-                node_id = ready_nodes.pop(0)
-
-                # Create an async task to execute the node
-                task = asyncio.create_task(self._execute_single_node_with_timing(node_id))
-                running_tasks[node_id] = task
+        self._node_intervals = []
+        wall_start = time.perf_counter()
+        try:
+            while ready_nodes or running_tasks:
+                # Start new tasks up to the concurrency limit
+                while ready_nodes and len(running_tasks) < self.max_concurrent:
+                    node_id = ready_nodes.popleft()
+                    task = asyncio.create_task(self._execute_single_node_with_timing(node_id))
+                    running_tasks[task] = node_id
 
-            if running_tasks:
                 # Wait for at least one task to complete
-                done, pending = await asyncio.wait(
-                    list(running_tasks.values()), return_when=asyncio.FIRST_COMPLETED
-                )
+                done, _ = await asyncio.wait(running_tasks, return_when=asyncio.FIRST_COMPLETED)
 
-                # Process completed tasks
                 for task in done:
-                    node_id = None
-                    for nid, t in running_tasks.items():
-                        if t == task:
-                            node_id = nid
-                            break
-
-                    if node_id:
-                        try:
-                            result = await task
-                            # Update results
+                    node_id = running_tasks.pop(task)
+                    try:
+                        result = task.result()
+                        if result is not None:
+                            # Update results and the main execution context
                             self.node_results[node_id] = result
-                            # Update the main execution context with results
                             self.execution_context.update(result)
-                            completed_nodes.add(node_id)
-
-                            # Update execution stats
                             self.execution_stats["nodes_executed"] += 1
                             self.execution_stats["nodes_successful"] += 1
+                    except Exception as e:
+                        # Handle errors in parallel execution
+                        node = self.workflow.nodes[node_id]
+                        error_msg = f"Node {node.name} ({node_id}) failed: {str(e)}"
+                        logger.error(error_msg, exc_info=True)
+                        self.execution_stats["errors"].append(error_msg)
+                        self.execution_stats["nodes_executed"] += 1
+                        self.execution_stats["nodes_failed"] += 1
 
-                            # Add newly ready nodes to the ready queue
-                            for candidate_id in execution_order:
-                                if (
-                                    candidate_id not in completed_nodes
-                                    and candidate_id not in running_tasks
-                                ):
-                                    # Check if all dependencies for candidate are met
-                                    dependencies_met = all(
-                                        dep in completed_nodes
-                                        for dep in node_dependencies[candidate_id]
-                                    )
-                                    if dependencies_met:
-                                        ready_nodes.append(candidate_id)
-                        except Exception as e:
-                            # Handle errors in parallel execution
-                            node = self.workflow.nodes[node_id]
-                            error_msg = f"Node {node.name} ({node_id}) failed: {str(e)}"
-                            logger.error(error_msg, exc_info=True)
-                            self.execution_stats["errors"].append(error_msg)
-                            self.execution_stats["nodes_failed"] += 1
-
-                            # Handle failure based on strategy
-                            if node.failure_strategy == "stop":
-                                raise
-                            else:
-                                # If failure strategy is continue, mark as completed anyway
-                                completed_nodes.add(node_id)
-
-                        # Remove completed task from running tasks
-                        del running_tasks[node_id]
-
-                # If memory optimization is enabled, clean up results that are no longer needed
-                for (
-                    node_id
-                ) in completed_nodes.copy():  # Use copy to avoid mutation during iteration
-                    if node_id in cleanup_schedule:
-                        for node_to_cleanup in cleanup_schedule[node_id]:
-                            if (
-                                node_to_cleanup in self.node_results
-                                and node_to_cleanup not in running_tasks
-                                and node_to_cleanup not in ready_nodes
-                            ):
-                                del self.node_results[node_to_cleanup]
+                        # Handle failure based on strategy
+                        if node.failure_strategy == "stop":
+                            raise
+                        # Otherwise treat the node as completed so dependents still run
+
+                    for dependent in dependents[node_id]:
+                        in_degree[dependent] -= 1
+                        if in_degree[dependent] == 0:
+                            ready_nodes.append(dependent)
+
+                    # If memory optimization is enabled, release results nobody still needs
+                    if cleanup_schedule:
+                        for dependency in node_dependencies[node_id]:
+                            pending_consumers[dependency] -= 1
+                            if pending_consumers[dependency] == 0 and dependency in self.node_results:
+                                del self.node_results[dependency]
                                 logger.debug(
                                     f"Cleaned up results for node "
-                                    f"{node_to_cleanup} to optimize memory"
+                                    f"{dependency} to optimize memory"
                                 )
+        finally:
+            for task in running_tasks:
+                task.cancel()
+            self._record_parallelism(time.perf_counter() - wall_start)
+            if owns_thread_pool:
+                self._active_thread_pool.shutdown(wait=True, cancel_futures=True)
+            if owns_process_pool and self._active_process_pool is not None:
+                self._active_process_pool.shutdown(wait=True, cancel_futures=True)
+            self._active_thread_pool = None
+            self._active_process_pool = None
+
+    def _record_parallelism(self, wall_time: float) -> None:
+        """Derives average and peak concurrency from the recorded node intervals."""
+        if not self._node_intervals or wall_time <= 0:
+            return
+        busy_time = sum(end - start for start, end in self._node_intervals)
+        average = busy_time / wall_time
+        self.execution_stats["average_concurrency"] = average
+        self.execution_stats["parallelism_utilization"] = min(1.0, average / self.max_concurrent)
+
+        # Sweep over start/end events; ends sort before starts at the same instant
+        events = sorted(
+            [(start, 1) for start, _ in self._node_intervals]
+            + [(end, -1) for _, end in self._node_intervals]
+        )
+        running = peak = 0
+        for _, delta in events:
+            running += delta
+            peak = max(peak, running)
+        self.execution_stats["peak_concurrency"] = peak
 
     async def _execute_single_node(self, node_id: str):
-        """Execute a single node asynchronously"""
+        """
+        Execute a single node asynchronously.
+
+        Returns None if the node was skipped because its condition was not met.
+        """
         node = self.workflow.nodes[node_id]
 
         # Check if node should be executed based on condition
@@ -514,21 +613,20 @@ class WorkflowRunner:
             logger.info(f"Condition not met for node {node_id}, skipping execution")
             # Update execution stats for skipped nodes
             self.execution_stats["nodes_skipped"] += 1
-            return {}
+            return None
 
         # Build context for this specific node based on connections
         node_context = self._build_node_context(node_id)
 
         # Try to execute the node with retries if specified
-        success = False
         retry_count = 0
 
-        while not success and retry_count <= self.max_retries:
+        while True:
             try:
-                # Execute the node
-                result = node.execute(node_context)
-                success = True
-                return result
+                # Execute the node where its execution mode says
+                return await node.execute_async(
+                    node_context, self._active_thread_pool, self._active_process_pool
+                )
             except Exception as e:
                 retry_count += 1
                 self.execution_stats["retries_performed"] += 1
@@ -543,22 +641,28 @@ class WorkflowRunner:
 
     async def _execute_single_node_with_timing(self, node_id: str):
         """Execute a single node asynchronously and track execution time"""
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            result = await self._execute_single_node(node_id)
-            end_time = time.time()
-            execution_time = end_time - start_time
-
-            # Record execution time for this node
-            self.execution_stats["node_execution_times"][node_id] = execution_time
-
-            return result
-        except Exception:
-            # Even if execution fails, record the time it took
-            end_time = time.time()
-            execution_time = end_time - start_time
-            self.execution_stats["node_execution_times"][node_id] = execution_time
-            raise
+            return await self._execute_single_node(node_id)
+        finally:
+            # Record execution time for this node, even if execution fails
+            end_time = time.perf_counter()
+            self.execution_stats["node_execution_times"][node_id] = end_time - start_time
+            self._node_intervals.append((start_time, end_time))
+
+    def _build_node_context(self, node_id: str) -> Dict[str, Any]:
+        """
+        Builds the inputs for a node: the execution context, with each connected
+        input bound to the output of its source node.
+        """
+        node_context = dict(self.execution_context)
+        for conn in self.workflow.connections:
+            if conn["to"]["node_id"] != node_id:
+                continue
+            source_results = self.node_results.get(conn["from"]["node_id"])
+            if source_results and conn["from"]["output"] in source_results:
+                node_context[conn["to"]["input"]] = source_results[conn["from"]["output"]]
+        return node_context
 
     def _calculate_node_dependencies(self) -> Dict[str, List[str]]:
         """Calculate which nodes each node depends on"""
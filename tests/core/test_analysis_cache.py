@@ -0,0 +1,107 @@
+import pytest
+
+from src.core.ai_engine import ANALYSIS_FAILED_FLAG, AIAnalysisResult, BaseAIEngine
+from src.core.analysis_cache import AnalysisCache
+
+
+class _CountingEngine(BaseAIEngine):
+    def __init__(self, cache, versions=None):
+        self.analysis_cache = cache
+        self.versions = versions or {"sentiment": "1.0.0"}
+        self.calls = 0
+        self.fail = False
+
+    def initialize(self):
+        pass
+
+    async def analyze_email(self, subject, content, categories=None):
+        self.calls += 1
+        if self.fail:
+            return AIAnalysisResult({"risk_flags": [ANALYSIS_FAILED_FLAG]})
+        return AIAnalysisResult({"topic": subject.strip().lower(), "confidence": 0.9})
+
+    def get_model_versions(self):
+        return self.versions
+
+    def health_check(self):
+        return self.get_analysis_cache_stats()
+
+    def cleanup(self):
+        pass
+
+    def train_models(self, training_data=None):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_identical_text_is_analyzed_once(tmp_path):
+    engine = _CountingEngine(AnalysisCache(db_path=str(tmp_path / "cache.db")))
+
+    first = await engine.analyze_email("Weekly  News", "Hello\n\nreaders")
+    second = await engine.analyze_email("Weekly News", "Hello readers ")
+
+    assert engine.calls == 1
+    assert second.to_dict() == first.to_dict()
+    # Different categories can change the result, so they are part of the key
+    await engine.analyze_email("Weekly News", "Hello readers", [{"id": 1, "name": "News"}])
+    assert engine.calls == 2
+
+    stats = engine.health_check()
+    assert stats["memory_hits"] == 1
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+@pytest.mark.asyncio
+async def test_model_version_change_invalidates_both_tiers(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    engine = _CountingEngine(AnalysisCache(db_path=db_path))
+    await engine.analyze_email("Invoice", "Amount due")
+
+    # A fresh process finds the result on disk
+    restarted = _CountingEngine(AnalysisCache(db_path=db_path))
+    result = await restarted.analyze_email("Invoice", "Amount due")
+    assert restarted.calls == 0
+    assert result.topic == "invoice"
+    assert restarted.analysis_cache.get_stats()["disk_hits"] == 1
+
+    restarted.versions = {"sentiment": "1.1.0"}
+    await restarted.analyze_email("Invoice", "Amount due")
+    assert restarted.calls == 1
+    assert restarted.analysis_cache.get_stats()["invalidations"] == 1
+
+    engine.versions = {"sentiment": "1.1.0"}
+    await engine.analyze_email("Invoice", "Amount due")
+    # The old memory entry is stale, the new disk entry is current
+    assert engine.calls == 1
+    assert engine.analysis_cache.get_stats()["disk_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_analyses_are_not_cached():
+    engine = _CountingEngine(AnalysisCache(db_path=None))
+    engine.fail = True
+    await engine.analyze_email("Hi", "there")
+    await engine.analyze_email("Hi", "there")
+
+    assert engine.calls == 2
+    assert engine.analysis_cache.get_stats()["stores"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_results_are_isolated_from_callers(tmp_path):
+    cache = AnalysisCache(db_path=str(tmp_path / "cache.db"))
+    key = cache.make_key("engine", "Invoice", "Amount due")
+    result = {"categories": ["finance"], "risk_flags": []}
+    await cache.put_async(key, result)
+    result["categories"].append("spam")
+
+    first = await cache.get_async(key)
+    first["risk_flags"].append("phishing")
+    assert await cache.get_async(key) == {"categories": ["finance"], "risk_flags": []}
+
+    # Disk hits are copies as well
+    restarted = AnalysisCache(db_path=str(tmp_path / "cache.db"))
+    from_disk = await restarted.get_async(key)
+    from_disk["categories"].clear()
+    assert restarted.get(key) == {"categories": ["finance"], "risk_flags": []}
+    assert restarted.get_stats()["disk_hits"] == 1
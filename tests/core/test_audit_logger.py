@@ -0,0 +1,129 @@
+import gzip
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+from src.core import audit_logger as audit_module
+from src.core.audit_logger import (
+    AuditEvent,
+    AuditEventType,
+    AuditLogger,
+    AuditSegmentWriter,
+    AuditSeverity,
+)
+
+
+def _event(action="read", severity=AuditSeverity.LOW):
+    return AuditEvent(
+        event_id=str(uuid.uuid4()),
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        event_type=AuditEventType.EMAIL_ACCESS,
+        severity=severity,
+        user_id="alice",
+        session_id=None,
+        ip_address=None,
+        user_agent=None,
+        resource="/api/emails",
+        action=action,
+        result="success",
+        details={},
+        metadata={},
+    )
+
+
+def _logger(tmp_path, **kwargs):
+    return AuditLogger(
+        log_file=str(tmp_path / "audit.log"), json_file=str(tmp_path / "audit.jsonl"), **kwargs
+    )
+
+
+def test_events_are_group_committed(tmp_path):
+    audit = _logger(tmp_path, max_batch_latency=0.5)
+    for i in range(50):
+        audit.log_event(_event(action=f"read-{i}"))
+    audit.shutdown()
+
+    lines = (tmp_path / "audit.jsonl").read_text().splitlines()
+    assert [json.loads(line)["action"] for line in lines] == [f"read-{i}" for i in range(50)]
+    assert len((tmp_path / "audit.log").read_text().splitlines()) == 50
+    metrics = audit.get_metrics()
+    assert metrics["written"] == 50
+    assert metrics["batches"] < 50
+    assert metrics["dropped"] == 0
+
+
+def test_segments_rotate_by_size_and_are_compressed(tmp_path):
+    audit = _logger(tmp_path, max_segment_bytes=2000, max_batch_size=5, backup_count=2)
+    for i in range(60):
+        audit.log_event(_event(action=f"read-{i}"))
+    audit.rotate()
+    audit.shutdown()
+    audit._json_writer.wait_for_compression()
+
+    segments = sorted(tmp_path.glob("audit.jsonl.*.gz"))
+    assert len(segments) == 2
+    assert not list(tmp_path.glob("audit.jsonl.*[0-9Z]"))
+    with gzip.open(segments[-1], "rt") as f:
+        assert json.loads(f.readlines()[-1])["action"] == "read-59"
+    assert audit.get_metrics()["rotations"] > 4
+
+
+def test_full_queue_drops_low_severity_events(tmp_path):
+    audit = _logger(tmp_path, max_queue_size=5, max_batch_size=1)
+    # Hold the writer so the queue cannot drain
+    audit._write_lock.acquire()
+    try:
+        audit.log_event(_event())
+        while audit.get_metrics()["queue_depth"]:
+            time.sleep(0.001)
+        for _ in range(20):
+            audit.log_event(_event())
+        audit.log_event(_event(severity=AuditSeverity.CRITICAL))
+        metrics = audit.get_metrics()
+    finally:
+        audit._write_lock.release()
+    audit.shutdown()
+
+    assert metrics["dropped_by_severity"] == {"low": 15, "critical": 1}
+    assert metrics["max_queue_depth"] == 5
+    assert audit.get_metrics()["written"] == 6
+    assert not audit._processing_thread.is_alive()
+
+
+def test_second_process_writes_its_own_file(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    owner = AuditSegmentWriter(path, backup_count=5)
+    # A second writer of the same path stands in for another uvicorn worker
+    other = AuditSegmentWriter(path, backup_count=5)
+    owner.write_batch(["owner-1\n"])
+    other.write_batch(["other-1\n"])
+    owner.rotate()
+    owner.write_batch(["owner-2\n"])
+    other.write_batch(["other-2\n"])
+    owner.close()
+    other.close()
+    owner.wait_for_compression()
+
+    assert other.active_path == tmp_path / f"audit.{os.getpid()}.jsonl"
+    assert other.active_path.read_text() == "other-1\nother-2\n"
+    assert path.read_text() == "owner-2\n"
+    (segment,) = tmp_path.glob("audit.jsonl.*.gz")
+    with gzip.open(segment, "rt") as f:
+        assert f.read() == "owner-1\n"
+
+
+def test_segments_are_pruned_when_compression_fails(tmp_path, monkeypatch):
+    def failing_open(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(audit_module.gzip, "open", failing_open)
+    writer = AuditSegmentWriter(tmp_path / "audit.jsonl", backup_count=2)
+    for i in range(5):
+        writer.write_batch([f"line-{i}\n"])
+        writer.rotate()
+        writer.wait_for_compression()
+
+    segments = sorted(tmp_path.glob("audit.jsonl.*"))
+    assert [segment.read_text() for segment in segments] == ["line-3\n", "line-4\n"]
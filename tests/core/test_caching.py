@@ -151,3 +151,33 @@ class TestCacheManager:
         config = CacheConfig(backend=CacheBackend.MEMORY, max_memory_items=5000)
         cache = init_cache_manager(config)
         assert cache.config.max_memory_items == 5000
+
+
+class TestMemoryCacheBudget:
+    """Test byte-budgeted memory cache"""
+
+    @pytest.mark.asyncio
+    async def test_byte_budget_evicts_least_recently_used(self):
+        """Test that large values are evicted to stay within the byte budget"""
+        config = CacheConfig(backend=CacheBackend.MEMORY, max_memory_bytes=40_000)
+        cache = CacheManager(config)
+
+        await cache.set("first", "x" * 15_000)
+        await cache.set("second", "y" * 15_000)
+        await cache.get("first")
+        await cache.set("third", "z" * 15_000)
+
+        assert await cache.get("second") is None
+        assert await cache.get("first") is not None
+        stats = await cache.get_stats()
+        assert stats.evictions == 1
+        assert 30_000 < stats.resident_bytes <= 40_000
+
+    @pytest.mark.asyncio
+    async def test_value_larger_than_budget_is_rejected(self):
+        """Test that a value larger than the whole budget is not cached"""
+        config = CacheConfig(backend=CacheBackend.MEMORY, max_memory_bytes=1_000)
+        cache = CacheManager(config)
+
+        assert await cache.set("huge", "x" * 5_000) is False
+        assert await cache.exists("huge") is False
@@ -0,0 +1,128 @@
+import json
+from datetime import date
+
+import pytest
+
+from src.core.dashboard_aggregates import EmailAggregates, rebuild_aggregates
+from src.core.data_export import DataPaths
+from src.core.database import DatabaseConfig, create_database_manager
+from src.core.metric_sink import BufferedMetricSink, RollingLatencySummary
+
+
+def _email(email_id, day, category_id=None, is_unread=False):
+    return {
+        "id": email_id,
+        "created_at": f"2025-03-{day:02d}T10:00:00+00:00",
+        "category_id": category_id,
+        "is_unread": is_unread,
+    }
+
+
+def test_email_aggregates_follow_adds_updates_and_removes():
+    aggregates = EmailAggregates()
+    aggregates.rebuild(
+        [_email(1, 1, category_id=1, is_unread=True), _email(2, 9, category_id=1)]
+        + [_email(i, 12) for i in range(3, 6)]
+    )
+    aggregates.add(_email(6, 14, category_id=2, is_unread=True))
+    # Updating an email replaces its previous contribution
+    aggregates.add(_email(2, 9, category_id=2, is_unread=True))
+    aggregates.remove(3)
+
+    assert aggregates.total == 5
+    assert aggregates.unread == 3
+    assert aggregates.auto_labeled == 3
+    assert aggregates.top_categories(1) == [(2, 2)]
+    # 8-14 March against 1-7 March
+    assert aggregates.weekly_growth(date(2025, 3, 14)) == {"emails": 4, "percentage": 300.0}
+    assert aggregates.ingestion_counts("day", 3, date(2025, 3, 14)) == [
+        ("2025-03-12", 2),
+        ("2025-03-13", 0),
+        ("2025-03-14", 1),
+    ]
+    assert aggregates.ingestion_counts("week", 2, date(2025, 3, 14)) == [
+        ("2025-W10", 1),
+        ("2025-W11", 3),
+    ]
+    assert not aggregates.remove(3)
+
+
+def test_latency_summary_is_fed_by_sink_and_replays_the_log(tmp_path):
+    log_file = tmp_path / "metrics.jsonl"
+    sink = BufferedMetricSink(log_file=str(log_file), flush_interval=60)
+    summary = RollingLatencySummary()
+    assert sink.add_observer(summary.record_batch) == 0
+    try:
+        for duration in (0.1, 0.2, 0.3):
+            sink.record("get_emails", duration)
+        saved, log_position = sink.checkpoint(summary.to_dict)
+    finally:
+        sink.shutdown()
+
+    assert summary.averages() == {"get_emails": pytest.approx(0.2)}
+    assert log_position == log_file.stat().st_size
+
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"operation": "get_emails", "duration_seconds": 0.6}) + "\n")
+    restored = RollingLatencySummary()
+    restored.merge(json.loads(json.dumps(saved)))
+    assert restored.replay_log(str(log_file), log_position) == 1
+
+    stats = restored.get_summaries()["get_emails"]
+    assert stats["count"] == 4
+    assert stats["max_seconds"] == pytest.approx(0.6)
+    # The appended entry has no timestamp, so only the all-time mean includes it
+    assert stats["recent_count"] == 3
+    assert stats["recent_mean_seconds"] == pytest.approx(0.2)
+    assert stats["mean_seconds"] == pytest.approx(0.3)
+
+    old = RollingLatencySummary(bucket_seconds=60, window_buckets=2)
+    old.record_batch([("sync", 1.0, 0.0), ("sync", 3.0, 600.0)])
+    assert old.averages(now=610.0) == {"sync": 3.0}
+    assert old.averages(now=10_000.0) == {"sync": 2.0}
+
+
+@pytest.mark.asyncio
+async def test_database_manager_serves_dashboard_from_aggregates(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    manager = await create_database_manager(DatabaseConfig(data_dir=str(data_dir)))
+    work = await manager.create_category({"name": "Work"})
+    personal = await manager.create_category({"name": "Personal"})
+    for i in range(3):
+        await manager.create_email(
+            {"messageId": f"msg-{i}", "subject": f"Subject {i}", "is_unread": True}
+        )
+    first = manager.emails_data[0]["id"]
+    await manager.update_email(first, {"category_id": work["id"], "is_unread": False})
+    await manager.update_email(first + 1, {"category_id": personal["id"]})
+    await manager.update_email(first + 2, {"category_id": work["id"]})
+    await manager.delete_email(first + 1)
+
+    aggregates = await manager.get_dashboard_aggregates()
+    assert aggregates == {
+        "total_emails": 2,
+        "auto_labeled": 2,
+        "categories_count": 2,
+        "unread_count": 1,
+        "weekly_growth": {"emails": 2, "percentage": 0.0},
+    }
+    assert await manager.get_category_breakdown(limit=5) == {"Work": 2}
+    await manager.shutdown()
+
+    # The rebuild command recounts the same totals from the saved data
+    metrics_log = tmp_path / "metrics.jsonl"
+    metrics_log.write_text(json.dumps({"operation": "get_emails", "duration_seconds": 0.5}) + "\n")
+    summary_file = tmp_path / "latency_summary.json"
+    rebuilt = rebuild_aggregates(
+        DataPaths.from_data_dir(str(data_dir)),
+        manager.storage_engine,
+        str(summary_file),
+        str(metrics_log),
+    )
+    assert rebuilt["total_emails"] == 2
+    assert rebuilt["unread_count"] == 1
+    assert rebuilt["category_counts"] == {work["id"]: 2}
+    assert rebuilt["operations"] == {"get_emails": 0.5}
+    saved = json.loads(summary_file.read_text())
+    assert saved["log_position"] == metrics_log.stat().st_size
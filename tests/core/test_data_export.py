@@ -0,0 +1,127 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from src.core.data_export import DataPaths, export_ndjson, import_ndjson, open_text_reader
+from src.core.storage_engine import (
+    JsonFileStorageEngine,
+    WriteAheadLogStorageEngine,
+    _write_json_gz_atomic,
+)
+
+
+def _make_store(data_dir, emails=5):
+    paths = DataPaths.from_data_dir(str(data_dir))
+    (data_dir / "email_content").mkdir(parents=True)
+    _write_json_gz_atomic(paths.categories_file, [{"id": 1, "name": "Work"}])
+    _write_json_gz_atomic(paths.users_file, [{"id": 1, "username": "alice"}])
+    _write_json_gz_atomic(
+        paths.emails_file, [{"id": i, "subject": f"Subject {i}"} for i in range(1, emails + 1)]
+    )
+    for i in range(1, emails + 1, 2):
+        with gzip.open(data_dir / "email_content" / f"{i}.json.gz", "wt") as f:
+            json.dump({"content": f"Body {i} ünïcode"}, f)
+    return paths
+
+
+def _read_lines(path):
+    with open_text_reader(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_export_import_round_trip(tmp_path):
+    source = _make_store(tmp_path / "source")
+    output = str(tmp_path / "backup.ndjson.gz")
+
+    stats = export_ndjson(output, source, JsonFileStorageEngine())
+    assert stats["emails"] == 5 and stats["contents"] == 3 and not stats["resumed"]
+    lines = _read_lines(output)
+    assert lines[0]["type"] == "header"
+    assert lines[-1] == {
+        "type": "end",
+        "counts": {"categories": 1, "users": 1, "emails": 5, "contents": 3},
+    }
+
+    target = _make_store(tmp_path / "target", emails=8)
+    import_ndjson(output, target, JsonFileStorageEngine())
+    engine = JsonFileStorageEngine()
+    for data_type in ("categories", "users", "emails"):
+        assert list(engine.iter_records(data_type, target.snapshot_file(data_type))) == list(
+            engine.iter_records(data_type, source.snapshot_file(data_type))
+        )
+    # Content files of the replaced data are gone
+    assert sorted(p.name for p in (tmp_path / "target" / "email_content").iterdir()) == [
+        "1.json.gz",
+        "3.json.gz",
+        "5.json.gz",
+    ]
+    with gzip.open(tmp_path / "target" / "email_content" / "3.json.gz", "rt") as f:
+        assert json.load(f) == {"content": "Body 3 ünïcode"}
+
+
+class _FailingEngine(JsonFileStorageEngine):
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def iter_records(self, data_type, file_path):
+        for record in super().iter_records(data_type, file_path):
+            if data_type == "emails" and record["id"] > self.fail_after:
+                raise IOError("disk went away")
+            yield record
+
+
+def test_interrupted_export_resumes_from_checkpoint(tmp_path):
+    source = _make_store(tmp_path / "source", emails=9)
+    output = str(tmp_path / "backup.ndjson.gz")
+
+    with pytest.raises(IOError):
+        export_ndjson(output, source, _FailingEngine(fail_after=7), checkpoint_interval=3)
+    stats = export_ndjson(output, source, JsonFileStorageEngine(), checkpoint_interval=3)
+
+    assert stats["resumed"]
+    emails = [line["record"]["id"] for line in _read_lines(output) if line["type"] == "email"]
+    assert emails == list(range(1, 10))
+
+
+def test_export_restarts_when_the_data_changed_since_its_checkpoint(tmp_path):
+    source = _make_store(tmp_path / "source", emails=9)
+    output = str(tmp_path / "backup.ndjson.gz")
+
+    with pytest.raises(IOError):
+        export_ndjson(output, source, _FailingEngine(fail_after=7), checkpoint_interval=3)
+    # Emails 1 and 2 are deleted, so the checkpointed positions point at other records
+    _write_json_gz_atomic(source.emails_file, [{"id": i, "subject": f"Subject {i}"} for i in range(3, 10)])
+    stats = export_ndjson(output, source, JsonFileStorageEngine(), checkpoint_interval=3)
+
+    assert not stats["resumed"]
+    emails = [line["record"]["id"] for line in _read_lines(output) if line["type"] == "email"]
+    assert emails == list(range(3, 10))
+
+
+def test_import_includes_wal_tail_and_rejects_truncated_input(tmp_path):
+    source = _make_store(tmp_path / "source")
+    wal = WriteAheadLogStorageEngine(str(tmp_path / "source"))
+    wal.record_put("emails", {"id": 2, "subject": "Edited"})
+    wal.record_delete("emails", 4)
+    asyncio.run(wal.persist("emails", source.emails_file, []))
+    output = str(tmp_path / "backup.ndjson")
+    export_ndjson(output, source, wal)
+    subjects = {
+        line["record"]["id"]: line["record"]["subject"]
+        for line in _read_lines(output)
+        if line["type"] == "email"
+    }
+    assert subjects == {1: "Subject 1", 2: "Edited", 3: "Subject 3", 5: "Subject 5"}
+
+    with open(output, encoding="utf-8") as f:
+        truncated = f.readlines()[:-2]
+    truncated_path = tmp_path / "truncated.ndjson"
+    truncated_path.write_text("".join(truncated), encoding="utf-8")
+    target = _make_store(tmp_path / "target")
+    with pytest.raises(ValueError, match="truncated"):
+        import_ndjson(str(truncated_path), target, JsonFileStorageEngine())
+    # The existing data is untouched
+    assert len(list(JsonFileStorageEngine().iter_records("emails", target.emails_file))) == 5
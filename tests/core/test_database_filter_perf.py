@@ -35,8 +35,8 @@ async def test_get_emails_filtering(db_manager):
             "created_at": "2023-01-01T00:00:00Z"
         })
     db_manager.emails_data = emails
-    # _get_sorted_emails uses emails_data if cache is None
-    db_manager._sorted_emails_cache = None
+    # get_emails reads from the ordered indexes built from emails_data
+    db_manager._build_indexes()
 
     # Test filtering by category
     results = await db_manager.get_emails(category_id=1, limit=10)
@@ -4,7 +4,7 @@ import os
 import json
 import gzip
 from unittest.mock import MagicMock, AsyncMock, patch
-from src.core.database import DatabaseManager, DatabaseConfig, FIELD_CONTENT, FIELD_ID
+from src.core.database import DatabaseManager, DatabaseConfig, FIELD_CONTENT, FIELD_ID, create_database_manager
 
 @pytest.fixture
 def db_config(tmp_path):
@@ -26,65 +26,115 @@ def db_manager(db_config):
     return manager
 
 @pytest.mark.asyncio
-async def test_search_emails_uses_cache(db_manager):
-    """Test that search checks cache before hitting disk."""
-    # Setup
-    email_id = 1
-    email_light = {FIELD_ID: email_id, "subject": "Test Subject"}
-    db_manager.emails_data = [email_light]
-
-    # Mock cache hit
-    cached_content = {FIELD_CONTENT: "This contains the secret keyword"}
-    db_manager.caching_manager.get_email_content.return_value = cached_content
-
-    # Mock disk path existence to ensure we rely on cache and not fall through
-    with patch("os.path.exists", return_value=True) as mock_exists:
-        # Execute
+async def test_search_matches_body_without_reading_content_files(db_manager):
+    """Test that body matches come from the full-text index, not from disk."""
+    created = await db_manager.create_email({
+        "messageId": "msg-1",
+        "subject": "Test Subject",
+        "content": "This contains the secret keyword",
+    })
+
+    with patch.object(db_manager, "_read_content_sync") as mock_read, \
+            patch("gzip.open") as mock_gzip_open:
         results = await db_manager.search_emails_with_limit("secret", limit=10)
 
-    # Verify
-    assert len(results) == 1
-    assert results[0][FIELD_ID] == email_id
-    # Verify cache was checked
-    db_manager.caching_manager.get_email_content.assert_called_with(email_id)
+    assert [r[FIELD_ID] for r in results] == [created[FIELD_ID]]
+    mock_read.assert_not_called()
+    mock_gzip_open.assert_not_called()
 
 @pytest.mark.asyncio
-async def test_search_emails_offloads_io(db_manager, tmp_path):
-    """Test that search offloads file I/O to a thread."""
-    # Setup
-    email_id = 2
-    email_light = {FIELD_ID: email_id, "subject": "Test Subject 2"}
-    db_manager.emails_data = [email_light]
+async def test_search_ranks_subject_matches_first(db_manager):
+    """Test that a subject match outranks a body-only match."""
+    body_match = await db_manager.create_email({
+        "messageId": "msg-1", "subject": "Weekly notes", "content": "invoice attached"
+    })
+    subject_match = await db_manager.create_email({
+        "messageId": "msg-2", "subject": "Invoice 42", "content": "see attachment"
+    })
+
+    results = await db_manager.search_emails_with_limit("invoice", limit=10)
+
+    assert [r[FIELD_ID] for r in results] == [subject_match[FIELD_ID], body_match[FIELD_ID]]
+
+@pytest.mark.asyncio
+async def test_search_supports_prefix_queries(db_manager):
+    """Test that a trailing '*' expands a term as a prefix."""
+    created = await db_manager.create_email({"messageId": "msg-1", "subject": "Quarterly report"})
+
+    assert db_manager.search_index.search("quart") == []
+    results = await db_manager.search_emails_with_limit("quart*", limit=10)
+    assert [r[FIELD_ID] for r in results] == [created[FIELD_ID]]
 
-    # Mock cache miss
-    db_manager.caching_manager.get_email_content.return_value = None
+@pytest.mark.asyncio
+async def test_search_falls_back_to_substring_matching(db_manager):
+    """Test that fragments matching no indexed word still find subject and sender substrings."""
+    older = await db_manager.create_email({"messageId": "msg-1", "subject": "Invoice 41"})
+    newer = await db_manager.create_email({"messageId": "msg-2", "subject": "Invoice 42"})
+    await db_manager.create_email({"messageId": "msg-3", "subject": "Lunch", "content": "invoices"})
+
+    results = await db_manager.search_emails_with_limit("nvoice 4", limit=10)
+    assert [r[FIELD_ID] for r in results] == [newer[FIELD_ID], older[FIELD_ID]]
+    assert await db_manager.search_emails_with_limit("nvoic*", limit=10) == []
+
+@pytest.mark.asyncio
+async def test_search_index_tracks_updates_and_deletes(db_manager):
+    """Test that updates replace indexed text and deletes remove it."""
+    created = await db_manager.create_email({"messageId": "msg-1", "subject": "Alpha"})
+    await db_manager.update_email(created[FIELD_ID], {"subject": "Beta"})
+
+    assert await db_manager.search_emails_with_limit("alpha", limit=10) == []
+    assert len(await db_manager.search_emails_with_limit("beta", limit=10)) == 1
+
+    await db_manager.delete_email(created[FIELD_ID])
+    assert await db_manager.search_emails_with_limit("beta", limit=10) == []
+
+@pytest.mark.asyncio
+async def test_search_index_is_rebuilt_and_persisted(db_manager, db_config, tmp_path):
+    """Test that unindexed emails are indexed once from disk and the index is reloaded later."""
+    email_id = 2
+    db_manager.emails_data = [{FIELD_ID: email_id, "subject": "Test Subject 2"}]
 
-    # Create real file
     content_dir = tmp_path / "data" / "email_content"
     content_dir.mkdir(parents=True, exist_ok=True)
-    content_path = content_dir / f"{email_id}.json.gz"
+    with gzip.open(content_dir / f"{email_id}.json.gz", "wt", encoding="utf-8") as f:
+        json.dump({FIELD_CONTENT: "This has the hidden keyword"}, f)
 
-    heavy_data = {FIELD_CONTENT: "This has the hidden keyword"}
-    with gzip.open(content_path, "wt", encoding="utf-8") as f:
-        json.dump(heavy_data, f)
+    db_manager._build_indexes()
+    with patch("asyncio.to_thread", side_effect=asyncio.to_thread) as mock_to_thread:
+        await db_manager._load_search_index()
+    assert any(
+        getattr(call.args[0], "__name__", "") == "_read_content_sync"
+        for call in mock_to_thread.call_args_list
+        if call.args
+    )
+    await db_manager.shutdown()
 
-    # Update content index manually since we created file backdoor
-    db_manager._content_available_index.add(email_id)
+    reloaded = DatabaseManager(config=db_config)
+    reloaded.caching_manager = MagicMock()
+    reloaded.caching_manager.get_query_result.return_value = None
+    reloaded.emails_data = db_manager.emails_data
+    reloaded._build_indexes()
+    with patch.object(reloaded, "_read_content_sync") as mock_read:
+        await reloaded._load_search_index()
+        results = await reloaded.search_emails_with_limit("hidden", limit=10)
 
-    # Spy on asyncio.to_thread
-    with patch("asyncio.to_thread", side_effect=asyncio.to_thread) as mock_to_thread:
-        # Execute
-        results = await db_manager.search_emails_with_limit("hidden", limit=10)
+    mock_read.assert_not_called()
+    assert [r[FIELD_ID] for r in results] == [email_id]
 
-        # Verify
-        assert len(results) == 1
-        assert results[0][FIELD_ID] == email_id
+@pytest.mark.asyncio
+async def test_search_index_saved_before_a_crash_is_rebuilt(db_config):
+    """Test that a search index older than the data on disk is not trusted."""
+    manager = await create_database_manager(db_config)
+    created = await manager.create_email({"messageId": "msg-1", "subject": "Alpha"})
+    await manager.shutdown()
 
-        # Verify to_thread was called with the helper
-        found_call = False
-        for call in mock_to_thread.call_args_list:
-            if call.args and getattr(call.args[0], "__name__", "") == "_read_content_sync":
-                found_call = True
-                break
+    # The data is written but the process dies before saving the search index
+    crashed = await create_database_manager(db_config)
+    await crashed.update_email(created[FIELD_ID], {"subject": "Beta"})
+    await crashed.flush()
+    crashed.data_dir_lock.release()
 
-        assert found_call, "asyncio.to_thread should have been called with _read_content_sync"
+    reloaded = await create_database_manager(db_config)
+    assert await reloaded.search_emails_with_limit("alpha", limit=10) == []
+    assert [r[FIELD_ID] for r in await reloaded.search_emails_with_limit("beta", limit=10)] == [created[FIELD_ID]]
+    await reloaded.shutdown()
@@ -0,0 +1,66 @@
+import pytest
+from unittest.mock import patch
+
+from src.core.database import DatabaseConfig, create_database_manager
+from src.core.sorted_index import EmailOrderIndex
+
+
+@pytest.fixture
+def db_config(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return DatabaseConfig(data_dir=str(data_dir))
+
+
+async def _populate(db_config):
+    manager = await create_database_manager(db_config)
+    category = await manager.create_category({"name": "Work"})
+    for i in range(5):
+        await manager.create_email(
+            {
+                "messageId": f"msg-{i}",
+                "subject": f"Subject {i}",
+                "content": f"Body {i}",
+                "categoryId": category["id"],
+                "time": f"2025-01-0{i + 1}T00:00:00",
+            }
+        )
+    await manager.shutdown()
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_startup_loads_persisted_indexes(db_config):
+    original = await _populate(db_config)
+
+    with patch("os.listdir") as mock_listdir, patch.object(
+        EmailOrderIndex, "rebuild"
+    ) as mock_rebuild:
+        restarted = await create_database_manager(db_config)
+
+    mock_listdir.assert_not_called()
+    mock_rebuild.assert_not_called()
+    assert restarted._index_generation == 1
+    assert restarted._content_available_index == original._content_available_index
+    assert restarted.category_counts == original.category_counts
+    assert list(restarted.email_order_index.iter_ids()) == list(
+        original.email_order_index.iter_ids()
+    )
+    assert set(restarted.emails_by_message_id) == {f"msg-{i}" for i in range(5)}
+
+
+@pytest.mark.asyncio
+async def test_stale_index_snapshot_is_rebuilt(db_config):
+    await _populate(db_config)
+    # A content file added behind the manager's back changes the fingerprint
+    with open(f"{db_config.email_content_dir}/99.json.gz", "wb"):
+        pass
+
+    restarted = await create_database_manager(db_config)
+    assert 99 in restarted._content_available_index
+    await restarted.shutdown()
+    assert restarted._index_generation == 2
+
+    with open(restarted.index_snapshot_file, "wb") as f:
+        f.write(b"corrupt")
+    assert 99 in (await create_database_manager(db_config))._content_available_index
@@ -0,0 +1,82 @@
+import pytest
+from src.core.database import DatabaseManager, DatabaseConfig, FIELD_ID
+from src.core.enhanced_caching import EnhancedCachingManager, QueryResultCache
+
+
+def test_invalidate_tags_only_removes_dependent_entries():
+    cache = QueryResultCache(ttl_seconds=60, capacity=10)
+    cache.put("search:invoice:10", [1], tags={"term:invoice", "email:1"})
+    cache.put("search:report:10", [2], tags={"term:report", "email:2"})
+
+    assert cache.invalidate_tags({"email:1", "term:unrelated"}) == 1
+    assert cache.get("search:invoice:10") is None
+    assert cache.get("search:report:10") == [2]
+
+    stats = cache.get_stats()
+    assert stats["invalidations"] == 1
+    assert stats["invalidations_by_tag"] == {"email:1": 1}
+    assert stats["invalidations_by_tag_type"] == {"email": 1}
+
+
+def test_evicted_entries_drop_their_tags():
+    cache = QueryResultCache(ttl_seconds=60, capacity=1)
+    cache.put("a", 1, tags={"term:a"})
+    cache.put("b", 2, tags={"term:b"})
+
+    assert cache.invalidate_tags({"term:a"}) == 0
+    assert cache._tag_keys == {"term:b": {"b"}}
+
+
+def test_tag_values_follow_the_cached_entries():
+    cache = QueryResultCache(ttl_seconds=60, capacity=10)
+    cache.put("search:inv*:10", [1], tags={"prefix:inv", "email:1"})
+    cache.put("search:in*:10", [1], tags={"prefix:in", "email:1"})
+
+    assert cache.tag_values("prefix") == {"inv", "in"}
+    cache.invalidate("search:inv*:10")
+    assert cache.tag_values("prefix") == {"in"}
+    cache.invalidate_tags({"email:1"})
+    assert cache.tag_values("prefix") == set()
+    assert cache._tag_values == {}
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return DatabaseManager(config=DatabaseConfig(data_dir=str(data_dir)))
+
+
+@pytest.mark.asyncio
+async def test_unrelated_writes_keep_cached_searches(db_manager):
+    await db_manager._ensure_initialized()
+    invoice = await db_manager.create_email({"messageId": "msg-1", "subject": "Invoice 42"})
+    await db_manager.create_email({"messageId": "msg-2", "subject": "Quarterly report"})
+
+    await db_manager.search_emails_with_limit("invoice", limit=10)
+    await db_manager.search_emails_with_limit("quart*", limit=10)
+
+    # A new email without matching terms leaves both searches cached
+    await db_manager.create_email({"messageId": "msg-3", "subject": "Lunch plans"})
+    assert db_manager.caching_manager.get_query_result("search:invoice:10") is not None
+    assert db_manager.caching_manager.get_query_result("search:quart*:10") is not None
+
+    # A new email matching a prefix invalidates only that search
+    await db_manager.create_email({"messageId": "msg-4", "subject": "Quarter close"})
+    assert db_manager.caching_manager.get_query_result("search:quart*:10") is None
+    assert db_manager.caching_manager.get_query_result("search:invoice:10") is not None
+
+    # Marking a returned email as read invalidates searches that returned it
+    await db_manager.update_email(invoice[FIELD_ID], {"is_unread": False})
+    assert db_manager.caching_manager.get_query_result("search:invoice:10") is None
+
+
+def test_content_cache_reports_resident_bytes():
+    manager = EnhancedCachingManager(content_cache_max_bytes=50_000)
+    manager.put_email_content(1, {"content": "x" * 30_000})
+    manager.put_email_content(2, {"content": "y" * 30_000})
+
+    stats = manager.get_cache_statistics()["email_content_cache"]
+    assert stats["size"] == 1
+    assert 30_000 < stats["resident_bytes"] <= 50_000
+    assert manager.get_email_content(2) is not None
@@ -0,0 +1,96 @@
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from src.core.filter_matcher import AhoCorasickAutomaton, CompiledFilterSet
+from src.core.smart_filter_manager import EmailFilter, SmartFilterManager, _EmailContext
+
+
+def _make_filter(filter_id, criteria):
+    now = datetime.now(timezone.utc)
+    return EmailFilter(
+        filter_id=filter_id,
+        name=filter_id,
+        description="Test",
+        criteria=criteria,
+        actions={},
+        priority=5,
+        effectiveness_score=0.0,
+        created_at=now,
+        last_used=now,
+        usage_count=0,
+        false_positive_rate=0.0,
+        performance_metrics={},
+    )
+
+
+def _context(sender, subject, content):
+    return _EmailContext(
+        email={},
+        sender_domain=sender.split("@")[1].lower() if "@" in sender else "",
+        subject_lower=subject.lower(),
+        content_lower=content.lower(),
+        sender_lower=sender.lower(),
+    )
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasickAutomaton(["he", "she", "his", "hers", "ushers"])
+    assert automaton.find("ushers") == {0, 1, 3, 4}
+    assert automaton.find("this") == {2}
+    assert automaton.find("nothing") == set()
+
+
+def test_automaton_matches_naive_substring_search():
+    rng = random.Random(7)
+    patterns = sorted({"".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(40)})
+    automaton = AhoCorasickAutomaton(patterns)
+    for _ in range(200):
+        text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 30)))
+        expected = {i for i, p in enumerate(patterns) if p in text}
+        assert automaton.find(text) == expected
+
+
+@pytest.mark.asyncio
+async def test_compiled_set_agrees_with_per_filter_matching():
+    rng = random.Random(11)
+    words = ["invoice", "report", "urgent", "meeting", "sale", "voice", ""]
+    domains = ["example.com", "shop.io", "news.org"]
+    filters = []
+    for i in range(60):
+        criteria = {}
+        if rng.random() < 0.4:
+            criteria["sender_domain"] = rng.choice(domains)
+        if rng.random() < 0.5:
+            criteria["subject_keywords"] = rng.sample(words, rng.randint(0, 2))
+        if rng.random() < 0.4:
+            criteria["content_keywords"] = [w.upper() for w in rng.sample(words, rng.randint(1, 2))]
+        if rng.random() < 0.2:
+            criteria["from_patterns"] = [r"^(no-?reply|alerts)@"]
+        filters.append(_make_filter(f"f{i}", criteria))
+
+    manager = SmartFilterManager(db_path=":memory:")
+    compiled = CompiledFilterSet(filters)
+    for _ in range(100):
+        sender = f"{rng.choice(['noreply', 'bob', 'alerts'])}@{rng.choice(domains)}"
+        subject = " ".join(rng.sample(words, 2)).title()
+        content = " ".join(rng.sample(words, 3))
+        context = _context(sender, subject, content)
+
+        expected = [
+            f for f in filters
+            if await manager._apply_filter_to_email(f, context)
+        ]
+        assert compiled.match(context) == expected
+
+
+def test_invalid_patterns_are_skipped():
+    filters = [
+        _make_filter("bad", {"from_patterns": ["("]}),
+        _make_filter("good", {"from_patterns": ["alerts"]}),
+    ]
+    compiled = CompiledFilterSet(filters)
+
+    assert compiled.invalid_filters == ["bad"]
+    assert [f.filter_id for f in compiled.match(_context("alerts@x.io", "", ""))] == ["good"]
@@ -0,0 +1,173 @@
+import asyncio
+import gzip
+import json
+import threading
+import time
+
+import pytest
+
+from src.core.job_queue import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    JobQueue,
+    JobWorker,
+    calculate_weekly_growth,
+    rebuild_indexes,
+    start_workers,
+)
+
+_attempts = {"flaky": 0}
+
+
+def flaky(succeed_on):
+    _attempts["flaky"] += 1
+    if _attempts["flaky"] < succeed_on:
+        raise RuntimeError(f"attempt {_attempts['flaky']} failed")
+    return {"attempts": _attempts["flaky"]}
+
+
+async def async_echo(value):
+    return value
+
+
+def slow(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_jobs_run_by_priority_and_report_results(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    low = queue.enqueue("operator.add", args=(1, 1), priority=PRIORITY_LOW)
+    high = queue.enqueue("operator.add", args=(2, 2), priority=PRIORITY_HIGH)
+    echo = queue.enqueue(f"{__name__}:async_echo", args=({"ok": True},))
+
+    assert queue.get_job_status(high).status == "queued"
+    assert [queue.claim("w")["id"] for _ in range(3)] == [high, echo, low]
+    queue.close()
+
+    queue = JobQueue(str(tmp_path / "other.db"))
+    ids = [queue.enqueue("operator.add", args=(i, i)) for i in range(3)]
+    ids.append(queue.enqueue(f"{__name__}:async_echo", args=({"ok": True},)))
+    assert JobWorker(queue).work(burst=True) == 4
+
+    status = queue.get_job_status(ids[2])
+    assert (status.status, status.result, status.attempts) == ("finished", 4, 1)
+    assert status.completed_at >= status.created_at
+    assert queue.get_job_status(ids[3]).result == {"ok": True}
+    assert queue.get_job_status("missing").status == "not_found"
+    assert queue.get_stats()["finished"] == 4
+    queue.close()
+
+
+def test_failed_jobs_are_retried_with_backoff_then_fail(tmp_path):
+    _attempts["flaky"] = 0
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    worker = JobWorker(queue)
+    job_id = queue.enqueue(f"{__name__}:flaky", args=(3,), max_retries=2, retry_backoff=0.05)
+
+    assert worker.run_one()
+    status = queue.get_job_status(job_id)
+    assert status.status == "queued"
+    assert "attempt 1 failed" in status.error
+    # The retry waits for the backoff
+    assert not worker.run_one()
+    time.sleep(0.06)
+    assert worker.run_one()
+    assert not worker.run_one()
+    time.sleep(0.11)
+    assert worker.run_one()
+
+    status = queue.get_job_status(job_id)
+    assert (status.status, status.result, status.attempts) == ("finished", {"attempts": 3}, 3)
+
+    failing = queue.enqueue(f"{__name__}:flaky", args=(100,), max_retries=0)
+    assert worker.run_one()
+    status = queue.get_job_status(failing)
+    assert status.status == "failed"
+    assert status.result is None
+    assert "RuntimeError" in status.error
+    queue.close()
+
+
+def test_results_expire_and_lost_leases_are_reclaimed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    expiring = queue.enqueue("operator.add", args=(1, 2), result_ttl=0.05)
+    assert JobWorker(queue).run_one()
+    assert queue.get_job_status(expiring).result == 3
+    time.sleep(0.06)
+    assert queue.get_job_status(expiring).status == "not_found"
+    assert queue.purge_expired() == 1
+
+    job_id = queue.enqueue("operator.add", args=(2, 2), timeout=0.05, max_retries=1)
+    stale = queue.claim("dead-worker")
+    assert queue.claim("other") is None
+    time.sleep(0.06)
+    reclaimed = queue.claim("other")
+    assert (reclaimed["id"], reclaimed["attempts"]) == (job_id, 2)
+    # The first worker lost its lease and cannot overwrite the new attempt
+    assert not queue.complete(stale, 0)
+    assert queue.complete(reclaimed, 4)
+    assert queue.get_job_status(job_id).result == 4
+
+    abandoned = queue.enqueue("operator.add", args=(1, 1), timeout=0.01, max_retries=0)
+    queue.claim("dead-worker")
+    time.sleep(0.02)
+    assert queue.claim("other") is None
+    assert queue.get_job_status(abandoned).status == "failed"
+    queue.close()
+
+
+def test_running_jobs_renew_their_lease(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    queue = JobQueue(db_path)
+    job_id = queue.enqueue(f"{__name__}:slow", args=(0.2,), timeout=0.06, max_retries=1)
+    worker = threading.Thread(target=JobWorker(queue).run_one)
+    worker.start()
+    time.sleep(0.12)
+
+    # The job outlived its timeout but its worker is alive, so it is not handed out again
+    other = JobQueue(db_path)
+    assert other.claim("other") is None
+    worker.join()
+    status = queue.get_job_status(job_id)
+    assert (status.status, status.result, status.attempts) == ("finished", 0.2, 1)
+    other.close()
+    queue.close()
+
+
+def test_reindex_job_refuses_a_data_dir_in_use(tmp_path):
+    from src.core.database import DatabaseConfig, create_database_manager
+
+    async def run():
+        manager = await create_database_manager(DatabaseConfig(data_dir=str(tmp_path)))
+        await manager.create_email({"message_id": "m1", "subject": "Quarterly report"})
+        with pytest.raises(RuntimeError, match="in use"):
+            await rebuild_indexes(str(tmp_path))
+        await manager.shutdown()
+        return await rebuild_indexes(str(tmp_path))
+
+    stats = asyncio.run(run())
+    assert (stats["emails"], stats["indexed_documents"]) == (1, 1)
+    assert stats["index_generation"] >= 1
+
+
+def test_worker_processes_share_the_queue(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    queue = JobQueue(db_path)
+    ids = [queue.enqueue("operator.mul", args=(i, 10)) for i in range(20)]
+
+    for process in start_workers(2, db_path, burst=True):
+        process.join(30)
+        assert process.exitcode == 0
+
+    assert [queue.get_job_status(job_id).result for job_id in ids] == [i * 10 for i in range(20)]
+    queue.close()
+
+
+def test_weekly_growth_job_reads_the_stored_emails(tmp_path):
+    today = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+    with gzip.open(tmp_path / "emails.json.gz", "wt", encoding="utf-8") as f:
+        json.dump([{"id": i, "created_at": today} for i in range(3)], f)
+    result = calculate_weekly_growth(str(tmp_path))
+    assert result["weekly_growth"] == {"emails": 3, "percentage": 0.0}
+    assert result["daily_ingestion"][-1][1] == 3
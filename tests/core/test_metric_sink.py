@@ -0,0 +1,69 @@
+import json
+import random
+import threading
+
+import pytest
+
+from src.core.metric_sink import BufferedMetricSink, HdrHistogram
+
+
+def test_histogram_percentiles_stay_within_relative_error():
+    rng = random.Random(3)
+    values = sorted(int(rng.lognormvariate(8, 1.5)) for _ in range(20000))
+    histogram = HdrHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for percentile in (50, 95, 99):
+        exact = values[max(0, -(-len(values) * percentile // 100) - 1)]
+        assert histogram.value_at_percentile(percentile) == pytest.approx(exact, rel=1 / 64)
+    assert histogram.value_at_percentile(100) == values[-1]
+    assert histogram.min == values[0]
+
+
+def test_flush_writes_one_batch_and_counts_drops(tmp_path):
+    log_file = tmp_path / "metrics.jsonl"
+    sink = BufferedMetricSink(log_file=str(log_file), capacity=100, flush_interval=60)
+    try:
+        for i in range(150):
+            sink.record("search_emails", 0.001 * (i % 10 + 1))
+        assert sink.flush() == 100
+
+        stats = sink.get_stats()
+        assert stats["dropped"] == 50
+        assert stats["written"] == 100
+        assert stats["flushes"] == 1
+        entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+        assert len(entries) == 100
+        assert set(entries[0]) == {"timestamp", "operation", "duration_seconds"}
+
+        latencies = sink.get_latency_stats("search_emails")["search_emails"]
+        assert latencies["count"] == 100
+        assert latencies["p50_ms"] == pytest.approx(5.0, rel=0.02)
+        assert latencies["p99_ms"] == pytest.approx(10.0, rel=0.02)
+    finally:
+        sink.shutdown()
+
+
+def test_concurrent_records_are_not_lost():
+    sink = BufferedMetricSink(batch_size=64, flush_interval=0.01)
+
+    def worker():
+        for _ in range(2000):
+            sink.record("op", 0.0001)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.shutdown()
+
+    assert sink.get_latency_stats()["op"]["count"] == 8000
+    assert sink.get_stats()["dropped"] == 0
+
+
+def test_sampling_rate_is_validated():
+    with pytest.raises(ValueError):
+        BufferedMetricSink(sample_rate=1.5)
+    assert not BufferedMetricSink(sample_rate=0.0).should_sample()
@@ -561,3 +561,156 @@ class TestNotmuchDataSourceDashboard:
 
         assert isinstance(result, dict)
         assert len(result) == 0
+
+
+class _FakeMessage:
+    def __init__(self, message_id, date, tags, lastmod):
+        self.message_id = message_id
+        self.date = date
+        self.tags = set(tags)
+        self.lastmod = lastmod
+
+    def get_message_id(self):
+        return self.message_id
+
+    def get_header(self, name):
+        return f"{name} of {self.message_id}"
+
+    def get_date(self):
+        return self.date
+
+    def get_tags(self):
+        return list(self.tags)
+
+
+class _FakeQuery:
+    def __init__(self, db, query_string):
+        self.db = db
+        self.query_string = query_string
+        self.sort = None
+
+    def set_sort(self, sort):
+        self.sort = sort
+
+    def _matches(self):
+        messages = list(self.db.messages.values())
+        if self.query_string.startswith("lastmod:"):
+            low, high = self.query_string[len("lastmod:"):].split("..")
+            messages = [m for m in messages if int(low) <= m.lastmod <= int(high)]
+        elif self.query_string.startswith("tag:"):
+            messages = [m for m in messages if self.query_string[4:].strip('"') in m.tags]
+        if self.sort == "NEWEST_FIRST":
+            messages.sort(key=lambda m: m.date, reverse=True)
+        return messages
+
+    def search_messages(self):
+        for message in self._matches():
+            self.db.messages_loaded += 1
+            yield message
+
+    def count_messages(self):
+        self.db.count_queries += 1
+        return len(self._matches())
+
+
+class _FakeNotmuchDatabase:
+    def __init__(self):
+        self.messages = {}
+        self.revision = 0
+        self.messages_loaded = 0
+        self.count_queries = 0
+
+    def add(self, message_id, date, tags):
+        self.revision += 1
+        self.messages[message_id] = _FakeMessage(message_id, date, tags, self.revision)
+
+    def retag(self, message_id, tags):
+        self.revision += 1
+        self.messages[message_id].tags = set(tags)
+        self.messages[message_id].lastmod = self.revision
+
+    def remove(self, message_id):
+        self.revision += 1
+        del self.messages[message_id]
+
+    def get_revision(self):
+        return self.revision, "uuid-1"
+
+    def get_all_tags(self):
+        return sorted({tag for message in self.messages.values() for tag in message.tags})
+
+    def create_query(self, query_string):
+        return _FakeQuery(self, query_string)
+
+
+class TestNotmuchDataSourcePagingAndTagCounts:
+    """Test lazy paging and the cached tag-count table."""
+
+    @pytest.fixture
+    def fake_source(self):
+        fake_db = _FakeNotmuchDatabase()
+        for i in range(100):
+            fake_db.add(f"m{i}", date=i, tags=["inbox", "work" if i % 2 else "personal"])
+        data_source = NotmuchDataSource(db_manager=AsyncMock(spec=DatabaseManager))
+        data_source.notmuch_db = fake_db
+        data_source._initialized = True
+        return data_source, fake_db
+
+    @pytest.mark.asyncio
+    async def test_get_emails_stops_after_requested_page(self, fake_source):
+        data_source, fake_db = fake_source
+        with patch('src.core.notmuch_data_source.notmuch') as mock_notmuch:
+            mock_notmuch.Query.SORT.NEWEST_FIRST = "NEWEST_FIRST"
+            page = await data_source.get_emails(limit=5, offset=10)
+
+        assert [email["id"] for email in page] == [f"m{i}" for i in range(89, 84, -1)]
+        assert fake_db.messages_loaded == 15
+
+    @pytest.mark.asyncio
+    async def test_tag_counts_refresh_incrementally(self, fake_source):
+        data_source, fake_db = fake_source
+
+        # The table is built from notmuch's per-tag counts without walking messages
+        assert await data_source.get_category_breakdown() == {"work": 50, "personal": 50}
+        assert fake_db.messages_loaded == 0
+
+        fake_db.retag("m0", ["inbox", "personal", "urgent"])
+        fake_db.add("m100", date=100, tags=["urgent"])
+        fake_db.count_queries = 0
+        breakdown = await data_source.get_category_breakdown()
+        assert breakdown == {"work": 50, "personal": 50, "urgent": 2}
+        # Only the changed messages are visited, and only their tags are recounted
+        assert fake_db.messages_loaded == 2
+        assert fake_db.count_queries == 4
+
+        # Removed messages are not visible to lastmod queries, so force a rebuild
+        fake_db.remove("m100")
+        aggregates = await data_source.get_dashboard_aggregates()
+        assert aggregates["total_emails"] == 100
+        assert (await data_source.get_category_breakdown())["urgent"] == 1
+
+        stats = data_source.get_tag_count_stats()
+        assert stats["full_rebuilds"] == 2
+        assert stats["revision"] == fake_db.revision
+
+    @pytest.mark.asyncio
+    async def test_tag_counts_drop_removed_messages_and_tags(self, fake_source):
+        data_source, fake_db = fake_source
+        data_source._tag_counts.verify_interval = 2
+        await data_source.get_category_breakdown()
+
+        # A removal hidden behind an addition keeps the total unchanged
+        fake_db.remove("m1")
+        fake_db.add("m100", date=100, tags=["inbox", "personal"])
+        assert await data_source.get_category_breakdown() == {"work": 49, "personal": 51}
+        assert data_source.get_tag_count_stats()["full_rebuilds"] == 2
+
+        # The tag a message gained is recounted at once, without a rebuild
+        fake_db.retag("m2", ["inbox", "work"])
+        assert (await data_source.get_category_breakdown())["work"] == 50
+        assert data_source.get_tag_count_stats()["full_rebuilds"] == 2
+
+        # The tag it lost is caught by the periodic recount of every tag
+        fake_db.retag("m3", ["inbox", "work", "urgent"])
+        assert await data_source.get_category_breakdown() == {"work": 50, "personal": 50, "urgent": 1}
+        assert data_source.get_tag_count_stats()["full_rebuilds"] == 3
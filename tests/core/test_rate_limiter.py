@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from src.core.rate_limiter import (
+    APIRateLimiter,
+    RateLimitConfig,
+    ShardedMemoryStore,
+    SQLiteBucketStore,
+    normalize_endpoint,
+)
+
+
+@pytest.mark.asyncio
+async def test_resource_paths_share_their_route_bucket():
+    limiter = APIRateLimiter()
+    limiter.add_endpoint_limit("/api/emails", RateLimitConfig(requests_per_minute=1, burst_limit=2))
+
+    results = [
+        (await limiter.check_rate_limit(f"/api/emails/{email_id}", "10.0.0.1"))[0]
+        for email_id in (123, 124, 125)
+    ]
+    assert results == [True, True, False]
+    assert normalize_endpoint("/api/emails/123") == "/api/emails/{id}"
+    assert list(limiter._limiters) == ["/api/emails/{id}"]
+    assert normalize_endpoint("/api/files/V1StGXR8_Z5jdHi6B-myT") == "/api/files/{id}"
+    assert normalize_endpoint("/api/tokens/cjld2cjxh0000qzrmn831i7rn") == "/api/tokens/{id}"
+    # Long static segments are part of the route
+    for path in (
+        "/api/dashboard/performance-overview-statistics",
+        "/api/reports/quarterly_v2_summary_export",
+    ):
+        assert normalize_endpoint(path) == path
+
+    # A known route template takes precedence over normalization
+    allowed, headers = await limiter.check_rate_limit(
+        "/api/emails/by-sender", "10.0.0.1", route_template="/api/emails/{sender}"
+    )
+    assert allowed
+    assert headers["X-RateLimit-Limit"] == 1
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_sqlite_store_enforce_one_budget(tmp_path):
+    db_path = str(tmp_path / "rate_limits.db")
+    workers = [APIRateLimiter(store=SQLiteBucketStore(db_path)) for _ in range(2)]
+    for worker in workers:
+        worker.add_endpoint_limit("/api", RateLimitConfig(requests_per_minute=1, burst_limit=3))
+
+    allowed = [
+        (await workers[i % 2].check_rate_limit("/api/models", "client"))[0] for i in range(5)
+    ]
+    assert allowed == [True, True, True, False, False]
+    assert await workers[0].get_limiter("/api/models").get_remaining_tokens("client") == 0
+    assert (await workers[1].check_rate_limit("/api/models", "other-client"))[0]
+
+
+@pytest.mark.asyncio
+async def test_unusable_sqlite_store_falls_back_to_local_limits(tmp_path):
+    # A directory cannot be opened as a database
+    limiter = APIRateLimiter(store=SQLiteBucketStore(str(tmp_path)))
+    limiter.add_endpoint_limit("/api", RateLimitConfig(requests_per_minute=1, burst_limit=2))
+
+    allowed = [(await limiter.check_rate_limit("/api/models", "client"))[0] for _ in range(3)]
+    assert allowed == [True, True, False]
+    assert await limiter.get_limiter("/api/models").get_remaining_tokens("client") == 0
+
+
+def test_sharded_store_is_exact_under_threads():
+    store = ShardedMemoryStore(shards=4)
+    config = RateLimitConfig(requests_per_minute=1, window_seconds=3600, burst_limit=100)
+    allowed = []
+
+    def hammer():
+        for _ in range(50):
+            allowed.append(store.take("ip:1", config, 1000.0)[0])
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 100
@@ -0,0 +1,53 @@
+from src.core.search_index import InvertedIndex, tokenize
+
+
+def test_tokenize_splits_on_punctuation():
+    assert tokenize("Re: Invoice #42 from billing@example.com") == [
+        "re", "invoice", "42", "from", "billing", "example", "com"
+    ]
+    assert tokenize(None) == []
+
+
+def test_conjunctive_query_and_ranking():
+    index = InvertedIndex()
+    index.add_document(1, subject="Project update", body="budget numbers")
+    index.add_document(2, subject="Budget review", body="project budget")
+    index.add_document(3, subject="Lunch", body="project")
+
+    results = index.search("project budget")
+    assert [doc_id for doc_id, _ in results] == [2, 1]
+
+
+def test_prefix_expansion_and_removal():
+    index = InvertedIndex()
+    index.add_document(1, subject="newsletter")
+    index.add_document(2, subject="news")
+
+    assert {doc_id for doc_id, _ in index.search("news*")} == {1, 2}
+    index.remove_document(1)
+    assert index.expand_prefix("news") == ["news"]
+    assert index.search("newsletter") == []
+
+
+def test_prefix_search_is_not_truncated():
+    index = InvertedIndex()
+    for doc_id in range(600):
+        index.add_document(doc_id, subject=f"ticket{doc_id:04d}")
+    index.add_document(600, subject="tickets")
+    index.add_document(601, subject="unrelated")
+
+    assert len(index.search("ticket*")) == 601
+    assert index.expand_prefix("ticket", max_terms=3) == ["ticket0000", "ticket0001", "ticket0002"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "search_index.json.gz")
+    index = InvertedIndex()
+    index.add_document(7, subject="Quarterly report", sender="cfo@example.com")
+    index.save(path)
+    assert not index.dirty
+
+    loaded = InvertedIndex.load(path)
+    assert loaded.doc_ids == {7}
+    assert loaded.search("quart* cfo") == index.search("quart* cfo")
+    assert InvertedIndex.load(str(tmp_path / "missing.json.gz")) is None
@@ -0,0 +1,67 @@
+import pytest
+
+from src.core.sized_cache import (
+    EVICTION_SLRU,
+    EVICTION_W_TINYLFU,
+    FrequencySketch,
+    SizeAwareCache,
+    estimate_size,
+)
+
+
+def test_estimate_size_counts_nested_values():
+    small = estimate_size({"content": "short"})
+    large = estimate_size({"content": "x" * 10_000})
+    assert large - small >= 9_000
+
+
+def test_budget_is_enforced_in_bytes_not_entries():
+    cache = SizeAwareCache(max_bytes=1_000, size_estimator=len)
+    for i in range(10):
+        cache.put(f"note-{i}", "n" * 10)
+    assert len(cache) == 10
+
+    cache.put("body", "b" * 950)
+    assert cache.resident_bytes <= 1_000
+    assert "body" in cache
+    assert cache.get_stats()["evictions"] > 0
+
+    with pytest.raises(ValueError):
+        SizeAwareCache(policy="random")
+
+
+def test_slru_protects_entries_accessed_twice_from_scans():
+    cache = SizeAwareCache(max_bytes=100, policy=EVICTION_SLRU, size_estimator=len)
+    cache.put("hot", "h" * 10)
+    cache.get("hot")
+
+    # A scan of one-off entries only churns the probation segment
+    for i in range(20):
+        cache.put(f"scan-{i}", "s" * 10)
+
+    assert cache.get("hot") == "h" * 10
+    assert cache.resident_bytes <= 100
+
+
+def test_tinylfu_rejects_cold_candidates():
+    cache = SizeAwareCache(max_bytes=101, policy=EVICTION_W_TINYLFU, size_estimator=len)
+    for key in ("a", "b", "c", "d"):
+        cache.put(key, "v" * 25)
+        for _ in range(3):
+            cache.get(key)
+
+    cache.put("cold", "v" * 25)
+    stats = cache.get_stats()
+    assert stats["rejections"] == 1
+    assert "cold" not in cache
+    assert all(key in cache for key in ("a", "b", "c", "d"))
+
+
+def test_frequency_sketch_ages_counts():
+    sketch = FrequencySketch(width=16)
+    for _ in range(5):
+        sketch.increment("key")
+    assert sketch.estimate("key") == 5
+
+    sketch._age()
+    assert sketch.estimate("key") == 2
@@ -1,10 +1,12 @@
 
 import pytest
 import asyncio
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
 from datetime import datetime, timezone
+import copy
 import json
 
+from src.core.filter_matcher import CompiledFilterSet
 from src.core.smart_filter_manager import SmartFilterManager, EmailFilter, _EmailContext
 
 @pytest.fixture
@@ -51,22 +53,19 @@ async def test_apply_filters_to_email_context_creation(mock_db_manager):
         "body": "Some content"
     }
 
-    # We want to spy on _apply_filter_to_email to check arguments
-    # But since it's a method on the instance we're testing, we can wrap it
-    original_apply = mock_db_manager._apply_filter_to_email
-    mock_db_manager._apply_filter_to_email = AsyncMock(side_effect=original_apply)
-
-    result = await mock_db_manager.apply_filters_to_email(email_data)
+    # Spy on the compiled matcher to check the context it receives
+    with patch.object(CompiledFilterSet, "match", autospec=True, side_effect=CompiledFilterSet.match) as mock_match:
+        result = await mock_db_manager.apply_filters_to_email(email_data)
 
     assert len(result["filters_matched"]) == 1
     assert result["filters_matched"][0]["filter_id"] == "test_filter"
 
     # Verify call args
-    call_args = mock_db_manager._apply_filter_to_email.call_args
+    call_args = mock_match.call_args
     assert call_args is not None
-    filter_arg, context_arg = call_args[0]
+    compiled_arg, context_arg = call_args[0]
 
-    assert filter_arg == filter_obj
+    assert compiled_arg.source == [filter_obj]
     assert isinstance(context_arg, _EmailContext)
     assert context_arg.subject_lower == "this is a test email"
     assert context_arg.sender_domain == "example.com"
@@ -151,3 +150,95 @@ async def test_batch_update_filter_usage(mock_db_manager):
 
     # Verify cache invalidation
     assert mock_db_manager.caching_manager.delete.call_count == 3
+
+@pytest.mark.asyncio
+async def test_compiled_filters_are_reused_until_filters_change(mock_db_manager):
+    """Verify the active filter set is compiled once and rebuilt after a change."""
+    filters = [
+        EmailFilter(
+            filter_id="f0",
+            name="Filter 0",
+            description="Test",
+            criteria={"sender_domain": "example.com"},
+            actions={},
+            priority=5,
+            effectiveness_score=0.0,
+            created_at=datetime.now(timezone.utc),
+            last_used=datetime.now(timezone.utc),
+            usage_count=0,
+            false_positive_rate=0.0,
+            performance_metrics={},
+            is_active=True
+        )
+    ]
+    mock_db_manager.get_active_filters_sorted.return_value = filters
+    mock_db_manager._batch_update_filter_usage = AsyncMock()
+    email_data = {"sender": "user@example.com", "subject": "Hello"}
+
+    await mock_db_manager.apply_filters_to_email(email_data)
+    compiled = mock_db_manager._compiled_filters
+    await mock_db_manager.apply_filters_to_email(email_data)
+    assert mock_db_manager._compiled_filters is compiled
+    # While the version is unchanged the filters are not even reloaded
+    assert mock_db_manager.get_active_filters_sorted.await_count == 1
+
+    # Filter changes all invalidate, which bumps the version
+    changed = copy.deepcopy(filters)
+    changed[0].criteria = {"sender_domain": "example.org"}
+    mock_db_manager.get_active_filters_sorted.return_value = changed
+    await mock_db_manager._invalidate_active_filters()
+    result = await mock_db_manager.apply_filters_to_email(email_data)
+    assert mock_db_manager._compiled_filters is not compiled
+    assert result["filters_matched"] == []
+
+    await mock_db_manager.update_filter_status("f0", False)
+    assert mock_db_manager._compiled_filters is None
+
+@pytest.mark.asyncio
+async def test_apply_filters_to_emails_coalesces_usage_updates(mock_db_manager):
+    """Verify batch application returns per-email summaries and one usage update per batch."""
+    filter_obj = EmailFilter(
+        filter_id="invoices",
+        name="Invoices",
+        description="Test",
+        criteria={"subject_keywords": ["invoice"]},
+        actions={"add_label": "Finance"},
+        priority=5,
+        effectiveness_score=0.0,
+        created_at=datetime.now(timezone.utc),
+        last_used=datetime.now(timezone.utc),
+        usage_count=0,
+        false_positive_rate=0.0,
+        performance_metrics={},
+        is_active=True
+    )
+    mock_db_manager.get_active_filters_sorted.return_value = [filter_obj]
+    mock_db_manager._db_executemany = MagicMock()
+
+    async def email_stream():
+        for i in range(5):
+            yield {"id": i, "sender": "billing@example.com", "subject": f"Invoice {i}" if i % 2 == 0 else "Hello"}
+
+    result = await mock_db_manager.apply_filters_to_emails(email_stream(), batch_size=2)
+
+    assert [s["email_id"] for s in result["summaries"]] == [0, 1, 2, 3, 4]
+    assert [s["categories"] for s in result["summaries"]] == [["Finance"], [], ["Finance"], [], ["Finance"]]
+    assert result["metrics"]["emails_processed"] == 5
+    assert result["metrics"]["batches"] == 3
+    assert result["metrics"]["filters_matched"] == 3
+
+    # Batches 1, 2 and 3 each matched once: one update statement per batch
+    assert mock_db_manager._db_executemany.call_count == 3
+    query, params = mock_db_manager._db_executemany.call_args[0]
+    assert "usage_count + ?" in query
+    assert params[0][0] == 1 and params[0][2] == "invoices"
+    assert filter_obj.usage_count == 3
+    assert mock_db_manager.get_batch_metrics()["emails_processed"] == 5
+
+    # Report-only passes (e.g. a rerun backfill) leave the usage statistics alone
+    summaries = [s async for s in mock_db_manager.iter_filter_results(
+        email_stream(), batch_size=2, record_usage=False
+    )]
+    assert len(summaries) == 5
+    assert mock_db_manager._db_executemany.call_count == 3
+    assert filter_obj.usage_count == 3
@@ -0,0 +1,90 @@
+import random
+
+from src.core.sorted_index import EmailOrderIndex, SortedKeyList
+
+
+def _legacy_order(emails, category_id=None, is_unread=None):
+    """The full re-sort that the ordered index replaces."""
+    ordered = sorted(emails, key=lambda e: e.get("time", e.get("created_at", "")), reverse=True)
+    if category_id is not None:
+        ordered = [e for e in ordered if e.get("category_id") == category_id]
+    if is_unread is not None:
+        ordered = [e for e in ordered if e.get("is_unread") == is_unread]
+    return [e["id"] for e in ordered]
+
+
+def test_sorted_key_list_add_remove_and_offset():
+    keys = SortedKeyList(chunk_size=4)
+    values = random.Random(1).sample(range(1000), 200)
+    for value in values:
+        keys.add(value)
+    for value in values[:50]:
+        assert keys.remove(value)
+    assert not keys.remove(-1)
+
+    expected = sorted(values[50:])
+    assert list(keys) == expected
+    assert list(keys.iter_reversed_from(7)) == expected[::-1][7:]
+    assert list(keys.iter_from(expected[20] - 0.5)) == expected[20:]
+    assert list(keys.iter_from(expected[-1] + 1)) == []
+    assert len(keys) == 150
+
+
+def test_index_matches_full_sort_under_writes():
+    rng = random.Random(42)
+    emails = {}
+    index = EmailOrderIndex()
+    for email_id in range(1, 301):
+        email = {
+            "id": email_id,
+            "time": f"2025-01-{rng.randint(1, 28):02d}",
+            "category_id": rng.choice([None, 1, 2]),
+            "is_unread": rng.choice([True, False]),
+        }
+        emails[email_id] = email
+        index.add(email)
+
+    for email_id in rng.sample(sorted(emails), 60):
+        emails[email_id]["is_unread"] = not emails[email_id]["is_unread"]
+        emails[email_id]["category_id"] = rng.choice([1, 2])
+        index.add(emails[email_id])
+    for email_id in rng.sample(sorted(emails), 40):
+        index.remove(email_id)
+        del emails[email_id]
+
+    # Emails are inserted in ID order, which mirrors the legacy emails_data order.
+    data = [emails[i] for i in sorted(emails)]
+    for category_id, is_unread in [(None, None), (1, None), (None, True), (2, False)]:
+        assert list(index.iter_ids(category_id, is_unread)) == _legacy_order(
+            data, category_id, is_unread
+        )
+    assert list(index.iter_ids(offset=10))[:5] == _legacy_order(data)[10:15]
+
+
+def test_rebuild_falls_back_to_created_at():
+    index = EmailOrderIndex()
+    index.rebuild(
+        [
+            {"id": 1, "created_at": "2025-01-01"},
+            {"id": 2, "time": "2025-02-01"},
+            {"id": 3, "created_at": "2025-03-01"},
+        ]
+    )
+    assert list(index.iter_ids()) == [3, 2, 1]
+
+
+def test_rebuild_from_order_reuses_saved_order():
+    emails = [{"id": i, "time": f"2025-01-{i % 7 + 1:02d}", "category_id": i % 2} for i in range(1, 30)]
+    index = EmailOrderIndex()
+    index.rebuild(emails)
+    by_id = {email["id"]: email for email in emails}
+
+    restored = EmailOrderIndex()
+    assert restored.rebuild_from_order(by_id, index.ordered_ids())
+    assert list(restored.iter_ids()) == list(index.iter_ids())
+    assert list(restored.iter_ids(category_id=1)) == list(index.iter_ids(category_id=1))
+
+    # A saved order that no longer matches the emails is rejected
+    by_id[5]["time"] = "2026-01-01"
+    assert not EmailOrderIndex().rebuild_from_order(by_id, index.ordered_ids())
+    assert not EmailOrderIndex().rebuild_from_order(by_id, index.ordered_ids()[1:])
@@ -0,0 +1,192 @@
+import gzip
+import json
+import os
+import sqlite3
+
+import pytest
+
+from src.core.database import DatabaseConfig
+from src.core.data.sqlite_data_source import SQLiteDataSource
+from src.core.storage_engine import STORAGE_ENGINE_WAL, WriteAheadLogStorageEngine
+
+
+@pytest.fixture
+def db_config(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return DatabaseConfig(data_dir=str(data_dir))
+
+
+@pytest.fixture
+def data_source(db_config):
+    # The connection and schema are created lazily on first use.
+    return SQLiteDataSource(os.path.join(db_config.data_dir, "emails.sqlite3"))
+
+
+def _write_json_gz(path, data):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+@pytest.mark.asyncio
+async def test_create_and_get_email(data_source):
+    """Creating an email assigns an ID and stores heavy content separately."""
+    category = await data_source.create_category({"name": "Work"})
+    created = await data_source.create_email(
+        {
+            "messageId": "msg-1",
+            "subject": "Hello",
+            "content": "Body text",
+            "category_id": category["id"],
+            "time": "2025-01-01T00:00:00Z",
+        }
+    )
+
+    assert created["id"] == 1
+    assert created["categoryName"] == "Work"
+    light = await data_source.get_email_by_id(created["id"], include_content=False)
+    assert "content" not in light
+    full = await data_source.get_email_by_message_id("msg-1")
+    assert full["content"] == "Body text"
+    assert (await data_source.get_all_categories())[0]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_keyset_pagination_matches_offset_order(data_source):
+    """Walking cursors returns the same newest-first order as offset pagination."""
+    for i in range(7):
+        await data_source.create_email(
+            {"messageId": f"msg-{i}", "subject": f"S{i}", "time": f"2025-01-0{i + 1}"}
+        )
+
+    page = await data_source.get_emails_page(limit=3)
+    paged_ids = [e["id"] for e in page["emails"]]
+    while page["next_cursor"]:
+        page = await data_source.get_emails_page(limit=3, cursor=page["next_cursor"])
+        paged_ids.extend(e["id"] for e in page["emails"])
+
+    offset_ids = [e["id"] for e in await data_source.get_emails(limit=100)]
+    assert paged_ids == offset_ids == [7, 6, 5, 4, 3, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_filters_and_category_counts(data_source):
+    """Category and unread filters use indexed columns and counts stay consistent."""
+    work = await data_source.create_category({"name": "Work"})
+    home = await data_source.create_category({"name": "Home"})
+    first = await data_source.create_email(
+        {"messageId": "a", "category_id": work["id"], "is_unread": True}
+    )
+    await data_source.create_email({"messageId": "b", "category_id": work["id"], "is_unread": False})
+
+    assert len(await data_source.get_emails_by_category(work["id"])) == 2
+    assert len(await data_source.get_emails(is_unread=True)) == 1
+
+    await data_source.update_email(first["id"], {"category_id": home["id"]})
+    assert await data_source.get_category_breakdown() == {"Home": 1, "Work": 1}
+
+    assert await data_source.delete_email(first["id"]) is True
+    assert await data_source.get_category_breakdown() == {"Work": 1, "Home": 0}
+
+
+@pytest.mark.asyncio
+async def test_search_covers_subject_and_content(data_source):
+    """Search matches light fields and stored content, case-insensitively."""
+    await data_source.create_email({"messageId": "a", "subject": "Quarterly report"})
+    await data_source.create_email({"messageId": "b", "subject": "Hi", "content": "Secret plan"})
+
+    assert [e["message_id"] for e in await data_source.search_emails("QUARTERLY")] == ["a"]
+    assert [e["message_id"] for e in await data_source.search_emails("secret")] == ["b"]
+    assert await data_source.search_emails("100%") == []
+
+
+@pytest.mark.asyncio
+async def test_search_matches_body_text_not_serialized_json(data_source):
+    """Quotes and non-ASCII text match; JSON keys and escapes do not."""
+    await data_source.create_email({"messageId": "a", "subject": "Hi", "content": 'She said "go" to ÉCOLE'})
+    await data_source.create_email({"messageId": "b", "subject": "Other", "content": "Nothing here"})
+
+    assert [e["message_id"] for e in await data_source.search_emails('"go"')] == ["a"]
+    assert [e["message_id"] for e in await data_source.search_emails("école")] == ["a"]
+    assert await data_source.search_emails('content":') == []
+    assert await data_source.search_emails('\\"') == []
+
+
+@pytest.mark.asyncio
+async def test_search_text_is_added_to_existing_databases(db_config):
+    """Databases created before the search_text column get it filled on open."""
+    db_path = os.path.join(db_config.data_dir, "emails.sqlite3")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE emails (id INTEGER PRIMARY KEY, message_id TEXT UNIQUE, category_id INTEGER, "
+                 "is_unread INTEGER, time TEXT NOT NULL DEFAULT '', subject TEXT, sender TEXT, "
+                 "sender_email TEXT, record TEXT NOT NULL, content TEXT)")
+    conn.execute(
+        "INSERT INTO emails (id, message_id, subject, record, content) VALUES (1, 'old', 'Old', ?, ?)",
+        (json.dumps({"message_id": "old", "subject": "Old"}), json.dumps({"content": "Legacy body"})),
+    )
+    conn.commit()
+    conn.close()
+
+    ds = SQLiteDataSource(db_path)
+    try:
+        assert [e["message_id"] for e in await ds.search_emails("legacy body")] == ["old"]
+    finally:
+        await ds.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_migration_includes_the_wal_tail(db_config):
+    """Emails logged to the WAL after the last snapshot are migrated too."""
+    db_config.storage_engine = STORAGE_ENGINE_WAL
+    engine = WriteAheadLogStorageEngine(db_config.data_dir)
+    _write_json_gz(db_config.emails_file, [{"id": 1, "message_id": "snap", "subject": "Snapshot"}])
+    engine.record_put("emails", {"id": 1, "message_id": "snap", "subject": "Edited"})
+    engine.record_put("emails", {"id": 2, "message_id": "tail", "subject": "Tail"})
+    await engine.commit("emails", db_config.emails_file, [])
+
+    ds = await SQLiteDataSource.create(db_config)
+    try:
+        assert (await ds.get_email_by_id(1))["subject"] == "Edited"
+        assert (await ds.get_email_by_id(2))["subject"] == "Tail"
+    finally:
+        await ds.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_one_shot_migration_from_json(db_config):
+    """Existing JSON files and content files are imported once with their IDs."""
+    _write_json_gz(db_config.categories_file, [{"id": 3, "name": "Work", "count": 0}])
+    _write_json_gz(db_config.users_file, [{"id": 1, "username": "alice"}])
+    _write_json_gz(
+        db_config.emails_file,
+        [{"id": 42, "message_id": "legacy", "subject": "Old", "category_id": 3}],
+    )
+    _write_json_gz(os.path.join(db_config.email_content_dir, "42.json.gz"), {"content": "Legacy body"})
+
+    ds = await SQLiteDataSource.create(db_config)
+    try:
+        email = await ds.get_email_by_id(42)
+        assert email["content"] == "Legacy body"
+        assert email["categoryName"] == "Work"
+        assert (await ds.get_all_categories())[0]["count"] == 1
+        assert await ds.migrate_from_json(db_config) == {}
+    finally:
+        await ds.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_migration_includes_the_wal_tail(db_config):
+    """Emails logged to the WAL after the last snapshot are migrated too."""
+    db_config.storage_engine = STORAGE_ENGINE_WAL
+    engine = WriteAheadLogStorageEngine(db_config.data_dir)
+    _write_json_gz(db_config.emails_file, [{"id": 1, "message_id": "snap", "subject": "Snapshot"}])
+    engine.record_put("emails", {"id": 1, "message_id": "snap", "subject": "Edited"})
+    engine.record_put("emails", {"id": 2, "message_id": "tail", "subject": "Tail"})
+    await engine.commit("emails", db_config.emails_file, [])
+
+    ds = await SQLiteDataSource.create(db_config)
+    try:
+        assert (await ds.get_email_by_id(1))["subject"] == "Edited"
+        assert (await ds.get_email_by_id(2))["subject"] == "Tail"
+    finally:
+        await ds.shutdown()
@@ -0,0 +1,224 @@
+import asyncio
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.core import storage_engine
+from src.core.storage_engine import (
+    JsonFileStorageEngine,
+    WriteAheadLogStorageEngine,
+    create_storage_engine,
+)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "emails.json.gz")
+
+
+@pytest.mark.asyncio
+async def test_wal_replays_snapshot_and_tail(tmp_path, snapshot_path):
+    """Records written through the WAL survive a restart, including deletes."""
+    engine = WriteAheadLogStorageEngine(str(tmp_path))
+    assert await engine.load("emails", snapshot_path) is None
+
+    records = []
+    for i in range(1, 6):
+        record = {"id": i, "subject": f"Subject {i}"}
+        records.append(record)
+        engine.record_put("emails", record)
+    await engine.persist("emails", snapshot_path, records)
+
+    records[0]["subject"] = "Changed"
+    engine.record_put("emails", records[0])
+    engine.record_delete("emails", 2)
+    del records[1]
+    await engine.persist("emails", snapshot_path, records)
+    await engine.close()
+
+    reloaded = await WriteAheadLogStorageEngine(str(tmp_path)).load("emails", snapshot_path)
+    assert reloaded == records
+
+
+@pytest.mark.asyncio
+async def test_wal_flush_appends_only_changes(tmp_path, snapshot_path):
+    """A flush writes the pending change set, not the whole corpus."""
+    engine = WriteAheadLogStorageEngine(str(tmp_path))
+    records = [{"id": i, "subject": "x" * 100} for i in range(1, 1001)]
+    for record in records:
+        engine.record_put("emails", record)
+    await engine.persist("emails", snapshot_path, records)
+    bytes_before = engine.get_stats()["appended_bytes"]
+
+    new_record = {"id": 1001, "subject": "new"}
+    records.append(new_record)
+    engine.record_put("emails", new_record)
+    await engine.persist("emails", snapshot_path, records)
+
+    assert engine.get_stats()["appended_bytes"] - bytes_before < 200
+
+
+@pytest.mark.asyncio
+async def test_wal_compaction_folds_segments_into_snapshot(tmp_path, snapshot_path):
+    """Compaction rewrites the snapshot and removes folded segments."""
+    engine = WriteAheadLogStorageEngine(
+        str(tmp_path), segment_max_bytes=256, compact_after_bytes=1024
+    )
+    records = []
+    for i in range(1, 51):
+        record = {"id": i, "subject": f"Subject {i}"}
+        records.append(record)
+        engine.record_put("emails", record)
+        await engine.persist("emails", snapshot_path, records)
+    await engine.close()
+
+    assert engine.get_stats()["compactions"] >= 1
+    assert os.path.exists(snapshot_path)
+    reloaded = await WriteAheadLogStorageEngine(str(tmp_path)).load("emails", snapshot_path)
+    assert reloaded == records
+
+
+async def _compaction_events(data_dir, fsync):
+    """Compacts a WAL and returns the file system operations of the compaction, in order."""
+    snapshot_path = str(data_dir / "emails.json.gz")
+    engine = WriteAheadLogStorageEngine(str(data_dir), fsync=fsync)
+    records = [{"id": 1, "subject": "Subject 1"}]
+    engine.record_put("emails", records[0])
+    await engine.persist("emails", snapshot_path, records)
+    records.append({"id": 2, "subject": "Subject 2"})
+    engine.record_put("emails", records[1])
+    await engine.persist("emails", snapshot_path, records)
+
+    events = []
+    real_replace, real_remove = os.replace, os.remove
+
+    def replace(src, dst):
+        events.append(f"replace:{os.path.basename(dst)}")
+        real_replace(src, dst)
+
+    def remove(path):
+        events.append("remove_segment")
+        real_remove(path)
+
+    with patch.object(os, "fsync", side_effect=lambda fd: events.append("fsync")), \
+            patch.object(storage_engine, "_fsync_dir", side_effect=lambda path: events.append("fsync_dir")), \
+            patch.object(os, "replace", side_effect=replace), \
+            patch.object(os, "remove", side_effect=remove):
+        await engine._compact("emails", snapshot_path, records)
+
+    reloaded = await WriteAheadLogStorageEngine(str(data_dir)).load("emails", snapshot_path)
+    assert reloaded == records
+    return events
+
+
+@pytest.mark.asyncio
+async def test_wal_snapshot_is_durable_before_segments_are_retired(tmp_path):
+    """The snapshot and its rename reach disk before the manifest moves and segments are removed."""
+    (tmp_path / "durable").mkdir()
+    assert await _compaction_events(tmp_path / "durable", fsync=True) == [
+        "fsync", "replace:emails.json.gz", "fsync_dir",
+        "fsync", "replace:MANIFEST.json", "fsync_dir",
+        "remove_segment",
+    ]
+    (tmp_path / "fast").mkdir()
+    assert await _compaction_events(tmp_path / "fast", fsync=False) == [
+        "replace:emails.json.gz", "replace:MANIFEST.json", "remove_segment",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_wal_skips_torn_tail_record(tmp_path, snapshot_path):
+    """A partially written last record is ignored on replay."""
+    engine = WriteAheadLogStorageEngine(str(tmp_path))
+    records = [{"id": 1, "subject": "kept"}]
+    engine.record_put("emails", records[0])
+    await engine.persist("emails", snapshot_path, records)
+
+    segment_dir = tmp_path / "wal" / "emails"
+    segment = sorted(p for p in segment_dir.iterdir() if p.suffix == ".log")[-1]
+    with open(segment, "a", encoding="utf-8") as f:
+        f.write('{"op": "put", "key": 2, "rec')
+
+    reloaded = await WriteAheadLogStorageEngine(str(tmp_path)).load("emails", snapshot_path)
+    assert reloaded == records
+
+
+@pytest.mark.asyncio
+async def test_wal_full_snapshot_for_undescribed_changes(tmp_path, snapshot_path):
+    """Persisting without recorded changes falls back to a full snapshot."""
+    engine = WriteAheadLogStorageEngine(str(tmp_path))
+    users = [{"id": 1, "username": "alice"}]
+    await engine.persist("users", snapshot_path, users)
+
+    reloaded = await WriteAheadLogStorageEngine(str(tmp_path)).load("users", snapshot_path)
+    assert reloaded == users
+
+
+@pytest.mark.asyncio
+async def test_wal_commit_appends_each_write_and_groups_concurrent_ones(tmp_path, snapshot_path):
+    """Commits make writes durable immediately; writes noted during an append share the next one."""
+    engine = WriteAheadLogStorageEngine(str(tmp_path))
+    records = []
+    # Nothing persisted yet, so the first save must be a full persist
+    assert not await engine.commit("emails", snapshot_path, records)
+    await engine.persist("emails", snapshot_path, records)
+
+    async def write(i):
+        record = {"id": i, "subject": f"Subject {i}"}
+        records.append(record)
+        engine.record_put("emails", record)
+        assert await engine.commit("emails", snapshot_path, records)
+
+    await asyncio.gather(*(write(i) for i in range(1, 21)))
+    stats = engine.get_stats()
+    assert stats["appended_records"] == 20
+    assert stats["flushes"] < 20
+    assert not engine._pending.get("emails")
+
+    # No shutdown: the log alone restores every committed write
+    reloaded = await WriteAheadLogStorageEngine(str(tmp_path)).load("emails", snapshot_path)
+    assert sorted(r["id"] for r in reloaded) == list(range(1, 21))
+
+
+@pytest.mark.asyncio
+async def test_wal_full_snapshot_waits_for_background_compaction(tmp_path, snapshot_path):
+    """An inline snapshot and a background compaction never run at the same time."""
+    engine = WriteAheadLogStorageEngine(str(tmp_path), compact_after_bytes=1)
+    records = [{"id": 1, "subject": "first"}]
+    engine.record_put("emails", records[0])
+    await engine.persist("emails", snapshot_path, records)
+
+    records.append({"id": 2, "subject": "second"})
+    engine.record_put("emails", records[1])
+    await engine.persist("emails", snapshot_path, records)
+    # A compaction is now scheduled; a full snapshot must queue behind it
+    await engine.persist("emails", snapshot_path, records)
+    await engine.close()
+
+    assert engine.get_stats()["compactions"] >= 2
+    reloaded = await WriteAheadLogStorageEngine(str(tmp_path)).load("emails", snapshot_path)
+    assert reloaded == records
+
+
+def test_create_storage_engine(tmp_path):
+    """The factory resolves engine names and falls back to JSON."""
+    assert isinstance(create_storage_engine("wal", str(tmp_path)), WriteAheadLogStorageEngine)
+    assert isinstance(create_storage_engine("json", str(tmp_path)), JsonFileStorageEngine)
+    assert isinstance(create_storage_engine(None, str(tmp_path)), JsonFileStorageEngine)
+
+
+@pytest.mark.asyncio
+async def test_json_persist_swaps_the_file_in_for_concurrent_readers(tmp_path, snapshot_path):
+    """A reader that opened the file before a persist keeps reading the old snapshot."""
+    engine = JsonFileStorageEngine()
+    old = [{"id": i, "subject": f"Old {i}"} for i in range(200)]
+    await engine.persist("emails", snapshot_path, old)
+
+    reader = engine.iter_records("emails", snapshot_path)
+    assert next(reader) == old[0]
+    await engine.persist("emails", snapshot_path, [{"id": 1, "subject": "New"}])
+    assert list(reader) == old[1:]
+
+    assert await engine.load("emails", snapshot_path) == [{"id": 1, "subject": "New"}]
+    assert os.listdir(tmp_path) == ["emails.json.gz"]
@@ -227,6 +227,57 @@ def test_metrics_collection():
     assert stats["nodes_executed"] == 2  # Both nodes should execute
 
 
+def _square(x):
+    return x * x
+
+
+def test_parallel_execution_overlaps_blocking_nodes():
+    """Test that blocking nodes run concurrently in the thread pool"""
+    import time
+
+    def slow_operation(x):
+        time.sleep(0.2)
+        return x + 1
+
+    nodes = {
+        node_id: Node(node_id, f"Node {node_id}", slow_operation, ["input"], ["output"])
+        for node_id in ("A", "B", "C")
+    }
+    workflow = Workflow("blocking_workflow", nodes, [])
+    runner = WorkflowRunner(workflow, max_concurrent=3)
+
+    start = time.perf_counter()
+    result = runner.run({"input": 1}, parallel_execution=True)
+    elapsed = time.perf_counter() - start
+
+    assert result["success"] is True
+    assert elapsed < 0.5, f"Nodes did not overlap: {elapsed:.2f}s"
+    assert result["stats"]["peak_concurrency"] == 3
+    assert result["stats"]["parallelism_utilization"] > 0.5
+
+
+def test_parallel_execution_modes():
+    """Test loop, thread and process execution modes in one workflow"""
+
+    async def async_operation(x):
+        return x + 1
+
+    node_a = Node("A", "Node A", async_operation, ["input"], ["output"])
+    node_b = Node("B", "Node B", _square, ["input"], ["output"], execution_mode="process")
+    node_c = Node("C", "Node C", lambda x: x - 1, ["input"], ["output"], execution_mode="thread")
+
+    connections = [
+        {"from": {"node_id": "A", "output": "output"}, "to": {"node_id": "B", "input": "input"}},
+        {"from": {"node_id": "B", "output": "output"}, "to": {"node_id": "C", "input": "input"}},
+    ]
+    workflow = Workflow("modes_workflow", {"A": node_a, "B": node_b, "C": node_c}, connections)
+    assert node_a.resolve_execution_mode() == "loop"
+
+    result = WorkflowRunner(workflow).run({"input": 2}, parallel_execution=True)
+    assert result["success"] is True
+    assert result["results"]["C"] == {"output": 8}
+
+
 if __name__ == "__main__":
     # Run all tests
     test_topological_sort()
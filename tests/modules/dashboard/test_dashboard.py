@@ -16,6 +16,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 # Import routes directly to avoid gradio dependency
 from modules.dashboard.routes import router as dashboard_router
 from modules.dashboard.models import ConsolidatedDashboardStats
+from src.core.performance_monitor import latency_summary
 
 # Mock data
 mock_emails = [
@@ -78,10 +79,14 @@ def setup_and_teardown_mock_log():
 
     assert log_file_path.exists()
 
+    # The dashboard reads the rolling summary, repaired here from the log
+    latency_summary.rebuild_from_log(str(log_file_path))
+
     yield
 
     # Teardown: remove the mock log file
     os.remove(log_file_path)
+    latency_summary.clear()
 
 def test_get_dashboard_stats():
     response = client.get("/api/dashboard/stats")